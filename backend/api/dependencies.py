@@ -1,8 +1,87 @@
 """Injeção de dependências da API."""
 
+from fastapi import Request
+
+from config import API_KEY_HEADER
+from services.admission import AdmissionController, client_id
 from services.convert_service import ConvertService
+from services.cost_estimator import get_cost_estimator
+from services.executor import ConversionExecutor
+from services.job_service import JobManager, create_job_store
+from services.result_cache import ResultCache
+from services.template_registry import TemplateRegistry
+from services.template_registry import get_template_registry as _template_registry
+
+_executor: ConversionExecutor | None = None
+_result_cache: ResultCache | None = None
+_job_manager: JobManager | None = None
+_admission: AdmissionController | None = None
 
 
 def get_convert_service() -> ConvertService:
     """Retorna instância do serviço de conversão."""
     return ConvertService()
+
+
+def get_conversion_executor() -> ConversionExecutor:
+    """Retorna o pool de conversões compartilhado (criado sob demanda)."""
+    global _executor
+    if _executor is None:
+        _executor = ConversionExecutor()
+    return _executor
+
+
+def shutdown_conversion_executor() -> None:
+    """Encerra o pool de conversões, se tiver sido criado."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Retorna o controle de admissão compartilhado (criado sob demanda)."""
+    global _admission
+    if _admission is None:
+        _admission = AdmissionController(estimator=get_cost_estimator())
+    return _admission
+
+
+def get_client_id(request: Request) -> str:
+    """Cliente da requisição: chave de API (header X-API-Key) ou IP."""
+    host = request.client.host if request.client else None
+    return client_id(request.headers.get(API_KEY_HEADER), host)
+
+
+def get_result_cache() -> ResultCache:
+    """Retorna o cache de resultados compartilhado (criado sob demanda)."""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache()
+    return _result_cache
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Retorna o registro de templates compartilhado."""
+    return _template_registry()
+
+
+def get_job_manager() -> JobManager:
+    """Retorna o gerenciador de jobs assíncronos (criado sob demanda)."""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(
+            get_conversion_executor(),
+            get_result_cache(),
+            create_job_store(),
+            admission=get_admission_controller(),
+        )
+    return _job_manager
+
+
+async def shutdown_job_manager() -> None:
+    """Cancela os jobs em andamento e fecha o armazenamento de jobs."""
+    global _job_manager
+    if _job_manager is not None:
+        await _job_manager.shutdown()
+        _job_manager = None
@@ -0,0 +1,83 @@
+"""Middlewares ASGI da API."""
+
+import time
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejeita com 413 corpos de requisição acima do limite da rota.
+
+    Verifica o Content-Length antes de ler o corpo e, para corpos sem
+    Content-Length (chunked), conta os bytes recebidos e aborta ao passar
+    do limite, antes que o upload inteiro seja processado.
+    """
+
+    def __init__(self, app, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path", "")) if scope["type"] == "http" else None
+        if limit is None or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Requisição muito grande. Limite: {limit // (1024 * 1024)}MB"
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit():
+            if int(content_length) > limit:
+                response = JSONResponse(status_code=413, content={"detail": detail})
+                await response(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+class ResponseTimingMiddleware:
+    """
+    Mede o envio da resposta (do início ao último bloco do corpo).
+
+    Só registra requisições cujo endpoint definiu request.state.metric_labels
+    (formato de entrada, formato de saída).
+    """
+
+    def __init__(self, app, observe):
+        self.app = app
+        self.observe = observe
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = None
+
+        async def timed_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = time.perf_counter()
+            await send(message)
+            if (
+                message["type"] == "http.response.body"
+                and not message.get("more_body", False)
+                and started is not None
+            ):
+                labels = scope.get("state", {}).get("metric_labels")
+                if labels is not None:
+                    self.observe(time.perf_counter() - started, *labels)
+
+        await self.app(scope, receive, timed_send)
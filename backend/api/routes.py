@@ -1,13 +1,73 @@
 """Endpoints de conversão."""
 
+import asyncio
+import dataclasses
 import logging
+import zipfile
+from pathlib import PurePosixPath
 
-from fastapi import APIRouter, File, Form, HTTPException, UploadFile
-from fastapi.responses import Response
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Request,
+    UploadFile,
+)
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 
-from config import DEFAULT_PLACEHOLDER, OUTPUT_FORMATS
-from domain.models import ConvertRequest
-from services.convert_service import ConversionError, ConvertService
+from api.dependencies import (
+    get_admission_controller,
+    get_client_id,
+    get_conversion_executor,
+    get_job_manager,
+    get_result_cache,
+    get_template_registry,
+)
+from api.uploads import SpooledUpload, read_upload
+from config import (
+    BATCH_MAX_BYTES,
+    DEFAULT_PLACEHOLDER,
+    MAX_FILE_SIZE_BYTES,
+    MAX_SECTIONS,
+)
+from domain.models import ConvertRequest, ConvertResult, SourceSection
+from converter.converter_registry import PANDOC_ENGINE, get_converter_registry
+from converter.docx_template import TemplateError
+from converter.engine_registry import get_engine_registry
+from services.admission import AdmissionController, export_cost
+from services.batch_service import (
+    BatchConverter,
+    BatchItem,
+    archive_items,
+    check_batch_limits,
+    stream_zip,
+)
+from services.convert_service import ConversionError, normalize_output_format
+from services.executor import ConversionExecutor
+from services.export_service import (
+    MULTIPART_MEDIA_TYPE,
+    MultiFormatExporter,
+    new_boundary,
+    parse_formats,
+    stream_export_zip,
+    stream_multipart,
+)
+from services.job_service import DONE, FAILED, JobManager, JobNotFoundError
+from services.metrics import (
+    CACHE_LOOKUP,
+    UPLOAD_READ,
+    StageTimer,
+    format_labels,
+    observe_stages,
+    record_conversion,
+    record_error,
+)
+from services.result_cache import ResultCache, cache_key
+from services.template_registry import TemplateNotFoundError, TemplateRegistry
 
 router = APIRouter(prefix="/api", tags=["convert"])
 logger = logging.getLogger(__name__)
@@ -15,10 +75,21 @@ logger = logging.getLogger(__name__)
 
 @router.post("/convert")
 async def convert(
+    http_request: Request,
     source_file: UploadFile = File(...),
     output_format: str = Form(...),
     template_file: UploadFile | None = File(default=None),
-    placeholder: str = Form(default=DEFAULT_PLACEHOLDER),
+    template_id: str | None = Form(default=None),
+    placeholder: str | None = Form(default=None),
+    pdf_engine: str | None = Form(default=None),
+    section_files: list[UploadFile] | None = File(default=None),
+    section_placeholders: str | None = Form(default=None),
+    if_none_match: str | None = Header(default=None),
+    executor: ConversionExecutor = Depends(get_conversion_executor),
+    cache: ResultCache = Depends(get_result_cache),
+    templates: TemplateRegistry = Depends(get_template_registry),
+    admission: AdmissionController = Depends(get_admission_controller),
+    client: str = Depends(get_client_id),
 ) -> Response:
     """
     Converte o arquivo de origem para o formato especificado.
@@ -26,47 +97,602 @@ async def convert(
     - source_file: Arquivo de origem (obrigatório)
     - output_format: docx, html, md, odt, pdf, rst, rtf, tex, txt
     - template_file: Arquivo DOCX base (opcional, só para saída DOCX)
-    - placeholder: Placeholder no template (default: {{CONTEUDO}})
+    - template_id: Id de template registrado (alternativa a template_file)
+    - placeholder: Placeholder no template (default: {{CONTEUDO}}, ou o do
+      template registrado)
+    - pdf_engine: Motor de PDF: markdown, html (direto) ou auto (opcional)
+    - section_files: Origens de outros placeholders do template (opcional,
+      só para saída DOCX); source_file vai no lugar de placeholder
+    - section_placeholders: Placeholders de section_files, separados por
+      vírgula e na mesma ordem (ex.: {{RESULTADOS}},{{ANEXOS}})
+
+    Todas as origens são convertidas em paralelo e inseridas no template num
+    único merge.
+
+    A resposta traz um ETag derivado do conteúdo; com If-None-Match igual,
+    retorna 304 sem converter. O header Server-Timing traz a duração de
+    cada etapa e X-Converter-Engine, o motor que fez a conversão.
+
+    Conversões fora do cache passam pelo controle de admissão do cliente
+    (X-API-Key ou IP): acima do limite, 429 com Retry-After.
     """
-    template_content = None
-    if template_file and template_file.filename:
-        template_content = await template_file.read()
+    uploads: list[SpooledUpload] = []
+    timer = StageTimer()
+    try:
+        with timer.stage(UPLOAD_READ):
+            request = await _read_request(
+                source_file,
+                output_format,
+                template_file,
+                template_id,
+                placeholder,
+                pdf_engine,
+                templates,
+                uploads,
+                section_files,
+                section_placeholders,
+            )
+        normalize_output_format(request.output_format)
+        http_request.state.metric_labels = format_labels(request)
 
-    content = await source_file.read()
-    request = ConvertRequest(
-        source_content=content,
-        source_filename=source_file.filename or "source.md",
-        output_format=output_format,
-        template_content=template_content,
-        placeholder=placeholder or DEFAULT_PLACEHOLDER,
+        with timer.stage(CACHE_LOOKUP):
+            key = await asyncio.to_thread(cache_key, request)
+        etag = f'"{key}"'
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        result, hit = await cache.get_or_convert(
+            key, request, admission.converter(client, executor.run)
+        )
+        timer.extend(result.timings)
+        record_conversion(request, result, hit, timer)
+        return _result_response(
+            result,
+            {
+                "ETag": etag,
+                "X-Cache": "HIT" if hit else "MISS",
+                "X-Converter-Engine": result.engine or PANDOC_ENGINE,
+                "Server-Timing": timer.server_timing(),
+            },
+        )
+    except Exception as exc:
+        record_error(exc)
+        raise _http_error(exc) from exc
+    finally:
+        for upload in uploads:
+            upload.cleanup()
+
+
+@router.post("/convert/export")
+async def convert_export(
+    http_request: Request,
+    source_file: UploadFile = File(...),
+    output_formats: str = Form(...),
+    template_file: UploadFile | None = File(default=None),
+    template_id: str | None = Form(default=None),
+    placeholder: str | None = Form(default=None),
+    pdf_engine: str | None = Form(default=None),
+    accept: str | None = Header(default=None),
+    executor: ConversionExecutor = Depends(get_conversion_executor),
+    cache: ResultCache = Depends(get_result_cache),
+    templates: TemplateRegistry = Depends(get_template_registry),
+    admission: AdmissionController = Depends(get_admission_controller),
+    client: str = Depends(get_client_id),
+) -> StreamingResponse:
+    """
+    Converte o arquivo de origem para vários formatos de uma vez.
+
+    - output_formats: Formatos separados por vírgula (ex.: docx,html,pdf)
+    - demais campos: como em /convert (o template vale para a saída DOCX)
+
+    A origem é lida uma única vez e os formatos são gerados em paralelo a
+    partir do mesmo AST. A resposta é um zip com um arquivo por formato, ou
+    multipart/mixed se o header Accept pedir. X-Cache traz HIT/MISS por
+    formato, X-Converter-Engine o motor de cada formato e Server-Timing, a
+    duração de cada etapa.
+    """
+    uploads: list[SpooledUpload] = []
+    timer = StageTimer()
+    try:
+        formats = parse_formats(output_formats)
+        with timer.stage(UPLOAD_READ):
+            request = await _read_request(
+                source_file,
+                formats[0],
+                template_file,
+                template_id,
+                placeholder,
+                pdf_engine,
+                templates,
+                uploads,
+            )
+        input_format, _ = format_labels(request)
+        http_request.state.metric_labels = (input_format, "export")
+
+        assessment = await admission.assess(request, formats)
+        outcome = await admission.run(
+            client,
+            export_cost(request, formats),
+            lambda: MultiFormatExporter(executor, cache).run(request, formats),
+            low_priority=assessment.low_priority,
+        )
+        timer.extend(outcome.timings)
+        observe_stages(timer.as_tuple(), input_format, "export")
+        for fmt, result, hit in zip(
+            outcome.formats, outcome.results, outcome.cache_hits
+        ):
+            record_conversion(
+                dataclasses.replace(request, output_format=fmt),
+                result,
+                hit,
+                StageTimer(),
+            )
+    except Exception as exc:
+        record_error(exc)
+        raise _http_error(exc) from exc
+    finally:
+        for upload in uploads:
+            upload.cleanup()
+
+    headers = {
+        "X-Cache": ", ".join(
+            f"{fmt}={'HIT' if hit else 'MISS'}"
+            for fmt, hit in zip(outcome.formats, outcome.cache_hits)
+        ),
+        "X-Converter-Engine": ", ".join(
+            f"{fmt}={result.engine or PANDOC_ENGINE}"
+            for fmt, result in zip(outcome.formats, outcome.results)
+        ),
+        "Server-Timing": timer.server_timing(),
+    }
+    if accept and MULTIPART_MEDIA_TYPE in accept:
+        boundary = new_boundary()
+        return StreamingResponse(
+            stream_multipart(outcome.results, boundary),
+            media_type=f"{MULTIPART_MEDIA_TYPE}; boundary={boundary}",
+            headers=headers,
+        )
+    stem = PurePosixPath(request.source_filename or "output").stem
+    return StreamingResponse(
+        stream_export_zip(outcome.results),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{stem}.zip"',
+            **headers,
+        },
     )
 
+
+@router.post("/jobs", status_code=202)
+async def create_job(
+    response: Response,
+    source_file: UploadFile = File(...),
+    output_format: str = Form(...),
+    template_file: UploadFile | None = File(default=None),
+    template_id: str | None = Form(default=None),
+    placeholder: str | None = Form(default=None),
+    pdf_engine: str | None = Form(default=None),
+    section_files: list[UploadFile] | None = File(default=None),
+    section_placeholders: str | None = Form(default=None),
+    jobs: JobManager = Depends(get_job_manager),
+    templates: TemplateRegistry = Depends(get_template_registry),
+    client: str = Depends(get_client_id),
+) -> dict:
+    """
+    Cria um job de conversão e retorna seu id imediatamente.
+
+    Mesmos campos de /convert. Acompanhe em GET /api/jobs/{id} e baixe o
+    resultado em GET /api/jobs/{id}/result.
+    """
+    uploads: list[SpooledUpload] = []
+
+    def cleanup() -> None:
+        for upload in uploads:
+            upload.cleanup()
+
     try:
-        result = ConvertService().execute(request)
-        return Response(
-            content=result.content,
-            media_type=result.content_type,
-            headers={
-                "Content-Disposition": f'attachment; filename="{result.filename}"'
-            },
+        request = await _read_request(
+            source_file,
+            output_format,
+            template_file,
+            template_id,
+            placeholder,
+            pdf_engine,
+            templates,
+            uploads,
+            section_files,
+            section_placeholders,
         )
+        record = jobs.submit(request, cleanup=cleanup, client=client)
+    except Exception as exc:
+        cleanup()
+        raise _http_error(exc) from exc
+    response.headers["Location"] = f"/api/jobs/{record.job_id}"
+    return record.to_dict()
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str, jobs: JobManager = Depends(get_job_manager)
+) -> dict:
+    """Estado do job: queued, running, done ou failed, com tempos."""
+    try:
+        return jobs.get(job_id).to_dict()
     except Exception as exc:
-        if isinstance(exc, ConversionError):
-            status = getattr(exc, "status_code", 400)
-            detail = str(exc)
-            logger.warning("Erro de conversão: %s", detail)
-        else:
-            status = 500
-            detail = str(exc)
-            logger.exception("Erro inesperado na conversão: %s", exc)
-        raise HTTPException(status_code=status, detail=detail) from exc
+        raise _http_error(exc) from exc
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(
+    job_id: str, jobs: JobManager = Depends(get_job_manager)
+) -> Response:
+    """
+    Baixa o resultado de um job concluído (com suporte a Range).
+
+    Jobs ainda em andamento retornam 409; jobs falhos, o erro da conversão.
+    """
+    try:
+        record = jobs.get(job_id)
+        if record.status == FAILED:
+            raise ConversionError(record.error, status_code=record.status_code)
+        if record.status != DONE:
+            raise ConversionError("Job ainda não concluído", status_code=409)
+        path = jobs.result_path(record)
+        if not path.exists():
+            raise JobNotFoundError(job_id)
+    except Exception as exc:
+        raise _http_error(exc) from exc
+    return FileResponse(
+        path,
+        media_type=record.content_type,
+        headers={"Content-Disposition": f'attachment; filename="{record.filename}"'},
+    )
+
+
+@router.delete("/jobs/{job_id}", status_code=204)
+async def delete_job(
+    job_id: str, jobs: JobManager = Depends(get_job_manager)
+) -> Response:
+    """Cancela (se em andamento) e remove o job e seu resultado."""
+    try:
+        jobs.delete(job_id)
+    except Exception as exc:
+        raise _http_error(exc) from exc
+    return Response(status_code=204)
+
+
+@router.post("/convert/batch")
+async def convert_batch(
+    source_files: list[UploadFile] = File(...),
+    output_format: str = Form(...),
+    template_file: UploadFile | None = File(default=None),
+    template_id: str | None = Form(default=None),
+    placeholder: str | None = Form(default=None),
+    pdf_engine: str | None = Form(default=None),
+    executor: ConversionExecutor = Depends(get_conversion_executor),
+    cache: ResultCache = Depends(get_result_cache),
+    templates: TemplateRegistry = Depends(get_template_registry),
+    admission: AdmissionController = Depends(get_admission_controller),
+    client: str = Depends(get_client_id),
+) -> StreamingResponse:
+    """
+    Converte vários arquivos (ou o conteúdo de arquivos .zip) de uma vez.
+
+    - source_files: Arquivos de origem; arquivos .zip são expandidos
+    - output_format, template_file, template_id, placeholder: como em /convert
+
+    Os arquivos são convertidos em paralelo no pool de conversões e a
+    resposta é um zip gerado em streaming, com cada resultado enviado assim
+    que fica pronto e um manifest.json com o status de cada arquivo.
+    Acima do limite do cliente, os itens são desacelerados (não recusados).
+    """
+    uploads: list[SpooledUpload] = []
+    archives: list[zipfile.ZipFile] = []
+
+    def cleanup() -> None:
+        for archive in archives:
+            archive.close()
+        for upload in uploads:
+            upload.cleanup()
+
+    try:
+        output_format = normalize_output_format(output_format)
+
+        items: list[BatchItem] = []
+        total = 0
+        for upload_file in source_files:
+            filename = upload_file.filename or "source.md"
+            if filename.lower().endswith(".zip"):
+                upload = await read_upload(
+                    upload_file, BATCH_MAX_BYTES, "Arquivo zip", spool_threshold=0
+                )
+                uploads.append(upload)
+                try:
+                    archive = zipfile.ZipFile(upload.path)
+                except zipfile.BadZipFile as exc:
+                    raise ConversionError(f"Zip inválido: {filename}") from exc
+                archives.append(archive)
+                items.extend(archive_items(archive))
+                continue
+            upload = await read_upload(upload_file, MAX_FILE_SIZE_BYTES, filename)
+            uploads.append(upload)
+            total += upload.size
+            if total > BATCH_MAX_BYTES:
+                raise ConversionError(
+                    f"Lote muito grande. Limite: {BATCH_MAX_BYTES // (1024 * 1024)}MB",
+                    status_code=413,
+                )
+            items.append(
+                BatchItem(name=filename, content=upload.content, path=upload.path)
+            )
+        check_batch_limits(items)
+
+        template_content = None
+        if template_id:
+            placeholder = placeholder or templates.get_info(template_id).placeholder
+        elif template_file and template_file.filename:
+            template = await read_upload(
+                template_file,
+                MAX_FILE_SIZE_BYTES,
+                "Template",
+                spool_threshold=MAX_FILE_SIZE_BYTES,
+            )
+            template_content = template.content
+        placeholder = placeholder or DEFAULT_PLACEHOLDER
+        if template_content and output_format == "docx":
+            # Pré-processa uma vez: valida antes do streaming e aquece o cache
+            await asyncio.to_thread(templates.prepare, template_content, placeholder)
+
+        base = ConvertRequest(
+            source_content=b"",
+            source_filename="",
+            output_format=output_format,
+            template_content=template_content,
+            placeholder=placeholder,
+            template_id=template_id or None,
+            pdf_engine=pdf_engine or None,
+        )
+        outcomes = BatchConverter(
+            executor,
+            cache,
+            convert=admission.converter(
+                client, executor.run_when_available, wait=True
+            ),
+        ).run(items, base)
+    except Exception as exc:
+        cleanup()
+        raise _http_error(exc) from exc
+
+    return StreamingResponse(
+        stream_zip(outcomes, output_format),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="convertidos.zip"'},
+        background=BackgroundTask(cleanup),
+    )
+
+
+@router.post("/templates", status_code=201)
+async def register_template(
+    template_file: UploadFile = File(...),
+    placeholder: str = Form(default=DEFAULT_PLACEHOLDER),
+    templates: TemplateRegistry = Depends(get_template_registry),
+) -> dict:
+    """
+    Registra um template DOCX (ou ODT) para uso por id em /api/convert.
+
+    O template é validado e pré-processado uma única vez; o id é derivado
+    do conteúdo, então registrar o mesmo arquivo de novo retorna o mesmo id.
+    Sem o placeholder (placeholder_count 0) ou em ODT, o template só aplica
+    os estilos, como documento de referência do Pandoc.
+    """
+    try:
+        upload = await read_upload(
+            template_file,
+            MAX_FILE_SIZE_BYTES,
+            "Template",
+            spool_threshold=MAX_FILE_SIZE_BYTES,
+        )
+        info = await asyncio.to_thread(
+            templates.register,
+            upload.content,
+            template_file.filename or "template.docx",
+            placeholder or DEFAULT_PLACEHOLDER,
+        )
+        return info.to_dict()
+    except Exception as exc:
+        raise _http_error(exc) from exc
+
+
+@router.get("/templates")
+async def list_templates(
+    templates: TemplateRegistry = Depends(get_template_registry),
+) -> dict:
+    """Lista os templates registrados."""
+    return {
+        "templates": [info.to_dict() for info in templates.list()],
+        "cache": templates.stats(),
+    }
+
+
+@router.get("/templates/{template_id}")
+async def get_template(
+    template_id: str,
+    templates: TemplateRegistry = Depends(get_template_registry),
+) -> dict:
+    """Retorna os metadados de um template registrado."""
+    try:
+        return templates.get_info(template_id).to_dict()
+    except Exception as exc:
+        raise _http_error(exc) from exc
+
+
+@router.delete("/templates/{template_id}", status_code=204)
+async def delete_template(
+    template_id: str,
+    templates: TemplateRegistry = Depends(get_template_registry),
+) -> Response:
+    """Remove um template registrado."""
+    try:
+        templates.delete(template_id)
+    except Exception as exc:
+        raise _http_error(exc) from exc
+    return Response(status_code=204)
+
+
+@router.get("/admission")
+async def admission_stats(
+    admission: AdmissionController = Depends(get_admission_controller),
+    client: str = Depends(get_client_id),
+) -> dict:
+    """
+    Limites por cliente, ocupação da fila justa e os clientes mais ativos
+    (saldo do bucket, conversões em execução/na fila, admitidas, recusadas
+    e tempo desacelerado), a fila de baixa prioridade e, em estimator, os
+    orçamentos de custo e a calibração por par de formatos. client é o
+    identificador de quem consulta.
+    """
+    return {**admission.stats(), "client": client}
 
 
 @router.get("/formats")
 async def list_formats() -> dict:
-    """Lista os formatos de conversão suportados."""
+    """
+    Lista os formatos de conversão suportados pelos motores disponíveis.
+
+    Responde a partir do registro de motores, sondado na inicialização.
+    converters lista, por par de formatos, os conversores em processo
+    tentados antes do Pandoc.
+    """
+    registry = get_engine_registry()
+    output_formats = registry.output_formats()
     return {
-        "from_md": ["docx", "html", "md", "odt", "pdf", "rst", "rtf", "tex", "txt"],
+        "from_md": output_formats,
         "to_md": ["html", "md", "rst", "tex", "txt"],
-        "output_formats": sorted(OUTPUT_FORMATS),
+        "output_formats": output_formats,
+        "engines": registry.to_dict(),
+        "converters": get_converter_registry().to_dict(),
     }
+
+
+async def _read_request(
+    source_file: UploadFile,
+    output_format: str,
+    template_file: UploadFile | None,
+    template_id: str | None,
+    placeholder: str | None,
+    pdf_engine: str | None,
+    templates: TemplateRegistry,
+    uploads: list[SpooledUpload],
+    section_files: list[UploadFile] | None = None,
+    section_placeholders: str | None = None,
+) -> ConvertRequest:
+    """
+    Lê os uploads do formulário de conversão e monta a requisição.
+
+    Os uploads lidos são acrescentados a `uploads`; quem chama é responsável
+    por removê-los quando a conversão terminar.
+    """
+    source = await read_upload(source_file, MAX_FILE_SIZE_BYTES, "Arquivo de origem")
+    uploads.append(source)
+    template = None
+    if template_id:
+        placeholder = placeholder or templates.get_info(template_id).placeholder
+    elif template_file and template_file.filename:
+        template = await read_upload(template_file, MAX_FILE_SIZE_BYTES, "Template")
+        uploads.append(template)
+
+    names = [
+        name.strip() for name in (section_placeholders or "").split(",") if name.strip()
+    ]
+    files = [file for file in section_files or [] if file.filename]
+    if len(names) != len(files):
+        raise ConversionError(
+            "Informe um placeholder em section_placeholders para cada arquivo "
+            "de section_files"
+        )
+    if len(files) > MAX_SECTIONS:
+        raise ConversionError(
+            f"Seções demais em section_files. Limite: {MAX_SECTIONS}",
+            status_code=413,
+        )
+    sections = []
+    for name, section_file in zip(names, files):
+        upload = await read_upload(
+            section_file, MAX_FILE_SIZE_BYTES, f"Origem de {name}"
+        )
+        uploads.append(upload)
+        sections.append(
+            SourceSection(
+                placeholder=name,
+                content=upload.content,
+                filename=section_file.filename,
+                path=upload.path,
+            )
+        )
+
+    return ConvertRequest(
+        source_content=source.content,
+        source_filename=source_file.filename or "source.md",
+        output_format=output_format,
+        template_content=template.content if template else None,
+        placeholder=placeholder or DEFAULT_PLACEHOLDER,
+        source_path=source.path,
+        template_path=template.path if template else None,
+        template_id=template_id or None,
+        pdf_engine=pdf_engine or None,
+        sections=tuple(sections),
+    )
+
+
+def _result_response(result: ConvertResult, headers: dict[str, str]) -> Response:
+    """
+    Monta a resposta do resultado.
+
+    Resultados em arquivo são enviados em streaming (com suporte a Range) e o
+    arquivo é removido após o envio.
+    """
+    headers = {
+        "Content-Disposition": f'attachment; filename="{result.filename}"',
+        **headers,
+    }
+    if result.path:
+        return FileResponse(
+            result.path,
+            media_type=result.content_type,
+            headers=headers,
+            background=BackgroundTask(result.cleanup),
+        )
+    return Response(
+        content=result.content, media_type=result.content_type, headers=headers
+    )
+
+
+def _http_error(exc: Exception) -> HTTPException:
+    """Traduz exceções da conversão em HTTPException."""
+    headers = None
+    if isinstance(exc, TemplateNotFoundError):
+        exc = ConversionError(str(exc), status_code=404)
+    elif isinstance(exc, TemplateError):
+        exc = ConversionError(str(exc))
+    if isinstance(exc, ConversionError):
+        status = getattr(exc, "status_code", 400)
+        detail = str(exc)
+        logger.warning("Erro de conversão: %s", detail)
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after is not None:
+            headers = {"Retry-After": str(retry_after)}
+    else:
+        status = 500
+        detail = str(exc)
+        logger.exception("Erro inesperado na conversão: %s", exc)
+    return HTTPException(status_code=status, detail=detail, headers=headers)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Verifica se o header If-None-Match contém o ETag (comparação fraca)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
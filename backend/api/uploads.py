@@ -0,0 +1,76 @@
+"""Leitura de uploads em blocos, com limite de tamanho e spool em disco."""
+
+import asyncio
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import UploadFile
+
+from config import UPLOAD_CHUNK_SIZE, UPLOAD_SPOOL_THRESHOLD_BYTES
+from services.convert_service import ConversionError
+
+
+@dataclass
+class SpooledUpload:
+    """Conteúdo de um upload: em memória (content) ou em disco (path)."""
+
+    content: bytes
+    path: str | None
+    size: int
+
+    def cleanup(self) -> None:
+        """Remove o arquivo em disco, se houver."""
+        if self.path:
+            Path(self.path).unlink(missing_ok=True)
+            self.path = None
+
+
+async def read_upload(
+    upload: UploadFile,
+    limit: int,
+    label: str,
+    spool_threshold: int = UPLOAD_SPOOL_THRESHOLD_BYTES,
+) -> SpooledUpload:
+    """
+    Lê o upload em blocos, abortando assim que o limite é ultrapassado.
+
+    Até spool_threshold bytes o conteúdo fica em memória; acima disso é
+    gravado em um arquivo temporário, cujo caminho é retornado.
+
+    Raises:
+        ConversionError: 413 quando o upload excede o limite.
+    """
+    buffer = bytearray()
+    spool = None
+    size = 0
+    try:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > limit:
+                raise ConversionError(
+                    f"{label} muito grande. Limite: {limit // (1024 * 1024)}MB",
+                    status_code=413,
+                )
+            if spool is None and len(buffer) + len(chunk) > spool_threshold:
+                spool = tempfile.NamedTemporaryFile(
+                    prefix="upload-",
+                    suffix=Path(upload.filename or "").suffix,
+                    delete=False,
+                )
+                await asyncio.to_thread(spool.write, bytes(buffer))
+                buffer.clear()
+            if spool is not None:
+                await asyncio.to_thread(spool.write, chunk)
+            else:
+                buffer.extend(chunk)
+    except BaseException:
+        if spool is not None:
+            spool.close()
+            os.unlink(spool.name)
+        raise
+    if spool is not None:
+        spool.close()
+        return SpooledUpload(content=b"", path=spool.name, size=size)
+    return SpooledUpload(content=bytes(buffer), path=None, size=size)
@@ -0,0 +1,550 @@
+"""
+Conversão em lote pela linha de comando.
+
+Percorre um diretório, converte cada arquivo de formato suportado (pela
+extensão, como em EXT_TO_PANDOC) para os formatos pedidos num pool de
+processos e guarda no diretório de saída um manifesto com o hash de cada
+origem: numa nova execução, só os arquivos alterados (ou os formatos que
+ainda não foram gerados) são convertidos. Com --watch, o diretório é
+verificado periodicamente e só o que mudou é reconvertido.
+
+Uso (a partir de backend/):
+    python -m cli ../docs --output ../site --formats html,pdf
+    python -m cli ../docs -o ../site -f docx --template ../templates/base.docx
+    python -m cli ../docs -o ../site -f html --watch --interval 2
+
+Termina com código 1 se alguma conversão falhar (na última passada).
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from collections import Counter
+from collections.abc import Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from config import OUTPUT_FORMATS, PDF_ENGINE
+from converter.pandoc_engine import EXT_TO_PANDOC, PandocEngine
+from domain.models import ConvertRequest, ConvertResult
+from services.convert_service import ConversionError, ConvertService
+from services.result_cache import engine_version
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".converter-manifest.json"
+MANIFEST_VERSION = 1
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class FileTask:
+    """Conversão de um arquivo de origem para um ou mais formatos."""
+
+    path: str
+    rel: str
+    sha256: str
+    size: int
+    mtime_ns: int
+    formats: tuple[str, ...]
+    outputs: tuple[str, ...]
+    template_path: str | None = None
+    placeholder: str | None = None
+    pdf_engine: str | None = None
+
+
+@dataclass(frozen=True)
+class FileOutcome:
+    """Resultado da conversão de um arquivo (error é None em caso de sucesso)."""
+
+    task: FileTask
+    elapsed: float
+    output_bytes: int = 0
+    error: str | None = None
+
+
+@dataclass
+class PassStats:
+    """Totais de uma passada pelo diretório."""
+
+    converted: int = 0
+    skipped: int = 0
+    failed: int = 0
+    input_bytes: int = 0
+    output_bytes: int = 0
+    elapsed: float = 0.0
+    outcomes: list[FileOutcome] = field(default_factory=list)
+
+
+def file_sha256(path: Path) -> str:
+    """Hash SHA-256 do conteúdo do arquivo, lido em blocos."""
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        while chunk := file.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_sources(source_dir: Path, exclude: Iterable[Path] = ()) -> list[Path]:
+    """Arquivos de formato suportado no diretório, em ordem, sem os excluídos."""
+    excluded = [path.resolve() for path in exclude]
+    sources = []
+    for path in sorted(source_dir.rglob("*")):
+        if path.suffix.lower() not in EXT_TO_PANDOC or not path.is_file():
+            continue
+        if any(part.startswith(".") for part in path.relative_to(source_dir).parts):
+            continue
+        resolved = path.resolve()
+        if any(resolved == other or other in resolved.parents for other in excluded):
+            continue
+        sources.append(path)
+    return sources
+
+
+def output_names(rels: list[str], output_format: str) -> dict[str, str]:
+    """
+    Caminho de saída (relativo) de cada origem para o formato.
+
+    `guia/intro.md` vira `guia/intro.html`; se duas origens da mesma pasta
+    têm o mesmo nome (`a.md` e `a.rst`), a extensão de origem é mantida
+    (`a.md.html` e `a.rst.html`).
+    """
+    extension = PandocEngine.get_output_extension(output_format)
+    stems = Counter((str(Path(rel).parent), Path(rel).stem.lower()) for rel in rels)
+    names = {}
+    for rel in rels:
+        path = Path(rel)
+        if stems[(str(path.parent), path.stem.lower())] > 1:
+            names[rel] = (path.parent / (path.name + extension)).as_posix()
+        else:
+            names[rel] = path.with_suffix(extension).as_posix()
+    return names
+
+
+class Manifest:
+    """
+    Hash e formatos já gerados de cada origem, gravado no diretório de saída.
+
+    `settings` identifica as versões dos motores e as opções da conversão:
+    se mudar, todas as origens são convertidas de novo.
+    """
+
+    def __init__(self, path: Path, settings: str):
+        self.path = path
+        self.settings = settings
+        self.files: dict[str, dict] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            logger.warning("Manifesto ilegível, convertendo tudo: %s", exc)
+            return
+        if (
+            data.get("version") == MANIFEST_VERSION
+            and data.get("settings") == self.settings
+        ):
+            self.files = data.get("files", {})
+
+    def save(self) -> None:
+        """Grava o manifesto de forma atômica."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "version": MANIFEST_VERSION,
+                    "settings": self.settings,
+                    "files": self.files,
+                },
+                indent=1,
+                sort_keys=True,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.path)
+
+    def outputs(self) -> set[str]:
+        """Saídas registradas (relativas ao diretório de saída)."""
+        return {
+            output
+            for entry in self.files.values()
+            for output in entry.get("outputs", {}).values()
+        }
+
+    def record(self, task: FileTask) -> None:
+        """Registra os formatos convertidos a partir do conteúdo da tarefa."""
+        entry = self.files.get(task.rel)
+        if entry is None or entry.get("sha256") != task.sha256:
+            entry = {"sha256": task.sha256, "outputs": {}}
+            self.files[task.rel] = entry
+        entry.update(size=task.size, mtime_ns=task.mtime_ns)
+        entry["outputs"].update(zip(task.formats, task.outputs))
+
+
+class BulkConverter:
+    """
+    Converte um diretório para os formatos pedidos, de forma incremental.
+
+    Args:
+        source_dir: Diretório com os arquivos de origem
+        output_dir: Diretório de saída (mesma estrutura de pastas da origem)
+        formats: Formatos de saída (os mesmos de /api/convert)
+        jobs: Processos de conversão (1: no próprio processo)
+        template_path: Template DOCX para a saída DOCX (opcional)
+        placeholder: Placeholder no template
+        pdf_engine: Motor de PDF (markdown, html ou auto)
+        force: Ignora o manifesto e converte tudo
+    """
+
+    def __init__(
+        self,
+        source_dir: Path,
+        output_dir: Path,
+        formats: list[str],
+        jobs: int = os.cpu_count() or 1,
+        template_path: Path | None = None,
+        placeholder: str | None = None,
+        pdf_engine: str | None = None,
+        force: bool = False,
+    ):
+        self.source_dir = source_dir
+        self.output_dir = output_dir
+        self.formats = formats
+        self.jobs = max(1, jobs)
+        self.template_path = template_path
+        self.placeholder = placeholder
+        self.pdf_engine = pdf_engine
+        self.manifest = Manifest(output_dir / MANIFEST_NAME, self._settings())
+        if force:
+            self.manifest.files.clear()
+        self._pool: Executor | None = None
+
+    def __enter__(self) -> "BulkConverter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Encerra o pool de processos, se tiver sido criado."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def plan(self) -> tuple[list[FileTask], int]:
+        """
+        Tarefas de conversão das origens novas ou alteradas.
+
+        Returns:
+            (tarefas, número de origens sem alteração)
+        """
+        in_place = self.output_dir.resolve() == self.source_dir.resolve()
+        sources = find_sources(self.source_dir, [] if in_place else [self.output_dir])
+        rels = [path.relative_to(self.source_dir).as_posix() for path in sources]
+        if in_place:
+            # Saídas gravadas junto das origens não são convertidas de novo
+            known_outputs = self.manifest.outputs()
+            kept = [i for i, rel in enumerate(rels) if rel not in known_outputs]
+            sources, rels = [sources[i] for i in kept], [rels[i] for i in kept]
+        names = {fmt: output_names(rels, fmt) for fmt in self.formats}
+        # Origens removidas saem do manifesto (as saídas ficam)
+        for rel in set(self.manifest.files) - set(rels):
+            del self.manifest.files[rel]
+
+        tasks, skipped = [], 0
+        for path, rel in zip(sources, rels):
+            stat = path.stat()
+            entry = self.manifest.files.get(rel, {})
+            unchanged = (entry.get("size"), entry.get("mtime_ns")) == (
+                stat.st_size,
+                stat.st_mtime_ns,
+            )
+            if unchanged:
+                sha256 = entry["sha256"]
+            else:
+                sha256 = file_sha256(path)
+            done = entry.get("outputs", {}) if entry.get("sha256") == sha256 else {}
+            missing = [
+                fmt
+                for fmt in self.formats
+                if done.get(fmt) != names[fmt][rel]
+                or not (self.output_dir / names[fmt][rel]).exists()
+            ]
+            if not missing:
+                skipped += 1
+                if not unchanged:
+                    # Mesmo conteúdo com outra data: evita recalcular o hash
+                    entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                continue
+            tasks.append(
+                FileTask(
+                    path=str(path),
+                    rel=rel,
+                    sha256=sha256,
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                    formats=tuple(missing),
+                    outputs=tuple(names[fmt][rel] for fmt in missing),
+                    template_path=(
+                        str(self.template_path) if self.template_path else None
+                    ),
+                    placeholder=self.placeholder,
+                    pdf_engine=self.pdf_engine,
+                )
+            )
+        # Maiores primeiro: o pool termina mais cedo
+        tasks.sort(key=lambda task: task.size, reverse=True)
+        return tasks, skipped
+
+    def run_once(self, progress=None) -> PassStats:
+        """Uma passada: converte o que mudou e atualiza o manifesto."""
+        started = time.perf_counter()
+        tasks, skipped = self.plan()
+        stats = PassStats(skipped=skipped)
+        try:
+            for done, outcome in enumerate(self._run(tasks), start=1):
+                stats.outcomes.append(outcome)
+                if outcome.error is None:
+                    stats.converted += 1
+                    stats.input_bytes += outcome.task.size
+                    stats.output_bytes += outcome.output_bytes
+                    self.manifest.record(outcome.task)
+                else:
+                    stats.failed += 1
+                if progress is not None:
+                    progress(done, len(tasks), outcome)
+        finally:
+            # Interrompido no meio: o que já foi convertido não é refeito
+            self.manifest.save()
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    def _run(self, tasks: list[FileTask]) -> Iterable[FileOutcome]:
+        if self.jobs == 1 or len(tasks) <= 1:
+            for task in tasks:
+                yield convert_file(task, str(self.output_dir))
+            return
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.jobs,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        futures = [
+            self._pool.submit(convert_file, task, str(self.output_dir))
+            for task in tasks
+        ]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _settings(self) -> str:
+        template = file_sha256(self.template_path) if self.template_path else ""
+        return ";".join(
+            [
+                engine_version(),
+                f"pdf_engine={self.pdf_engine or PDF_ENGINE}",
+                f"template={template}",
+                f"placeholder={self.placeholder or ''}",
+            ]
+        )
+
+
+def convert_file(task: FileTask, output_dir: str) -> FileOutcome:
+    """
+    Converte um arquivo e grava as saídas (função de nível de módulo,
+    executada nos processos do pool).
+    """
+    started = time.perf_counter()
+    request = ConvertRequest(
+        source_content=b"",
+        source_filename=Path(task.path).name,
+        output_format=task.formats[0],
+        source_path=task.path,
+        template_path=task.template_path,
+        pdf_engine=task.pdf_engine,
+        **({"placeholder": task.placeholder} if task.placeholder else {}),
+    )
+    service = ConvertService()
+    try:
+        if len(task.formats) == 1:
+            results: tuple[ConvertResult, ...] = (service.execute(request),)
+        else:
+            results = service.export(request, task.formats).results
+        output_bytes = 0
+        for result, output in zip(results, task.outputs):
+            output_bytes += _write_output(result, Path(output_dir) / output)
+    except (ConversionError, OSError) as exc:
+        return FileOutcome(task, time.perf_counter() - started, error=str(exc))
+    except Exception as exc:
+        logger.exception("Erro inesperado ao converter %s", task.rel)
+        return FileOutcome(task, time.perf_counter() - started, error=repr(exc))
+    return FileOutcome(task, time.perf_counter() - started, output_bytes)
+
+
+def _write_output(result: ConvertResult, destination: Path) -> int:
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    if result.path:
+        size = os.path.getsize(result.path)
+        shutil.move(result.path, destination)
+        return size
+    destination.write_bytes(result.content)
+    return len(result.content)
+
+
+def _print_progress(done: int, total: int, outcome: FileOutcome) -> None:
+    status = "ERRO" if outcome.error else "ok"
+    formats = ",".join(outcome.task.formats)
+    print(
+        f"[{done}/{total}] {outcome.task.rel} -> {formats} "
+        f"({outcome.elapsed:.2f}s) {status}"
+        + (f": {outcome.error}" if outcome.error else "")
+    )
+
+
+def print_summary(stats: PassStats, jobs: int, top: int = 10) -> None:
+    """Totais, throughput e os arquivos mais lentos da passada."""
+    seconds = max(stats.elapsed, 1e-9)
+    print(
+        f"\n{stats.converted} convertidos, {stats.skipped} sem alteração, "
+        f"{stats.failed} com erro em {stats.elapsed:.2f}s ({jobs} processos)"
+    )
+    if stats.converted:
+        print(
+            f"Throughput: {stats.converted / seconds:.2f} arquivos/s, "
+            f"{stats.input_bytes / seconds / 1024 / 1024:.2f} MB/s de origem "
+            f"({stats.output_bytes / 1024 / 1024:.2f} MB gerados)"
+        )
+    slowest = sorted(stats.outcomes, key=lambda outcome: outcome.elapsed, reverse=True)
+    if slowest and top:
+        print(f"\nTempo por arquivo (os {min(top, len(slowest))} mais lentos):")
+        for outcome in slowest[:top]:
+            formats = ",".join(outcome.task.formats)
+            status = "  ERRO" if outcome.error else ""
+            print(
+                f"  {outcome.elapsed:8.2f}s  {outcome.task.rel} -> {formats}{status}"
+            )
+
+
+def _parse_formats(value: str) -> list[str]:
+    formats = list(dict.fromkeys(fmt.strip().lower() for fmt in value.split(",")))
+    invalid = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if invalid or not formats:
+        raise argparse.ArgumentTypeError(
+            f"Formato inválido: {', '.join(invalid) or value!r}. "
+            f"Use: {', '.join(sorted(OUTPUT_FORMATS))}"
+        )
+    return formats
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m cli",
+        description=(
+            "Converte todos os documentos de um diretório, de forma incremental."
+        ),
+    )
+    parser.add_argument("source", type=Path, help="Diretório de origem")
+    parser.add_argument(
+        "-o", "--output", type=Path, required=True, help="Diretório de saída"
+    )
+    parser.add_argument(
+        "-f",
+        "--formats",
+        type=_parse_formats,
+        default=["html"],
+        help="Formatos de saída, separados por vírgula (padrão: html)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processos de conversão (padrão: número de CPUs)",
+    )
+    parser.add_argument("--template", type=Path, help="Template DOCX (saída DOCX)")
+    parser.add_argument("--placeholder", help="Placeholder no template")
+    parser.add_argument(
+        "--pdf-engine", choices=["markdown", "html", "auto"], help="Motor de PDF"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Ignora o manifesto e converte tudo"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Continua verificando o diretório e reconverte o que mudar",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=2.0,
+        help="Intervalo entre verificações no modo --watch, em segundos",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="Arquivos mais lentos listados no final (0: nenhum)",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log detalhado")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+    )
+    if not args.source.is_dir():
+        print(f"Diretório de origem não encontrado: {args.source}", file=sys.stderr)
+        return 2
+
+    try:
+        return _run(args)
+    except KeyboardInterrupt:
+        return 130
+
+
+def _run(args: argparse.Namespace) -> int:
+    with BulkConverter(
+        args.source,
+        args.output,
+        args.formats,
+        jobs=args.jobs,
+        template_path=args.template,
+        placeholder=args.placeholder,
+        pdf_engine=args.pdf_engine,
+        force=args.force,
+    ) as converter:
+        stats = converter.run_once(_print_progress)
+        print_summary(stats, converter.jobs, args.top)
+        if not args.watch:
+            return 1 if stats.failed else 0
+        print(f"\nObservando {args.source} (Ctrl+C para sair)...")
+        try:
+            while True:
+                time.sleep(args.interval)
+                stats = converter.run_once(_print_progress)
+                if stats.converted or stats.failed:
+                    print_summary(stats, converter.jobs, args.top)
+        except KeyboardInterrupt:
+            return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
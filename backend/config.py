@@ -1,17 +1,169 @@
 """Configurações da aplicação."""
 
+import os
 from pathlib import Path
 
+
+def _env_int(name: str, default: int) -> int:
+    """Lê um inteiro de variável de ambiente, com valor padrão."""
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
 # Paths
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 BACKEND_ROOT = Path(__file__).resolve().parent
 FRONTEND_PATH = PROJECT_ROOT / "frontend"
 STATIC_PATH = FRONTEND_PATH / "static"
+TEMPLATES_PATH = Path(os.getenv("CONVERTER_TEMPLATES_DIR") or PROJECT_ROOT / "templates")
+JOBS_PATH = Path(os.getenv("CONVERTER_JOBS_DIR") or PROJECT_ROOT / "jobs")
 
 # Limites
 MAX_FILE_SIZE_BYTES = 10 * 1024 * 1024  # 10MB
 MAX_FILE_SIZE_MB = 10
 
+# Uploads: leitura em blocos; acima do limiar o arquivo vai para disco
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_SPOOL_THRESHOLD_BYTES = _env_int(
+    "CONVERTER_UPLOAD_SPOOL_THRESHOLD_BYTES", 1024 * 1024
+)
+# Resultados acima do limiar são entregues em arquivo (streaming)
+RESULT_SPOOL_THRESHOLD_BYTES = _env_int(
+    "CONVERTER_RESULT_SPOOL_THRESHOLD_BYTES", 4 * 1024 * 1024
+)
+# Registro de templates DOCX (pré-processados em memória, LRU)
+TEMPLATE_CACHE_SIZE = _env_int("CONVERTER_TEMPLATE_CACHE_SIZE", 32)
+# Templates avulsos só de estilos gravados como documento de referência;
+# acima do limite, os menos usados recentemente são removidos
+TEMPLATE_REFERENCE_MAX_BYTES = _env_int(
+    "CONVERTER_TEMPLATE_REFERENCE_MAX_BYTES", 128 * 1024 * 1024
+)
+# Origens extras (section_files) por requisição, cada uma até MAX_FILE_SIZE_BYTES
+MAX_SECTIONS = _env_int("CONVERTER_MAX_SECTIONS", 8)
+# Corpo máximo de POST /api/convert: origem + template + seções + campos do
+# formulário
+MAX_UPLOAD_BODY_BYTES = (2 + MAX_SECTIONS) * MAX_FILE_SIZE_BYTES + 64 * 1024
+
+# Conversão em lote: limites de arquivos e de bytes (descompactados) por lote
+BATCH_MAX_FILES = _env_int("CONVERTER_BATCH_MAX_FILES", 500)
+BATCH_MAX_BYTES = _env_int("CONVERTER_BATCH_MAX_BYTES", 100 * 1024 * 1024)
+MAX_BATCH_BODY_BYTES = BATCH_MAX_BYTES + MAX_FILE_SIZE_BYTES + 64 * 1024
+
+# Execução das conversões (pool de workers)
+# "auto": threads para Pandoc, processos para PDF e merge DOCX
+# "thread" / "process": força um único tipo de pool
+CONVERSION_BACKEND = os.getenv("CONVERTER_BACKEND", "auto")
+CONVERSION_MAX_CONCURRENCY = _env_int(
+    "CONVERTER_MAX_CONCURRENCY", min(4, os.cpu_count() or 1)
+)
+CONVERSION_QUEUE_DEPTH = _env_int("CONVERTER_QUEUE_DEPTH", 16)
+CONVERSION_TIMEOUT_SECONDS = _env_int("CONVERTER_TIMEOUT_SECONDS", 120)
+CONVERSION_PROCESS_MAX_TASKS = _env_int("CONVERTER_PROCESS_MAX_TASKS", 50)
+CONVERSION_RETRY_AFTER_SECONDS = _env_int("CONVERTER_RETRY_AFTER_SECONDS", 5)
+PANDOC_TIMEOUT_SECONDS = _env_int("CONVERTER_PANDOC_TIMEOUT_SECONDS", 60)
+
+# Admissão por cliente (chave de API ou IP), em unidades de custo (TXT/HTML
+# = 1, PDF = 5, DOCX com template = 5, multiplicado pelo tamanho em MB):
+# token bucket de RATE_LIMIT_PER_SECOND unidades/s, com rajada de até
+# RATE_LIMIT_BURST (0 desativa), e fila justa entre clientes para as
+# ADMISSION_SLOTS vagas de conversão
+API_KEY_HEADER = "X-API-Key"
+RATE_LIMIT_PER_SECOND = _env_int("CONVERTER_RATE_LIMIT_PER_SECOND", 20)
+RATE_LIMIT_BURST = _env_int("CONVERTER_RATE_LIMIT_BURST", 200)
+ADMISSION_SLOTS = _env_int("CONVERTER_ADMISSION_SLOTS", CONVERSION_MAX_CONCURRENCY)
+# Conversões avulsas na fila por cliente (além disso, 429)
+ADMISSION_MAX_QUEUED_PER_CLIENT = _env_int(
+    "CONVERTER_ADMISSION_MAX_QUEUED_PER_CLIENT", max(1, CONVERSION_QUEUE_DEPTH // 4)
+)
+
+# Estimativa de custo antes da conversão (segundos de CPU e memória
+# previstos a partir de uma pré-leitura da origem): acima do orçamento do
+# formato a conversão é recusada (413); acima de COST_LOW_PRIORITY_SECONDS
+# vai para a fila de baixa prioridade, que usa no máximo LOW_PRIORITY_SLOTS
+# vagas e só avança quando não há conversões normais esperando
+COST_BUDGET_SECONDS = _env_int("CONVERTER_COST_BUDGET_SECONDS", 120)
+COST_PDF_BUDGET_SECONDS = _env_int("CONVERTER_COST_PDF_BUDGET_SECONDS", 90)
+COST_MEMORY_BUDGET_BYTES = _env_int(
+    "CONVERTER_COST_MEMORY_BUDGET_BYTES", 1024 * 1024 * 1024
+)
+COST_LOW_PRIORITY_SECONDS = _env_int("CONVERTER_COST_LOW_PRIORITY_SECONDS", 5)
+LOW_PRIORITY_SLOTS = _env_int(
+    "CONVERTER_LOW_PRIORITY_SLOTS", max(1, ADMISSION_SLOTS // 2)
+)
+# Entradas DOCX/ODT (zip): limites do conteúdo descompactado (zip bomb)
+ZIP_MAX_UNCOMPRESSED_BYTES = _env_int(
+    "CONVERTER_ZIP_MAX_UNCOMPRESSED_BYTES", 200 * 1024 * 1024
+)
+ZIP_MAX_RATIO = _env_int("CONVERTER_ZIP_MAX_RATIO", 100)
+
+# Modo do Pandoc: "subprocess" (um processo por conversão) ou "server"
+# (pool de `pandoc server` de longa duração, com fallback para subprocesso)
+PANDOC_MODE = os.getenv("CONVERTER_PANDOC_MODE", "subprocess")
+PANDOC_SERVER_POOL_SIZE = _env_int("CONVERTER_PANDOC_SERVER_POOL_SIZE", 2)
+# Comando do servidor; vazio usa "<pandoc> server" (ex.: "pandoc-server")
+PANDOC_SERVER_COMMAND = os.getenv("CONVERTER_PANDOC_SERVER_COMMAND", "")
+
+# Orçamento da inicialização (sondagem dos motores, pools) em milissegundos;
+# acima dele, um aviso é registrado no log
+STARTUP_BUDGET_MS = _env_int("CONVERTER_STARTUP_BUDGET_MS", 1000)
+
+# Jobs assíncronos: "memory" (só no processo) ou "sqlite" (em JOBS_PATH,
+# sobrevive a reinícios e é compartilhado entre workers)
+JOB_STORE = os.getenv("CONVERTER_JOB_STORE", "memory")
+JOB_RESULT_TTL_SECONDS = _env_int("CONVERTER_JOB_RESULT_TTL_SECONDS", 3600)
+JOB_MAX_PENDING = _env_int("CONVERTER_JOB_MAX_PENDING", 100)
+# Intervalo em que o worker dono renova os jobs pendentes no armazenamento;
+# sem renovação por 3 intervalos, o job é dado como interrompido
+JOB_HEARTBEAT_SECONDS = _env_int("CONVERTER_JOB_HEARTBEAT_SECONDS", 10)
+
+# Cache de resultados (memória LRU + disco opcional)
+RESULT_CACHE_MAX_BYTES = _env_int("CONVERTER_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+RESULT_CACHE_TTL_SECONDS = _env_int("CONVERTER_CACHE_TTL_SECONDS", 3600)
+RESULT_CACHE_DISK_MAX_BYTES = _env_int(
+    "CONVERTER_CACHE_DISK_MAX_BYTES", 512 * 1024 * 1024
+)
+RESULT_CACHE_DIR = os.getenv("CONVERTER_CACHE_DIR") or None
+
+# Conversões idênticas simultâneas (mesma chave de cache) são feitas uma vez
+# só e as demais esperam o resultado; com SINGLE_FLIGHT_DIR, também entre os
+# workers do host (trava por arquivo e resultado gravado no diretório)
+SINGLE_FLIGHT_DIR = os.getenv("CONVERTER_SINGLE_FLIGHT_DIR") or None
+SINGLE_FLIGHT_POLL_MS = _env_int("CONVERTER_SINGLE_FLIGHT_POLL_MS", 50)
+SINGLE_FLIGHT_RESULT_TTL_SECONDS = _env_int(
+    "CONVERTER_SINGLE_FLIGHT_RESULT_TTL_SECONDS", 60
+)
+
+# Motor de PDF padrão: "markdown" (markdown-pdf), "html" (HTML direto no
+# PyMuPDF, sem Markdown intermediário) ou "auto" (html exceto para Markdown)
+PDF_ENGINE = os.getenv("CONVERTER_PDF_ENGINE", "markdown")
+# PDF em blocos: Markdown acima do limiar é dividido nos títulos e
+# renderizado em paralelo, em blocos de cerca de PDF_CHUNK_BYTES (0 desativa)
+PDF_CHUNK_THRESHOLD_BYTES = _env_int(
+    "CONVERTER_PDF_CHUNK_THRESHOLD_BYTES", 256 * 1024
+)
+PDF_CHUNK_BYTES = _env_int("CONVERTER_PDF_CHUNK_BYTES", 64 * 1024)
+PDF_CHUNK_WORKERS = _env_int(
+    "CONVERTER_PDF_CHUNK_WORKERS", min(4, os.cpu_count() or 1)
+)
+
+# Cache de AST por trecho (Markdown): numa nova conversão de um documento
+# editado, só os trechos alterados são lidos pelo Pandoc (0 desativa)
+AST_CACHE_MAX_BYTES = _env_int("CONVERTER_AST_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+# Documentos menores são convertidos inteiros (já são rápidos)
+AST_CACHE_MIN_BYTES = _env_int("CONVERTER_AST_CACHE_MIN_BYTES", 64 * 1024)
+AST_SEGMENT_BYTES = _env_int("CONVERTER_AST_SEGMENT_BYTES", 8 * 1024)
+
+# Conversores em processo (identidade, Markdown simples -> HTML/texto):
+# documentos maiores vão para o Pandoc, que roda fora do GIL (0 desativa)
+FAST_PATH_MAX_BYTES = _env_int("CONVERTER_FAST_PATH_MAX_BYTES", 256 * 1024)
+
+# Imagens embutidas (data URIs em Markdown/HTML, mídia de DOCX/ODT): as mais
+# largas que a página do formato de saída em IMAGE_DPI são reduzidas antes
+# da conversão (0 desativa) e guardadas num cache por hash
+IMAGE_DPI = _env_int("CONVERTER_IMAGE_DPI", 150)
+IMAGE_JPEG_QUALITY = _env_int("CONVERTER_IMAGE_JPEG_QUALITY", 85)
+IMAGE_CACHE_MAX_BYTES = _env_int("CONVERTER_IMAGE_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
 # Formatos
 OUTPUT_FORMATS = frozenset(
     ["docx", "html", "md", "odt", "pdf", "rst", "rtf", "tex", "txt"]
@@ -1,6 +1,14 @@
 """Módulo de conversão de documentos."""
 
 from .pandoc_engine import PandocEngine
-from .docx_merge import merge_with_template
 
 __all__ = ["PandocEngine", "merge_with_template"]
+
+
+def __getattr__(name: str):
+    # docx_merge (e o pacote docx-merge-xml) só é importado quando usado
+    if name == "merge_with_template":
+        from .docx_merge import merge_with_template
+
+        return merge_with_template
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,379 @@
+"""
+Cache do AST do Pandoc por trecho de documento Markdown.
+
+O documento é dividido nos títulos (como na renderização de PDF em blocos)
+e cada trecho é identificado pelo hash do seu conteúdo. Numa nova conversão
+do mesmo documento com uma edição pequena, só os trechos alterados passam
+pelo leitor do Pandoc (todos numa única chamada, separados por marcadores);
+os demais blocos do AST vêm do cache e são emendados antes da escrita.
+
+Para formatos de texto cuja saída é a concatenação da saída de cada trecho
+(FRAGMENT_FORMATS), o cache guarda também o fragmento escrito de cada
+trecho, e só os trechos alterados passam pelo writer. Os demais formatos
+são escritos a partir do AST emendado.
+
+Documentos com construções que ligam trechos entre si (notas de rodapé,
+referências implícitas a títulos, metadados fora do início, ids de título
+repetidos, listas de exemplo) são convertidos inteiros, sem o cache. Além
+do pré-filtro no texto, o AST de cada trecho é verificado: notas (que o
+writer numera e reúne no fim do documento) e listas de exemplo (numeradas
+ao longo do documento) levam à conversão inteira.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from config import AST_CACHE_MAX_BYTES, AST_CACHE_MIN_BYTES, AST_SEGMENT_BYTES
+from converter.pandoc_engine import PandocEngine, get_pandoc_version
+from converter.pdf_chunked import split_markdown
+
+logger = logging.getLogger(__name__)
+
+# Formato de saída -> separador entre os fragmentos de cada trecho
+FRAGMENT_FORMATS = {"html": "\n", "md": "\n\n", "txt": "\n\n", "tex": "\n\n"}
+# O writer HTML numera os blocos de código sem id ao longo do documento
+# (cb1, cb2, ...); os fragmentos guardam a numeração local de cada trecho
+_CODE_BLOCK = '{"t":"CodeBlock","c":[["",'
+_CODE_ID = re.compile(r'(id="|href="#)cb(\d+)(?=[-"])')
+
+_FOOTNOTE = re.compile(r"\[\^[^\]]+\]")
+# Notas inline e itens/referências de listas de exemplo
+_LINKED_INLINE = re.compile(r"\^\[|\(@[\w-]*\)")
+# Elementos do AST cuja saída depende dos demais trechos
+_LINKED_ELEMENTS = ('{"t":"Note"', '{"t":"Example"}')
+_ATX_TITLE = re.compile(r"^ {0,3}#{1,6}[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+_YAML_START = re.compile(r"^---[ \t]*\n(?![ \t]*\n)", re.MULTILINE)
+# Sufixo que o Pandoc acrescenta a ids de título repetidos
+_ID_SUFFIX = re.compile(r"-\d+$")
+
+
+@dataclass
+class _Segment:
+    """Blocos (JSON compacto, sem colchetes) e fragmentos escritos de um trecho."""
+
+    blocks: str
+    meta: str
+    header_ids: tuple[str, ...]
+    code_blocks: int
+    linked: bool = False
+    outputs: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return (
+            len(self.blocks)
+            + len(self.meta)
+            + sum(len(output) for output in self.outputs.values())
+        )
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _renumber_code_ids(fragment: str, offset: int) -> str:
+    if not offset:
+        return fragment
+    return _CODE_ID.sub(
+        lambda match: f"{match.group(1)}cb{int(match.group(2)) + offset}", fragment
+    )
+
+
+def _header_ids(blocks: list) -> tuple[str, ...]:
+    return tuple(
+        block["c"][1][0]
+        for block in blocks
+        if block.get("t") == "Header" and block["c"][1][0]
+    )
+
+
+class AstCache:
+    """
+    Cache LRU de trechos de AST (e fragmentos de saída), limitado em bytes.
+
+    convert() retorna None quando o documento não se beneficia do cache ou
+    não pode ser dividido com segurança; quem chama faz a conversão inteira.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = AST_CACHE_MAX_BYTES,
+        min_bytes: int = AST_CACHE_MIN_BYTES,
+        segment_bytes: int = AST_SEGMENT_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.min_bytes = min_bytes
+        self.segment_bytes = segment_bytes
+        self._marker = f"ASTSEGMENT{uuid.uuid4().hex}"
+        self._entries: OrderedDict[str, _Segment] = OrderedDict()
+        self._size = 0
+        self._api_version: list | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.fragment_hits = 0
+        self.fragment_misses = 0
+        self.fallbacks = 0
+
+    def convert(self, content: bytes, output_format: str) -> bytes | None:
+        """
+        Converte Markdown para output_format reaproveitando os trechos em cache.
+
+        Returns:
+            Bytes convertidos, ou None para converter sem o cache.
+        """
+        segments = self._split(content)
+        if segments is None:
+            return None
+        entries = self._parse(segments, self._keys(segments))
+        if entries is None:
+            return None
+        # ids cb<n> escritos no próprio documento impediriam a renumeração
+        if output_format in FRAGMENT_FORMATS and not (
+            output_format == "html"
+            and any(_CODE_ID.search(segment) for segment in segments)
+        ):
+            return self._write_fragments(entries, output_format)
+        return PandocEngine.convert_bytes(
+            self._document(entries), output_format, input_format="json"
+        )
+
+    def ast(self, content: bytes) -> bytes | None:
+        """AST JSON do documento inteiro, emendado a partir dos trechos."""
+        segments = self._split(content)
+        if segments is None:
+            return None
+        entries = self._parse(segments, self._keys(segments))
+        return None if entries is None else self._document(entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        """Retorna contadores e ocupação do cache."""
+        with self._lock:
+            return {
+                "segments": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "fragment_hits": self.fragment_hits,
+                "fragment_misses": self.fragment_misses,
+                "fallbacks": self.fallbacks,
+            }
+
+    def _split(self, content: bytes) -> list[str] | None:
+        if self.max_bytes <= 0 or len(content) < self.min_bytes:
+            return None
+        try:
+            text = content.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+        if not self._is_splittable(text):
+            self._fallback("construções que ligam trechos")
+            return None
+        segments = split_markdown(text, self.segment_bytes)
+        return segments if len(segments) > 1 else None
+
+    def _is_splittable(self, text: str) -> bool:
+        if _FOOTNOTE.search(text) or _LINKED_INLINE.search(text):
+            return False
+        if any(match.start() > 0 for match in _YAML_START.finditer(text)):
+            return False
+        return not any(
+            f"[{title}]" in text for title in _ATX_TITLE.findall(text)
+        )
+
+    def _keys(self, segments: list[str]) -> list[str]:
+        version = get_pandoc_version()
+        keys = []
+        for index, segment in enumerate(segments):
+            digest = hashlib.sha256(f"{version}\0{index == 0}\0".encode())
+            digest.update(segment.encode("utf-8"))
+            keys.append(digest.hexdigest())
+        return keys
+
+    def _parse(
+        self, segments: list[str], keys: list[str]
+    ) -> list[_Segment] | None:
+        """Entradas de todos os trechos; os ausentes são lidos numa só chamada."""
+        with self._lock:
+            cached = {key: self._entries.get(key) for key in keys}
+            for key, entry in cached.items():
+                if entry is not None:
+                    self._entries.move_to_end(key)
+        missing = [
+            index for index, key in enumerate(keys) if cached[key] is None
+        ]
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            separator = f"\n\n{self._marker}\n\n"
+            batch = separator.join(segments[index] for index in missing)
+            ast = json.loads(
+                PandocEngine.convert_bytes(batch.encode("utf-8"), "json")
+            )
+            parts = self._split_blocks(ast["blocks"])
+            if len(parts) != len(missing):
+                self._fallback("marcador de trecho absorvido")
+                return None
+            meta = _dumps(ast["meta"]) if missing[0] == 0 else "{}"
+            for index, blocks in zip(missing, parts):
+                dumped = _dumps(blocks)[1:-1]
+                entry = _Segment(
+                    blocks=dumped,
+                    meta=meta if index == 0 else "{}",
+                    header_ids=_header_ids(blocks),
+                    code_blocks=dumped.count(_CODE_BLOCK),
+                    linked=any(element in dumped for element in _LINKED_ELEMENTS),
+                )
+                cached[keys[index]] = entry
+                self._store(keys[index], entry)
+
+        entries = [cached[key] for key in keys]
+        if any(entry.linked for entry in entries):
+            self._fallback("notas ou listas de exemplo")
+            return None
+        ids = [header_id for entry in entries for header_id in entry.header_ids]
+        unique = set(ids)
+        if len(ids) != len(unique) or any(
+            _ID_SUFFIX.sub("", header_id) in unique
+            for header_id in unique
+            if _ID_SUFFIX.search(header_id)
+        ):
+            # A numeração de ids repetidos depende do documento inteiro
+            self._fallback("ids de título repetidos entre trechos")
+            return None
+        return entries
+
+    def _split_blocks(self, blocks: list) -> list[list]:
+        marker = {"t": "Para", "c": [{"t": "Str", "c": self._marker}]}
+        parts: list[list] = [[]]
+        for block in blocks:
+            if block == marker:
+                parts.append([])
+            else:
+                parts[-1].append(block)
+        return parts
+
+    def _document(self, entries: list[_Segment], marker: bool = False) -> bytes:
+        separator = ","
+        if marker:
+            separator = "," + _dumps(
+                {"t": "Para", "c": [{"t": "Str", "c": self._marker}]}
+            ) + ","
+        blocks = separator.join(entry.blocks for entry in entries if entry.blocks)
+        document = (
+            f'{{"pandoc-api-version":{_dumps(self._pandoc_api_version())},'
+            f'"meta":{entries[0].meta},"blocks":[{blocks}]}}'
+        )
+        return document.encode("utf-8")
+
+    def _write_fragments(self, entries: list[_Segment], output_format: str) -> bytes:
+        missing = [
+            entry
+            for entry in entries
+            if entry.blocks and output_format not in entry.outputs
+        ]
+        with self._lock:
+            self.fragment_hits += len(entries) - len(missing)
+            self.fragment_misses += len(missing)
+        if missing:
+            written = PandocEngine.convert_bytes(
+                self._document(missing, marker=True),
+                output_format,
+                input_format="json",
+            ).decode("utf-8")
+            fragments = self._split_output(written)
+            if len(fragments) != len(missing):
+                self._fallback("marcador de trecho alterado pelo writer")
+                return PandocEngine.convert_bytes(
+                    self._document(entries), output_format, input_format="json"
+                )
+            offset = 0
+            for entry, fragment in zip(missing, fragments):
+                if output_format == "html":
+                    fragment = _renumber_code_ids(fragment, -offset)
+                    offset += entry.code_blocks
+                entry.outputs[output_format] = fragment
+            with self._lock:
+                self._resize()
+        fragments = []
+        offset = 0
+        for entry in entries:
+            if not entry.blocks:
+                continue
+            fragment = entry.outputs[output_format]
+            if output_format == "html":
+                fragment = _renumber_code_ids(fragment, offset)
+                offset += entry.code_blocks
+            fragments.append(fragment)
+        output = FRAGMENT_FORMATS[output_format].join(fragments)
+        return (output + "\n").encode("utf-8")
+
+    def _split_output(self, written: str) -> list[str]:
+        fragments: list[str] = []
+        current: list[str] = []
+        for line in written.split("\n"):
+            if self._marker in line:
+                fragments.append("\n".join(current).strip("\n"))
+                current = []
+            else:
+                current.append(line)
+        fragments.append("\n".join(current).strip("\n"))
+        return fragments
+
+    def _pandoc_api_version(self) -> list:
+        if self._api_version is None:
+            ast = json.loads(PandocEngine.convert_bytes(b"", "json"))
+            self._api_version = ast["pandoc-api-version"]
+        return self._api_version
+
+    def _store(self, key: str, entry: _Segment) -> None:
+        with self._lock:
+            if entry.size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._size -= self._entries.pop(key).size
+            self._entries[key] = entry
+            self._size += entry.size
+            self._evict()
+
+    def _resize(self) -> None:
+        """Recalcula a ocupação após novos fragmentos (com o lock)."""
+        self._size = sum(item.size for item in self._entries.values())
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            _, oldest = self._entries.popitem(last=False)
+            self._size -= oldest.size
+
+    def _fallback(self, reason: str) -> None:
+        with self._lock:
+            self.fallbacks += 1
+        logger.debug("Conversão sem cache de AST: %s", reason)
+
+
+_cache: AstCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_ast_cache() -> AstCache:
+    """Retorna o cache de AST do processo."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AstCache()
+        return _cache
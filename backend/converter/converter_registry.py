@@ -0,0 +1,157 @@
+"""
+Registro de conversores por par (formato de entrada, formato de saída).
+
+Além do Pandoc, que atende todos os pares, o registro guarda conversores em
+processo para os casos simples: a identidade (entrada já no formato pedido)
+e Markdown simples para HTML ou texto puro com o markdown-it-py. Para cada
+documento vale o conversor de maior prioridade que aceitar o conteúdo; se
+nenhum aceitar, a conversão vai para o Pandoc.
+"""
+
+import logging
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from config import FAST_PATH_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Motor usado quando nenhum conversor do registro aceita o documento
+PANDOC_ENGINE = "pandoc"
+
+# Formato de saída da aplicação -> leitor do Pandoc para o mesmo formato
+_IDENTITY_PAIRS = {
+    "md": "markdown",
+    "txt": "plain",
+    "html": "html",
+    "rst": "rst",
+    "tex": "latex",
+    "docx": "docx",
+    "odt": "odt",
+}
+
+
+def _accept_all(content: bytes) -> bool:
+    return True
+
+
+@dataclass(frozen=True)
+class Converter:
+    """
+    Conversor em processo para um par de formatos.
+
+    convert recebe os bytes da origem e retorna os bytes convertidos;
+    accepts diz se o conversor atende o documento (se não, o próximo da
+    fila, por prioridade, é tentado).
+    """
+
+    name: str
+    convert: Callable[[bytes], bytes]
+    priority: int = 0
+    accepts: Callable[[bytes], bool] = _accept_all
+
+
+class ConverterRegistry:
+    """Conversores por par de formatos, ordenados por prioridade."""
+
+    def __init__(self, max_bytes: int = FAST_PATH_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._converters: dict[tuple[str, str], list[Converter]] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self, input_format: str, output_format: str, converter: Converter
+    ) -> None:
+        """Registra um conversor para o par (leitor do Pandoc, formato de saída)."""
+        with self._lock:
+            converters = self._converters.setdefault((input_format, output_format), [])
+            converters.append(converter)
+            converters.sort(key=lambda item: item.priority, reverse=True)
+
+    def select(
+        self, input_format: str, output_format: str, content: bytes
+    ) -> Converter | None:
+        """
+        Conversor de maior prioridade que aceita o documento.
+
+        Returns:
+            O conversor, ou None para converter com o Pandoc.
+        """
+        if self.max_bytes <= 0 or len(content) > self.max_bytes:
+            return None
+        for converter in self._converters.get((input_format, output_format), ()):
+            try:
+                if converter.accepts(content):
+                    return converter
+            except Exception:
+                logger.exception("Erro ao avaliar o conversor %s", converter.name)
+        return None
+
+    def to_dict(self) -> dict[str, list[str]]:
+        """Conversores por par ("entrada->saída"), em ordem de prioridade."""
+        return {
+            f"{input_format}->{output_format}": [
+                converter.name for converter in converters
+            ]
+            + [PANDOC_ENGINE]
+            for (input_format, output_format), converters in sorted(
+                self._converters.items()
+            )
+        }
+
+
+def _identity(content: bytes) -> bytes:
+    return content
+
+
+# O markdown-it-py só é importado na primeira conversão que o usa
+
+
+def _markdown_is_simple(content: bytes) -> bool:
+    from converter.markdown_fast import is_simple
+
+    return is_simple(content)
+
+
+def _markdown_to_html(content: bytes) -> bytes:
+    from converter.markdown_fast import markdown_to_html
+
+    return markdown_to_html(content)
+
+
+def _markdown_to_plain(content: bytes) -> bytes:
+    from converter.markdown_fast import markdown_to_plain
+
+    return markdown_to_plain(content)
+
+
+def _default_registry() -> ConverterRegistry:
+    registry = ConverterRegistry()
+    identity = Converter("identity", _identity, priority=100)
+    for output_format, input_format in _IDENTITY_PAIRS.items():
+        registry.register(input_format, output_format, identity)
+    registry.register(
+        "markdown",
+        "html",
+        Converter("markdown-it", _markdown_to_html, 50, _markdown_is_simple),
+    )
+    registry.register(
+        "markdown",
+        "txt",
+        Converter("markdown-it", _markdown_to_plain, 50, _markdown_is_simple),
+    )
+    return registry
+
+
+_registry: ConverterRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_converter_registry() -> ConverterRegistry:
+    """Retorna o registro de conversores do processo."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = _default_registry()
+        return _registry
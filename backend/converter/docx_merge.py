@@ -1,8 +1,11 @@
 """Merge de DOCX com template base."""
 
+from io import BytesIO
 from pathlib import Path
 
 from docx_merge import merge_docx
+from docx_merge.utils.merger import merge_xml
+from docx_merge.utils.xml import extract_document_xml, replace_document_xml
 
 
 def merge_with_template(
@@ -51,3 +54,24 @@ def merge_with_template_to_buffer(
         pattern=pattern,
     )
     return buffer.getvalue()
+
+
+def merge_with_template_bytes(
+    template_content: bytes,
+    content_docx: bytes,
+    pattern: str = "{{CONTEUDO}}",
+) -> bytes:
+    """
+    Faz o merge inteiramente em memória, sem caminhos em disco.
+
+    Mesmo resultado de merge_with_template_to_buffer: o body do template,
+    com o placeholder substituído, é gravado no pacote do conteúdo.
+    """
+    document_xml = merge_xml(
+        source_xml_stream=extract_document_xml(BytesIO(template_content)),
+        content_xml_stream=extract_document_xml(BytesIO(content_docx)),
+        pattern=pattern,
+        insert_start=False,
+        insert_end=False,
+    )
+    return replace_document_xml(BytesIO(content_docx), document_xml).getvalue()
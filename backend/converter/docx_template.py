@@ -0,0 +1,632 @@
+"""Template DOCX pré-processado para merges repetidos."""
+
+import copy
+import posixpath
+import re
+import zipfile
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from io import BytesIO
+from typing import BinaryIO
+
+from lxml import etree
+
+from .zip_stream import ZipStreamWriter, raw_offsets
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PR_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+WP_NS = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+NS = {"w": W_NS, "r": R_NS, "wp": WP_NS}
+
+DOCUMENT_PART = "word/document.xml"
+STYLES_PART = "word/styles.xml"
+NUMBERING_PART = "word/numbering.xml"
+FOOTNOTES_PART = "word/footnotes.xml"
+CONTENT_TYPES_PART = "[Content_Types].xml"
+
+_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+_NUMBERING = (
+    _REL_TYPE + "numbering",
+    "numbering.xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml",
+)
+_FOOTNOTES = (
+    _REL_TYPE + "footnotes",
+    "footnotes.xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml",
+)
+
+# Marcador que substitui o placeholder no XML serializado do template; o
+# texto da instrução é o índice do placeholder
+_PI_TARGET = "converter-placeholder"
+_PI_PATTERN = re.compile(rb"<\?%s (\d+)\?>" % _PI_TARGET.encode())
+_R_PREFIX = "{%s}" % R_NS
+
+
+class TemplateError(ValueError):
+    """Template DOCX inválido ou incompatível com o merge."""
+
+
+def _w(name: str) -> str:
+    return f"{{{W_NS}}}{name}"
+
+
+W_VAL = _w("val")
+W_ID = _w("id")
+
+
+def _rels_part(part: str) -> str:
+    directory, name = posixpath.split(part)
+    return f"{directory}/_rels/{name}.rels"
+
+
+def _serialize(root: etree._Element) -> bytes:
+    return etree.tostring(
+        root, xml_declaration=True, encoding="UTF-8", standalone=True
+    )
+
+
+def _placeholder_of(
+    elem: etree._Element, placeholders: Mapping[str, int]
+) -> str | None:
+    """Placeholder que é exatamente o texto do bloco (mesmo se dividido em runs)."""
+    first = elem.find(".//w:t", NS)
+    if first is not None and first.text in placeholders:
+        return first.text
+    text = "".join(node.text or "" for node in elem.iter(_w("t"))).strip()
+    return text if text in placeholders else None
+
+
+def _max_int(nodes, attr: str, default: int = 0) -> int:
+    values = [default]
+    for node in nodes:
+        try:
+            values.append(int(node.get(attr)))
+        except (TypeError, ValueError):
+            continue
+    return max(values)
+
+
+def _append_xml(xml: bytes, fragments: list[bytes]) -> bytes:
+    """Insere fragmentos antes da tag de fechamento do elemento raiz."""
+    index = xml.rfind(b"</")
+    return xml[:index] + b"".join(fragments) + xml[index:]
+
+
+def _is_xml_part(name: str) -> bool:
+    """Partes que o merge pode ler ou reescrever (as demais só são copiadas)."""
+    return name.endswith((".xml", ".rels"))
+
+
+class _Package:
+    """
+    Pacote zip mantido comprimido: as partes são descompactadas sob demanda
+    e as que não mudam são copiadas com os bytes comprimidos originais.
+    """
+
+    def __init__(self, content: bytes, error: str):
+        try:
+            self._zip = zipfile.ZipFile(BytesIO(content))
+            self.infos = self._zip.infolist()
+            self._offsets = raw_offsets(content, self.infos)
+        except zipfile.BadZipFile as exc:
+            raise TemplateError(error) from exc
+        self._content = memoryview(content)
+        self._by_name = {info.filename: info for info in self.infos}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def read(self, name: str) -> bytes | None:
+        info = self._by_name.get(name)
+        return self._zip.read(info) if info is not None else None
+
+    def info(self, name: str) -> zipfile.ZipInfo:
+        return self._by_name[name]
+
+    def raw(self, name: str) -> memoryview:
+        """Bytes comprimidos do membro, como estão no pacote."""
+        info = self._by_name[name]
+        start = self._offsets[name]
+        return self._content[start : start + info.compress_size]
+
+
+@dataclass(frozen=True)
+class _Relationship:
+    rel_type: str
+    target: str
+    external: bool
+
+
+class _SourcePackage:
+    """Pacote DOCX de conteúdo (gerado pelo Pandoc) a ser inserido."""
+
+    def __init__(self, content: bytes):
+        self.package = _Package(content, "Conteúdo não é um DOCX válido")
+        self._xml: dict[str, etree._Element | None] = {}
+        self._rels: dict[str, dict[str, _Relationship]] = {}
+        self._styles: dict[str, etree._Element] | None = None
+
+    def xml(self, part: str) -> etree._Element | None:
+        if part not in self._xml:
+            data = self.package.read(part)
+            self._xml[part] = etree.fromstring(data) if data else None
+        return self._xml[part]
+
+    def rels(self, part: str) -> dict[str, _Relationship]:
+        if part not in self._rels:
+            rels = {}
+            root = self.xml(_rels_part(part))
+            if root is not None:
+                for rel in root:
+                    rels[rel.get("Id")] = _Relationship(
+                        rel.get("Type"),
+                        rel.get("Target"),
+                        rel.get("TargetMode") == "External",
+                    )
+            self._rels[part] = rels
+        return self._rels[part]
+
+    def styles(self) -> dict[str, etree._Element]:
+        if self._styles is None:
+            root = self.xml(STYLES_PART)
+            self._styles = {
+                style.get(_w("styleId")): style
+                for style in (root.iterfind("w:style", NS) if root is not None else [])
+            }
+        return self._styles
+
+    def content_type(self, path: str) -> str | None:
+        root = self.xml(CONTENT_TYPES_PART)
+        if root is None:
+            return None
+        for override in root.iterfind(f"{{{CT_NS}}}Override"):
+            if override.get("PartName") == "/" + path:
+                return override.get("ContentType")
+        ext = path.rsplit(".", 1)[-1].lower()
+        for default in root.iterfind(f"{{{CT_NS}}}Default"):
+            if default.get("Extension", "").lower() == ext:
+                return default.get("ContentType")
+        return None
+
+
+class DocxTemplate:
+    """
+    Template DOCX preparado uma única vez para muitos merges.
+
+    Mantém o pacote comprimido, as partes XML descompactadas e o
+    document.xml serializado e dividido nos placeholders (um ou vários, como
+    {{INTRO}} e {{RESULTADOS}}). Cada merge insere os conteúdos entre os
+    segmentos numa única passada e reescreve apenas as partes afetadas
+    (relacionamentos, estilos, numeração, notas de rodapé e tipos de
+    conteúdo); o restante do pacote do template (capa, fontes, cabeçalhos,
+    rodapés, mídia) é copiado com os bytes comprimidos originais, sem
+    descompactar. O tempo do merge depende do conteúdo, não do template.
+    """
+
+    def __init__(
+        self, content: bytes, placeholder: str | Sequence[str] = "{{CONTEUDO}}"
+    ):
+        self.placeholders = (
+            (placeholder,)
+            if isinstance(placeholder, str)
+            else tuple(dict.fromkeys(placeholder))
+        )
+        if not self.placeholders:
+            raise TemplateError("Informe ao menos um placeholder")
+        self.placeholder = self.placeholders[0]
+        self.size = len(content)
+        self.package = _Package(content, "Template não é um DOCX válido")
+        self.infos = self.package.infos
+        self.parts = {
+            info.filename: self.package.read(info.filename)
+            for info in self.infos
+            if _is_xml_part(info.filename)
+        }
+        if DOCUMENT_PART not in self.parts or CONTENT_TYPES_PART not in self.parts:
+            raise TemplateError("Template sem word/document.xml")
+
+        root = etree.fromstring(self.parts[DOCUMENT_PART])
+        body = root.find("w:body", NS)
+        if body is None:
+            raise TemplateError("Template sem <w:body>")
+        index = {name: i for i, name in enumerate(self.placeholders)}
+        self.placeholder_counts = dict.fromkeys(self.placeholders, 0)
+        for elem in list(body):
+            if elem.tag == _w("sectPr"):
+                continue
+            name = _placeholder_of(elem, index)
+            if name is not None:
+                marker = etree.ProcessingInstruction(_PI_TARGET, str(index[name]))
+                marker.tail = elem.tail
+                body.replace(elem, marker)
+                self.placeholder_counts[name] += 1
+        self.placeholder_count = sum(self.placeholder_counts.values())
+        self.bookmark_max = _max_int(root.iter(_w("bookmarkStart")), W_ID)
+        self.docpr_max = _max_int(root.iter(f"{{{WP_NS}}}docPr"), "id")
+        # Segmentos do document.xml intercalados com o placeholder de cada vão
+        pieces = _PI_PATTERN.split(_serialize(root))
+        self.segments = pieces[::2]
+        self.slots = tuple(self.placeholders[int(i)] for i in pieces[1::2])
+
+        styles = self.parts.get(STYLES_PART)
+        self.style_ids = frozenset(
+            style.get(_w("styleId"))
+            for style in (
+                etree.fromstring(styles).iterfind("w:style", NS) if styles else []
+            )
+        )
+        numbering = self.parts.get(NUMBERING_PART)
+        numbering_root = etree.fromstring(numbering) if numbering else None
+        self.num_max = _max_int(
+            numbering_root.iterfind("w:num", NS) if numbering else [], _w("numId")
+        )
+        self.abstract_max = _max_int(
+            numbering_root.iterfind("w:abstractNum", NS) if numbering else [],
+            _w("abstractNumId"),
+        )
+        footnotes = self.parts.get(FOOTNOTES_PART)
+        self.footnote_max = _max_int(
+            etree.fromstring(footnotes).iterfind("w:footnote", NS) if footnotes else [],
+            W_ID,
+        )
+        content_types = etree.fromstring(self.parts[CONTENT_TYPES_PART])
+        self.ct_defaults = frozenset(
+            node.get("Extension", "").lower()
+            for node in content_types.iterfind(f"{{{CT_NS}}}Default")
+        )
+        self.ct_overrides = frozenset(
+            node.get("PartName") for node in content_types.iterfind(f"{{{CT_NS}}}Override")
+        )
+
+    def merge(self, contents: bytes | Mapping[str, bytes]) -> bytes:
+        """
+        Insere o corpo do DOCX de conteúdo no lugar do placeholder.
+
+        `contents` é o DOCX do placeholder principal ou um mapeamento
+        placeholder -> DOCX; placeholders sem conteúdo ficam vazios.
+
+        Raises:
+            TemplateError: Placeholder ausente ou pacote inválido.
+        """
+        contents = self._contents(contents)
+        output = BytesIO()
+        self.merge_to(contents, output)
+        return output.getvalue()
+
+    def merge_to(self, contents: bytes | Mapping[str, bytes], file: BinaryIO) -> None:
+        """
+        Como merge(), gravando o pacote em sequência em `file` (um arquivo
+        ou a resposta), sem montá-lo na memória.
+
+        Os conteúdos são importados um a um (relacionamentos, estilos e
+        numeração renumerados sobre o mesmo estado) e o document.xml é
+        montado numa única passada pelos segmentos.
+
+        Raises:
+            TemplateError: Placeholder ausente ou pacote inválido.
+        """
+        contents = self._contents(contents)
+        merge = _Merge(self)
+        bodies = {
+            name: merge.import_body(content_docx, prefix=f"c{i}_")
+            for i, (name, content_docx) in enumerate(contents.items())
+        }
+        document = [self.segments[0]]
+        for name, segment in zip(self.slots, self.segments[1:]):
+            document.append(bodies.get(name, b""))
+            document.append(segment)
+        merge.build(b"".join(document), file)
+
+    def _contents(self, contents: bytes | Mapping[str, bytes]) -> Mapping[str, bytes]:
+        if not isinstance(contents, Mapping):
+            contents = {self.placeholder: contents}
+        if not contents:
+            raise TemplateError("Nenhum conteúdo para inserir no template")
+        for name in contents:
+            if name not in self.placeholder_counts:
+                raise TemplateError(f"Placeholder {name} não preparado no template")
+            if self.placeholder_counts[name] == 0:
+                raise TemplateError(f"Placeholder {name} não encontrado no template")
+        return contents
+
+
+class _Merge:
+    """Estado de um merge: partes novas ou reescritas do pacote de saída."""
+
+    def __init__(self, template: DocxTemplate):
+        self.template = template
+        # Partes importadas do conteúdo: (pacote de origem, nome na origem)
+        self.parts: dict[str, tuple[_Package, str]] = {}
+        self.rels: dict[str, etree._Element] = {}
+        # Ids em uso e próximo número livre, por parte: numerados uma vez só
+        self.rel_used: dict[str, set[str]] = {}
+        self.rel_next: dict[str, int] = {}
+        self.style_ids = set(template.style_ids)
+        self.new_styles: list[bytes] = []
+        self.numbering: etree._Element | None = None
+        self.footnotes: etree._Element | None = None
+        self.next_num = template.num_max + 1
+        self.next_abstract = template.abstract_max + 1
+        self.next_footnote = template.footnote_max + 1
+        self.bookmark_offset = template.bookmark_max + 1
+        self.next_docpr = template.docpr_max + 1
+        self.ct_defaults: dict[str, str] = {}
+        self.ct_overrides: dict[str, str] = {}
+
+    def import_body(self, content_docx: bytes, prefix: str) -> bytes:
+        """Importa o corpo do conteúdo e retorna seu XML pronto para inserção."""
+        source = _SourcePackage(content_docx)
+        document = source.xml(DOCUMENT_PART)
+        body = document.find("w:body", NS) if document is not None else None
+        if body is None:
+            raise TemplateError("Conteúdo sem <w:body>")
+        elements = [elem for elem in body if elem.tag != _w("sectPr")]
+        self._import_rels(elements, source, DOCUMENT_PART, prefix)
+        self._import_styles(elements, source)
+        self._import_numbering(elements, source)
+        self._import_footnotes(elements, source, prefix)
+        self._renumber_drawings_and_bookmarks(elements)
+        return b"".join(etree.tostring(elem, encoding="UTF-8") for elem in elements)
+
+    def build(self, document_xml: bytes, file: BinaryIO) -> None:
+        """Grava o pacote de saída: template e partes alteradas ou importadas."""
+        changed = {DOCUMENT_PART: document_xml}
+        for part, root in self.rels.items():
+            changed[_rels_part(part)] = _serialize(root)
+        if self.new_styles:
+            changed[STYLES_PART] = _append_xml(
+                self.template.parts[STYLES_PART], self.new_styles
+            )
+        if self.numbering is not None:
+            changed[NUMBERING_PART] = _serialize(self.numbering)
+        if self.footnotes is not None:
+            changed[FOOTNOTES_PART] = _serialize(self.footnotes)
+        if self.ct_defaults or self.ct_overrides:
+            changed[CONTENT_TYPES_PART] = self._content_types()
+
+        template = self.template.package
+        with ZipStreamWriter(file) as output:
+            for info in template.infos:
+                if info.filename in changed:
+                    output.write(
+                        info, changed.pop(info.filename), zipfile.ZIP_DEFLATED
+                    )
+                else:
+                    output.copy(info, template.raw(info.filename))
+            for name, (source, source_name) in self.parts.items():
+                output.copy(source.info(source_name), source.raw(source_name), name)
+            for name, data in changed.items():
+                output.write(name, data)
+
+    def _rels_root(self, part: str) -> etree._Element:
+        if part not in self.rels:
+            data = self.template.parts.get(_rels_part(part))
+            self.rels[part] = (
+                etree.fromstring(data)
+                if data
+                else etree.Element(f"{{{PR_NS}}}Relationships", nsmap={None: PR_NS})
+            )
+            self.rel_used[part] = {rel.get("Id") for rel in self.rels[part]}
+            self.rel_next[part] = len(self.rel_used[part]) + 1
+        return self.rels[part]
+
+    def _add_rel(self, part: str, rel_type: str, target: str, external: bool) -> str:
+        root = self._rels_root(part)
+        used = self.rel_used[part]
+        number = self.rel_next[part]
+        while f"rId{number}" in used:
+            number += 1
+        rel_id = f"rId{number}"
+        used.add(rel_id)
+        self.rel_next[part] = number + 1
+        attrs = {"Id": rel_id, "Type": rel_type, "Target": target}
+        if external:
+            attrs["TargetMode"] = "External"
+        etree.SubElement(root, f"{{{PR_NS}}}Relationship", attrs)
+        return rel_id
+
+    def _import_rels(
+        self,
+        elements: list[etree._Element],
+        source: _SourcePackage,
+        part: str,
+        prefix: str,
+    ) -> None:
+        """Copia relacionamentos (imagens, links) usados pelos elementos."""
+        source_rels = source.rels(part)
+        mapping: dict[str, str] = {}
+        for elem in elements:
+            for node in elem.iter(etree.Element):
+                for key, value in node.attrib.items():
+                    if not key.startswith(_R_PREFIX) or value not in source_rels:
+                        continue
+                    if value not in mapping:
+                        mapping[value] = self._import_rel(
+                            source_rels[value], source, part, prefix
+                        )
+                    node.set(key, mapping[value])
+
+    def _import_rel(
+        self, rel: _Relationship, source: _SourcePackage, part: str, prefix: str
+    ) -> str:
+        if rel.external:
+            return self._add_rel(part, rel.rel_type, rel.target, external=True)
+        base = posixpath.dirname(part)
+        source_path = posixpath.normpath(posixpath.join(base, rel.target))
+        target = posixpath.join(
+            posixpath.dirname(rel.target), prefix + posixpath.basename(rel.target)
+        )
+        path = posixpath.normpath(posixpath.join(base, target))
+        if source_path in source.package:
+            self.parts[path] = (source.package, source_path)
+            self._ensure_content_type(path, source.content_type(source_path))
+        return self._add_rel(part, rel.rel_type, target, external=False)
+
+    def _ensure_content_type(self, path: str, content_type: str | None) -> None:
+        ext = path.rsplit(".", 1)[-1].lower()
+        if ext in self.template.ct_defaults or ext in self.ct_defaults:
+            return
+        if content_type:
+            self.ct_defaults[ext] = content_type
+
+    def _import_styles(
+        self, elements: list[etree._Element], source: _SourcePackage
+    ) -> None:
+        """Adiciona ao template os estilos usados que ele não define."""
+        if STYLES_PART not in self.template.parts:
+            return
+        pending = [
+            node.get(W_VAL)
+            for elem in elements
+            for node in elem.iter(_w("pStyle"), _w("rStyle"), _w("tblStyle"))
+        ]
+        source_styles = source.styles()
+        while pending:
+            style_id = pending.pop()
+            if style_id in self.style_ids or style_id not in source_styles:
+                continue
+            style = source_styles[style_id]
+            self.style_ids.add(style_id)
+            self.new_styles.append(etree.tostring(style, encoding="UTF-8"))
+            for ref in ("basedOn", "next", "link"):
+                node = style.find(f"w:{ref}", NS)
+                if node is not None:
+                    pending.append(node.get(W_VAL))
+
+    def _import_numbering(
+        self, elements: list[etree._Element], source: _SourcePackage
+    ) -> None:
+        """Copia as listas usadas, renumerando numId e abstractNumId."""
+        refs = [node for elem in elements for node in elem.iter(_w("numId"))]
+        used = {node.get(W_VAL) for node in refs} - {"0"}
+        source_root = source.xml(NUMBERING_PART)
+        if not used or source_root is None:
+            return
+        target = self._part_root(
+            "numbering", NUMBERING_PART, source_root, _NUMBERING
+        )
+        nums = {num.get(_w("numId")): num for num in source_root.iterfind("w:num", NS)}
+        abstracts = {
+            node.get(_w("abstractNumId")): node
+            for node in source_root.iterfind("w:abstractNum", NS)
+        }
+        num_map: dict[str, str] = {}
+        abstract_map: dict[str, str] = {}
+        for old_id in sorted(used):
+            num = nums.get(old_id)
+            if num is None:
+                continue
+            abstract_ref = num.find("w:abstractNumId", NS)
+            old_abstract = abstract_ref.get(W_VAL) if abstract_ref is not None else None
+            if old_abstract in abstracts and old_abstract not in abstract_map:
+                abstract_map[old_abstract] = str(self.next_abstract)
+                self.next_abstract += 1
+                abstract = copy.deepcopy(abstracts[old_abstract])
+                abstract.set(_w("abstractNumId"), abstract_map[old_abstract])
+                first_num = target.find("w:num", NS)
+                if first_num is not None:
+                    first_num.addprevious(abstract)
+                else:
+                    target.append(abstract)
+            num_map[old_id] = str(self.next_num)
+            self.next_num += 1
+            new_num = copy.deepcopy(num)
+            new_num.set(_w("numId"), num_map[old_id])
+            new_ref = new_num.find("w:abstractNumId", NS)
+            if new_ref is not None and old_abstract in abstract_map:
+                new_ref.set(W_VAL, abstract_map[old_abstract])
+            target.append(new_num)
+        for node in refs:
+            if node.get(W_VAL) in num_map:
+                node.set(W_VAL, num_map[node.get(W_VAL)])
+
+    def _import_footnotes(
+        self, elements: list[etree._Element], source: _SourcePackage, prefix: str
+    ) -> None:
+        """Copia as notas de rodapé referenciadas, com novos ids."""
+        refs = [
+            node for elem in elements for node in elem.iter(_w("footnoteReference"))
+        ]
+        source_root = source.xml(FOOTNOTES_PART)
+        if not refs or source_root is None:
+            return
+        target = self._part_root("footnotes", FOOTNOTES_PART, source_root, _FOOTNOTES)
+        notes = {note.get(W_ID): note for note in source_root.iterfind("w:footnote", NS)}
+        mapping: dict[str, str] = {}
+        imported = []
+        for ref in refs:
+            old_id = ref.get(W_ID)
+            if old_id not in mapping:
+                if old_id not in notes:
+                    continue
+                mapping[old_id] = str(self.next_footnote)
+                self.next_footnote += 1
+                note = copy.deepcopy(notes[old_id])
+                note.set(W_ID, mapping[old_id])
+                target.append(note)
+                imported.append(note)
+            ref.set(W_ID, mapping[old_id])
+        self._import_rels(imported, source, FOOTNOTES_PART, prefix)
+        self._import_styles(imported, source)
+
+    def _part_root(
+        self,
+        attr: str,
+        part: str,
+        source_root: etree._Element,
+        spec: tuple[str, str, str],
+    ) -> etree._Element:
+        """Raiz editável da parte; cria a parte se o template não a tiver."""
+        root = getattr(self, attr)
+        if root is not None:
+            return root
+        data = self.template.parts.get(part)
+        if data:
+            root = etree.fromstring(data)
+        else:
+            rel_type, target, content_type = spec
+            root = etree.Element(source_root.tag, nsmap=source_root.nsmap)
+            # Notas de rodapé exigem os separadores (ids -1 e 0)
+            for note in source_root.iterfind("w:footnote", NS):
+                if note.get(_w("type")) in ("separator", "continuationSeparator"):
+                    root.append(copy.deepcopy(note))
+            self._add_rel(DOCUMENT_PART, rel_type, target, external=False)
+            self.ct_overrides["/" + part] = content_type
+        setattr(self, attr, root)
+        return root
+
+    def _renumber_drawings_and_bookmarks(self, elements: list[etree._Element]) -> None:
+        """Evita ids duplicados de bookmarks e desenhos entre template e conteúdo."""
+        highest = 0
+        for elem in elements:
+            for node in elem.iter(_w("bookmarkStart"), _w("bookmarkEnd")):
+                try:
+                    value = int(node.get(W_ID))
+                except (TypeError, ValueError):
+                    continue
+                highest = max(highest, value)
+                node.set(W_ID, str(value + self.bookmark_offset))
+            for node in elem.iter(f"{{{WP_NS}}}docPr"):
+                node.set("id", str(self.next_docpr))
+                self.next_docpr += 1
+        self.bookmark_offset += highest + 1
+
+    def _content_types(self) -> bytes:
+        root = etree.fromstring(self.template.parts[CONTENT_TYPES_PART])
+        for ext, content_type in self.ct_defaults.items():
+            etree.SubElement(
+                root,
+                f"{{{CT_NS}}}Default",
+                {"Extension": ext, "ContentType": content_type},
+            )
+        for part_name, content_type in self.ct_overrides.items():
+            if part_name not in self.template.ct_overrides:
+                etree.SubElement(
+                    root,
+                    f"{{{CT_NS}}}Override",
+                    {"PartName": part_name, "ContentType": content_type},
+                )
+        return _serialize(root)
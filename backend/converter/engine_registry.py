@@ -0,0 +1,156 @@
+"""
+Registro dos motores de conversão disponíveis no processo.
+
+A sondagem (descoberta do Pandoc, versão e leitores/escritores suportados;
+presença e versão das bibliotecas de PDF e DOCX) roda uma única vez, na
+inicialização da aplicação. As bibliotecas Python são verificadas sem
+serem importadas, para não pesar na inicialização.
+"""
+
+import importlib.metadata
+import importlib.util
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+from config import OUTPUT_FORMATS
+from converter.pandoc_engine import (
+    INPUT_FORMATS,
+    OUTPUT_FORMAT_ALIASES,
+    get_pandoc_version,
+    pandoc_path,
+    run_pandoc,
+)
+
+logger = logging.getLogger(__name__)
+
+# Motor -> (módulo importável, distribuição no pip)
+_PYTHON_ENGINES = {
+    "markdown-pdf": ("markdown_pdf", "markdown-pdf"),
+    "pymupdf": ("pymupdf", "PyMuPDF"),
+    "docx-merge": ("docx_merge", "docx-merge-xml"),
+}
+# Formato de saída -> motores necessários além do Pandoc
+_FORMAT_ENGINES = {"pdf": ("pymupdf",)}
+
+
+@dataclass(frozen=True)
+class EngineInfo:
+    """Resultado da sondagem de um motor."""
+
+    name: str
+    available: bool
+    version: str | None = None
+    path: str | None = None
+    input_formats: frozenset[str] = field(default_factory=frozenset)
+    output_formats: frozenset[str] = field(default_factory=frozenset)
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        data = {"available": self.available, "version": self.version}
+        if self.path:
+            data["path"] = self.path
+        if self.input_formats:
+            data["input_formats"] = sorted(self.input_formats)
+            data["output_formats"] = sorted(self.output_formats)
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+def _probe_pandoc() -> EngineInfo:
+    try:
+        path = pandoc_path()
+        version = get_pandoc_version()
+        readers = run_pandoc(["--list-input-formats"]).decode().split()
+        writers = run_pandoc(["--list-output-formats"]).decode().split()
+    except Exception as exc:
+        return EngineInfo("pandoc", available=False, error=str(exc))
+    return EngineInfo(
+        "pandoc",
+        available=True,
+        version=version,
+        path=path,
+        input_formats=frozenset(readers),
+        output_formats=frozenset(writers),
+    )
+
+
+def _probe_python(name: str, module: str, distribution: str) -> EngineInfo:
+    if importlib.util.find_spec(module) is None:
+        return EngineInfo(name, available=False, error=f"Módulo {module} ausente")
+    try:
+        version = importlib.metadata.version(distribution)
+    except importlib.metadata.PackageNotFoundError:
+        version = None
+    return EngineInfo(name, available=True, version=version)
+
+
+class EngineRegistry:
+    """Motores sondados uma vez; consultas seguintes não executam nada."""
+
+    def __init__(self):
+        self._engines: dict[str, EngineInfo] | None = None
+        self._lock = threading.Lock()
+        self.probe_seconds: float | None = None
+
+    def probe(self) -> dict[str, EngineInfo]:
+        """Sonda os motores (só na primeira chamada) e retorna o registro."""
+        with self._lock:
+            if self._engines is None:
+                start = time.perf_counter()
+                engines = {"pandoc": _probe_pandoc()}
+                for name, (module, distribution) in _PYTHON_ENGINES.items():
+                    engines[name] = _probe_python(name, module, distribution)
+                self.probe_seconds = time.perf_counter() - start
+                self._engines = engines
+                for info in engines.values():
+                    if not info.available:
+                        logger.warning(
+                            "Motor %s indisponível: %s", info.name, info.error
+                        )
+                missing = INPUT_FORMATS - engines["pandoc"].input_formats
+                if engines["pandoc"].available and missing:
+                    logger.warning(
+                        "Formatos de entrada sem leitor no Pandoc: %s",
+                        ", ".join(sorted(missing)),
+                    )
+            return self._engines
+
+    def get(self, name: str) -> EngineInfo:
+        return self.probe()[name]
+
+    def output_formats(self) -> list[str]:
+        """Formatos de saída da aplicação suportados pelos motores sondados."""
+        engines = self.probe()
+        pandoc = engines["pandoc"]
+        formats = []
+        for output_format in sorted(OUTPUT_FORMATS):
+            required = _FORMAT_ENGINES.get(output_format)
+            if required is not None:
+                available = all(engines[name].available for name in required)
+            else:
+                writer = OUTPUT_FORMAT_ALIASES.get(output_format, output_format)
+                available = writer in pandoc.output_formats
+            if available:
+                formats.append(output_format)
+        return formats
+
+    def to_dict(self) -> dict:
+        return {name: info.to_dict() for name, info in self.probe().items()}
+
+    def summary(self) -> dict:
+        """Disponibilidade e versão de cada motor (para o /health)."""
+        return {
+            name: {"available": info.available, "version": info.version}
+            for name, info in self.probe().items()
+        }
+
+
+_registry = EngineRegistry()
+
+
+def get_engine_registry() -> EngineRegistry:
+    """Retorna o registro de motores do processo."""
+    return _registry
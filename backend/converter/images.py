@@ -0,0 +1,286 @@
+"""
+Imagens embutidas na origem: redução por formato de saída e cache por hash.
+
+Capturas de tela grandes incham o DOCX/PDF e são decodificadas de novo a cada
+conversão. Antes do Pandoc, as imagens PNG/JPEG da origem (data URIs em
+Markdown/HTML, mídia de DOCX/ODT) mais largas que a largura útil da página
+do formato de saída, em IMAGE_DPI, são reduzidas com o PyMuPDF. O formato da
+imagem não muda (PNG continua PNG) e a resolução gravada é ajustada para que
+o tamanho de exibição no documento continue o mesmo.
+
+O resultado fica num cache compartilhado, por hash do conteúdo e largura
+alvo: a mesma imagem repetida no documento, ou enviada de novo em outra
+requisição, é processada uma única vez.
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from collections.abc import Iterable
+
+from config import IMAGE_CACHE_MAX_BYTES, IMAGE_DPI, IMAGE_JPEG_QUALITY
+
+logger = logging.getLogger(__name__)
+
+# Largura útil da página por formato de saída, em polegadas (PDF: A4 com as
+# margens do markdown-pdf; DOCX/RTF: Carta com margens de 1"; ODT: A4 com
+# margens de 2cm). HTML usa a mesma largura do DOCX.
+CONTENT_WIDTH_INCHES = {
+    "pdf": 7.26,
+    "docx": 6.5,
+    "rtf": 6.5,
+    "odt": 6.69,
+    "html": 6.5,
+}
+# Formatos que guardam a imagem decodificada (tamanho ~ pixels): a versão
+# reduzida é usada mesmo que o PNG recodificado fique maior
+_PIXEL_FORMATS = frozenset(["pdf"])
+# Imagens acima disso não são decodificadas (risco de memória)
+MAX_PIXELS = 60_000_000
+MAX_IMAGE_BYTES = 50 * 1024 * 1024
+# Bytes lidos de um membro do zip para achar as dimensões (o JPEG pode ter
+# metadados EXIF antes do cabeçalho do quadro)
+_HEADER_BYTES = 128 * 1024
+# Resolução assumida quando a imagem não informa (a mesma do Pandoc)
+_DEFAULT_DPI = 96
+
+_DATA_URI = re.compile(rb"data:image/(png|jpe?g);base64,([A-Za-z0-9+/]+={0,2})")
+_DATA_URI_MARKER = b"data:image/"
+_DATA_URI_FORMATS = frozenset(["markdown", "html"])
+_ZIP_FORMATS = frozenset(["docx", "odt"])
+_ZIP_MEDIA_PREFIXES = ("word/media/", "Pictures/")
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def target_width(output_formats: Iterable[str]) -> int:
+    """
+    Largura máxima, em pixels, das imagens para os formatos de saída.
+
+    Com vários formatos (exportação) vale a maior; 0 quando nenhum formato
+    exibe imagens ou a redução está desativada (IMAGE_DPI=0).
+    """
+    widths = [
+        CONTENT_WIDTH_INCHES[fmt] for fmt in output_formats if fmt in CONTENT_WIDTH_INCHES
+    ]
+    if not widths or IMAGE_DPI <= 0:
+        return 0
+    return round(max(widths) * IMAGE_DPI)
+
+
+def image_size(data: bytes) -> tuple[int, int] | None:
+    """Largura e altura lidas do cabeçalho PNG/JPEG, sem decodificar."""
+    if data.startswith(_PNG_SIGNATURE) and data[12:16] == b"IHDR":
+        return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+    if not data.startswith(b"\xff\xd8"):
+        return None
+    index = 2
+    while index + 9 < len(data):
+        if data[index] != 0xFF:
+            return None
+        marker = data[index + 1]
+        if marker == 0xFF:
+            index += 1
+            continue
+        if 0xD0 <= marker <= 0xD9 or marker == 0x01:
+            index += 2
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(data[index + 5 : index + 7], "big")
+            width = int.from_bytes(data[index + 7 : index + 9], "big")
+            return width, height
+        index += 2 + int.from_bytes(data[index + 2 : index + 4], "big")
+    return None
+
+
+def _is_png(data: bytes) -> bool:
+    return data.startswith(_PNG_SIGNATURE)
+
+
+def _downscale(data: bytes, width: int) -> bytes:
+    """Reduz a imagem para `width` pixels de largura, no mesmo formato."""
+    import pymupdf
+
+    source = pymupdf.Pixmap(data)
+    ratio = width / source.width
+    height = max(1, round(source.height * ratio))
+    scaled = pymupdf.Pixmap(source, width, height, None)
+    # Mantém o tamanho físico: menos pixels por polegada
+    xres = source.xres or _DEFAULT_DPI
+    yres = source.yres or _DEFAULT_DPI
+    scaled.set_dpi(max(1, round(xres * ratio)), max(1, round(yres * ratio)))
+    if _is_png(data):
+        return scaled.tobytes("png")
+    return scaled.tobytes("jpg", jpg_quality=IMAGE_JPEG_QUALITY)
+
+
+class ImageCache:
+    """
+    Imagens já processadas, por hash do original e largura alvo (LRU por
+    bytes). Guarda None quando a imagem original deve ser mantida.
+    """
+
+    def __init__(self, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, int, bool], bytes | None] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def optimize(self, data: bytes, width: int, keep_larger: bool = False) -> bytes:
+        """
+        Imagem reduzida para a largura alvo, ou a original quando não há
+        ganho (já é estreita, formato não suportado, ou ficaria maior e
+        keep_larger é falso).
+        """
+        size = image_size(data)
+        if size is None or size[0] <= width or size[0] * size[1] > MAX_PIXELS:
+            return data
+        key = (hashlib.sha256(data).hexdigest(), width, keep_larger)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                cached = self._entries[key]
+                return data if cached is None else cached
+            self.misses += 1
+        try:
+            result: bytes | None = _downscale(data, width)
+        except Exception:
+            logger.warning("Imagem embutida não pôde ser reduzida", exc_info=True)
+            result = None
+        if result is not None and not keep_larger and len(result) >= len(data):
+            result = None
+        self._store(key, result)
+        return data if result is None else result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _store(self, key: tuple[str, int, bool], value: bytes | None) -> None:
+        size = len(value or b"")
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = value
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted or b"")
+
+
+_cache: ImageCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_image_cache() -> ImageCache:
+    """Cache de imagens compartilhado do processo."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ImageCache()
+    return _cache
+
+
+def has_images(content: bytes, input_format: str) -> bool:
+    """Indica, sem decodificar nada, se a origem tem imagens a processar."""
+    if input_format in _DATA_URI_FORMATS:
+        return _DATA_URI_MARKER in content
+    return input_format in _ZIP_FORMATS and content.startswith(b"PK")
+
+
+def optimize_images(
+    content: bytes, input_format: str, output_formats: Iterable[str]
+) -> bytes:
+    """
+    Origem com as imagens embutidas reduzidas para os formatos de saída.
+
+    Retorna o próprio `content` quando nada muda.
+    """
+    output_formats = list(output_formats)
+    width = target_width(output_formats)
+    if not width or not has_images(content, input_format):
+        return content
+    keep_larger = bool(_PIXEL_FORMATS.intersection(output_formats))
+    if input_format in _DATA_URI_FORMATS:
+        return _optimize_data_uris(content, width, keep_larger)
+    return _optimize_zip_media(content, width, keep_larger)
+
+
+def _optimize_data_uris(content: bytes, width: int, keep_larger: bool) -> bytes:
+    cache = get_image_cache()
+    # Data URIs repetidos no documento são decodificados uma vez (None: manter)
+    replacements: dict[bytes, bytes | None] = {}
+
+    def replace(match: re.Match) -> bytes:
+        encoded = match.group(2)
+        if encoded not in replacements:
+            replacements[encoded] = _optimize_encoded(
+                cache, encoded, width, keep_larger
+            )
+        replacement = replacements[encoded]
+        if replacement is None:
+            return match.group(0)
+        return b"data:image/" + match.group(1) + b";base64," + replacement
+
+    result = _DATA_URI.sub(replace, content)
+    return result if any(replacements.values()) else content
+
+
+def _optimize_encoded(
+    cache: ImageCache, encoded: bytes, width: int, keep_larger: bool
+) -> bytes | None:
+    try:
+        data = base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    optimized = cache.optimize(data, width, keep_larger)
+    return None if optimized is data else base64.b64encode(optimized)
+
+
+def _optimize_zip_media(content: bytes, width: int, keep_larger: bool) -> bytes:
+    cache = get_image_cache()
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(content))
+    except zipfile.BadZipFile:
+        return content  # o Pandoc relata o erro
+    with archive:
+        media: dict[str, bytes] = {}
+        for info in archive.infolist():
+            if not info.filename.startswith(_ZIP_MEDIA_PREFIXES):
+                continue
+            if info.file_size > MAX_IMAGE_BYTES:
+                continue
+            # Só o cabeçalho decide se vale ler a imagem inteira
+            with archive.open(info) as member:
+                size = image_size(member.read(_HEADER_BYTES))
+            if size is None or size[0] <= width:
+                continue
+            data = archive.read(info)
+            optimized = cache.optimize(data, width, keep_larger)
+            if optimized is not data:
+                media[info.filename] = optimized
+        if not media:
+            return content
+        buffer = io.BytesIO()
+        # Mesma ordem e compressão dos membros (o "mimetype" do ODT vem
+        # primeiro e sem compressão)
+        with zipfile.ZipFile(buffer, "w") as output:
+            for info in archive.infolist():
+                output.writestr(info, media.get(info.filename) or archive.read(info))
+    return buffer.getvalue()
@@ -0,0 +1,409 @@
+"""
+Conversão de Markdown simples em processo, com o markdown-it-py.
+
+Para documentos que só usam o núcleo comum ao CommonMark e ao Markdown do
+Pandoc (títulos, parágrafos, ênfase, código, links, imagens, listas e
+citações simples, linhas horizontais), gera o mesmo HTML do Pandoc (ids de
+título, tipografia e marcação; só sem a quebra de linhas em 72 colunas, que
+não altera o HTML) e o mesmo texto do writer plain, sem iniciar o Pandoc.
+
+is_simple() recusa qualquer construção em que os dois dialetos divergem ou
+que só o Pandoc entende; esses documentos vão para o Pandoc.
+"""
+
+import functools
+import re
+import unicodedata
+
+from markdown_it import MarkdownIt
+from markdown_it.common.utils import escapeHtml
+
+# Mesma largura de linha do Pandoc (--columns)
+COLUMNS = 72
+
+# Sintaxe que só o Markdown do Pandoc entende (ou entende diferente)
+_PANDOC_ONLY = re.compile(
+    r"""
+      [$^~|\t]                                  # matemática, sub/sobrescrito, tabelas
+    | \\[A-Za-z\ ]                              # TeX bruto, espaço inseparável
+    | \\\n[\ ]*(?:\n|\Z) | \\\n?\Z               # barra no fim do parágrafo
+    | (?<!\w)'(?=\d)                           # apóstrofo antes de número
+    | \[\^ | (?<![\w.])@\w                      # notas de rodapé, citações
+    | \{[#.=-]                                  # atributos
+    | (?:\*{3}|_{3})(?=\w) | (?<=\w)(?:\*{3}|_{3})  # ênfase tripla (aninha diferente)
+    | ^\ {0,3}(?::|\+-|\#{7})                   # definições, divs, grid tables, h7
+    | ^\ {0,3}\(?[A-Za-z#]{1,5}[.)](?:\ |$)     # listas com letras, romanos ou #
+    | ^\ {0,3}\d+\)                             # listas com parêntese
+    | ^\ {0,3}[-*+]\ +\[[\ xX]\]                # listas de tarefas
+    | ^\ {0,3}-+\ +-[-\ ]*$                     # simple tables
+    """,
+    re.MULTILINE | re.VERBOSE,
+)
+_BLOCK_TOKENS = frozenset(
+    [
+        "heading_open",
+        "heading_close",
+        "paragraph_open",
+        "paragraph_close",
+        "inline",
+        "bullet_list_open",
+        "bullet_list_close",
+        "ordered_list_open",
+        "ordered_list_close",
+        "list_item_open",
+        "list_item_close",
+        "blockquote_open",
+        "blockquote_close",
+        "fence",
+        "code_block",
+        "hr",
+    ]
+)
+_INLINE_TOKENS = frozenset(
+    [
+        "text",
+        "softbreak",
+        "hardbreak",
+        "em_open",
+        "em_close",
+        "strong_open",
+        "strong_close",
+        "code_inline",
+        "link_open",
+        "link_close",
+        "image",
+    ]
+)
+# Blocos que o Pandoc só reconhece depois de uma linha em branco
+_NEEDS_BLANK_BEFORE = frozenset(
+    [
+        "heading_open",
+        "bullet_list_open",
+        "ordered_list_open",
+        "blockquote_open",
+        "fence",
+        "code_block",
+        "hr",
+    ]
+)
+# Filhos permitidos em itens de lista e citações: só parágrafos
+_PARAGRAPH_ONLY = ("paragraph_open", "inline", "paragraph_close")
+_SMART_DASHES = (("---", "\u2014"), ("--", "\u2013"), ("...", "\u2026"))
+
+
+def _smart_dashes(state) -> None:
+    """Travessões e reticências como no Pandoc (sem as demais substituições)."""
+    for token in state.tokens:
+        if token.type != "inline":
+            continue
+        for child in token.children or ():
+            if child.type == "text":
+                for source, target in _SMART_DASHES:
+                    child.content = child.content.replace(source, target)
+
+
+def _heading_ids(state) -> None:
+    """Ids de título no formato do Pandoc (auto_identifiers)."""
+    used: set[str] = set()
+    for index, token in enumerate(state.tokens):
+        if token.type != "heading_open":
+            continue
+        identifier = _identifier(_inline_text(state.tokens[index + 1]))
+        base, suffix = identifier, 0
+        while identifier in used:
+            suffix += 1
+            identifier = f"{base}-{suffix}"
+        used.add(identifier)
+        token.attrSet("id", identifier)
+
+
+def _identifier(text: str) -> str:
+    words = "-".join(text.lower().split())
+    allowed = "".join(c for c in words if c.isalnum() or c in "_-.")
+    # O id começa na primeira letra
+    start = next((i for i, c in enumerate(allowed) if c.isalpha()), len(allowed))
+    return allowed[start:] or "section"
+
+
+def _inline_text(token) -> str:
+    parts = []
+    for child in token.children or ():
+        if child.type in ("text", "code_inline"):
+            parts.append(child.content)
+        elif child.type == "image":
+            parts.append(child.content)
+        elif child.type in ("softbreak", "hardbreak"):
+            parts.append(" ")
+    return "".join(parts)
+
+
+def _render_ordered_list_open(self, tokens, index, options, env) -> str:
+    tokens[index].attrSet("type", "1")
+    return self.renderToken(tokens, index, options, env)
+
+
+def _render_link_open(self, tokens, index, options, env) -> str:
+    token = tokens[index]
+    if token.markup == "autolink":
+        is_email = str(token.attrGet("href")).startswith("mailto:")
+        token.attrSet("class", "email" if is_email else "uri")
+    return self.renderToken(tokens, index, options, env)
+
+
+def _render_code(self, tokens, index, options, env) -> str:
+    content = tokens[index].content.rstrip("\n")
+    return f"<pre><code>{escapeHtml(content)}</code></pre>\n"
+
+
+@functools.lru_cache(maxsize=1)
+def _parser() -> MarkdownIt:
+    parser = MarkdownIt("commonmark", {"typographer": True}).enable("smartquotes")
+    parser.core.ruler.push("pandoc_dashes", _smart_dashes)
+    parser.core.ruler.push("pandoc_heading_ids", _heading_ids)
+    parser.add_render_rule("ordered_list_open", _render_ordered_list_open)
+    parser.add_render_rule("link_open", _render_link_open)
+    parser.add_render_rule("fence", _render_code)
+    parser.add_render_rule("code_block", _render_code)
+    return parser
+
+
+@functools.lru_cache(maxsize=4)
+def _parse(text: str) -> list | None:
+    """Tokens do documento, ou None se não for Markdown simples."""
+    if text.startswith("%") or _PANDOC_ONLY.search(text):
+        return None
+    if any(
+        unicodedata.combining(c) or unicodedata.east_asian_width(c) in "WF"
+        for c in text
+        if ord(c) > 0x2FF
+    ):
+        # Larguras que o Pandoc conta diferente ao quebrar as linhas
+        return None
+    tokens = _parser().parse(text)
+    lines = text.splitlines()
+    titles = [
+        _inline_text(tokens[index + 1])
+        for index, token in enumerate(tokens)
+        if token.type == "heading_open"
+    ]
+    if any(f"[{title}]" in text for title in titles):
+        return None  # referências implícitas a títulos
+    for index, token in enumerate(tokens):
+        if token.type not in _BLOCK_TOKENS:
+            return None
+        if token.type == "inline" and not _is_simple_inline(token):
+            return None
+        if token.type == "fence" and token.info.strip():
+            return None  # o Pandoc realça o código pela linguagem
+        if token.type in _NEEDS_BLANK_BEFORE and token.level == 0:
+            start = token.map[0]
+            if start > 0 and lines[start - 1].strip():
+                return None
+        if token.type == "hr" and not _is_plain_rule(lines, token.map):
+            return None
+        if token.type in ("list_item_open", "blockquote_open") and not (
+            _has_only_paragraphs(tokens, index)
+        ):
+            return None
+        if token.type in ("bullet_list_open", "ordered_list_open") and not (
+            _is_uniform_list(tokens, index, lines)
+        ):
+            return None
+    return tokens
+
+
+def _is_simple_inline(token) -> bool:
+    children = token.children or []
+    if any(child.type not in _INLINE_TOKENS for child in children):
+        return False
+    if any(
+        child.type == "code_inline" and child.content != child.content.strip()
+        for child in children
+    ):
+        return False  # o Pandoc apara os espaços do código inline
+    # Imagem sozinha no parágrafo vira figura com legenda no Pandoc
+    return not (len(children) == 1 and children[0].type == "image")
+
+
+def _is_plain_rule(lines: list[str], line_map: list[int]) -> bool:
+    start, end = line_map
+    rule = lines[start].strip()
+    return (
+        start > 0
+        and " " not in rule
+        and (end >= len(lines) or not lines[end].strip())
+    )
+
+
+def _has_only_paragraphs(tokens: list, index: int) -> bool:
+    """O item/citação contém só parágrafos (sem listas, código ou títulos)."""
+    closing = tokens[index].type.replace("_open", "_close")
+    level = tokens[index].level
+    children = []
+    for token in tokens[index + 1 :]:
+        if token.type == closing and token.level == level:
+            break
+        children.append(token.type)
+    if not children or len(children) % 3:
+        return False
+    if tokens[index].type == "list_item_open" and len(children) != 3:
+        return False
+    return all(
+        children[i : i + 3] == list(_PARAGRAPH_ONLY)
+        for i in range(0, len(children), 3)
+    )
+
+
+def _is_uniform_list(tokens: list, index: int, lines: list[str]) -> bool:
+    """
+    Lista sem itens mistos (com e sem linha em branco entre eles) e que não
+    emenda em outra lista do mesmo tipo logo depois: casos em que os dialetos divergem.
+    """
+    opening = tokens[index]
+    closing = opening.type.replace("_open", "_close")
+    items = []
+    end = index
+    for end in range(index + 1, len(tokens)):
+        token = tokens[end]
+        if token.type == closing and token.level == opening.level:
+            break
+        if token.type == "list_item_open" and token.level == opening.level + 1:
+            items.append(token.map[0])
+    gaps = {not lines[start - 1].strip() for start in items[1:]}
+    if len(gaps) > 1:
+        return False
+    following = tokens[end + 1] if end + 1 < len(tokens) else None
+    return following is None or following.type != opening.type
+
+
+def is_simple(content: bytes) -> bool:
+    """Indica se o Markdown pode ser convertido sem o Pandoc."""
+    try:
+        return _parse(content.decode("utf-8")) is not None
+    except UnicodeDecodeError:
+        return False
+
+
+def markdown_to_html(content: bytes) -> bytes:
+    """HTML equivalente ao do Pandoc para Markdown simples."""
+    tokens = _parse(content.decode("utf-8"))
+    if tokens is None:
+        raise ValueError("Markdown com recursos que exigem o Pandoc")
+    return _parser().renderer.render(tokens, _parser().options, {}).encode("utf-8")
+
+
+def markdown_to_plain(content: bytes) -> bytes:
+    """Texto igual ao do writer plain do Pandoc para Markdown simples."""
+    tokens = _parse(content.decode("utf-8"))
+    if tokens is None:
+        raise ValueError("Markdown com recursos que exigem o Pandoc")
+    blocks = _plain_blocks(tokens)
+    return ("\n\n".join(blocks) + "\n" if blocks else "").encode("utf-8")
+
+
+def _plain_blocks(tokens: list) -> list[str]:
+    blocks = []
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token.type == "heading_open":
+            # O writer plain não quebra os títulos
+            blocks.append("\n".join(_wrap(tokens[index + 1], None)))
+            index += 3
+        elif token.type == "paragraph_open":
+            blocks.append("\n".join(_wrap(tokens[index + 1], COLUMNS)))
+            index += 3
+        elif token.type in ("bullet_list_open", "ordered_list_open"):
+            index = _plain_list(tokens, index, blocks)
+        elif token.type == "blockquote_open":
+            paragraphs = []
+            index += 1
+            while tokens[index].type != "blockquote_close":
+                lines = _wrap(tokens[index + 1], COLUMNS - 2)
+                paragraphs.append("\n".join(f"  {line}" for line in lines))
+                index += 3
+            blocks.append("\n\n".join(paragraphs))
+            index += 1
+        elif token.type in ("fence", "code_block"):
+            code = token.content.rstrip("\n").split("\n")
+            blocks.append("\n".join(f"    {line}" if line else "" for line in code))
+            index += 1
+        elif token.type == "hr":
+            blocks.append("-" * COLUMNS)
+            index += 1
+        else:
+            index += 1
+    return blocks
+
+
+def _plain_list(tokens: list, index: int, blocks: list[str]) -> int:
+    opening = tokens[index]
+    number = int(opening.attrGet("start") or 1)
+    tight = True
+    items = []
+    index += 1
+    while tokens[index].type != opening.type.replace("_open", "_close"):
+        # list_item_open, paragraph_open, inline, paragraph_close, list_item_close
+        paragraph, inline = tokens[index + 1], tokens[index + 2]
+        tight = tight and paragraph.hidden
+        if opening.type == "ordered_list_open":
+            marker = f"{number}."
+            marker += " " * max(1, 4 - len(marker))
+            number += 1
+        else:
+            marker = "- "
+        indent = " " * len(marker)
+        lines = _wrap(inline, COLUMNS - len(marker))
+        items.append(
+            "\n".join(
+                (marker if i == 0 else indent) + line for i, line in enumerate(lines)
+            )
+        )
+        index += 5
+    blocks.append(("\n" if tight else "\n\n").join(items))
+    return index + 1
+
+
+def _wrap(inline, width: int | None) -> list[str]:
+    """Quebra gulosa nos espaços, como o Pandoc; código inline não quebra."""
+    words: list[str | None] = []  # None marca quebra de linha forçada
+    current = ""
+    for child in inline.children or ():
+        if child.type == "text":
+            parts = child.content.split(" ")
+            current += parts[0]
+            for part in parts[1:]:
+                if current:
+                    words.append(current)
+                current = part
+        elif child.type == "code_inline":
+            current += child.content
+        elif child.type == "image":
+            current += f"[{child.content}]"
+        elif child.type == "softbreak":
+            if current:
+                words.append(current)
+            current = ""
+        elif child.type == "hardbreak":
+            if current:
+                words.append(current)
+            words.append(None)
+            current = ""
+    if current:
+        words.append(current)
+
+    lines: list[str] = []
+    line = ""
+    for word in words:
+        if word is None:
+            lines.append(line)
+            line = ""
+        elif not line:
+            line = word
+        elif width is None or len(line) + 1 + len(word) <= width:
+            line = f"{line} {word}"
+        else:
+            lines.append(line)
+            line = word
+    lines.append(line)
+    return lines
@@ -1,14 +1,40 @@
 """Motor de conversão via Pandoc."""
 
+import atexit
+import functools
 import logging
 import os
+import shlex
+import subprocess
 import tempfile
+import threading
 from pathlib import Path
 
 import pypandoc
 
+from config import (
+    PANDOC_MODE,
+    PANDOC_SERVER_COMMAND,
+    PANDOC_SERVER_POOL_SIZE,
+    PANDOC_TIMEOUT_SECONDS,
+)
+from converter.pandoc_server import (
+    PandocServerError,
+    PandocServerPool,
+    PandocServerTimeout,
+)
+
 logger = logging.getLogger(__name__)
 _pandoc_ensured = False
+_pandoc_path: str | None = None
+_pandoc_error: Exception | None = None
+_pandoc_lock = threading.Lock()
+_server_pool: PandocServerPool | None = None
+_server_pool_lock = threading.Lock()
+
+
+class PandocTimeoutError(RuntimeError):
+    """O processo do Pandoc excedeu o tempo limite e foi encerrado."""
 
 
 def ensure_pandoc() -> None:
@@ -29,6 +55,139 @@ def ensure_pandoc() -> None:
         logger.info("Pandoc instalado com sucesso.")
 
 
+def pandoc_path() -> str:
+    """
+    Caminho do binário do Pandoc, descoberto uma única vez por processo.
+
+    A descoberta (e o eventual download) acontece na inicialização, pelo
+    registro de motores; se falhou, as conversões falham na hora em vez
+    de tentar o download no meio de uma requisição.
+
+    Raises:
+        RuntimeError: Pandoc indisponível.
+    """
+    global _pandoc_path, _pandoc_error
+    if _pandoc_path is not None:
+        return _pandoc_path
+    with _pandoc_lock:
+        if _pandoc_path is None:
+            if _pandoc_error is not None:
+                raise RuntimeError(f"Pandoc indisponível: {_pandoc_error}")
+            try:
+                ensure_pandoc()
+                _pandoc_path = pypandoc.get_pandoc_path()
+            except Exception as exc:
+                _pandoc_error = exc
+                raise RuntimeError(f"Pandoc indisponível: {exc}") from exc
+        return _pandoc_path
+
+
+@functools.lru_cache(maxsize=1)
+def get_pandoc_version() -> str:
+    """Retorna a versão do Pandoc em uso (consultada uma única vez)."""
+    pandoc_path()
+    return pypandoc.get_pandoc_version()
+
+
+def run_pandoc(
+    args: list[str],
+    timeout: float | None = None,
+    input: bytes | None = None,
+) -> bytes:
+    """
+    Executa o binário do Pandoc com os argumentos informados.
+
+    O processo filho é encerrado (kill) se exceder o tempo limite.
+
+    Args:
+        args: Argumentos de linha de comando (sem o executável).
+        timeout: Tempo limite em segundos. Se None, usa PANDOC_TIMEOUT_SECONDS.
+        input: Conteúdo enviado ao stdin do Pandoc (entrada sem arquivo).
+
+    Returns:
+        Conteúdo escrito pelo Pandoc no stdout.
+
+    Raises:
+        PandocTimeoutError: Quando o tempo limite é excedido.
+        RuntimeError: Quando o Pandoc termina com erro.
+    """
+    executable = pandoc_path()
+    timeout = PANDOC_TIMEOUT_SECONDS if timeout is None else timeout
+    try:
+        completed = subprocess.run(
+            [executable, *args],
+            input=input,
+            capture_output=True,
+            timeout=timeout,
+            check=False,
+        )
+    except subprocess.TimeoutExpired as exc:
+        # subprocess.run já mata o processo filho antes de propagar o erro
+        raise PandocTimeoutError(
+            f"Pandoc excedeu o tempo limite de {timeout}s"
+        ) from exc
+    if completed.returncode != 0:
+        stderr = completed.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(
+            f"Pandoc falhou (código {completed.returncode}): {stderr}"
+        )
+    return completed.stdout
+
+
+def get_server_pool() -> PandocServerPool | None:
+    """
+    Retorna o pool de `pandoc server`, iniciado na primeira chamada.
+
+    Retorna None quando o modo servidor está desativado (PANDOC_MODE).
+    """
+    global _server_pool
+    if PANDOC_MODE != "server":
+        return None
+    with _server_pool_lock:
+        if _server_pool is None:
+            command = shlex.split(PANDOC_SERVER_COMMAND) or [pandoc_path(), "server"]
+            _server_pool = PandocServerPool(
+                command, PANDOC_SERVER_POOL_SIZE, PANDOC_TIMEOUT_SECONDS
+            )
+            _server_pool.start()
+            atexit.register(_server_pool.close)
+        return _server_pool
+
+
+def _convert_with_server(
+    content: bytes,
+    input_format: str,
+    pandoc_format: str,
+    reference_doc: str | Path | None,
+    standalone: bool = False,
+) -> bytes | None:
+    """Converte via pool de servidores; None indica usar o subprocesso."""
+    pool = get_server_pool()
+    if pool is None or not pool.available:
+        return None
+    files = None
+    options = {}
+    if standalone:
+        options["standalone"] = True
+    if reference_doc:
+        name = "reference" + Path(reference_doc).suffix
+        files = {name: Path(reference_doc).read_bytes()}
+        options["reference-doc"] = name
+    try:
+        return pool.convert(
+            content,
+            input_format,
+            pandoc_format,
+            files=files,
+            options=options,
+        )
+    except PandocServerTimeout as exc:
+        raise PandocTimeoutError(str(exc)) from exc
+    except PandocServerError as exc:
+        logger.warning("Fallback para subprocesso do Pandoc: %s", exc)
+        return None
+
+
 # Mapeamento de extensões para formatos Pandoc
 EXT_TO_PANDOC = {
     ".md": "markdown",
@@ -57,11 +216,12 @@ PANDOC_TO_EXT = {
     "txt": ".txt",
 }
 
-# Formatos de entrada e saída suportados
-INPUT_FORMATS = {"markdown", "html", "rst", "latex", "plain", "docx", "odt"}
+# Formatos de entrada e saída suportados ("json" é o AST do Pandoc, usado
+# como intermediário na exportação multi-formato)
+INPUT_FORMATS = {"markdown", "html", "rst", "latex", "plain", "docx", "odt", "json"}
 OUTPUT_FORMATS = {
     "docx", "html", "markdown", "md", "odt", "pdf", "rst", "rtf", "latex", "tex",
-    "plain", "txt",
+    "plain", "txt", "json",
 }
 # Alias para formato Pandoc (API usa md/tex, Pandoc usa markdown/latex)
 OUTPUT_FORMAT_ALIASES = {"md": "markdown", "tex": "latex", "txt": "plain"}
@@ -97,13 +257,55 @@ class PandocEngine:
             output_format: Formato de saída (docx, html, md, odt, pdf, rst, rtf, tex, txt).
             output_path: Caminho do arquivo de saída. Se None, retorna bytes.
             input_format: Formato de entrada. Se None, detecta pela extensão.
-            reference_doc: Caminho do DOCX de referência para estilos (só para saída docx).
+            reference_doc: Caminho do DOCX/ODT de referência para estilos (só para
+                saída docx/odt, no mesmo formato).
 
         Returns:
             Caminho do arquivo gerado ou bytes se output_path for None.
         """
-        ensure_pandoc()
         source_path = Path(source_path)
+        if input_format is None:
+            input_format = PandocEngine.detect_input_format(str(source_path))
+
+        output = PandocEngine.convert_bytes(
+            source_path.read_bytes(),
+            output_format,
+            input_format=input_format,
+            reference_doc=reference_doc,
+        )
+        if output_path:
+            output_path = Path(output_path)
+            output_path.write_bytes(output)
+            return str(output_path)
+        return output.decode("utf-8")
+
+    @staticmethod
+    def convert_bytes(
+        content: bytes | Path,
+        output_format: str,
+        input_format: str = "markdown",
+        reference_doc: str | Path | None = None,
+        standalone: bool = False,
+    ) -> bytes:
+        """
+        Converte o conteúdo em memória, sem arquivos temporários.
+
+        A origem é enviada pelo stdin do Pandoc e o resultado (inclusive
+        formatos binários como docx/odt, via `-o -`) é lido do stdout.
+        Se content for um Path (upload grande em disco), o Pandoc lê o
+        arquivo diretamente.
+
+        Args:
+            content: Bytes do documento de origem, ou caminho do arquivo.
+            output_format: Formato de saída (docx, html, md, odt, rst, rtf, tex, txt).
+            input_format: Formato de entrada Pandoc (markdown, html, docx, ...).
+            reference_doc: Caminho do DOCX/ODT de referência para estilos (só para
+                saída docx/odt, no mesmo formato).
+            standalone: Documento completo (-s); docx/odt já são sempre completos.
+
+        Returns:
+            Bytes do documento convertido.
+        """
         output_format = output_format.lower()
 
         if output_format not in OUTPUT_FORMATS:
@@ -111,35 +313,31 @@ class PandocEngine:
 
         pandoc_format = OUTPUT_FORMAT_ALIASES.get(output_format, output_format)
 
-        if input_format is None:
-            input_format = PandocEngine.detect_input_format(str(source_path))
-
         if input_format not in INPUT_FORMATS:
             raise ValueError(f"Formato de entrada não suportado: {input_format}")
 
         extra_args = []
-        if pandoc_format == "docx" and reference_doc:
+        if pandoc_format in ("docx", "odt") and reference_doc:
             extra_args = [f"--reference-doc={reference_doc}"]
+        else:
+            reference_doc = None
         if pandoc_format == "pdf":
             raise ValueError("PDF deve usar pdf_engine")
+        if standalone:
+            extra_args.append("--standalone")
 
-        if output_path:
-            output_path = Path(output_path)
-            pypandoc.convert_file(
-                str(source_path),
-                pandoc_format,
-                format=input_format,
-                outputfile=str(output_path),
-                extra_args=extra_args,
+        if PANDOC_MODE == "server":
+            data = content.read_bytes() if isinstance(content, Path) else content
+            output = _convert_with_server(
+                data, input_format, pandoc_format, reference_doc, standalone
             )
-            return str(output_path)
+            if output is not None:
+                return output
 
-        return pypandoc.convert_file(
-            str(source_path),
-            pandoc_format,
-            format=input_format,
-            extra_args=extra_args,
-        )
+        args = ["-f", input_format, "-t", pandoc_format, "-o", "-", *extra_args]
+        if isinstance(content, Path):
+            return run_pandoc([*args, str(content)])
+        return run_pandoc(args, input=content)
 
     @staticmethod
     def convert_to_temp_docx(
@@ -151,7 +349,6 @@ class PandocEngine:
 
         Usado como passo intermediário para merge com template.
         """
-        ensure_pandoc()
         source_path = Path(source_path)
         if input_format is None:
             input_format = PandocEngine.detect_input_format(str(source_path))
@@ -0,0 +1,257 @@
+"""Pool de processos `pandoc server` de longa duração (API JSON via HTTP local)."""
+
+import base64
+import http.client
+import json
+import logging
+import queue
+import socket
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Formatos binários: entrada enviada e saída recebida em base64
+BINARY_FORMATS = frozenset(["docx", "odt", "epub", "pptx"])
+
+
+class PandocServerError(RuntimeError):
+    """Servidor Pandoc indisponível (não iniciou, caiu ou não responde)."""
+
+
+class PandocServerTimeout(PandocServerError):
+    """O servidor não respondeu dentro do tempo limite e foi reiniciado."""
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class PandocServer:
+    """Um processo `pandoc server` escutando em uma porta local."""
+
+    def __init__(
+        self,
+        command: list[str],
+        timeout: float,
+        startup_timeout: float = 5.0,
+    ):
+        self.command = command
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.port: int | None = None
+        self._process: subprocess.Popen | None = None
+
+    def start(self) -> None:
+        """Inicia o processo e aguarda o health check responder."""
+        self.stop()
+        self.port = _free_port()
+        try:
+            self._process = subprocess.Popen(
+                [
+                    *self.command,
+                    "--port",
+                    str(self.port),
+                    "--timeout",
+                    str(max(1, int(self.timeout))),
+                ],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as exc:
+            raise PandocServerError(f"Falha ao iniciar pandoc server: {exc}") from exc
+
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if not self.is_alive():
+                raise PandocServerError(
+                    f"pandoc server encerrou na inicialização "
+                    f"(código {self._process.returncode})"
+                )
+            if self.health_check():
+                return
+            time.sleep(0.05)
+        self.stop()
+        raise PandocServerError("pandoc server não respondeu ao health check")
+
+    def stop(self) -> None:
+        """Encerra o processo, se estiver rodando."""
+        if self._process is None:
+            return
+        if self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        self._process = None
+
+    def is_alive(self) -> bool:
+        """Indica se o processo ainda está rodando."""
+        return self._process is not None and self._process.poll() is None
+
+    def health_check(self) -> bool:
+        """Consulta GET /version; retorna True se o servidor respondeu."""
+        try:
+            status, _ = self._http("GET", "/version", None, timeout=1.0)
+        except PandocServerError:
+            return False
+        return status == 200
+
+    def convert(
+        self,
+        text: bytes,
+        input_format: str,
+        output_format: str,
+        files: dict[str, bytes] | None = None,
+        options: dict | None = None,
+    ) -> bytes:
+        """
+        Converte o documento pela API JSON do servidor.
+
+        Raises:
+            PandocServerError: Servidor indisponível (permite fallback).
+            RuntimeError: O Pandoc rejeitou o documento.
+        """
+        payload = {
+            "text": (
+                base64.b64encode(text).decode("ascii")
+                if input_format in BINARY_FORMATS
+                else text.decode("utf-8")
+            ),
+            "from": input_format,
+            "to": output_format,
+            **(options or {}),
+        }
+        if files:
+            payload["files"] = {
+                name: base64.b64encode(content).decode("ascii")
+                for name, content in files.items()
+            }
+        status, body = self._http(
+            "POST", "/", json.dumps(payload).encode("utf-8"), timeout=self.timeout
+        )
+        if status != 200:
+            raise RuntimeError(
+                f"Pandoc falhou: {body.decode('utf-8', errors='replace').strip()}"
+            )
+        data = json.loads(body)
+        if "error" in data:
+            raise RuntimeError(f"Pandoc falhou: {data['error']}")
+        output = data.get("output", "")
+        if data.get("base64"):
+            return base64.b64decode(output)
+        return output.encode("utf-8")
+
+    def _http(
+        self, method: str, path: str, body: bytes | None, timeout: float
+    ) -> tuple[int, bytes]:
+        if self.port is None:
+            raise PandocServerError("pandoc server não iniciado")
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=timeout)
+        headers = {"Accept": "application/json"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except TimeoutError as exc:
+            raise PandocServerTimeout(
+                f"pandoc server excedeu o tempo limite de {timeout}s"
+            ) from exc
+        except (OSError, http.client.HTTPException) as exc:
+            raise PandocServerError(f"Falha na comunicação com pandoc server: {exc}") from exc
+        finally:
+            connection.close()
+
+
+class PandocServerPool:
+    """
+    Pool de servidores Pandoc com health check e reinício em caso de falha.
+
+    Cada conversão usa um servidor exclusivo. Servidores que caem ou
+    estouram o tempo limite são reiniciados; após max_failures inícios
+    consecutivos sem sucesso, o pool é marcado como indisponível e o
+    chamador deve usar o caminho por subprocesso.
+    """
+
+    def __init__(
+        self,
+        command: list[str],
+        size: int,
+        timeout: float,
+        max_failures: int = 3,
+    ):
+        self.size = max(1, size)
+        self.max_failures = max_failures
+        self.available = False
+        self._servers = [PandocServer(command, timeout) for _ in range(self.size)]
+        self._idle: queue.Queue[PandocServer] = queue.Queue()
+        self._lock = threading.Lock()
+        self._failures = 0
+        self.restarts = 0
+
+    def start(self) -> bool:
+        """Inicia os servidores; retorna se o pool ficou disponível."""
+        for server in self._servers:
+            if not self._try_start(server):
+                # Falha no início costuma ser do binário (sem suporte a server)
+                break
+            self._idle.put(server)
+        self.available = not self._idle.empty()
+        if not self.available:
+            logger.warning("pandoc server indisponível; usando subprocesso por conversão")
+        return self.available
+
+    def close(self) -> None:
+        """Encerra todos os servidores."""
+        self.available = False
+        for server in self._servers:
+            server.stop()
+
+    def convert(self, text: bytes, input_format: str, output_format: str, **kwargs) -> bytes:
+        """Converte usando um servidor livre do pool."""
+        if not self.available:
+            raise PandocServerError("Pool de pandoc server indisponível")
+        server = self._idle.get()
+        try:
+            if not server.is_alive() and not self._restart(server):
+                raise PandocServerError("pandoc server caiu e não pôde ser reiniciado")
+            try:
+                return server.convert(text, input_format, output_format, **kwargs)
+            except PandocServerError:
+                self._restart(server)
+                raise
+        finally:
+            self._idle.put(server)
+
+    def stats(self) -> dict:
+        """Retorna o estado do pool."""
+        return {
+            "available": self.available,
+            "size": self.size,
+            "alive": sum(server.is_alive() for server in self._servers),
+            "restarts": self.restarts,
+        }
+
+    def _restart(self, server: PandocServer) -> bool:
+        logger.warning("Reiniciando pandoc server (porta %s)", server.port)
+        with self._lock:
+            self.restarts += 1
+        return self._try_start(server)
+
+    def _try_start(self, server: PandocServer) -> bool:
+        try:
+            server.start()
+        except PandocServerError as exc:
+            logger.warning("%s", exc)
+            with self._lock:
+                self._failures += 1
+                if self._failures >= self.max_failures:
+                    self.available = False
+            return False
+        with self._lock:
+            self._failures = 0
+        return True
@@ -0,0 +1,217 @@
+"""
+Renderização de PDF em blocos, para documentos Markdown muito grandes.
+
+O Markdown é dividido nos títulos (até _SPLIT_LEVEL) em blocos de tamanho
+limitado; cada bloco é renderizado pelo markdown-pdf em um pool de
+processos e as páginas e o sumário são costurados, em ordem, no documento
+final assim que cada bloco fica pronto. O pico de memória dos workers é
+proporcional ao bloco, não ao documento; na costura, cada bloco é gravado
+de forma incremental num arquivo temporário, que só é carregado inteiro na
+passagem final de limpeza.
+
+O pool é único no processo, criado na primeira renderização e
+compartilhado pelas requisições concorrentes: o total de processos de
+renderização fica limitado ao número de workers do pool, e o custo de
+iniciá-los (spawn + imports) é pago uma vez.
+"""
+
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import BinaryIO
+
+from converter.pdf_engine import normalize_toc, render_markdown_part
+
+# Títulos que podem abrir um bloco (# e ##, os mesmos do sumário)
+_SPLIT_LEVEL = 2
+_HEADING = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]|$)")
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+# Definições de link por referência: valem para o documento inteiro
+_LINK_DEFINITION = re.compile(r"^ {0,3}\[[^\]^][^\]]*\]:\s*\S")
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_serial = False
+
+
+def split_markdown(markdown: str, target_chars: int) -> list[str]:
+    """
+    Divide o Markdown em blocos de cerca de target_chars caracteres.
+
+    Só divide antes de títulos de nível até _SPLIT_LEVEL fora de blocos de
+    código, de modo que nenhum bloco corta uma seção menor ao meio; uma
+    seção maior que target_chars vira um bloco sozinha. As definições de
+    link por referência são repetidas em todos os blocos.
+    """
+    lines = markdown.splitlines(keepends=True)
+    definitions = "".join(line for line in lines if _LINK_DEFINITION.match(line))
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    fence: str | None = None
+    for line in lines:
+        fence_match = _FENCE.match(line)
+        if fence_match:
+            marker = fence_match.group(1)
+            if fence is None:
+                fence = marker
+            elif marker[0] == fence[0] and len(marker) >= len(fence):
+                fence = None
+        elif fence is None and size >= target_chars:
+            heading = _HEADING.match(line)
+            if heading and len(heading.group(1)) <= _SPLIT_LEVEL:
+                chunks.append("".join(current))
+                current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("".join(current))
+    if definitions and len(chunks) > 1:
+        chunks = [f"{chunk}\n\n{definitions}" for chunk in chunks]
+    return chunks
+
+
+def disable_chunk_pool() -> None:
+    """
+    Renderiza os blocos em série neste processo, sem pool próprio.
+
+    Para processos que já são workers de outro pool (ex.: o de conversões),
+    onde um pool de blocos por processo multiplicaria os interpretadores.
+    """
+    global _serial
+    _serial = True
+
+
+def shutdown_chunk_pool() -> None:
+    """Encerra o pool de blocos do processo (recriado sob demanda)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _chunk_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de blocos do processo; workers só vale na criação."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Descarta o pool quebrado (worker morto) para o próximo ser recriado."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_chunks(
+    chunks: list[str], workers: int
+) -> Iterator[tuple[bytes, list[list]]]:
+    """
+    Renderiza os blocos em paralelo no pool do processo, produzindo
+    (PDF, sumário) na ordem original.
+
+    No máximo 2 × workers blocos desta renderização ficam em andamento ou
+    aguardando a vez, o que limita a memória ocupada pelos PDFs parciais.
+    """
+    if min(workers, len(chunks)) <= 1 or _serial:
+        for chunk in chunks:
+            yield render_markdown_part(chunk)
+        return
+
+    pool = _chunk_pool(workers)
+    workers = min(workers, len(chunks))
+    pending: deque[Future] = deque()
+    try:
+        remaining = iter(chunks)
+        for chunk in remaining:
+            pending.append(pool.submit(render_markdown_part, chunk))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            part = pending.popleft().result()
+            for chunk in remaining:
+                pending.append(pool.submit(render_markdown_part, chunk))
+                break
+            yield part
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+    finally:
+        # Blocos que não serão mais consumidos (erro ou abandono) saem da fila
+        for future in pending:
+            future.cancel()
+
+
+def stitch_pdfs(
+    parts: Iterable[tuple[bytes, list[list]]], output: str | Path | BinaryIO
+) -> int:
+    """
+    Junta as partes (PDF, sumário) em um único documento, com as entradas
+    do sumário deslocadas para as páginas finais. Retorna o número de páginas.
+
+    A primeira parte vira o arquivo temporário da costura e as seguintes
+    são acrescentadas com gravações incrementais, reabrindo o arquivo a
+    cada parte para que as páginas já gravadas saiam da memória.
+    """
+    import pymupdf
+
+    fd, path = tempfile.mkstemp(prefix="stitch-", suffix=".pdf")
+    os.close(fd)
+    toc: list[list] = []
+    pages = 0
+    try:
+        for pdf, part_toc in parts:
+            toc.extend(
+                [level, title, page + pages, top]
+                for level, title, page, top in part_toc
+            )
+            if pages == 0:
+                Path(path).write_bytes(pdf)
+                with pymupdf.open(path) as document:
+                    pages = document.page_count
+                continue
+            with pymupdf.open(path) as document:
+                with pymupdf.open(stream=pdf, filetype="pdf") as source:
+                    document.insert_pdf(source)
+                pages = document.page_count
+                document.save(
+                    path, incremental=True, encryption=pymupdf.PDF_ENCRYPT_KEEP
+                )
+        with pymupdf.open(path) as document:
+            document.set_toc(normalize_toc(toc))
+            # garbage=4 funde as fontes que cada bloco embute separadamente
+            document.save(output, garbage=4, deflate=True)
+        return pages
+    finally:
+        os.unlink(path)
+
+
+def render_markdown_to_pdf_chunked(
+    markdown: str,
+    output: str | Path | BinaryIO,
+    target_chars: int,
+    workers: int,
+) -> int:
+    """
+    Renderiza o Markdown em blocos paralelos e grava o PDF em output.
+
+    Returns:
+        Número de páginas do PDF.
+    """
+    chunks = split_markdown(markdown, target_chars)
+    return stitch_pdfs(render_chunks(chunks, workers), output)
@@ -1,11 +1,28 @@
-"""Motor de conversão para PDF via markdown-pdf (pip install)."""
+"""
+Motores de conversão para PDF (100% pip).
 
+- markdown: input -> Pandoc -> Markdown -> markdown-pdf (markdown-it + PyMuPDF)
+- html: input -> Pandoc -> HTML (ou o HTML enviado) -> PyMuPDF Story, sem o
+  Markdown intermediário
+
+PyMuPDF e markdown-pdf são importados só na primeira renderização: workers
+que fazem apenas conversões de texto não pagam o custo dessas importações.
+"""
+
+import functools
 import io
-import tempfile
 from pathlib import Path
 
 from converter.pandoc_engine import PandocEngine
-from markdown_pdf import MarkdownPdf, Section
+
+PDF_ENGINES = frozenset(["auto", "markdown", "html"])
+
+_TOC_LEVEL = 2
+_HTML_CSS = """
+table { border-collapse: collapse; }
+th, td { border: 1px solid #999; padding: 2px 4px; }
+pre { background-color: #f5f5f5; padding: 4px; }
+"""
 
 
 def convert_to_pdf(
@@ -37,40 +54,160 @@ def convert_to_pdf_bytes(
     source_path = Path(source_path)
     if input_format is None:
         input_format = PandocEngine.detect_input_format(str(source_path))
+    return convert_bytes_to_pdf(source_path.read_bytes(), input_format)
 
-    md_content = _to_markdown(source_path, input_format)
-    buffer = io.BytesIO()
-    pdf = MarkdownPdf(toc_level=2, optimize=True)
+
+@functools.lru_cache(maxsize=1)
+def _page_rects():
+    """Página e área de conteúdo: as do markdown-pdf (A4, margens de 36pt)."""
+    import pymupdf
+
+    page = pymupdf.paper_rect("A4")
+    return page, page + (36, 36, -36, -36)
+
+
+def _markdown_pdf(md_content: str):
+    """Documento do markdown-pdf com o conteúdo em uma seção."""
+    from markdown_pdf import MarkdownPdf, Section
+
+    pdf = MarkdownPdf(toc_level=_TOC_LEVEL, optimize=True)
     pdf.add_section(Section(md_content))
+    return pdf
+
+
+def convert_bytes_to_pdf(content: bytes, input_format: str = "markdown") -> bytes:
+    """Converte o conteúdo em memória para PDF e retorna bytes."""
+    return render_markdown_to_pdf(bytes_to_markdown(content, input_format))
+
+
+def render_markdown_to_pdf(md_content: str) -> bytes:
+    """
+    Renderiza Markdown em PDF (markdown-pdf) e retorna bytes.
+
+    O save_bytes do markdown-pdf grava sem compressão (imagens PNG ficam com
+    os pixels crus); o PDF é regravado comprimido, como no motor html.
+    """
+    import pymupdf
+
+    buffer = io.BytesIO()
+    _markdown_pdf(md_content).save_bytes(buffer)
+    with pymupdf.open(stream=buffer.getbuffer()) as document:
+        return document.tobytes(garbage=3, deflate=True)
+
+
+def render_markdown_part(md_content: str) -> tuple[bytes, list[list]]:
+    """
+    Renderiza um trecho de Markdown sem gravar o sumário no PDF.
+
+    Retorna o PDF e as entradas do sumário ([nível, título, página, topo]),
+    para que o documento final monte um sumário único. Um trecho pode
+    começar em qualquer nível de título, o que o markdown-pdf rejeitaria.
+    """
+    buffer = io.BytesIO()
+    pdf = _markdown_pdf(md_content)
+    toc = [list(entry) for entry in pdf.toc]
+    pdf.toc_level = 0
     pdf.save_bytes(buffer)
-    return buffer.getvalue()
+    return buffer.getvalue(), toc
 
 
 def _to_markdown(source_path: Path, input_format: str) -> str:
     """Converte qualquer formato para Markdown via Pandoc."""
+    return bytes_to_markdown(source_path.read_bytes(), input_format)
+
+
+def bytes_to_markdown(content: bytes, input_format: str) -> str:
+    """Converte o conteúdo para Markdown via Pandoc (stdin/stdout)."""
     if input_format == "markdown":
-        return source_path.read_text(encoding="utf-8")
-    with tempfile.NamedTemporaryFile(
-        mode="w",
-        suffix=".md",
-        delete=False,
-        encoding="utf-8",
-    ) as tmp:
-        tmp_path = tmp.name
-    try:
-        PandocEngine.convert(
-            source_path=source_path,
-            output_format="markdown",
-            output_path=tmp_path,
-            input_format=input_format,
-        )
-        return Path(tmp_path).read_text(encoding="utf-8")
-    finally:
-        Path(tmp_path).unlink(missing_ok=True)
+        return content.decode("utf-8")
+    return PandocEngine.convert_bytes(
+        content, "markdown", input_format=input_format
+    ).decode("utf-8")
 
 
 def _markdown_to_pdf(md_content: str, output_path: Path) -> None:
     """Converte Markdown para PDF usando markdown-pdf."""
-    pdf = MarkdownPdf(toc_level=2, optimize=True)
-    pdf.add_section(Section(md_content))
-    pdf.save(str(output_path))
+    _markdown_pdf(md_content).save(str(output_path))
+
+
+def resolve_pdf_engine(engine: str, input_format: str) -> str:
+    """
+    Motor efetivo para a entrada.
+
+    "auto" usa markdown-pdf para Markdown (sem processo do Pandoc) e o
+    caminho direto para os demais formatos (HTML não passa pelo Pandoc).
+    """
+    if engine not in PDF_ENGINES:
+        raise ValueError(
+            f"Motor de PDF inválido. Use: {', '.join(sorted(PDF_ENGINES))}"
+        )
+    if engine == "auto":
+        return "markdown" if input_format == "markdown" else "html"
+    return engine
+
+
+def convert_bytes_to_pdf_direct(content: bytes, input_format: str = "markdown") -> bytes:
+    """Converte para PDF pelo caminho direto (HTML -> PyMuPDF Story)."""
+    return render_html_to_pdf(bytes_to_html(content, input_format))
+
+
+def bytes_to_html(content: bytes, input_format: str) -> str:
+    """HTML do conteúdo: o próprio upload HTML ou a saída HTML do Pandoc."""
+    if input_format == "html":
+        return content.decode("utf-8")
+    return PandocEngine.convert_bytes(
+        content, "html", input_format=input_format
+    ).decode("utf-8")
+
+
+def render_html_to_pdf(html: str, toc_level: int = _TOC_LEVEL) -> bytes:
+    """
+    Renderiza HTML em PDF com o Story do PyMuPDF.
+
+    Gera o sumário (bookmarks) a partir dos títulos até toc_level e mantém
+    os links, como o markdown-pdf.
+    """
+    import pymupdf
+
+    page_rect, content_rect = _page_rects()
+    story = pymupdf.Story(html=html, user_css=_HTML_CSS)
+    buffer = io.BytesIO()
+    writer = pymupdf.DocumentWriter(buffer)
+    state = {"page": 0, "toc": [], "links": []}
+
+    def record(position) -> None:
+        position.page_num = state["page"]
+        state["links"].append(position)
+        if position.open_close & 1 and 0 < position.heading <= toc_level:
+            state["toc"].append(
+                [position.heading, position.text, state["page"], position.rect[1]]
+            )
+
+    more = 1
+    while more:
+        state["page"] += 1
+        device = writer.begin_page(page_rect)
+        more, _ = story.place(content_rect)
+        story.element_positions(record)
+        story.draw(device)
+        writer.end_page()
+    writer.close()
+
+    buffer.seek(0)
+    document = pymupdf.Story.add_pdf_links(buffer, state["links"])
+    document.set_toc(normalize_toc(state["toc"]))
+    return document.tobytes(garbage=3, deflate=True)
+
+
+def normalize_toc(toc: list[list]) -> list[list]:
+    """Ajusta os níveis para a hierarquia aceita pelo PDF (começa em 1, sem saltos)."""
+    import pymupdf
+
+    normalized = []
+    previous = 0
+    for level, text, page, top in toc:
+        level = max(1, min(level, previous + 1))
+        destination = {"kind": pymupdf.LINK_GOTO, "to": pymupdf.Point(0, top)}
+        normalized.append([level, text, page, destination])
+        previous = level
+    return normalized
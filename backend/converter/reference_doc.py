@@ -0,0 +1,28 @@
+"""Documentos de referência de estilos (--reference-doc do Pandoc)."""
+
+import zipfile
+from io import BytesIO
+
+# Formatos em que o Pandoc aceita documento de referência -> extensão
+REFERENCE_FORMATS = {"docx": ".docx", "odt": ".odt"}
+
+_ODT_MIMETYPE = b"application/vnd.oasis.opendocument.text"
+
+
+def reference_format(content: bytes) -> str | None:
+    """
+    Formato do pacote pelo conteúdo: "docx", "odt" ou None (outro arquivo).
+
+    Só o diretório do zip (e o membro mimetype, no ODT) é lido.
+    """
+    try:
+        with zipfile.ZipFile(BytesIO(content)) as package:
+            names = set(package.namelist())
+            if "word/document.xml" in names:
+                return "docx"
+            if "mimetype" in names:
+                if package.read("mimetype").strip() == _ODT_MIMETYPE:
+                    return "odt"
+    except zipfile.BadZipFile:
+        return None
+    return None
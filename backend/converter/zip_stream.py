@@ -0,0 +1,193 @@
+"""
+Zip gravado em sequência, com cópia direta de membros já comprimidos.
+
+O `zipfile` só grava membros a partir dos bytes descompactados: copiar um
+membro de outro pacote custa descompactar e comprimir de novo. Aqui, os
+membros que não mudam (fontes, imagens, cabeçalhos do template) são copiados
+com os bytes comprimidos do pacote de origem, e só as partes novas ou
+reescritas passam pelo zlib. A saída é escrita em ordem, sem seek, então
+pode ir direto para um arquivo ou para a resposta.
+"""
+
+import struct
+import time
+import zipfile
+import zlib
+from typing import BinaryIO
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+_LOCAL_SIGNATURE = b"PK\x03\x04"
+_CENTRAL_SIGNATURE = b"PK\x01\x02"
+_END_SIGNATURE = b"PK\x05\x06"
+_VERSION = 20
+_FLAG_ENCRYPTED = 0x1
+_FLAG_UTF8 = 0x800
+_ZIP32_LIMIT = 0xFFFFFFFF
+_MAX_ENTRIES = 0xFFFF
+
+
+def raw_offsets(
+    content: bytes | memoryview, infos: list[zipfile.ZipInfo]
+) -> dict[str, int]:
+    """
+    Posição dos dados comprimidos de cada membro dentro do pacote.
+
+    Raises:
+        zipfile.BadZipFile: Cabeçalho local inválido ou membro criptografado.
+    """
+    offsets = {}
+    for info in infos:
+        if info.flag_bits & _FLAG_ENCRYPTED:
+            raise zipfile.BadZipFile(f"Membro criptografado: {info.filename}")
+        header = bytes(content[info.header_offset : info.header_offset + 30])
+        if len(header) < 30 or header[:4] != _LOCAL_SIGNATURE:
+            raise zipfile.BadZipFile(f"Cabeçalho local inválido: {info.filename}")
+        name_length, extra_length = struct.unpack("<2H", header[26:30])
+        start = info.header_offset + 30 + name_length + extra_length
+        if start + info.compress_size > len(content):
+            raise zipfile.BadZipFile(f"Membro truncado: {info.filename}")
+        offsets[info.filename] = start
+    return offsets
+
+
+def _dos_datetime(date_time: tuple[int, ...]) -> tuple[int, int]:
+    year, month, day, hour, minute, second = date_time[:6]
+    year = min(max(year, 1980), 2107)
+    return (
+        (hour << 11) | (minute << 5) | (second // 2),
+        ((year - 1980) << 9) | (month << 5) | day,
+    )
+
+
+class ZipStreamWriter:
+    """
+    Grava um zip em sequência num arquivo (ou qualquer objeto com write).
+
+    Membros novos usam Deflate (ou Stored); membros copiados mantêm o método
+    de compressão de origem. Sem Zip64: pacotes DOCX ficam muito abaixo dos
+    limites.
+    """
+
+    def __init__(self, file: BinaryIO, compresslevel: int = -1):
+        self.file = file
+        self.compresslevel = compresslevel
+        self._offset = 0
+        self._central: list[bytes] = []
+
+    def __enter__(self) -> "ZipStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+
+    def copy(
+        self,
+        info: zipfile.ZipInfo,
+        raw: bytes | memoryview,
+        name: str | None = None,
+    ) -> None:
+        """Copia um membro com os bytes já comprimidos (sem descompactar)."""
+        self._add(
+            name or info.filename,
+            info,
+            info.compress_type,
+            info.CRC,
+            info.file_size,
+            raw,
+        )
+
+    def write(
+        self,
+        info: zipfile.ZipInfo | str,
+        data: bytes,
+        compress_type: int | None = None,
+    ) -> None:
+        """Comprime e grava um membro novo ou reescrito."""
+        if isinstance(info, str):
+            info = zipfile.ZipInfo(info, time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+        if compress_type is None:
+            compress_type = info.compress_type
+        if compress_type == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15)
+            raw = compressor.compress(data) + compressor.flush()
+        elif compress_type == zipfile.ZIP_STORED:
+            raw = data
+        else:
+            raise NotImplementedError(f"Compressão não suportada: {compress_type}")
+        self._add(
+            info.filename, info, compress_type, zlib.crc32(data), len(data), raw
+        )
+
+    def close(self) -> None:
+        """Grava o diretório central e o registro final."""
+        if len(self._central) > _MAX_ENTRIES:
+            raise zipfile.LargeZipFile("Membros demais para um zip sem Zip64")
+        central = b"".join(self._central)
+        if self._offset + len(central) > _ZIP32_LIMIT:
+            raise zipfile.LargeZipFile("Pacote grande demais para um zip sem Zip64")
+        self.file.write(central)
+        self.file.write(
+            _END_RECORD.pack(
+                _END_SIGNATURE,
+                0,
+                0,
+                len(self._central),
+                len(self._central),
+                len(central),
+                self._offset,
+                0,
+            )
+        )
+
+    def _add(
+        self,
+        name: str,
+        info: zipfile.ZipInfo,
+        compress_type: int,
+        crc: int,
+        file_size: int,
+        raw: bytes | memoryview,
+    ) -> None:
+        if max(file_size, len(raw), self._offset) > _ZIP32_LIMIT:
+            raise zipfile.LargeZipFile(f"Membro grande demais sem Zip64: {name}")
+        try:
+            encoded = name.encode("ascii")
+            flags = 0
+        except UnicodeEncodeError:
+            encoded = name.encode("utf-8")
+            flags = _FLAG_UTF8
+        dos_time, dos_date = _dos_datetime(info.date_time)
+        fields = (
+            flags,
+            compress_type,
+            dos_time,
+            dos_date,
+            crc,
+            len(raw),
+            file_size,
+            len(encoded),
+        )
+        header = _LOCAL_HEADER.pack(_LOCAL_SIGNATURE, _VERSION, *fields, 0)
+        self._central.append(
+            _CENTRAL_HEADER.pack(
+                _CENTRAL_SIGNATURE,
+                (info.create_system << 8) | _VERSION,
+                _VERSION,
+                *fields,
+                0,
+                0,
+                0,
+                info.internal_attr,
+                info.external_attr,
+                self._offset,
+            )
+            + encoded
+        )
+        self.file.write(header)
+        self.file.write(encoded)
+        self.file.write(raw)
+        self._offset += len(header) + len(encoded) + len(raw)
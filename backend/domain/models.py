@@ -1,23 +1,185 @@
 """Modelos de domínio e DTOs."""
 
+import os
+from collections.abc import Iterator
 from dataclasses import dataclass
+from pathlib import Path
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _iter_file(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as file:
+        while chunk := file.read(_CHUNK_SIZE):
+            yield chunk
+
+
+@dataclass(frozen=True)
+class SourceSection:
+    """
+    Origem adicional de um merge com template, inserida no lugar do seu
+    placeholder. Como na origem principal, uploads grandes ficam em disco
+    (path) e content fica vazio.
+    """
+
+    placeholder: str
+    content: bytes
+    filename: str
+    path: str | None = None
+
+    @property
+    def size(self) -> int:
+        """Tamanho da origem em bytes."""
+        if self.path:
+            return os.path.getsize(self.path)
+        return len(self.content)
+
+    def read(self) -> bytes:
+        """Retorna os bytes da origem (lendo do disco, se necessário)."""
+        if self.path:
+            return Path(self.path).read_bytes()
+        return self.content
+
+    def iter_content(self) -> Iterator[bytes]:
+        """Itera a origem em blocos, sem carregá-la inteira."""
+        if self.path:
+            yield from _iter_file(self.path)
+        else:
+            yield self.content
 
 
 @dataclass(frozen=True)
 class ConvertRequest:
-    """Requisição de conversão."""
+    """
+    Requisição de conversão.
+
+    Uploads grandes ficam em disco: nesse caso source_path/template_path
+    apontam para o arquivo e os campos *_content ficam vazios. template_id
+    referencia um template registrado, no lugar do upload. pdf_engine
+    escolhe o motor de PDF (None usa o padrão configurado). sections traz
+    as origens dos demais placeholders do template (a origem principal vai
+    no lugar de placeholder), todas inseridas no mesmo merge.
+    """
 
     source_content: bytes
     source_filename: str
     output_format: str
     template_content: bytes | None = None
     placeholder: str = "{{CONTEUDO}}"
+    source_path: str | None = None
+    template_path: str | None = None
+    template_id: str | None = None
+    pdf_engine: str | None = None
+    sections: tuple[SourceSection, ...] = ()
+
+    @property
+    def source_size(self) -> int:
+        """Tamanho da origem em bytes."""
+        if self.source_path:
+            return os.path.getsize(self.source_path)
+        return len(self.source_content)
+
+    @property
+    def template_size(self) -> int:
+        """Tamanho do template em bytes (0 se não houver)."""
+        if self.template_path:
+            return os.path.getsize(self.template_path)
+        return len(self.template_content or b"")
+
+    @property
+    def sections_size(self) -> int:
+        """Soma dos tamanhos das origens adicionais (0 se não houver)."""
+        return sum(section.size for section in self.sections)
+
+    @property
+    def has_template(self) -> bool:
+        """Indica se há template não vazio (enviado ou registrado)."""
+        return bool(self.template_id) or self.template_size > 0
+
+    def read_source(self) -> bytes:
+        """Retorna os bytes da origem (lendo do disco, se necessário)."""
+        if self.source_path:
+            return Path(self.source_path).read_bytes()
+        return self.source_content
+
+    def read_template(self) -> bytes | None:
+        """Retorna os bytes do template, ou None."""
+        if self.template_path:
+            return Path(self.template_path).read_bytes()
+        return self.template_content
+
+    def iter_source(self) -> Iterator[bytes]:
+        """Itera a origem em blocos, sem carregá-la inteira."""
+        if self.source_path:
+            yield from _iter_file(self.source_path)
+        else:
+            yield self.source_content
+
+    def iter_template(self) -> Iterator[bytes]:
+        """Itera o template em blocos (vazio se não houver)."""
+        if self.template_path:
+            yield from _iter_file(self.template_path)
+        elif self.template_content:
+            yield self.template_content
 
 
 @dataclass(frozen=True)
 class ConvertResult:
-    """Resultado da conversão."""
+    """
+    Resultado da conversão.
+
+    Resultados grandes ficam em disco: path aponta para o arquivo e content
+    fica vazio. Quem consome o resultado deve chamar cleanup() ao terminar.
+    timings traz a duração de cada etapa da conversão: (etapa, segundos).
+    engine indica o motor que fez a conversão (pandoc, markdown-it, ...).
+    """
 
     content: bytes
     filename: str
     content_type: str
+    path: str | None = None
+    timings: tuple[tuple[str, float], ...] = ()
+    engine: str | None = None
+
+    @property
+    def size(self) -> int:
+        """Tamanho do resultado em bytes."""
+        if self.path:
+            return os.path.getsize(self.path)
+        return len(self.content)
+
+    def read_content(self) -> bytes:
+        """Retorna os bytes do resultado (lendo do disco, se necessário)."""
+        if self.path:
+            return Path(self.path).read_bytes()
+        return self.content
+
+    def iter_content(self) -> Iterator[bytes]:
+        """Itera o resultado em blocos, sem carregá-lo inteiro."""
+        if self.path:
+            yield from _iter_file(self.path)
+        else:
+            yield self.content
+
+    def cleanup(self) -> None:
+        """Remove o arquivo em disco, se houver."""
+        if self.path:
+            Path(self.path).unlink(missing_ok=True)
+
+
+@dataclass(frozen=True)
+class ExportResult:
+    """
+    Resultado de uma exportação multi-formato.
+
+    results traz um ConvertResult por formato, na ordem pedida; timings,
+    a duração de cada etapa da exportação inteira.
+    """
+
+    results: tuple[ConvertResult, ...]
+    timings: tuple[tuple[str, float], ...] = ()
+
+    def cleanup(self) -> None:
+        """Remove os arquivos em disco de todos os resultados."""
+        for result in self.results:
+            result.cleanup()
@@ -1,18 +1,37 @@
 """Aplicação FastAPI - Sistema de Conversão All-in-One."""
 
+import asyncio
 import logging
 import sys
+import time
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 
+from api.dependencies import (
+    get_conversion_executor,
+    get_result_cache,
+    shutdown_conversion_executor,
+    shutdown_job_manager,
+)
+from api.middleware import BodySizeLimitMiddleware, ResponseTimingMiddleware
 from api.routes import router
-from config import FRONTEND_PATH, STATIC_PATH
+from converter.ast_cache import get_ast_cache
+from converter.engine_registry import get_engine_registry
+from converter.pandoc_engine import get_server_pool
+from services import metrics
+from config import (
+    FRONTEND_PATH,
+    MAX_BATCH_BODY_BYTES,
+    MAX_UPLOAD_BODY_BYTES,
+    STARTUP_BUDGET_MS,
+    STATIC_PATH,
+)
 
 # Configuração de logging
 logging.basicConfig(
@@ -21,13 +40,46 @@ logging.basicConfig(
     handlers=[logging.StreamHandler(sys.stdout)],
 )
 logger = logging.getLogger(__name__)
+_startup_seconds: float | None = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Gerencia ciclo de vida da aplicação."""
+    """
+    Gerencia ciclo de vida da aplicação.
+
+    Sonda os motores (Pandoc, PDF, DOCX) e inicia os pools antes de aceitar
+    requisições, para que a primeira conversão não pague a descoberta.
+    """
+    global _startup_seconds
     logger.info("Iniciando aplicação")
+    start = time.perf_counter()
+    registry = get_engine_registry()
+    await asyncio.to_thread(registry.probe)
+    await asyncio.to_thread(get_server_pool)
+    executor = get_conversion_executor()
+    metrics.bind_executor(executor)
+    logger.info(
+        "Pool de conversões: backend=%s, concorrência=%d, fila=%d",
+        executor.backend,
+        executor.max_concurrency,
+        executor.queue_depth,
+    )
+    _startup_seconds = time.perf_counter() - start
+    pandoc = registry.get("pandoc")
+    logger.info(
+        "Inicialização em %.0fms (sondagem dos motores %.0fms; Pandoc %s)",
+        _startup_seconds * 1000,
+        registry.probe_seconds * 1000,
+        pandoc.version if pandoc.available else "indisponível",
+    )
+    if _startup_seconds * 1000 > STARTUP_BUDGET_MS:
+        logger.warning(
+            "Inicialização acima do orçamento de %dms", STARTUP_BUDGET_MS
+        )
     yield
+    await shutdown_job_manager()
+    shutdown_conversion_executor()
     logger.info("Encerrando aplicação")
 
 
@@ -46,6 +98,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={
+        "/api/convert": MAX_UPLOAD_BODY_BYTES,
+        "/api/convert/batch": MAX_BATCH_BODY_BYTES,
+        "/api/convert/export": MAX_UPLOAD_BODY_BYTES,
+        "/api/jobs": MAX_UPLOAD_BODY_BYTES,
+        "/api/templates": MAX_UPLOAD_BODY_BYTES,
+    },
+)
+
+app.add_middleware(
+    ResponseTimingMiddleware,
+    observe=lambda seconds, input_format, output_format: metrics.observe_stages(
+        [(metrics.RESPONSE_WRITE, seconds)], input_format, output_format
+    ),
+)
+
 app.include_router(router)
 
 
@@ -77,4 +147,21 @@ async def root():
 @app.get("/health")
 async def health_check() -> dict:
     """Health check para monitoramento."""
-    return {"status": "ok", "service": "converter-all-in-one"}
+    registry = get_engine_registry()
+    return {
+        "status": "ok" if registry.get("pandoc").available else "degraded",
+        "service": "converter-all-in-one",
+        "engines": registry.summary(),
+        "startup_ms": (
+            round(_startup_seconds * 1000, 1) if _startup_seconds is not None else None
+        ),
+        "cache": get_result_cache().stats(),
+        "ast_cache": get_ast_cache().stats(),
+    }
+
+
+@app.get("/metrics")
+async def prometheus_metrics() -> Response:
+    """Métricas no formato do Prometheus."""
+    content, content_type = metrics.render()
+    return Response(content=content, media_type=content_type)
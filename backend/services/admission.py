@@ -0,0 +1,405 @@
+"""
+Controle de admissão das conversões: limite por cliente e fila justa.
+
+Cada conversão tem um custo estimado (formato de saída, merge com template
+e tamanho da origem). O cliente (chave de API ou IP) paga esse custo de um
+token bucket próprio; acima do limite, conversões avulsas recebem 429 e
+lotes/jobs são desacelerados até o bucket repor.
+
+As vagas de conversão (ADMISSION_SLOTS) são distribuídas por uma fila justa
+(start-time fair queueing, ponderada pelo custo): um cliente com centenas de
+conversões na fila avança uma por vez na sua vez, e a conversão de um
+cliente leve entra na frente das que ele ainda não começou.
+
+Com um estimador de custo, cada conversão é avaliada antes de entrar na
+fila: acima do orçamento do formato é recusada (413) e, se cara, entra na
+fila de baixa prioridade, que usa no máximo LOW_PRIORITY_SLOTS vagas e só
+avança quando não há conversões normais esperando.
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import TypeVar
+
+from config import (
+    ADMISSION_MAX_QUEUED_PER_CLIENT,
+    ADMISSION_SLOTS,
+    CONVERSION_QUEUE_DEPTH,
+    CONVERSION_TIMEOUT_SECONDS,
+    LOW_PRIORITY_SLOTS,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_PER_SECOND,
+)
+from domain.models import ConvertRequest, ConvertResult
+from services.convert_service import ConversionError
+from services.cost_estimator import Assessment, BudgetExceededError, CostEstimator
+from services.executor import ExecutorBusyError
+from services.metrics import ADMISSION, ADMISSION_REJECTIONS
+
+T = TypeVar("T")
+
+ANONYMOUS = "anonymous"
+
+# Custo relativo por formato de saída (os demais custam 1)
+FORMAT_COSTS = {"pdf": 5.0, "docx": 2.0, "odt": 2.0, "rtf": 2.0}
+# Acréscimo do merge com template DOCX
+TEMPLATE_COST = 3.0
+# Cada MB de origem soma de novo o custo base
+_COST_BYTES = 1024 * 1024
+# Acima desse número de clientes, os ociosos são esquecidos
+_MAX_CLIENTS = 4096
+_STATS_CLIENTS = 50
+
+
+class RateLimitedError(ConversionError):
+    """Cliente acima do seu limite; deve tentar novamente depois."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message, status_code=429)
+        self.retry_after = retry_after
+
+
+def client_id(api_key: str | None, host: str | None) -> str:
+    """Identificador do cliente: hash da chave de API ou o IP."""
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:12]
+    return f"ip:{host}" if host else ANONYMOUS
+
+
+def conversion_cost(request: ConvertRequest) -> float:
+    """Custo estimado da conversão, em unidades (TXT de 0 bytes = 1)."""
+    output_format = request.output_format.lower().strip()
+    cost = FORMAT_COSTS.get(output_format, 1.0)
+    if output_format == "docx" and request.has_template:
+        cost += TEMPLATE_COST
+    return cost * (1 + (request.source_size + request.sections_size) / _COST_BYTES)
+
+
+def export_cost(request: ConvertRequest, formats: Iterable[str]) -> float:
+    """Custo de uma exportação: a soma dos custos de cada formato."""
+    return sum(
+        conversion_cost(dataclasses.replace(request, output_format=fmt))
+        for fmt in formats
+    )
+
+
+@dataclass
+class _Client:
+    """Bucket, posição na fila justa e contadores de um cliente."""
+
+    tokens: float
+    updated: float
+    finish: float = 0.0
+    active: int = 0
+    queued: int = 0
+    admitted: int = 0
+    low_priority: int = 0
+    rejected: int = 0
+    throttled_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "tokens": round(self.tokens, 2),
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "low_priority": self.low_priority,
+            "rejected": self.rejected,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+        }
+
+
+class AdmissionController:
+    """
+    Token bucket por cliente e fila justa para as vagas de conversão.
+
+    Seguro entre threads e event loops: o estado fica sob um lock e cada
+    espera é um Future concorrente, liberado por quem devolve a vaga.
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_PER_SECOND,
+        burst: float = RATE_LIMIT_BURST,
+        slots: int = ADMISSION_SLOTS,
+        max_queued: int = CONVERSION_QUEUE_DEPTH,
+        max_queued_per_client: int = ADMISSION_MAX_QUEUED_PER_CLIENT,
+        queue_timeout: float = CONVERSION_TIMEOUT_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        estimator: CostEstimator | None = None,
+        low_priority_slots: int = LOW_PRIORITY_SLOTS,
+    ):
+        if slots < 1:
+            raise ValueError("slots deve ser >= 1")
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.slots = slots
+        self.max_queued = max_queued
+        self.max_queued_per_client = max_queued_per_client
+        self.queue_timeout = queue_timeout
+        self.estimator = estimator
+        self.low_priority_slots = max(1, min(low_priority_slots, slots))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._clients: dict[str, _Client] = {}
+        self._heap: list[tuple[float, int, str, Future]] = []
+        self._low_heap: list[tuple[float, int, str, Future]] = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._active = 0
+        self._queued = 0
+        self._low_active = 0
+        self._low_queued = 0
+
+    async def run(
+        self,
+        client: str,
+        cost: float,
+        operation: Callable[[], Awaitable[T]],
+        wait: bool = False,
+        low_priority: bool = False,
+    ) -> T:
+        """
+        Executa a operação quando o cliente tiver saldo e vaga na fila justa.
+
+        wait=False (requisições avulsas) rejeita na hora quem está acima do
+        limite; wait=True (lotes, jobs) espera o bucket repor. low_priority
+        coloca a operação na fila de baixa prioridade.
+
+        Raises:
+            RateLimitedError: Acima do limite ou da fila do cliente (429).
+            ExecutorBusyError: Fila geral cheia ou espera acima do limite (503).
+        """
+        await self._take_tokens(client, cost, wait)
+        await self._acquire(client, cost, wait, low_priority)
+        try:
+            return await operation()
+        finally:
+            self._release(client, low_priority)
+
+    async def assess(
+        self, request: ConvertRequest, output_formats: Iterable[str]
+    ) -> Assessment:
+        """
+        Custo previsto da requisição pelo estimador (vazio sem estimador).
+
+        Raises:
+            BudgetExceededError: Acima do orçamento ou zip suspeito (413).
+        """
+        if self.estimator is None:
+            return Assessment()
+        try:
+            return await asyncio.to_thread(
+                self.estimator.assess, request, list(output_formats)
+            )
+        except BudgetExceededError as exc:
+            ADMISSION_REJECTIONS.labels(exc.reason).inc()
+            raise
+
+    def converter(
+        self,
+        client: str,
+        convert: Callable[[ConvertRequest], Awaitable[ConvertResult]],
+        wait: bool = False,
+    ) -> Callable[[ConvertRequest], Awaitable[ConvertResult]]:
+        """
+        Envolve convert(request) com a admissão do cliente.
+
+        O tempo até a admissão (estimativa de custo incluída) entra nos
+        timings do resultado (etapa "admission"), e os tempos medidos
+        calibram o estimador.
+        """
+
+        async def admitted(request: ConvertRequest) -> ConvertResult:
+            start = time.perf_counter()
+            assessment = await self.assess(request, [request.output_format])
+
+            async def operation() -> ConvertResult:
+                waited = time.perf_counter() - start
+                result = await convert(request)
+                if self.estimator is not None:
+                    self.estimator.record(assessment.estimates[0], result.timings)
+                return dataclasses.replace(
+                    result, timings=((ADMISSION, waited), *result.timings)
+                )
+
+            return await self.run(
+                client,
+                conversion_cost(request),
+                operation,
+                wait,
+                assessment.low_priority,
+            )
+
+        return admitted
+
+    def stats(self) -> dict:
+        """Limites, ocupação e os clientes mais ativos."""
+        with self._lock:
+            for state in self._clients.values():
+                self._refill(state)
+            busiest = sorted(
+                self._clients.items(),
+                key=lambda item: (item[1].active + item[1].queued, item[1].admitted),
+                reverse=True,
+            )[:_STATS_CLIENTS]
+            return {
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+                "slots": self.slots,
+                "max_queued": self.max_queued,
+                "max_queued_per_client": self.max_queued_per_client,
+                "active": self._active,
+                "queued": self._queued,
+                "low_priority_slots": self.low_priority_slots,
+                "low_priority_active": self._low_active,
+                "low_priority_queued": self._low_queued,
+                "clients": {name: state.to_dict() for name, state in busiest},
+                **(
+                    {"estimator": self.estimator.stats()}
+                    if self.estimator is not None
+                    else {}
+                ),
+            }
+
+    async def _take_tokens(self, client: str, cost: float, wait: bool) -> None:
+        if self.rate <= 0:
+            return
+        # Uma conversão maior que a rajada passa com o bucket cheio
+        cost = min(cost, self.burst)
+        with self._lock:
+            state = self._client(client)
+            self._refill(state)
+            if state.tokens < cost and not wait:
+                state.rejected += 1
+                ADMISSION_REJECTIONS.labels("rate").inc()
+                retry_after = math.ceil((cost - state.tokens) / self.rate)
+                raise RateLimitedError(
+                    "Limite de conversões excedido. Tente novamente em "
+                    f"{retry_after}s.",
+                    retry_after,
+                )
+            # Em modo de espera, reserva o custo e aguarda a dívida ser paga
+            state.tokens -= cost
+            delay = max(0.0, -state.tokens / self.rate)
+            state.throttled_seconds += delay
+        if delay:
+            await asyncio.sleep(delay)
+
+    async def _acquire(
+        self, client: str, cost: float, wait: bool, low_priority: bool
+    ) -> None:
+        with self._lock:
+            state = self._client(client)
+            busy = self._active >= self.slots or (
+                low_priority and self._low_active >= self.low_priority_slots
+            )
+            if not wait and busy:
+                if state.queued >= self.max_queued_per_client:
+                    state.rejected += 1
+                    ADMISSION_REJECTIONS.labels("client_queue").inc()
+                    raise RateLimitedError(
+                        "Conversões demais na fila para este cliente.", 1
+                    )
+                if self._queued >= self.max_queued:
+                    ADMISSION_REJECTIONS.labels("queue").inc()
+                    raise ExecutorBusyError()
+            start = max(self._virtual_time, state.finish)
+            state.finish = start + cost
+            state.queued += 1
+            self._queued += 1
+            self._low_queued += low_priority
+            waiter: Future = Future()
+            heapq.heappush(
+                self._low_heap if low_priority else self._heap,
+                (start, next(self._sequence), client, waiter),
+            )
+            self._dispatch()
+        try:
+            await asyncio.wait_for(
+                asyncio.wrap_future(waiter),
+                timeout=None if wait else self.queue_timeout,
+            )
+        except BaseException as exc:
+            with self._lock:
+                granted = waiter.done() and not waiter.cancelled()
+                if not granted:
+                    waiter.cancel()
+                    state.queued -= 1
+                    self._queued -= 1
+                    self._low_queued -= low_priority
+            if granted:
+                self._release(client, low_priority)
+            if isinstance(exc, asyncio.TimeoutError):
+                ADMISSION_REJECTIONS.labels("timeout").inc()
+                raise ExecutorBusyError() from exc
+            raise
+
+    def _release(self, client: str, low_priority: bool) -> None:
+        with self._lock:
+            self._active -= 1
+            self._low_active -= low_priority
+            self._clients[client].active -= 1
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """
+        Libera as esperas de menor tag enquanto houver vaga (com o lock).
+
+        A fila de baixa prioridade só avança com a normal vazia e até
+        low_priority_slots conversões ao mesmo tempo.
+        """
+        while self._active < self.slots:
+            if self._heap:
+                low_priority = False
+            elif self._low_heap and self._low_active < self.low_priority_slots:
+                low_priority = True
+            else:
+                break
+            heap = self._low_heap if low_priority else self._heap
+            start, _, client, waiter = heapq.heappop(heap)
+            if not waiter.set_running_or_notify_cancel():
+                continue  # desistiu; a contagem já foi desfeita
+            self._virtual_time = max(self._virtual_time, start)
+            state = self._clients[client]
+            state.queued -= 1
+            state.active += 1
+            state.admitted += 1
+            state.low_priority += low_priority
+            self._queued -= 1
+            self._active += 1
+            self._low_queued -= low_priority
+            self._low_active += low_priority
+            waiter.set_result(None)
+
+    def _client(self, client: str) -> _Client:
+        state = self._clients.get(client)
+        if state is None:
+            if len(self._clients) >= _MAX_CLIENTS:
+                self._forget_idle()
+            state = _Client(tokens=self.burst, updated=self._clock())
+            self._clients[client] = state
+        return state
+
+    def _refill(self, state: _Client) -> None:
+        now = self._clock()
+        if self.rate > 0:
+            state.tokens = min(
+                self.burst, state.tokens + (now - state.updated) * self.rate
+            )
+        state.updated = now
+
+    def _forget_idle(self) -> None:
+        for name, state in list(self._clients.items()):
+            self._refill(state)
+            if not state.active and not state.queued and state.tokens >= self.burst:
+                del self._clients[name]
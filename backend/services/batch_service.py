@@ -0,0 +1,304 @@
+"""Conversão em lote: muitos arquivos em paralelo, resultado em zip."""
+
+import asyncio
+import dataclasses
+import json
+import logging
+import time
+import zipfile
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+
+from config import BATCH_MAX_BYTES, BATCH_MAX_FILES, MAX_FILE_SIZE_BYTES
+from converter.pandoc_engine import PandocEngine
+from domain.models import ConvertRequest, ConvertResult
+from services.convert_service import ConversionError
+from services.executor import ConversionExecutor
+from services.metrics import StageTimer, record_conversion, record_error
+from services.result_cache import ResultCache, cache_key
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+# Formatos já compactados: gravados sem recompressão no zip
+COMPRESSED_FORMATS = frozenset(["docx", "odt", "pdf"])
+
+
+@dataclass(frozen=True)
+class BatchItem:
+    """Arquivo de um lote: em memória, em disco ou membro de um zip enviado."""
+
+    name: str
+    content: bytes = b""
+    path: str | None = None
+    loader: Callable[[], bytes] | None = None
+
+    async def to_request(self, base: ConvertRequest) -> ConvertRequest:
+        """Monta a requisição do item a partir dos parâmetros comuns do lote."""
+        content = self.content
+        if self.loader is not None:
+            content = await asyncio.to_thread(self.loader)
+        return dataclasses.replace(
+            base,
+            source_content=content,
+            source_filename=PurePosixPath(self.name).name,
+            source_path=self.path,
+        )
+
+
+@dataclass(frozen=True)
+class BatchOutcome:
+    """Resultado de um item do lote (result é None em caso de erro)."""
+
+    name: str
+    result: ConvertResult | None
+    error: str | None = None
+    status_code: int = 200
+    cache_hit: bool = False
+    elapsed: float = 0.0
+
+
+def safe_name(name: str) -> str:
+    """Caminho relativo seguro dentro do zip (sem '..' nem raiz absoluta)."""
+    parts = [
+        part
+        for part in PurePosixPath(name.replace("\\", "/")).parts
+        if part not in ("", ".", "..", "/")
+    ]
+    return "/".join(parts)
+
+
+def archive_items(archive: zipfile.ZipFile) -> list[BatchItem]:
+    """
+    Lista os arquivos de um zip enviado como itens do lote.
+
+    Os tamanhos declarados são verificados antes de descompactar qualquer
+    membro (proteção contra zip bomb); o conteúdo só é lido quando o item
+    entra em conversão.
+
+    Raises:
+        ConversionError: Zip acima dos limites do lote.
+    """
+    items = []
+    total = 0
+    limit_mb = MAX_FILE_SIZE_BYTES // (1024 * 1024)
+    for info in archive.infolist():
+        name = safe_name(info.filename)
+        if info.is_dir() or not name or name.startswith("__MACOSX/"):
+            continue
+        if PurePosixPath(name).name.startswith("."):
+            continue
+        if info.file_size > MAX_FILE_SIZE_BYTES:
+            raise ConversionError(
+                f"Arquivo {name} muito grande. Limite: {limit_mb}MB", status_code=413
+            )
+        total += info.file_size
+        if total > BATCH_MAX_BYTES:
+            raise ConversionError(
+                f"Lote muito grande. Limite: {BATCH_MAX_BYTES // (1024 * 1024)}MB",
+                status_code=413,
+            )
+        items.append(
+            BatchItem(name=name, loader=lambda info=info: archive.read(info))
+        )
+    return items
+
+
+def check_batch_limits(items: list[BatchItem]) -> None:
+    """Valida a quantidade de arquivos do lote."""
+    if not items:
+        raise ConversionError("Nenhum arquivo para converter")
+    if len(items) > BATCH_MAX_FILES:
+        raise ConversionError(
+            f"Lote com arquivos demais. Limite: {BATCH_MAX_FILES}", status_code=413
+        )
+
+
+class BatchConverter:
+    """
+    Converte os itens de um lote no pool de conversões compartilhado.
+
+    No máximo `concurrency` itens ficam no pool ao mesmo tempo, para que um
+    lote grande não ocupe a fila das conversões avulsas. Cada item passa pelo
+    cache de resultados; templates enviados são pré-processados uma única vez
+    pelo registro de templates e reaproveitados por todos os itens.
+
+    convert substitui a execução padrão dos itens (ex.: com o controle de
+    admissão do cliente).
+    """
+
+    def __init__(
+        self,
+        executor: ConversionExecutor,
+        cache: ResultCache,
+        concurrency: int | None = None,
+        convert: Callable[[ConvertRequest], Awaitable[ConvertResult]] | None = None,
+    ):
+        self.executor = executor
+        self.cache = cache
+        self.concurrency = max(1, concurrency or executor.max_concurrency)
+        self.convert = convert or executor.run_when_available
+
+    async def run(
+        self, items: list[BatchItem], base: ConvertRequest
+    ) -> AsyncGenerator[BatchOutcome, None]:
+        """Converte os itens, produzindo os resultados na ordem de conclusão."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def convert(item: BatchItem) -> BatchOutcome:
+            async with semaphore:
+                return await self._convert_item(item, base)
+
+        tasks = [asyncio.create_task(convert(item)) for item in items]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    outcome = task.result()
+                    if outcome.result is not None:
+                        outcome.result.cleanup()
+
+    async def _convert_item(
+        self, item: BatchItem, base: ConvertRequest
+    ) -> BatchOutcome:
+        start = time.perf_counter()
+        try:
+            request = await item.to_request(base)
+            key = await asyncio.to_thread(cache_key, request)
+            result, hit = await self.cache.get_or_convert(key, request, self.convert)
+        except Exception as exc:
+            record_error(exc)
+            status_code = getattr(exc, "status_code", 500)
+            if not isinstance(exc, ConversionError):
+                logger.exception("Erro inesperado no item %s do lote", item.name)
+            return BatchOutcome(
+                name=item.name,
+                result=None,
+                error=str(exc),
+                status_code=status_code,
+                elapsed=time.perf_counter() - start,
+            )
+        record_conversion(request, result, hit, StageTimer(result.timings))
+        return BatchOutcome(
+            name=item.name,
+            result=result,
+            cache_hit=hit,
+            elapsed=time.perf_counter() - start,
+        )
+
+
+class ZipSink:
+    """Destino não pesquisável do zip: acumula os bytes até serem drenados."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _output_name(name: str, output_format: str, used: set[str]) -> str:
+    """Nome do resultado no zip, preservando diretórios e sem colisões."""
+    path = PurePosixPath(name).with_suffix(
+        PandocEngine.get_output_extension(output_format)
+    )
+    candidate, counter = str(path), 1
+    while candidate in used or candidate == MANIFEST_NAME:
+        counter += 1
+        candidate = str(path.with_name(f"{path.stem}-{counter}{path.suffix}"))
+    used.add(candidate)
+    return candidate
+
+
+def write_zip_entry(
+    archive: zipfile.ZipFile, arcname: str, result: ConvertResult, compress: bool
+) -> None:
+    """Grava o resultado no zip em blocos, sem carregá-lo inteiro."""
+    info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with archive.open(info, "w", force_zip64=result.size > 2**31) as entry:
+        for chunk in result.iter_content():
+            entry.write(chunk)
+
+
+async def _add_outcome(
+    archive: zipfile.ZipFile,
+    outcome: BatchOutcome,
+    output_format: str,
+    compress: bool,
+    used: set[str],
+) -> dict:
+    """Grava o resultado no zip e retorna sua entrada no manifesto."""
+    entry = {
+        "source": outcome.name,
+        "status": "ok" if outcome.result is not None else "error",
+        "elapsed_ms": round(outcome.elapsed * 1000, 1),
+    }
+    if outcome.result is None:
+        entry.update(error=outcome.error, status_code=outcome.status_code)
+        return entry
+    arcname = _output_name(outcome.name, output_format, used)
+    size = outcome.result.size
+    try:
+        await asyncio.to_thread(write_zip_entry, archive, arcname, outcome.result, compress)
+    finally:
+        outcome.result.cleanup()
+    entry.update(output=arcname, size=size, cache="HIT" if outcome.cache_hit else "MISS")
+    return entry
+
+
+async def stream_zip(
+    outcomes: AsyncGenerator[BatchOutcome, None], output_format: str
+) -> AsyncIterator[bytes]:
+    """
+    Empacota os resultados em um zip gerado em streaming.
+
+    Cada resultado é enviado assim que fica pronto; ao final, o zip recebe
+    manifest.json com o status de cada arquivo.
+    """
+    sink = ZipSink()
+    archive = zipfile.ZipFile(sink, mode="w")
+    compress = output_format not in COMPRESSED_FORMATS
+    used: set[str] = set()
+    manifest = []
+    start = time.perf_counter()
+    try:
+        async for outcome in outcomes:
+            manifest.append(
+                await _add_outcome(archive, outcome, output_format, compress, used)
+            )
+            yield sink.drain()
+    finally:
+        await outcomes.aclose()
+
+    summary = {
+        "output_format": output_format,
+        "total": len(manifest),
+        "succeeded": sum(1 for entry in manifest if entry["status"] == "ok"),
+        "failed": sum(1 for entry in manifest if entry["status"] != "ok"),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        "files": manifest,
+    }
+    archive.writestr(
+        MANIFEST_NAME,
+        json.dumps(summary, ensure_ascii=False, indent=2),
+        compress_type=zipfile.ZIP_DEFLATED,
+    )
+    archive.close()
+    yield sink.drain()
+
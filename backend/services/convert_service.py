@@ -1,8 +1,12 @@
 """Serviço de conversão de documentos."""
 
+import dataclasses
 import logging
 import os
 import tempfile
+import time
+from collections.abc import Callable, Iterable, Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 from config import (
@@ -10,20 +14,100 @@ from config import (
     DEFAULT_PLACEHOLDER,
     MAX_FILE_SIZE_BYTES,
     OUTPUT_FORMATS,
+    PDF_CHUNK_BYTES,
+    PDF_CHUNK_THRESHOLD_BYTES,
+    PDF_CHUNK_WORKERS,
+    PDF_ENGINE,
+    RESULT_SPOOL_THRESHOLD_BYTES,
 )
-from domain.models import ConvertRequest, ConvertResult
-from converter.docx_merge import merge_with_template_to_buffer
-from converter.pandoc_engine import PandocEngine
-from converter.pdf_engine import convert_to_pdf_bytes
+from domain.models import ConvertRequest, ConvertResult, ExportResult
+from converter.ast_cache import get_ast_cache
+from converter.converter_registry import (
+    PANDOC_ENGINE,
+    Converter,
+    get_converter_registry,
+)
+from converter.docx_template import DocxTemplate, TemplateError
+from converter.images import has_images, optimize_images, target_width
+from converter.pandoc_engine import PandocEngine, PandocTimeoutError
+from converter.reference_doc import REFERENCE_FORMATS, reference_format
+from converter.pdf_chunked import render_markdown_to_pdf_chunked
+from converter.pdf_engine import (
+    PDF_ENGINES,
+    bytes_to_html,
+    bytes_to_markdown,
+    render_html_to_pdf,
+    render_markdown_to_pdf,
+    resolve_pdf_engine,
+)
+from services.metrics import (
+    AST_CACHE,
+    DOCX_MERGE,
+    FAST_PATH,
+    IMAGES,
+    PANDOC,
+    PDF_RENDER,
+    TEMP_WRITE,
+    StageTimer,
+)
+from services.template_registry import TemplateNotFoundError, get_template_registry
 
 logger = logging.getLogger(__name__)
 
+# Exportação multi-formato: leitores cujo AST depende do modo standalone e
+# writers que sempre geram documento completo
+_STANDALONE_READERS = frozenset(["rst"])
+_STANDALONE_WRITERS = frozenset(["docx", "odt"])
+# Motor de PDF -> nome do motor no resultado (como no registro de motores)
+_PDF_ENGINE_NAMES = {"markdown": "markdown-pdf", "html": "pymupdf"}
+
 
 def _format_error(exc: Exception) -> str:
     """Formata erro de conversão com mensagem amigável."""
     return f"Erro na conversão: {exc}"
 
 
+def _source(request: ConvertRequest) -> bytes | Path:
+    """Origem para o Pandoc: caminho em disco (uploads grandes) ou bytes."""
+    if request.source_path:
+        return Path(request.source_path)
+    return request.source_content
+
+
+def _placeholders(request: ConvertRequest) -> tuple[str, ...]:
+    """Placeholders do merge: o da origem principal e os de cada seção."""
+    return (request.placeholder or DEFAULT_PLACEHOLDER,) + tuple(
+        section.placeholder for section in request.sections
+    )
+
+
+def _to_docx(source: bytes | Path, filename: str) -> bytes:
+    """DOCX intermediário da origem, para o merge com o template."""
+    input_format = PandocEngine.detect_input_format(filename or "source.md")
+    return PandocEngine.convert_bytes(source, "docx", input_format=input_format)
+
+
+def _optimized_images(
+    read: Callable[[], bytes],
+    filename: str,
+    output_formats: list[str],
+    timer: StageTimer,
+) -> bytes | None:
+    """Origem com as imagens embutidas reduzidas; None se não há o que reduzir."""
+    input_format = PandocEngine.detect_input_format(filename or "source.md")
+    source = read()
+    if not has_images(source, input_format):
+        return None
+    try:
+        with timer.stage(IMAGES):
+            optimized = optimize_images(source, input_format, output_formats)
+    except Exception:
+        # Imagem ou zip ilegível: o Pandoc converte (ou relata) a original
+        logger.warning("Falha ao processar as imagens da origem", exc_info=True)
+        return None
+    return None if optimized is source else optimized
+
+
 class ConversionError(Exception):
     """Erro na conversão ou validação de documento."""
 
@@ -32,9 +116,42 @@ class ConversionError(Exception):
         self.status_code = status_code
 
 
+def normalize_output_format(output_format: str) -> str:
+    """
+    Normaliza e valida o formato de saída.
+
+    Raises:
+        ConversionError: Formato não suportado.
+    """
+    output_format = output_format.lower().strip()
+    if output_format not in OUTPUT_FORMATS:
+        raise ConversionError(
+            f"Formato inválido. Use: {', '.join(sorted(OUTPUT_FORMATS))}"
+        )
+    return output_format
+
+
+def _conversion_error(exc: Exception) -> ConversionError:
+    """Converte exceção da infraestrutura em ConversionError com status adequado."""
+    if isinstance(exc, ConversionError):
+        return exc
+    if isinstance(exc, PandocTimeoutError):
+        return ConversionError(_format_error(exc), status_code=504)
+    if isinstance(exc, TemplateNotFoundError):
+        return ConversionError(str(exc), status_code=404)
+    if isinstance(exc, TemplateError):
+        return ConversionError(str(exc))
+    return ConversionError(_format_error(exc))
+
+
 class ConvertService:
     """Caso de uso: converter documento para outro formato."""
 
+    def __init__(self, spool_threshold: int | None = None):
+        self.spool_threshold = (
+            RESULT_SPOOL_THRESHOLD_BYTES if spool_threshold is None else spool_threshold
+        )
+
     def execute(self, request: ConvertRequest) -> ConvertResult:
         """
         Executa a conversão conforme a requisição.
@@ -43,7 +160,8 @@ class ConvertService:
             request: Dados da requisição de conversão.
 
         Returns:
-            Resultado com conteúdo, nome do arquivo e content-type.
+            Resultado com conteúdo, nome do arquivo, content-type e a
+            duração de cada etapa.
 
         Raises:
             ConversionError: Quando a conversão falha.
@@ -51,109 +169,583 @@ class ConvertService:
         output_format = request.output_format.lower().strip()
         self._validate_output_format(output_format)
         self._validate_file_sizes(request)
+        self._validate_pdf_engine(request)
+        self._validate_sections(request, [output_format])
 
-        if self._should_use_template(request, output_format):
-            return self._convert_with_template(request, output_format)
-        return self._convert_direct(request, output_format)
+        timer = StageTimer()
+        request = self._prepare_images(request, [output_format], timer)
+        template = (
+            self._load_template(request, output_format)
+            if self._should_use_template(request, output_format)
+            else None
+        )
+        if isinstance(template, DocxTemplate):
+            result = self._convert_with_template(request, template, timer)
+        elif template is not None:
+            result = self._convert_with_reference(
+                request, output_format, template, timer
+            )
+        else:
+            result = self._convert_direct(request, output_format, timer)
+        return dataclasses.replace(result, timings=timer.as_tuple())
 
     def _validate_output_format(self, output_format: str) -> None:
-        if output_format not in OUTPUT_FORMATS:
+        normalize_output_format(output_format)
+
+    def _validate_pdf_engine(self, request: ConvertRequest) -> None:
+        if (request.pdf_engine or PDF_ENGINE) not in PDF_ENGINES:
             raise ConversionError(
-                f"Formato inválido. Use: {', '.join(sorted(OUTPUT_FORMATS))}"
+                f"Motor de PDF inválido. Use: {', '.join(sorted(PDF_ENGINES))}"
             )
 
     def _validate_file_sizes(self, request: ConvertRequest) -> None:
         limit_mb = MAX_FILE_SIZE_BYTES // (1024 * 1024)
-        if len(request.source_content) > MAX_FILE_SIZE_BYTES:
+        if request.source_size > MAX_FILE_SIZE_BYTES:
             raise ConversionError(
                 f"Arquivo de origem muito grande. Limite: {limit_mb}MB",
                 status_code=413,
             )
-        if request.template_content and len(request.template_content) > MAX_FILE_SIZE_BYTES:
+        if request.template_size > MAX_FILE_SIZE_BYTES:
             raise ConversionError(
                 f"Template muito grande. Limite: {limit_mb}MB",
                 status_code=413,
             )
+        for section in request.sections:
+            if section.size > MAX_FILE_SIZE_BYTES:
+                raise ConversionError(
+                    f"Origem de {section.placeholder} muito grande. "
+                    f"Limite: {limit_mb}MB",
+                    status_code=413,
+                )
+
+    def _validate_sections(
+        self, request: ConvertRequest, output_formats: list[str]
+    ) -> None:
+        """Origens por placeholder só valem para um merge DOCX com template."""
+        if not request.sections:
+            return
+        if output_formats != ["docx"] or not request.has_template:
+            raise ConversionError(
+                "Várias origens só são aceitas na saída DOCX com template"
+            )
+        placeholders = _placeholders(request)
+        if len(set(placeholders)) != len(placeholders):
+            raise ConversionError("Placeholder repetido entre as origens")
+
+    def _prepare_images(
+        self, request: ConvertRequest, output_formats: list[str], timer: StageTimer
+    ) -> ConvertRequest:
+        """
+        Requisição com as imagens embutidas reduzidas para os formatos de
+        saída; a própria requisição quando não há o que reduzir.
+        """
+        if not target_width(output_formats):
+            return request
+        changes: dict = {}
+        optimized = _optimized_images(
+            request.read_source, request.source_filename, output_formats, timer
+        )
+        if optimized is not None:
+            changes.update(source_content=optimized, source_path=None)
+        sections = []
+        for section in request.sections:
+            optimized = _optimized_images(
+                section.read, section.filename, output_formats, timer
+            )
+            if optimized is not None:
+                section = dataclasses.replace(section, content=optimized, path=None)
+            sections.append(section)
+        if any(new is not old for new, old in zip(sections, request.sections)):
+            changes["sections"] = tuple(sections)
+        return dataclasses.replace(request, **changes) if changes else request
 
     def _should_use_template(
         self, request: ConvertRequest, output_format: str
     ) -> bool:
-        return (
-            output_format == "docx"
-            and request.template_content is not None
-            and len(request.template_content) > 0
-        )
+        return output_format in REFERENCE_FORMATS and request.has_template
 
     def _convert_with_template(
-        self, request: ConvertRequest, output_format: str
+        self, request: ConvertRequest, template: DocxTemplate, timer: StageTimer
     ) -> ConvertResult:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmppath = Path(tmpdir)
-            source_path = tmppath / (request.source_filename or "source.md")
-            source_path.write_bytes(request.source_content)
+        # Origem principal e as de cada placeholder: DOCX intermediários em
+        # paralelo (cada um num processo do Pandoc)
+        sources = [(_source(request), request.source_filename)] + [
+            (Path(section.path) if section.path else section.content, section.filename)
+            for section in request.sections
+        ]
+        try:
+            with timer.stage(PANDOC):
+                if len(sources) == 1:
+                    docs = [_to_docx(*sources[0])]
+                else:
+                    with ThreadPoolExecutor(
+                        max_workers=len(sources), thread_name_prefix="sections"
+                    ) as pool:
+                        docs = list(pool.map(lambda args: _to_docx(*args), sources))
+        except Exception as exc:
+            logger.exception("Erro ao converter para DOCX intermediário")
+            raise _conversion_error(exc) from exc
 
-            template_path = tmppath / "template.docx"
-            template_path.write_bytes(request.template_content)
+        contents = dict(zip(_placeholders(request), docs))
+        result_bytes = self._merge_template(template, contents, timer)
+        filename = Path(request.source_filename or "output").stem + ".docx"
+        return self._build_result(
+            result_bytes, filename, CONTENT_TYPES["docx"], timer, PANDOC_ENGINE
+        )
 
-            try:
-                temp_docx = PandocEngine.convert_to_temp_docx(source_path)
-            except Exception as exc:
-                logger.exception("Erro ao converter para DOCX temporário")
-                raise ConversionError(_format_error(exc)) from exc
+    def _convert_with_reference(
+        self,
+        request: ConvertRequest,
+        output_format: str,
+        reference_doc: Path,
+        timer: StageTimer,
+    ) -> ConvertResult:
+        """Template só de estilos: aplicado pelo Pandoc na própria conversão."""
+        input_format = PandocEngine.detect_input_format(
+            request.source_filename or "source.md"
+        )
+        try:
+            with timer.stage(PANDOC):
+                output = PandocEngine.convert_bytes(
+                    _source(request),
+                    output_format,
+                    input_format=input_format,
+                    reference_doc=reference_doc,
+                )
+        except Exception as exc:
+            logger.exception("Erro ao converter com o documento de referência")
+            raise _conversion_error(exc) from exc
+        filename = Path(request.source_filename or "output").stem + (
+            PandocEngine.get_output_extension(output_format)
+        )
+        return self._build_result(
+            output, filename, CONTENT_TYPES[output_format], timer, PANDOC_ENGINE
+        )
 
-            try:
-                result_bytes = merge_with_template_to_buffer(
-                    template_path=str(template_path),
-                    content_path=temp_docx,
-                    pattern=request.placeholder or DEFAULT_PLACEHOLDER,
+    def _load_template(
+        self, request: ConvertRequest, output_format: str
+    ) -> DocxTemplate | Path | None:
+        """
+        Template da requisição (registrado, por id, ou enviado) para o formato.
+
+        DOCX com placeholder: template pré-processado para o merge. DOCX sem
+        placeholder (ou ODT, para saída ODT): caminho do documento de
+        referência em disco, aplicado direto pelo Pandoc. None quando o
+        template não serve ao formato (DOCX numa saída ODT).
+        """
+        registry = get_template_registry()
+        try:
+            if request.template_id:
+                template_format = registry.get_info(request.template_id).format
+            else:
+                content = request.read_template()
+                template_format = reference_format(content)
+                if template_format is None:
+                    raise TemplateError("Template não é um DOCX ou ODT válido")
+            if template_format != output_format:
+                if output_format == "docx":
+                    raise TemplateError("Template ODT só vale para a saída ODT")
+                return None
+            if template_format == "docx":
+                template = (
+                    registry.get(request.template_id, _placeholders(request))
+                    if request.template_id
+                    else registry.prepare(content, _placeholders(request))
                 )
-            except Exception as exc:
-                logger.exception("Erro ao mesclar template DOCX")
-                raise ConversionError(_format_error(exc)) from exc
-            finally:
-                if os.path.exists(temp_docx):
-                    os.remove(temp_docx)
-
-            filename = Path(request.source_filename or "output").stem + ".docx"
-            return ConvertResult(
-                content=result_bytes,
-                filename=filename,
-                content_type=CONTENT_TYPES["docx"],
-            )
+                if template.placeholder_count or request.sections:
+                    return template
+            if request.template_id:
+                return registry.reference_path(request.template_id)
+            return registry.reference_doc(content, template_format)
+        except (TemplateError, TemplateNotFoundError) as exc:
+            raise _conversion_error(exc) from exc
+
+    def _merge_template(
+        self,
+        template: DocxTemplate,
+        contents: bytes | Mapping[str, bytes],
+        timer: StageTimer,
+    ) -> bytes | Path:
+        """
+        Merge do conteúdo (ou dos conteúdos, por placeholder) no template.
+        Acima de spool_threshold (estimado pelos pacotes), o pacote é gravado
+        direto no arquivo de resultado, sem passar pela memória.
+        """
+        size = sum(
+            map(len, contents.values() if isinstance(contents, Mapping) else [contents])
+        )
+        try:
+            with timer.stage(DOCX_MERGE):
+                if template.size + size <= self.spool_threshold:
+                    return template.merge(contents)
+                fd, path = tempfile.mkstemp(prefix="result-", suffix=".docx")
+                try:
+                    with os.fdopen(fd, "wb") as file:
+                        template.merge_to(contents, file)
+                except BaseException:
+                    os.unlink(path)
+                    raise
+                return Path(path)
+        except TemplateError as exc:
+            raise _conversion_error(exc) from exc
+        except Exception as exc:
+            logger.exception("Erro ao mesclar template DOCX")
+            raise ConversionError(_format_error(exc)) from exc
 
     def _convert_direct(
-        self, request: ConvertRequest, output_format: str
+        self, request: ConvertRequest, output_format: str, timer: StageTimer
     ) -> ConvertResult:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmppath = Path(tmpdir)
-            source_path = tmppath / (request.source_filename or "source.md")
-            source_path.write_bytes(request.source_content)
+        input_format = PandocEngine.detect_input_format(
+            request.source_filename or "source.md"
+        )
+        ext = PandocEngine.get_output_extension(output_format)
+        output_filename = Path(request.source_filename or "output").stem + ext
+
+        try:
+            if output_format == "pdf":
+                pdf_engine = resolve_pdf_engine(
+                    request.pdf_engine or PDF_ENGINE, input_format
+                )
+                engine = _PDF_ENGINE_NAMES[pdf_engine]
+                pdf = self._convert_to_pdf(request, input_format, pdf_engine, timer)
+                if isinstance(pdf, Path):
+                    return ConvertResult(
+                        content=b"",
+                        filename=output_filename,
+                        content_type=CONTENT_TYPES["pdf"],
+                        path=str(pdf),
+                        engine=engine,
+                    )
+                result_bytes = pdf
+            elif converter := self._fast_converter(
+                request, input_format, output_format
+            ):
+                engine = converter.name
+                with timer.stage(FAST_PATH):
+                    result_bytes = converter.convert(request.source_content)
+            else:
+                engine = PANDOC_ENGINE
+                result_bytes = self._pandoc_convert(
+                    request, output_format, input_format, timer
+                )
+        except Exception as exc:
+            logger.exception("Erro ao converter documento")
+            raise _conversion_error(exc) from exc
+
+        content_type = CONTENT_TYPES.get(output_format, "application/octet-stream")
+        return self._build_result(
+            result_bytes, output_filename, content_type, timer, engine
+        )
 
-            ext = PandocEngine.get_output_extension(output_format)
-            output_filename = Path(request.source_filename or "output").stem + ext
-            output_path = tmppath / output_filename
+    def _fast_converter(
+        self, request: ConvertRequest, input_format: str, output_format: str
+    ) -> Converter | None:
+        """
+        Conversor em processo que atende o documento, ou None para o Pandoc.
+
+        Só origens em memória: uploads grandes (em disco) vão para o Pandoc.
+        """
+        if request.source_path:
+            return None
+        return get_converter_registry().select(
+            input_format, output_format, request.source_content
+        )
+
+    def _pandoc_convert(
+        self,
+        request: ConvertRequest,
+        output_format: str,
+        input_format: str,
+        timer: StageTimer,
+    ) -> bytes:
+        """
+        Conversão pelo Pandoc; Markdown grande passa pelo cache de AST, que
+        só relê os trechos alterados desde a última conversão.
+
+        A duração vai para a etapa "ast_cache" quando o cache atendeu a
+        conversão e para "pandoc" quando o documento foi lido inteiro.
+        """
+        start = time.perf_counter()
+        output = None
+        if input_format == "markdown":
+            output = get_ast_cache().convert(request.read_source(), output_format)
+        stage = AST_CACHE
+        if output is None:
+            stage = PANDOC
+            output = PandocEngine.convert_bytes(
+                _source(request), output_format, input_format=input_format
+            )
+        timer.add(stage, time.perf_counter() - start)
+        return output
+
+    def _convert_to_pdf(
+        self,
+        request: ConvertRequest,
+        input_format: str,
+        engine: str,
+        timer: StageTimer,
+    ) -> bytes | Path:
+        """
+        PDF em memória ou, para Markdown acima de PDF_CHUNK_THRESHOLD_BYTES,
+        renderizado em blocos paralelos direto para um arquivo temporário.
+        """
+        with timer.stage(PANDOC):
+            if engine == "html":
+                text = bytes_to_html(request.read_source(), input_format)
+            else:
+                text = bytes_to_markdown(request.read_source(), input_format)
+        with timer.stage(PDF_RENDER):
+            return self._render_pdf(engine, text)
+
+    def _render_pdf(self, engine: str, text: str) -> bytes | Path:
+        """Renderiza o HTML ou Markdown intermediário com o motor dado."""
+        if engine == "html":
+            return render_html_to_pdf(text)
+        if 0 < PDF_CHUNK_THRESHOLD_BYTES < len(text):
+            return self._render_pdf_chunked(text)
+        return render_markdown_to_pdf(text)
+
+    def _render_pdf_chunked(self, markdown: str) -> Path:
+        fd, path = tempfile.mkstemp(prefix="result-", suffix=".pdf")
+        os.close(fd)
+        try:
+            render_markdown_to_pdf_chunked(
+                markdown, path, PDF_CHUNK_BYTES, PDF_CHUNK_WORKERS
+            )
+        except BaseException:
+            os.unlink(path)
+            raise
+        return Path(path)
+
+    def export(
+        self, request: ConvertRequest, output_formats: Iterable[str]
+    ) -> ExportResult:
+        """
+        Converte a origem para vários formatos com uma única leitura.
+
+        A origem é lida uma vez para o AST JSON do Pandoc e os writers de
+        cada formato rodam em paralelo a partir dele. O PDF usa a mesma saída
+        Markdown/HTML (a do writer, se esse formato também foi pedido) e o
+        DOCX/ODT com template passa pelo mesmo merge (ou documento de
+        referência) de execute().
+
+        Raises:
+            ConversionError: Formato inválido ou falha em algum formato.
+        """
+        formats = list(
+            dict.fromkeys(normalize_output_format(fmt) for fmt in output_formats)
+        )
+        if not formats:
+            raise ConversionError("Informe ao menos um formato de saída")
+        self._validate_file_sizes(request)
+        self._validate_pdf_engine(request)
+        self._validate_sections(request, formats)
+
+        timer = StageTimer()
+        request = self._prepare_images(request, formats, timer)
+        input_format = PandocEngine.detect_input_format(
+            request.source_filename or "source.md"
+        )
+        engine = resolve_pdf_engine(request.pdf_engine or PDF_ENGINE, input_format)
+        templates = {
+            fmt: self._load_template(request, fmt)
+            for fmt in formats
+            if self._should_use_template(request, fmt)
+        }
+        references = {
+            fmt: template
+            for fmt, template in templates.items()
+            if isinstance(template, Path)
+        }
+        writers = {_export_writer(fmt, input_format, engine) for fmt in formats}
+        writers.discard(None)
 
+        results: list[ConvertResult] = []
+        with ThreadPoolExecutor(
+            max_workers=max(1, len(writers)), thread_name_prefix="export"
+        ) as pool:
             try:
-                if output_format == "pdf":
-                    result_bytes = convert_to_pdf_bytes(source_path)
+                outputs = self._start_writers(
+                    request, input_format, writers, references, pool, timer
+                )
+                for output_format in formats:
+                    results.append(
+                        self._export_format(
+                            request,
+                            output_format,
+                            input_format,
+                            engine,
+                            templates.get(output_format),
+                            outputs,
+                            timer,
+                        )
+                    )
+                for future in outputs.values():
+                    timer.add(PANDOC, future.result()[1])
+            except BaseException:
+                for result in results:
+                    result.cleanup()
+                raise
+        return ExportResult(results=tuple(results), timings=timer.as_tuple())
+
+    def _start_writers(
+        self,
+        request: ConvertRequest,
+        input_format: str,
+        writers: set[str],
+        references: dict[str, Path],
+        pool: ThreadPoolExecutor,
+        timer: StageTimer,
+    ) -> dict[str, Future]:
+        """
+        Lê a origem para o AST e dispara um writer por formato no pool
+        (docx/odt com o documento de referência, se houver).
+
+        O leitor de RST muda o AST quando o documento é completo (título
+        promovido a metadado), como acontece para docx/odt; nesse caso
+        esses writers leem de um segundo AST, gerado em modo standalone.
+        """
+        outputs: dict[str, Future] = {}
+        asts: dict[bool, bytes] = {}
+        try:
+            for writer in sorted(writers):
+                standalone = (
+                    input_format in _STANDALONE_READERS
+                    and writer in _STANDALONE_WRITERS
+                )
+                if standalone not in asts:
+                    with timer.stage(PANDOC):
+                        asts[standalone] = self._read_ast(
+                            request, input_format, standalone
+                        )
+                outputs[writer] = pool.submit(
+                    _write_from_ast, asts[standalone], writer, references.get(writer)
+                )
+        except Exception as exc:
+            logger.exception("Erro ao ler o documento para o AST do Pandoc")
+            raise _conversion_error(exc) from exc
+        return outputs
+
+    def _read_ast(
+        self, request: ConvertRequest, input_format: str, standalone: bool
+    ) -> bytes:
+        """AST JSON da origem; para Markdown, emendado pelo cache de AST."""
+        if input_format == "markdown":
+            ast = get_ast_cache().ast(request.read_source())
+            if ast is not None:
+                return ast
+        return PandocEngine.convert_bytes(
+            _source(request), "json", input_format=input_format, standalone=standalone
+        )
+
+    def _export_format(
+        self,
+        request: ConvertRequest,
+        output_format: str,
+        input_format: str,
+        engine: str,
+        template: DocxTemplate | Path | None,
+        outputs: dict[str, Future],
+        timer: StageTimer,
+    ) -> ConvertResult:
+        filename = Path(request.source_filename or "output").stem + (
+            PandocEngine.get_output_extension(output_format)
+        )
+        content_type = CONTENT_TYPES.get(output_format, "application/octet-stream")
+        writer = _export_writer(output_format, input_format, engine)
+        try:
+            if output_format == "pdf":
+                if writer is None:
+                    text = request.read_source().decode("utf-8")
                 else:
-                    PandocEngine.convert(
-                        source_path=source_path,
-                        output_format=output_format,
-                        output_path=output_path,
+                    text = outputs[writer].result()[0].decode("utf-8")
+                with timer.stage(PDF_RENDER):
+                    pdf = self._render_pdf(engine, text)
+                if isinstance(pdf, Path):
+                    return ConvertResult(
+                        content=b"",
+                        filename=filename,
+                        content_type=content_type,
+                        path=str(pdf),
+                        engine=_PDF_ENGINE_NAMES[engine],
                     )
-                    if not output_path.exists():
-                        raise ConversionError("Arquivo de saída não foi gerado")
-                    result_bytes = output_path.read_bytes()
-            except Exception as exc:
-                logger.exception("Erro ao converter documento")
-                raise ConversionError(_format_error(exc)) from exc
-
-            content_type = CONTENT_TYPES.get(
-                output_format, "application/octet-stream"
+                content = pdf
+            else:
+                content = outputs[writer].result()[0]
+        except Exception as exc:
+            logger.exception("Erro ao exportar documento para %s", output_format)
+            raise _conversion_error(exc) from exc
+        if isinstance(template, DocxTemplate):
+            content = self._merge_template(template, content, timer)
+        return self._build_result(
+            content,
+            filename,
+            content_type,
+            timer,
+            _PDF_ENGINE_NAMES[engine] if output_format == "pdf" else PANDOC_ENGINE,
+        )
+
+    def _build_result(
+        self,
+        content: bytes | Path,
+        filename: str,
+        content_type: str,
+        timer: StageTimer,
+        engine: str | None = None,
+    ) -> ConvertResult:
+        """
+        Monta o resultado; acima de spool_threshold, grava em arquivo (ou usa
+        o arquivo já gravado, quando `content` é um caminho).
+        """
+        if isinstance(content, Path):
+            return ConvertResult(
+                content=b"",
+                filename=filename,
+                content_type=content_type,
+                path=str(content),
+                engine=engine,
             )
+        if len(content) <= self.spool_threshold:
             return ConvertResult(
-                content=result_bytes,
-                filename=output_filename,
+                content=content,
+                filename=filename,
                 content_type=content_type,
+                engine=engine,
             )
+        with timer.stage(TEMP_WRITE):
+            fd, path = tempfile.mkstemp(prefix="result-", suffix=Path(filename).suffix)
+            with os.fdopen(fd, "wb") as file:
+                file.write(content)
+        return ConvertResult(
+            content=b"",
+            filename=filename,
+            content_type=content_type,
+            path=path,
+            engine=engine,
+        )
+
+
+def _export_writer(output_format: str, input_format: str, engine: str) -> str | None:
+    """
+    Writer do Pandoc necessário para o formato na exportação.
+
+    Para PDF é o intermediário do motor (Markdown ou HTML), ou None quando a
+    própria origem já serve (Markdown para markdown-pdf, HTML para o direto).
+    """
+    if output_format != "pdf":
+        return output_format
+    if engine == "html":
+        return None if input_format == "html" else "html"
+    return None if input_format == "markdown" else "md"
+
+
+def _write_from_ast(
+    ast: bytes, output_format: str, reference_doc: Path | None = None
+) -> tuple[bytes, float]:
+    """Roda um writer do Pandoc sobre o AST; retorna (saída, segundos)."""
+    timer = StageTimer()
+    with timer.stage(PANDOC):
+        output = PandocEngine.convert_bytes(
+            ast, output_format, input_format="json", reference_doc=reference_doc
+        )
+    return output, timer.stages[PANDOC]
@@ -0,0 +1,457 @@
+"""
+Estimativa do custo de uma conversão antes de executá-la.
+
+Uma pré-leitura barata da origem (tamanho, linhas, títulos, tabelas,
+imagens, profundidade de aninhamento e, para DOCX/ODT, o diretório do zip)
+alimenta um modelo linear por formato de saída que prevê os segundos de CPU
+e a memória de pico da conversão. Conversões acima do orçamento do formato
+são recusadas (413); as caras, mas dentro do orçamento, vão para a fila de
+baixa prioridade do controle de admissão.
+
+O fator de escala de cada par de formatos (entrada -> saída) é calibrado com
+os tempos medidos das conversões concluídas. Os tempos medidos crescem com a
+disputa por CPU, então a recusa (413, definitiva para o cliente) usa a
+escala restrita a _BUDGET_SCALE_LIMITS; a escala inteira só decide a fila
+de baixa prioridade.
+"""
+
+import dataclasses
+import io
+import math
+import re
+import threading
+import zipfile
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+from config import (
+    COST_BUDGET_SECONDS,
+    COST_LOW_PRIORITY_SECONDS,
+    COST_MEMORY_BUDGET_BYTES,
+    COST_PDF_BUDGET_SECONDS,
+    ZIP_MAX_RATIO,
+    ZIP_MAX_UNCOMPRESSED_BYTES,
+)
+from converter.pandoc_engine import PandocEngine
+from domain.models import ConvertRequest
+from services.convert_service import ConversionError
+from services.metrics import AST_CACHE, DOCX_MERGE, FAST_PATH, PANDOC, PDF_RENDER
+
+_MB = 1024 * 1024
+_ZIP_MAGIC = b"PK\x03\x04"
+# Razão de compressão só é verificada em membros maiores que isso (XML
+# pequeno comprime muito e não é perigoso)
+_ZIP_RATIO_MIN_BYTES = _MB
+_ZIP_CHUNK = 256 * 1024
+# Etapas que entram na calibração (o trabalho da conversão em si)
+_MEASURED_STAGES = frozenset([PANDOC, PDF_RENDER, DOCX_MERGE])
+# Conversões por caminhos que o modelo não descreve (conversor em processo,
+# trechos do cache de AST) não calibram: puxariam a escala para baixo
+_UNMODELED_STAGES = frozenset([FAST_PATH, AST_CACHE])
+# Peso de cada nova medida na escala calibrada (média móvel em log)
+_CALIBRATION_WEIGHT = 0.1
+_SCALE_LIMITS = (0.01, 100.0)
+# Faixa da escala aplicada na verificação do orçamento
+_BUDGET_SCALE_LIMITS = (0.5, 2.0)
+
+# Marcadores procurados na origem em minúsculas e prefixada com "\n": os
+# padrões de início de linha começam por "\n" em vez de usar re.MULTILINE,
+# o que mantém a varredura em dezenas de ms mesmo para origens de vários MB
+_HEADINGS = re.compile(rb"\n#{1,6}[ \t]|<h[1-6][\s>]|\\(?:sub)*section\b")
+_TABLES = re.compile(
+    rb"\n[ \t]*\|?[ \t]*:?-{3,}:?[ \t]*\||\n\+[-=]+\+|<table[\s>]|\\begin\{tabular"
+)
+_IMAGES = re.compile(rb"!\[|<img[\s>]|\\includegraphics|\n\.\. (?:image|figure)::")
+_NESTED_LIST = re.compile(rb"\n([ \t]+)(?:[-*+]|\d+[.)])[ \t]")
+_NESTED_QUOTE = re.compile(rb"\n(?:>[ \t]?){2,}")
+
+# Documento principal e marcadores contados dentro dele, por formato zip
+_ZIP_DOCUMENTS = {
+    "word/document.xml": (b"<w:tbl>", b'w:val="Heading', b"<w:drawing"),
+    "content.xml": (b"<table:table ", b"<text:h ", b"<draw:image "),
+}
+_ZIP_MEDIA_PREFIXES = ("word/media/", "Pictures/")
+
+
+class BudgetExceededError(ConversionError):
+    """Conversão prevista acima do orçamento, ou zip suspeito (413)."""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message, status_code=413)
+        self.reason = reason
+
+
+@dataclass(frozen=True)
+class DocumentProfile:
+    """Características da origem medidas pela pré-leitura."""
+
+    size: int
+    lines: int = 0
+    headings: int = 0
+    tables: int = 0
+    images: int = 0
+    depth: int = 0
+    # Conteúdo descompactado (entradas zip) mais o template DOCX
+    unpacked: int = 0
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+
+@dataclass(frozen=True)
+class _Coefficients:
+    """Modelo de custo de um formato de saída (valores iniciais)."""
+
+    base: float  # segundos por conversão
+    per_mb: float  # segundos por MB da origem
+    per_kline: float  # segundos por mil linhas
+    per_heading: float
+    per_table: float
+    per_image: float
+    memory_factor: float  # bytes de pico por byte da origem
+
+
+# Medidos com o Pandoc 3 e o markdown-pdf num núcleo: as tabelas dominam
+# (alguns ms cada); o PDF em blocos paraleliza, mas segura mais memória
+_DEFAULT_COEFFICIENTS = _Coefficients(0.05, 2.0, 0.01, 0.0005, 0.004, 0.001, 8)
+COEFFICIENTS = {
+    "pdf": _Coefficients(0.3, 4.0, 0.05, 0.001, 0.006, 0.02, 40),
+    "docx": _Coefficients(0.15, 2.0, 0.02, 0.001, 0.004, 0.01, 12),
+    "odt": _Coefficients(0.15, 2.0, 0.02, 0.001, 0.004, 0.01, 12),
+}
+# Merge com template DOCX: segundos fixos e por MB do template
+TEMPLATE_SECONDS = 0.1
+TEMPLATE_SECONDS_PER_MB = 0.5
+# Memória fixa de uma conversão (processo do Pandoc, buffers)
+BASE_MEMORY_BYTES = 32 * _MB
+# Cada nível de aninhamento acima de 3 encarece a conversão em 10%
+_DEPTH_FREE = 3
+_DEPTH_FACTOR = 0.1
+
+
+@dataclass(frozen=True)
+class CostEstimate:
+    """Custo previsto de converter a origem para um formato."""
+
+    input_format: str
+    output_format: str
+    seconds: float
+    memory_bytes: int
+    # Previsão antes da escala calibrada (base da calibração)
+    raw_seconds: float
+
+    def to_dict(self) -> dict:
+        return {
+            "input_format": self.input_format,
+            "output_format": self.output_format,
+            "seconds": round(self.seconds, 3),
+            "memory_bytes": self.memory_bytes,
+        }
+
+
+@dataclass(frozen=True)
+class Assessment:
+    """Estimativas de uma requisição (um item por formato de saída)."""
+
+    estimates: tuple[CostEstimate, ...] = ()
+    low_priority: bool = False
+
+    @property
+    def seconds(self) -> float:
+        return sum(estimate.seconds for estimate in self.estimates)
+
+
+def _count_tokens(chunks: Iterable[bytes], tokens: tuple[bytes, ...]) -> list[int]:
+    """Conta ocorrências de cada marcador num fluxo, sem juntar os blocos."""
+    counts = [0] * len(tokens)
+    overlap = max(len(token) for token in tokens) - 1
+    tail = b""
+    for chunk in chunks:
+        data = tail + chunk
+        for index, token in enumerate(tokens):
+            # Ocorrências inteiras no trecho já contado não entram de novo
+            counts[index] += data.count(token) - tail.count(token)
+        tail = data[-overlap:] if overlap else b""
+    return counts
+
+
+def _iter_member(archive: zipfile.ZipFile, name: str) -> Iterator[bytes]:
+    with archive.open(name) as member:
+        while chunk := member.read(_ZIP_CHUNK):
+            yield chunk
+
+
+def _open_zip(content: bytes, path: str | None) -> zipfile.ZipFile | None:
+    try:
+        return zipfile.ZipFile(path or io.BytesIO(content))
+    except (zipfile.BadZipFile, OSError):
+        return None  # zip inválido: o Pandoc relata o erro
+
+
+def check_zip(archive: zipfile.ZipFile, label: str) -> int:
+    """
+    Verifica os tamanhos declarados do zip sem descompactar nada.
+
+    Returns:
+        Tamanho total descompactado.
+
+    Raises:
+        BudgetExceededError: Conteúdo descompactado ou razão de compressão
+            acima dos limites (zip bomb).
+    """
+    total = 0
+    for info in archive.infolist():
+        total += info.file_size
+        if (
+            info.file_size > _ZIP_RATIO_MIN_BYTES
+            and info.file_size > ZIP_MAX_RATIO * max(info.compress_size, 1)
+        ):
+            raise BudgetExceededError(
+                f"{label} suspeito: {info.filename} descompacta "
+                f"{info.file_size // max(info.compress_size, 1)}x o tamanho "
+                f"compactado (limite: {ZIP_MAX_RATIO}x)",
+                reason="zip",
+            )
+    if total > ZIP_MAX_UNCOMPRESSED_BYTES:
+        raise BudgetExceededError(
+            f"{label} descompactado muito grande. Limite: "
+            f"{ZIP_MAX_UNCOMPRESSED_BYTES // _MB}MB",
+            reason="zip",
+        )
+    return total
+
+
+def _scan_zip(archive: zipfile.ZipFile, size: int) -> DocumentProfile:
+    unpacked = check_zip(archive, "Arquivo de origem")
+    names = set(archive.namelist())
+    images = sum(1 for name in names if name.startswith(_ZIP_MEDIA_PREFIXES))
+    tables = headings = 0
+    for name, tokens in _ZIP_DOCUMENTS.items():
+        if name in names:
+            tables, headings, drawings = _count_tokens(
+                _iter_member(archive, name), tokens
+            )
+            images = max(images, drawings)
+            break
+    return DocumentProfile(
+        size=size, headings=headings, tables=tables, images=images, unpacked=unpacked
+    )
+
+
+def _scan_text(content: bytes) -> DocumentProfile:
+    text = b"\n" + content.lower()
+    depth = 0
+    for match in _NESTED_LIST.finditer(text):
+        depth = max(depth, len(match.group(1).expandtabs(4)) // 2 + 1)
+    for match in _NESTED_QUOTE.finditer(text):
+        depth = max(depth, match.group(0).count(b">"))
+    return DocumentProfile(
+        size=len(content),
+        lines=content.count(b"\n") + 1,
+        headings=len(_HEADINGS.findall(text)),
+        tables=len(_TABLES.findall(text)),
+        images=len(_IMAGES.findall(text)),
+        depth=depth,
+    )
+
+
+def scan(request: ConvertRequest) -> DocumentProfile:
+    """
+    Pré-leitura da origem (e do template enviado, se houver).
+
+    Entradas zip (DOCX/ODT) só têm o diretório e o XML principal lidos,
+    depois de verificados os tamanhos declarados.
+
+    Raises:
+        BudgetExceededError: Origem ou template com cara de zip bomb.
+    """
+    size = request.source_size
+    if request.source_path:
+        with open(request.source_path, "rb") as file:
+            head = file.read(len(_ZIP_MAGIC))
+    else:
+        head = request.source_content[: len(_ZIP_MAGIC)]
+    archive = None
+    if head == _ZIP_MAGIC:
+        archive = _open_zip(request.source_content, request.source_path)
+    if archive is not None:
+        with archive:
+            profile = _scan_zip(archive, size)
+    else:
+        profile = _scan_text(request.read_source())
+
+    if request.template_content or request.template_path:
+        template = _open_zip(request.template_content or b"", request.template_path)
+        if template is not None:
+            with template:
+                unpacked = check_zip(template, "Template")
+            profile = dataclasses.replace(
+                profile, unpacked=profile.unpacked + unpacked
+            )
+    if request.sections:
+        # Origens adicionais do merge entram só pelo tamanho
+        profile = dataclasses.replace(
+            profile, size=profile.size + request.sections_size
+        )
+    return profile
+
+
+class CostEstimator:
+    """Modelo de custo por formato, orçamentos e calibração pelos tempos medidos."""
+
+    def __init__(
+        self,
+        budget_seconds: float = COST_BUDGET_SECONDS,
+        format_budgets: dict[str, float] | None = None,
+        memory_budget: int = COST_MEMORY_BUDGET_BYTES,
+        low_priority_seconds: float = COST_LOW_PRIORITY_SECONDS,
+    ):
+        self.budget_seconds = budget_seconds
+        self.format_budgets = (
+            {"pdf": COST_PDF_BUDGET_SECONDS}
+            if format_budgets is None
+            else dict(format_budgets)
+        )
+        self.memory_budget = memory_budget
+        self.low_priority_seconds = low_priority_seconds
+        self._lock = threading.Lock()
+        # (entrada, saída) -> (log da escala, medidas)
+        self._calibration: dict[tuple[str, str], tuple[float, int]] = {}
+
+    def budget(self, output_format: str) -> float:
+        """Segundos de CPU previstos aceitos para o formato de saída."""
+        return self.format_budgets.get(output_format, self.budget_seconds)
+
+    def estimate(
+        self,
+        profile: DocumentProfile,
+        input_format: str,
+        output_format: str,
+        template_size: int = 0,
+    ) -> CostEstimate:
+        """Custo previsto de uma conversão com a escala calibrada do par."""
+        coef = COEFFICIENTS.get(output_format, _DEFAULT_COEFFICIENTS)
+        work = max(profile.size, profile.unpacked)
+        seconds = (
+            coef.base
+            + coef.per_mb * work / _MB
+            + coef.per_kline * profile.lines / 1000
+            + coef.per_heading * profile.headings
+            + coef.per_table * profile.tables
+            + coef.per_image * profile.images
+        )
+        seconds *= 1 + _DEPTH_FACTOR * max(profile.depth - _DEPTH_FREE, 0)
+        if template_size and output_format == "docx":
+            seconds += TEMPLATE_SECONDS + TEMPLATE_SECONDS_PER_MB * template_size / _MB
+        memory = BASE_MEMORY_BYTES + int(coef.memory_factor * work)
+        with self._lock:
+            log_scale, _ = self._calibration.get((input_format, output_format), (0, 0))
+        return CostEstimate(
+            input_format=input_format,
+            output_format=output_format,
+            seconds=seconds * math.exp(log_scale),
+            memory_bytes=memory,
+            raw_seconds=seconds,
+        )
+
+    def assess(
+        self, request: ConvertRequest, output_formats: Iterable[str]
+    ) -> Assessment:
+        """
+        Estima a requisição para cada formato e aplica os orçamentos.
+
+        Raises:
+            BudgetExceededError: Zip suspeito ou custo previsto acima do
+                orçamento de algum formato.
+        """
+        profile = scan(request)
+        input_format = PandocEngine.detect_input_format(
+            request.source_filename or "source.md"
+        )
+        template_size = request.template_size
+        estimates = tuple(
+            self.estimate(profile, input_format, fmt.lower().strip(), template_size)
+            for fmt in output_formats
+        )
+        for estimate in estimates:
+            self._check(estimate)
+        return Assessment(
+            estimates=estimates,
+            low_priority=sum(e.seconds for e in estimates) > self.low_priority_seconds,
+        )
+
+    def record(
+        self, estimate: CostEstimate, timings: Iterable[tuple[str, float]]
+    ) -> None:
+        """Ajusta a escala do par de formatos com o tempo medido da conversão."""
+        timings = tuple(timings)
+        if any(stage in _UNMODELED_STAGES for stage, _ in timings):
+            return
+        observed = sum(
+            seconds for stage, seconds in timings if stage in _MEASURED_STAGES
+        )
+        if observed <= 0 or estimate.raw_seconds <= 0:
+            return
+        low, high = _SCALE_LIMITS
+        sample = math.log(min(max(observed / estimate.raw_seconds, low), high))
+        key = (estimate.input_format, estimate.output_format)
+        with self._lock:
+            log_scale, count = self._calibration.get(key, (0.0, 0))
+            # Média simples nas primeiras medidas, depois média móvel
+            weight = max(1 / (count + 1), _CALIBRATION_WEIGHT)
+            self._calibration[key] = (
+                log_scale + weight * (sample - log_scale),
+                count + 1,
+            )
+
+    def stats(self) -> dict:
+        """Orçamentos e a escala calibrada de cada par de formatos."""
+        with self._lock:
+            calibration = {
+                f"{source}->{target}": {
+                    "scale": round(math.exp(log_scale), 3),
+                    "samples": count,
+                }
+                for (source, target), (log_scale, count) in sorted(
+                    self._calibration.items()
+                )
+            }
+        return {
+            "budget_seconds": self.budget_seconds,
+            "format_budgets": self.format_budgets,
+            "memory_budget_bytes": self.memory_budget,
+            "low_priority_seconds": self.low_priority_seconds,
+            "calibration": calibration,
+        }
+
+    def _check(self, estimate: CostEstimate) -> None:
+        budget = self.budget(estimate.output_format)
+        label = estimate.output_format.upper()
+        seconds = estimate.raw_seconds
+        if seconds > 0:
+            low, high = _BUDGET_SCALE_LIMITS
+            seconds *= min(max(estimate.seconds / seconds, low), high)
+        if seconds > budget:
+            raise BudgetExceededError(
+                f"Documento caro demais para {label}: previstos "
+                f"{seconds:.0f}s de CPU (limite: {budget:.0f}s)",
+                reason="budget",
+            )
+        if estimate.memory_bytes > self.memory_budget:
+            raise BudgetExceededError(
+                f"Documento caro demais para {label}: previstos "
+                f"{estimate.memory_bytes // _MB}MB de memória (limite: "
+                f"{self.memory_budget // _MB}MB)",
+                reason="memory",
+            )
+
+
+_estimator: CostEstimator | None = None
+
+
+def get_cost_estimator() -> CostEstimator:
+    """Estimador compartilhado do processo (calibração única)."""
+    global _estimator
+    if _estimator is None:
+        _estimator = CostEstimator()
+    return _estimator
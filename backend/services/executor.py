@@ -0,0 +1,353 @@
+"""Execução das conversões fora do event loop, em pool de workers limitado."""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from config import (
+    CONVERSION_BACKEND,
+    CONVERSION_MAX_CONCURRENCY,
+    CONVERSION_PROCESS_MAX_TASKS,
+    CONVERSION_QUEUE_DEPTH,
+    CONVERSION_RETRY_AFTER_SECONDS,
+    CONVERSION_TIMEOUT_SECONDS,
+    PDF_CHUNK_THRESHOLD_BYTES,
+    PDF_ENGINE,
+)
+from converter.pandoc_engine import PandocEngine
+from converter.pdf_chunked import disable_chunk_pool, shutdown_chunk_pool
+from converter.pdf_engine import resolve_pdf_engine
+from domain.models import ConvertRequest, ConvertResult, ExportResult
+from services.convert_service import ConversionError, ConvertService
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = frozenset(["auto", "thread", "process"])
+_BUSY_BACKOFF_SECONDS = 0.05
+
+
+class ExecutorBusyError(ConversionError):
+    """Fila de conversões cheia; o cliente deve tentar novamente depois."""
+
+    def __init__(self, retry_after: int = CONVERSION_RETRY_AFTER_SECONDS):
+        super().__init__(
+            "Servidor ocupado. Tente novamente em instantes.", status_code=503
+        )
+        self.retry_after = retry_after
+
+
+class ConversionTimeoutError(ConversionError):
+    """A conversão excedeu o tempo limite."""
+
+    def __init__(self, timeout: float):
+        super().__init__(
+            f"Conversão excedeu o tempo limite de {timeout:g}s", status_code=504
+        )
+
+
+class WorkerLostError(ConversionError):
+    """O processo que executava a conversão morreu (ex.: falta de memória)."""
+
+    def __init__(self, retry_after: int = CONVERSION_RETRY_AFTER_SECONDS):
+        super().__init__(
+            "O worker da conversão foi interrompido. Tente novamente em instantes.",
+            status_code=503,
+        )
+        self.retry_after = retry_after
+
+
+def execute_request(request: ConvertRequest) -> ConvertResult:
+    """Executa uma conversão completa (função de nível de módulo, serializável)."""
+    return ConvertService().execute(request)
+
+
+def export_request(
+    request: ConvertRequest, output_formats: tuple[str, ...]
+) -> ExportResult:
+    """Executa uma exportação multi-formato (serializável via functools.partial)."""
+    return ConvertService().export(request, output_formats)
+
+
+def _discard_result(future: Future) -> None:
+    """Remove o arquivo de um resultado que ninguém vai consumir."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().cleanup()
+
+
+def is_cpu_bound(request: ConvertRequest) -> bool:
+    """
+    Indica se a conversão é dominada por CPU (render de PDF ou merge DOCX).
+
+    Merges com template registrado ficam em thread: o template já
+    pré-processado vive no registro deste processo. PDFs de Markdown acima
+    de PDF_CHUNK_THRESHOLD_BYTES também: os blocos são renderizados no pool
+    de blocos compartilhado deste processo, que limita o total de workers.
+    """
+    output_format = request.output_format.lower().strip()
+    if output_format == "pdf":
+        return not _renders_in_chunks(request)
+    if output_format != "docx" or request.template_id:
+        return False
+    return request.has_template
+
+
+def _renders_in_chunks(request: ConvertRequest) -> bool:
+    input_format = PandocEngine.detect_input_format(
+        request.source_filename or "source.md"
+    )
+    try:
+        engine = resolve_pdf_engine(request.pdf_engine or PDF_ENGINE, input_format)
+    except ValueError:
+        return False
+    return (
+        engine == "markdown"
+        and input_format == "markdown"
+        and 0 < PDF_CHUNK_THRESHOLD_BYTES < request.source_size
+    )
+
+
+class ConversionExecutor:
+    """
+    Pool limitado de workers para conversões.
+
+    Todo job ocupa uma thread do pool (que limita a concorrência total);
+    jobs CPU-bound são despachados dessa thread para um pool de processos,
+    substituído quando um job estoura o tempo limite (o worker preso é
+    encerrado em vez de ocupar a vaga até o reinício).
+    Jobs além de max_concurrency + queue_depth são rejeitados com 503.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = CONVERSION_MAX_CONCURRENCY,
+        queue_depth: int = CONVERSION_QUEUE_DEPTH,
+        timeout: float = CONVERSION_TIMEOUT_SECONDS,
+        backend: str = CONVERSION_BACKEND,
+        job: Callable[[ConvertRequest], ConvertResult] = execute_request,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend de execução inválido: {backend}")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency deve ser >= 1")
+        self.max_concurrency = max_concurrency
+        self.queue_depth = max(0, queue_depth)
+        self.timeout = timeout
+        self.backend = backend
+        self._job = job
+        self._threads = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="convert"
+        )
+        self._processes: ProcessPoolExecutor | None = None
+        self._in_process: dict[Future, ProcessPoolExecutor] = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+
+    @property
+    def capacity(self) -> int:
+        """Número máximo de jobs aceitos simultaneamente (execução + fila)."""
+        return self.max_concurrency + self.queue_depth
+
+    def stats(self) -> dict:
+        """Retorna o estado atual do pool."""
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "max_concurrency": self.max_concurrency,
+                "queue_depth": self.queue_depth,
+                "running": self._running,
+                "queued": self._pending - self._running,
+            }
+
+    async def run(
+        self,
+        request: ConvertRequest,
+        job: Callable[[ConvertRequest], ConvertResult] | None = None,
+        cpu_bound: bool | None = None,
+        on_start: Callable[[], None] | None = None,
+    ) -> ConvertResult:
+        """
+        Executa a conversão no pool sem bloquear o event loop.
+
+        job substitui a função de conversão padrão para esta requisição (deve
+        ser serializável para rodar em processo); cpu_bound força a escolha
+        do pool no backend "auto". on_start é chamado na thread do worker
+        quando a conversão sai da fila e começa a executar.
+
+        Raises:
+            ExecutorBusyError: Quando a fila está cheia.
+            ConversionTimeoutError: Quando o job excede o tempo limite.
+            ConversionError: Erros de conversão propagados do serviço.
+        """
+        future = self.submit(request, job, cpu_bound, on_start)
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=self.timeout
+            )
+        except asyncio.TimeoutError as exc:
+            # Jobs ainda na fila são cancelados; em execução, o Pandoc tem
+            # timeout próprio e o slot é liberado quando o job termina.
+            if not future.cancel():
+                future.add_done_callback(_discard_result)
+            raise ConversionTimeoutError(self.timeout) from exc
+
+    async def run_when_available(
+        self,
+        request: ConvertRequest,
+        on_start: Callable[[], None] | None = None,
+    ) -> ConvertResult:
+        """
+        Como run(), mas aguarda vaga quando a fila está cheia em vez de
+        rejeitar de imediato (até o tempo limite do job).
+
+        Para chamadores que não respondem ao cliente na hora (lotes, jobs).
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                return await self.run(request, on_start=on_start)
+            except ExecutorBusyError:
+                if time.monotonic() >= deadline:
+                    raise
+                await asyncio.sleep(_BUSY_BACKOFF_SECONDS)
+
+    def submit(
+        self,
+        request: ConvertRequest,
+        job: Callable[[ConvertRequest], ConvertResult] | None = None,
+        cpu_bound: bool | None = None,
+        on_start: Callable[[], None] | None = None,
+    ) -> Future:
+        """Enfileira a conversão e retorna um Future concorrente."""
+        with self._lock:
+            if self._pending >= self.capacity:
+                raise ExecutorBusyError()
+            self._pending += 1
+        try:
+            future = self._threads.submit(
+                self._run_job, request, job or self._job, cpu_bound, on_start
+            )
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def shutdown(self) -> None:
+        """Encerra os pools, cancelando jobs ainda não iniciados."""
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+        shutdown_chunk_pool()
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _run_job(
+        self,
+        request: ConvertRequest,
+        job: Callable[[ConvertRequest], ConvertResult],
+        cpu_bound: bool | None,
+        on_start: Callable[[], None] | None = None,
+    ) -> ConvertResult:
+        with self._lock:
+            self._running += 1
+        try:
+            if on_start is not None:
+                on_start()
+            if self._use_process(request, cpu_bound):
+                return self._run_in_process(request, job)
+            return job(request)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _use_process(self, request: ConvertRequest, cpu_bound: bool | None) -> bool:
+        if self.backend == "auto":
+            return is_cpu_bound(request) if cpu_bound is None else cpu_bound
+        return self.backend == "process"
+
+    def _run_in_process(
+        self, request: ConvertRequest, job: Callable[[ConvertRequest], ConvertResult]
+    ) -> ConvertResult:
+        pool = self._process_pool()
+        future = pool.submit(job, request)
+        with self._lock:
+            self._in_process[future] = pool
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError as exc:
+            if not future.cancel():
+                # O worker segue preso na conversão e ocuparia a vaga até o
+                # reinício: o pool é substituído e seus processos encerrados
+                self._retire_pool(pool)
+            raise ConversionTimeoutError(self.timeout) from exc
+        except BrokenProcessPool as exc:
+            # Worker morto (ex.: falta de memória): o próximo job usa pool novo
+            self._retire_pool(pool)
+            raise WorkerLostError() from exc
+        finally:
+            with self._lock:
+                self._in_process.pop(future, None)
+
+    def _retire_pool(self, pool: ProcessPoolExecutor) -> None:
+        """
+        Tira o pool de uso e encerra seus processos quando os demais jobs
+        em execução nele terminarem (no máximo após o tempo limite).
+        """
+        with self._lock:
+            if self._processes is not pool:
+                return
+            self._processes = None
+            others = [job for job, owner in self._in_process.items() if owner is pool]
+        # Dependência de atributo privado (dict pid -> Process, estável até o
+        # Python 3.13): o ProcessPoolExecutor não expõe seus processos antes
+        # do terminate_workers() do 3.14. Sem ele, o pool só é substituído.
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        logger.warning(
+            "Pool de processos substituído; %d workers serão encerrados",
+            len(processes),
+        )
+        threading.Thread(
+            target=self._terminate_processes,
+            args=(others, processes),
+            name="convert-reaper",
+            daemon=True,
+        ).start()
+
+    def _terminate_processes(
+        self, others: list[Future], processes: list[multiprocessing.Process]
+    ) -> None:
+        wait(others, timeout=self.timeout)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.max_concurrency,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=CONVERSION_PROCESS_MAX_TASKS,
+                    # Sem pool de blocos aninhado em cada worker
+                    initializer=disable_chunk_pool,
+                )
+                logger.info(
+                    "Pool de processos iniciado (%d workers)", self.max_concurrency
+                )
+            return self._processes
@@ -0,0 +1,158 @@
+"""Exportação multi-formato: um upload, vários formatos de saída."""
+
+import asyncio
+import dataclasses
+import functools
+import uuid
+import zipfile
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+
+from domain.models import ConvertRequest, ConvertResult
+from services.batch_service import COMPRESSED_FORMATS, ZipSink, write_zip_entry
+from services.convert_service import ConversionError, normalize_output_format
+from services.executor import ConversionExecutor, export_request, is_cpu_bound
+from services.result_cache import ResultCache, cache_key, rename_result
+
+MULTIPART_MEDIA_TYPE = "multipart/mixed"
+
+
+def parse_formats(value: str) -> tuple[str, ...]:
+    """
+    Lê a lista de formatos (separados por vírgula), sem repetições.
+
+    Raises:
+        ConversionError: Lista vazia ou formato inválido.
+    """
+    formats = tuple(
+        dict.fromkeys(
+            normalize_output_format(part) for part in value.split(",") if part.strip()
+        )
+    )
+    if not formats:
+        raise ConversionError("Informe ao menos um formato de saída")
+    return formats
+
+
+def format_request(request: ConvertRequest, output_format: str) -> ConvertRequest:
+    """Requisição equivalente à conversão avulsa para um dos formatos."""
+    return dataclasses.replace(request, output_format=output_format)
+
+
+def export_is_cpu_bound(request: ConvertRequest, formats: tuple[str, ...]) -> bool:
+    """Indica se algum dos formatos é dominado por CPU (PDF ou merge DOCX)."""
+    return any(is_cpu_bound(format_request(request, fmt)) for fmt in formats)
+
+
+@dataclass(frozen=True)
+class ExportOutcome:
+    """Resultados por formato (na ordem pedida), origem de cada um e tempos."""
+
+    formats: tuple[str, ...]
+    results: tuple[ConvertResult, ...]
+    cache_hits: tuple[bool, ...]
+    timings: tuple[tuple[str, float], ...] = ()
+
+
+class MultiFormatExporter:
+    """
+    Exporta uma origem para vários formatos com um único job no pool.
+
+    Cada formato é consultado no cache de resultados com a mesma chave da
+    conversão avulsa; só os ausentes são exportados (um único parse da
+    origem) e depois armazenados no cache.
+    """
+
+    def __init__(self, executor: ConversionExecutor, cache: ResultCache):
+        self.executor = executor
+        self.cache = cache
+
+    async def run(
+        self, request: ConvertRequest, formats: tuple[str, ...]
+    ) -> ExportOutcome:
+        keys = await asyncio.to_thread(
+            lambda: {fmt: cache_key(format_request(request, fmt)) for fmt in formats}
+        )
+        results: dict[str, ConvertResult] = {}
+        for fmt in formats:
+            cached = self.cache.get(keys[fmt])
+            if cached is not None:
+                results[fmt] = rename_result(cached, request.source_filename)
+        hits = tuple(fmt in results for fmt in formats)
+
+        missing = tuple(fmt for fmt in formats if fmt not in results)
+        timings: tuple[tuple[str, float], ...] = ()
+        if missing:
+            export = await self.executor.run(
+                request,
+                job=functools.partial(export_request, output_formats=missing),
+                cpu_bound=export_is_cpu_bound(request, missing),
+            )
+            timings = export.timings
+            for fmt, result in zip(missing, export.results):
+                if result.path is None:
+                    self.cache.put(keys[fmt], result)
+                else:
+                    await asyncio.to_thread(self.cache.put, keys[fmt], result)
+                results[fmt] = result
+        return ExportOutcome(
+            formats=formats,
+            results=tuple(results[fmt] for fmt in formats),
+            cache_hits=hits,
+            timings=timings,
+        )
+
+
+async def stream_export_zip(
+    results: tuple[ConvertResult, ...],
+) -> AsyncIterator[bytes]:
+    """Empacota os resultados em um zip gerado em streaming."""
+    sink = ZipSink()
+    archive = zipfile.ZipFile(sink, mode="w")
+    try:
+        for result in results:
+            extension = result.filename.rsplit(".", 1)[-1]
+            await asyncio.to_thread(
+                write_zip_entry,
+                archive,
+                result.filename,
+                result,
+                extension not in COMPRESSED_FORMATS,
+            )
+            yield sink.drain()
+        archive.close()
+        yield sink.drain()
+    finally:
+        for result in results:
+            result.cleanup()
+
+
+def new_boundary() -> str:
+    """Delimitador das partes da resposta multipart."""
+    return uuid.uuid4().hex
+
+
+async def stream_multipart(
+    results: tuple[ConvertResult, ...], boundary: str
+) -> AsyncIterator[bytes]:
+    """Envia os resultados como partes de uma resposta multipart/mixed."""
+    try:
+        for result in results:
+            yield (
+                f"--{boundary}\r\n"
+                f"Content-Type: {result.content_type}\r\n"
+                f'Content-Disposition: attachment; filename="{result.filename}"\r\n'
+                f"Content-Length: {result.size}\r\n\r\n"
+            ).encode("utf-8")
+            chunks = result.iter_content()
+            while chunk := await asyncio.to_thread(_next_chunk, chunks):
+                yield chunk
+            yield b"\r\n"
+        yield f"--{boundary}--\r\n".encode("utf-8")
+    finally:
+        for result in results:
+            result.cleanup()
+
+
+def _next_chunk(chunks: Iterator[bytes]) -> bytes:
+    return next(chunks, b"")
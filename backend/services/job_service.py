@@ -0,0 +1,471 @@
+"""Jobs de conversão assíncronos: submissão imediata, consulta e resultado."""
+
+import asyncio
+import dataclasses
+import functools
+import logging
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from config import (
+    JOB_HEARTBEAT_SECONDS,
+    JOB_MAX_PENDING,
+    JOB_RESULT_TTL_SECONDS,
+    JOB_STORE,
+    JOBS_PATH,
+)
+from domain.models import ConvertRequest
+from services.admission import ANONYMOUS, AdmissionController
+from services.convert_service import ConversionError, normalize_output_format
+from services.executor import ConversionExecutor, ExecutorBusyError
+from services.metrics import StageTimer, record_conversion, record_error
+from services.result_cache import ResultCache, cache_key
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = frozenset([DONE, FAILED])
+
+
+class JobNotFoundError(ConversionError):
+    """Job inexistente ou expirado."""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Job não encontrado: {job_id}", status_code=404)
+
+
+@dataclass(frozen=True)
+class JobRecord:
+    """Estado de um job de conversão."""
+
+    job_id: str
+    status: str
+    source_filename: str
+    output_format: str
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    filename: str | None = None
+    content_type: str | None = None
+    size: int | None = None
+    cache: str | None = None
+    error: str | None = None
+    status_code: int | None = None
+    heartbeat_at: float | None = None
+
+    def to_dict(self) -> dict:
+        """Representação para a API, com tempos de fila e de execução."""
+        data = dataclasses.asdict(self)
+        del data["heartbeat_at"]
+        end = self.finished_at or time.time()
+        data["queue_seconds"] = round((self.started_at or end) - self.created_at, 3)
+        data["run_seconds"] = (
+            round(end - self.started_at, 3) if self.started_at else None
+        )
+        return data
+
+
+_COLUMNS = tuple(field.name for field in dataclasses.fields(JobRecord))
+
+
+class MemoryJobStore:
+    """
+    Registros de jobs em memória; resultados em arquivos no diretório dado.
+
+    Sem diretório, usa um diretório temporário próprio.
+    """
+
+    def __init__(self, directory: str | Path | None = None):
+        self._owns_directory = directory is None
+        self.directory = Path(directory or tempfile.mkdtemp(prefix="jobs-"))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._records: dict[str, JobRecord] = {}
+        self._lock = threading.Lock()
+
+    def result_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.result"
+
+    def save(self, record: JobRecord) -> None:
+        with self._lock:
+            self._records[record.job_id] = record
+
+    def update(self, record: JobRecord) -> bool:
+        """Grava o registro só se o job ainda existe; retorna se gravou."""
+        with self._lock:
+            if record.job_id not in self._records:
+                return False
+            self._records[record.job_id] = record
+            return True
+
+    def get(self, job_id: str) -> JobRecord | None:
+        with self._lock:
+            return self._records.get(job_id)
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._records.pop(job_id, None)
+        self.result_path(job_id).unlink(missing_ok=True)
+
+    def touch(self, job_ids: list[str], now: float) -> None:
+        """Renova o heartbeat dos jobs dados que ainda não terminaram."""
+        with self._lock:
+            for job_id in job_ids:
+                record = self._records.get(job_id)
+                if record is not None and record.finished_at is None:
+                    self._records[job_id] = dataclasses.replace(
+                        record, heartbeat_at=now
+                    )
+
+    def expired(self, finished_before: float) -> list[str]:
+        with self._lock:
+            return [
+                record.job_id
+                for record in self._records.values()
+                if record.finished_at is not None
+                and record.finished_at < finished_before
+            ]
+
+    def close(self) -> None:
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class SqliteJobStore(MemoryJobStore):
+    """
+    Registros de jobs em SQLite, no mesmo diretório dos resultados.
+
+    Sobrevive a reinícios e pode ser compartilhado por vários workers.
+    """
+
+    def __init__(self, directory: str | Path = JOBS_PATH):
+        super().__init__(directory)
+        self._db = sqlite3.connect(
+            self.directory / "jobs.sqlite3", check_same_thread=False
+        )
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                "source_filename TEXT, output_format TEXT, created_at REAL, "
+                "started_at REAL, finished_at REAL, filename TEXT, "
+                "content_type TEXT, size INTEGER, cache TEXT, error TEXT, "
+                "status_code INTEGER, heartbeat_at REAL)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            if "heartbeat_at" not in columns:
+                # Banco criado por versão anterior
+                self._db.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)"
+            )
+
+    def save(self, record: JobRecord) -> None:
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        with self._lock, self._db:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(_COLUMNS)}) "
+                f"VALUES ({placeholders})",
+                dataclasses.astuple(record),
+            )
+
+    def update(self, record: JobRecord) -> bool:
+        job_id, *values = dataclasses.astuple(record)
+        assignments = ", ".join(f"{column} = ?" for column in _COLUMNS[1:])
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*values, job_id)
+            )
+        return cursor.rowcount > 0
+
+    def get(self, job_id: str) -> JobRecord | None:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return JobRecord(*row) if row else None
+
+    def delete(self, job_id: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        self.result_path(job_id).unlink(missing_ok=True)
+
+    def touch(self, job_ids: list[str], now: float) -> None:
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE jobs SET heartbeat_at = ? "
+                "WHERE job_id = ? AND finished_at IS NULL",
+                [(now, job_id) for job_id in job_ids],
+            )
+
+    def expired(self, finished_before: float) -> list[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT job_id FROM jobs WHERE finished_at < ?", (finished_before,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+        super().close()
+
+
+def create_job_store(kind: str = JOB_STORE) -> MemoryJobStore:
+    """Cria o armazenamento de jobs configurado."""
+    if kind == "sqlite":
+        return SqliteJobStore()
+    if kind == "memory":
+        return MemoryJobStore()
+    raise ValueError(f"Armazenamento de jobs inválido: {kind}")
+
+
+class JobManager:
+    """
+    Executa conversões em segundo plano e guarda seus resultados.
+
+    A submissão retorna na hora; a conversão entra no pool compartilhado
+    (aguardando vaga, em vez de 503) e o resultado vai para o diretório do
+    armazenamento, onde fica disponível até expirar. Enquanto houver jobs
+    pendentes, o heartbeat deles é renovado a cada heartbeat_seconds, para
+    que outros workers do mesmo armazenamento saibam que seguem vivos.
+    """
+
+    def __init__(
+        self,
+        executor: ConversionExecutor,
+        cache: ResultCache,
+        store: MemoryJobStore,
+        ttl_seconds: float = JOB_RESULT_TTL_SECONDS,
+        max_pending: int = JOB_MAX_PENDING,
+        admission: AdmissionController | None = None,
+        heartbeat_seconds: float = JOB_HEARTBEAT_SECONDS,
+    ):
+        self.executor = executor
+        self.admission = admission
+        self.cache = cache
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.max_pending = max_pending
+        self.heartbeat_seconds = heartbeat_seconds
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._heartbeat: asyncio.Task | None = None
+
+    def submit(
+        self,
+        request: ConvertRequest,
+        cleanup: Callable[[], None] | None = None,
+        client: str = ANONYMOUS,
+    ) -> JobRecord:
+        """
+        Registra o job e inicia a conversão em segundo plano.
+
+        cleanup é chamado quando o job termina (ex.: remover uploads em disco).
+        Com controle de admissão, o job espera o limite e a vez de client.
+
+        Raises:
+            ConversionError: Formato de saída inválido.
+            ExecutorBusyError: Quando há jobs pendentes demais.
+        """
+        output_format = normalize_output_format(request.output_format)
+        self.purge_expired()
+        if len(self._tasks) >= self.max_pending:
+            raise ExecutorBusyError()
+        now = time.time()
+        record = JobRecord(
+            job_id=uuid.uuid4().hex,
+            status=QUEUED,
+            source_filename=request.source_filename,
+            output_format=output_format,
+            created_at=now,
+            heartbeat_at=now,
+        )
+        self.store.save(record)
+        task = asyncio.create_task(self._run(record, request, cleanup, client))
+        self._tasks[record.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(record.job_id, None))
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._beat())
+        return record
+
+    def get(self, job_id: str) -> JobRecord:
+        """
+        Retorna o estado do job.
+
+        Jobs pendentes cujo heartbeat não é renovado há 3 intervalos foram
+        interrompidos (reinício do worker dono, em qualquer processo que
+        compartilhe o armazenamento) e passam a constar como falhos.
+        """
+        record = self.store.get(job_id)
+        if record is None or self._is_expired(record):
+            raise JobNotFoundError(job_id)
+        if self._is_stale(record):
+            record = dataclasses.replace(
+                record,
+                status=FAILED,
+                finished_at=time.time(),
+                error="Job interrompido por reinício do servidor",
+                status_code=503,
+            )
+            self.store.save(record)
+        return record
+
+    def result_path(self, record: JobRecord) -> Path:
+        """Arquivo com o resultado de um job concluído."""
+        return self.store.result_path(record.job_id)
+
+    def delete(self, job_id: str) -> None:
+        """Remove o job; se ainda estiver em andamento, cancela."""
+        self.get(job_id)
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        self.store.delete(job_id)
+
+    def purge_expired(self) -> None:
+        """Remove jobs concluídos há mais de ttl_seconds."""
+        for job_id in self.store.expired(time.time() - self.ttl_seconds):
+            self.store.delete(job_id)
+
+    def stats(self) -> dict:
+        """Retorna a ocupação atual."""
+        return {"pending": len(self._tasks), "max_pending": self.max_pending}
+
+    async def shutdown(self) -> None:
+        """Cancela os jobs em andamento e fecha o armazenamento."""
+        tasks = list(self._tasks.values())
+        if self._heartbeat is not None:
+            tasks.append(self._heartbeat)
+            self._heartbeat = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.store.close()
+
+    def _is_stale(self, record: JobRecord) -> bool:
+        last_seen = record.heartbeat_at or record.created_at
+        return (
+            record.status not in FINISHED
+            and time.time() - last_seen > 3 * self.heartbeat_seconds
+        )
+
+    async def _beat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            if not self._tasks:
+                continue
+            try:
+                await asyncio.to_thread(
+                    self.store.touch, list(self._tasks), time.time()
+                )
+            except Exception:
+                logger.warning("Falha ao renovar heartbeat dos jobs", exc_info=True)
+
+    def _is_expired(self, record: JobRecord) -> bool:
+        return (
+            record.finished_at is not None
+            and time.time() - record.finished_at > self.ttl_seconds
+        )
+
+    async def _run(
+        self,
+        record: JobRecord,
+        request: ConvertRequest,
+        cleanup: Callable[[], None] | None,
+        client: str,
+    ) -> None:
+
+        def mark_running() -> None:
+            # Chamado pelo executor, na thread do worker, quando a conversão
+            # sai da fila (admissão e pool); até lá o job segue "queued"
+            nonlocal record
+            now = time.time()
+            record = dataclasses.replace(
+                record, status=RUNNING, started_at=now, heartbeat_at=now
+            )
+            self._update(record)
+
+        convert = functools.partial(
+            self.executor.run_when_available, on_start=mark_running
+        )
+        if self.admission is not None:
+            convert = self.admission.converter(client, convert, wait=True)
+        try:
+            key = await asyncio.to_thread(cache_key, request)
+            result, hit = await self.cache.get_or_convert(key, request, convert)
+            record_conversion(request, result, hit, StageTimer(result.timings))
+            try:
+                size = result.size
+                await asyncio.to_thread(
+                    self._store_result, record.job_id, result.content, result.path
+                )
+            finally:
+                result.cleanup()
+            await asyncio.to_thread(
+                self._update,
+                dataclasses.replace(
+                    record,
+                    status=DONE,
+                    finished_at=time.time(),
+                    filename=result.filename,
+                    content_type=result.content_type,
+                    size=size,
+                    cache="HIT" if hit else "MISS",
+                ),
+            )
+        except asyncio.CancelledError:
+            # Removido via delete() ou encerramento do servidor
+            await asyncio.to_thread(
+                self._update,
+                dataclasses.replace(
+                    record,
+                    status=FAILED,
+                    finished_at=time.time(),
+                    error="Job cancelado",
+                    status_code=503,
+                ),
+            )
+            raise
+        except Exception as exc:
+            record_error(exc)
+            if not isinstance(exc, ConversionError):
+                logger.exception("Erro inesperado no job %s", record.job_id)
+            await asyncio.to_thread(
+                self._update,
+                dataclasses.replace(
+                    record,
+                    status=FAILED,
+                    finished_at=time.time(),
+                    error=str(exc),
+                    status_code=getattr(exc, "status_code", 500),
+                ),
+            )
+        finally:
+            if cleanup is not None:
+                cleanup()
+
+    def _update(self, record: JobRecord) -> None:
+        """
+        Grava o novo estado do job, a menos que ele tenha sido removido
+        (delete(), neste ou em outro worker); nesse caso, descarta o
+        resultado já gravado.
+        """
+        if not self.store.update(record):
+            self.store.result_path(record.job_id).unlink(missing_ok=True)
+
+    def _store_result(self, job_id: str, content: bytes, path: str | None) -> None:
+        target = self.store.result_path(job_id)
+        if path:
+            shutil.move(path, target)
+        else:
+            target.write_bytes(content)
@@ -0,0 +1,161 @@
+"""Métricas Prometheus e tempos por etapa das conversões."""
+
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+from config import OUTPUT_FORMATS
+from converter.pandoc_engine import PandocEngine
+from domain.models import ConvertRequest, ConvertResult
+
+# Etapas do pipeline
+UPLOAD_READ = "upload_read"
+ADMISSION = "admission"
+CACHE_LOOKUP = "cache_lookup"
+IMAGES = "images"
+TEMP_WRITE = "temp_write"
+PANDOC = "pandoc"
+AST_CACHE = "ast_cache"
+FAST_PATH = "fast_path"
+PDF_RENDER = "pdf_render"
+DOCX_MERGE = "docx_merge"
+RESPONSE_WRITE = "response_write"
+
+_STAGE_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120
+)
+
+STAGE_SECONDS = Histogram(
+    "converter_stage_seconds",
+    "Duração de cada etapa do pipeline de conversão",
+    ["stage", "input_format", "output_format"],
+    buckets=_STAGE_BUCKETS,
+)
+CONVERSIONS = Counter(
+    "converter_conversions_total",
+    "Conversões concluídas",
+    ["input_format", "output_format", "cache"],
+)
+ENGINE_CONVERSIONS = Counter(
+    "converter_engine_conversions_total",
+    "Conversões executadas (fora do cache) por motor",
+    ["engine", "input_format", "output_format"],
+)
+CACHE_REQUESTS = Counter(
+    "converter_cache_requests_total", "Consultas ao cache de resultados", ["result"]
+)
+ADMISSION_REJECTIONS = Counter(
+    "converter_admission_rejections_total",
+    "Conversões recusadas pelo controle de admissão",
+    ["reason"],
+)
+COALESCED_REQUESTS = Counter(
+    "converter_coalesced_requests_total",
+    "Requisições atendidas por uma conversão idêntica já em andamento",
+    ["scope"],
+)
+ERRORS = Counter(
+    "converter_errors_total", "Conversões com erro", ["type", "status_code"]
+)
+BYTES_IN = Counter(
+    "converter_bytes_in_total", "Bytes de origem recebidos", ["input_format"]
+)
+BYTES_OUT = Counter(
+    "converter_bytes_out_total", "Bytes de resultado produzidos", ["output_format"]
+)
+IN_FLIGHT = Gauge("converter_in_flight", "Conversões em execução no pool")
+QUEUE_DEPTH = Gauge("converter_queue_depth", "Conversões aguardando vaga no pool")
+
+
+class StageTimer:
+    """Acumula a duração de cada etapa de uma conversão."""
+
+    def __init__(self, timings: Iterable[tuple[str, float]] = ()):
+        self.stages: dict[str, float] = {}
+        self.extend(timings)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Mede o bloco como parte da etapa `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def extend(self, timings: Iterable[tuple[str, float]]) -> None:
+        for name, seconds in timings:
+            self.add(name, seconds)
+
+    def as_tuple(self) -> tuple[tuple[str, float], ...]:
+        return tuple(self.stages.items())
+
+    def server_timing(self) -> str:
+        """Valor do header Server-Timing (durações em milissegundos)."""
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()
+        )
+
+
+def format_labels(request: ConvertRequest) -> tuple[str, str]:
+    """
+    Rótulos (formato de entrada, formato de saída) da requisição.
+
+    Formatos de saída desconhecidos vão todos para "other": o valor vem do
+    cliente e não pode criar séries novas.
+    """
+    input_format = PandocEngine.detect_input_format(
+        request.source_filename or "source.md"
+    )
+    output_format = request.output_format.lower().strip()
+    return input_format, output_format if output_format in OUTPUT_FORMATS else "other"
+
+
+def observe_stages(
+    timings: Iterable[tuple[str, float]], input_format: str, output_format: str
+) -> None:
+    """Registra os tempos de etapa nos histogramas."""
+    for name, seconds in timings:
+        STAGE_SECONDS.labels(name, input_format, output_format).observe(seconds)
+
+
+def record_conversion(
+    request: ConvertRequest, result: ConvertResult, cache_hit: bool, timer: StageTimer
+) -> None:
+    """Registra uma conversão concluída (tempos, cache e bytes)."""
+    input_format, output_format = format_labels(request)
+    observe_stages(timer.stages.items(), input_format, output_format)
+    cache = "hit" if cache_hit else "miss"
+    CACHE_REQUESTS.labels(cache).inc()
+    CONVERSIONS.labels(input_format, output_format, cache).inc()
+    if not cache_hit and result.engine:
+        ENGINE_CONVERSIONS.labels(result.engine, input_format, output_format).inc()
+    BYTES_IN.labels(input_format).inc(request.source_size)
+    BYTES_OUT.labels(output_format).inc(result.size)
+
+
+def record_error(exc: Exception) -> None:
+    """Registra uma conversão com erro, pelo tipo da exceção."""
+    ERRORS.labels(type(exc).__name__, str(getattr(exc, "status_code", 500))).inc()
+
+
+def bind_executor(executor) -> None:
+    """Lê os gauges de ocupação do pool no momento da coleta."""
+    IN_FLIGHT.set_function(lambda: executor.stats()["running"])
+    QUEUE_DEPTH.set_function(lambda: executor.stats()["queued"])
+
+
+def render() -> tuple[bytes, str]:
+    """Métricas no formato de exposição do Prometheus."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,349 @@
+"""Cache de resultados de conversão endereçado por conteúdo."""
+
+import asyncio
+import dataclasses
+import functools
+import hashlib
+import importlib.metadata
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from config import (
+    DEFAULT_PLACEHOLDER,
+    IMAGE_DPI,
+    IMAGE_JPEG_QUALITY,
+    PDF_ENGINE,
+    RESULT_CACHE_DIR,
+    RESULT_CACHE_DISK_MAX_BYTES,
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_TTL_SECONDS,
+)
+from converter.pandoc_engine import get_pandoc_version
+from domain.models import ConvertRequest, ConvertResult
+from services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Subdiretório da camada em disco com os hardlinks entregues nos hits
+_SERVE_DIR = "serve"
+
+
+@functools.lru_cache(maxsize=1)
+def engine_version() -> str:
+    """Identifica as versões dos motores que influenciam o resultado."""
+    parts = [f"pandoc={get_pandoc_version()}"]
+    for package in ("markdown-pdf", "markdown-it-py", "docx-merge-xml"):
+        try:
+            parts.append(f"{package}={importlib.metadata.version(package)}")
+        except importlib.metadata.PackageNotFoundError:
+            parts.append(f"{package}=?")
+    # Imagens embutidas reduzidas antes da conversão mudam o resultado
+    parts.append(f"images={IMAGE_DPI}/{IMAGE_JPEG_QUALITY}")
+    # Templates sem placeholder (e ODT) aplicados como --reference-doc
+    parts.append("reference-doc=1")
+    return ";".join(parts)
+
+
+def cache_key(request: ConvertRequest, version: str | None = None) -> str:
+    """
+    Calcula a chave do cache para a requisição.
+
+    A chave cobre bytes de origem, extensão, formato de saída, bytes (ou id)
+    do template, placeholder, motor de PDF, origens adicionais (placeholder,
+    extensão e bytes) e versão dos motores. O id de um template registrado é
+    derivado do seu conteúdo.
+    """
+    version = engine_version() if version is None else version
+    digest = hashlib.sha256()
+    has_template = request.has_template
+    output_format = request.output_format.lower().strip()
+    fields = (
+        Path(request.source_filename or "").suffix.lower().encode(),
+        output_format.encode(),
+        (request.placeholder or DEFAULT_PLACEHOLDER).encode() if has_template else b"",
+        (request.template_id or "").encode(),
+        (request.pdf_engine or PDF_ENGINE).encode() if output_format == "pdf" else b"",
+        version.encode(),
+    )
+    for field in fields:
+        digest.update(len(field).to_bytes(8, "big"))
+        digest.update(field)
+    for size, chunks in (
+        (request.source_size, request.iter_source()),
+        (request.template_size, request.iter_template()),
+    ):
+        digest.update(size.to_bytes(8, "big"))
+        for chunk in chunks:
+            digest.update(chunk)
+    for section in request.sections:
+        for field in (
+            section.placeholder.encode(),
+            Path(section.filename or "").suffix.lower().encode(),
+        ):
+            digest.update(len(field).to_bytes(8, "big"))
+            digest.update(field)
+        digest.update(section.size.to_bytes(8, "big"))
+        for chunk in section.iter_content():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def rename_result(result: ConvertResult, source_filename: str) -> ConvertResult:
+    """
+    Ajusta o nome do arquivo de um resultado em cache para a nova origem.
+
+    Os tempos de etapa da conversão original são descartados.
+    """
+    stem = Path(source_filename or "output").stem
+    return dataclasses.replace(
+        result, filename=stem + Path(result.filename).suffix, timings=()
+    )
+
+
+class ResultCache:
+    """
+    Cache LRU de ConvertResult com limite de bytes, TTL e camada em disco.
+
+    A camada em memória é consultada primeiro; em caso de miss, a camada em
+    disco (se configurada) é consultada e o item é promovido para a memória.
+    Misses simultâneos da mesma chave compartilham uma única conversão.
+
+    Resultados em arquivo (grandes) só ficam na camada em disco: o arquivo
+    é ligado (hardlink, ou copiado) para o diretório do cache e cada hit
+    recebe um hardlink próprio, que quem consome remove com cleanup().
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+        disk_dir: str | Path | None = RESULT_CACHE_DIR,
+        disk_max_bytes: int = RESULT_CACHE_DISK_MAX_BYTES,
+        single_flight: SingleFlight | None = None,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self.single_flight = single_flight or SingleFlight()
+        self._entries: OrderedDict[str, tuple[float, ConvertResult]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> ConvertResult | None:
+        """Retorna o resultado em cache ou None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, result = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                self._remove(key)
+        result = self._disk_get(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            if result.path is None:
+                self._store(key, result, now)
+        return result
+
+    def put(self, key: str, result: ConvertResult) -> None:
+        """
+        Armazena o resultado nas camadas configuradas.
+
+        O arquivo de um resultado em arquivo continua sendo de quem chamou.
+        """
+        if result.path is None:
+            with self._lock:
+                self._store(key, result, time.monotonic())
+        self._disk_put(key, result)
+
+    async def get_or_convert(
+        self,
+        key: str,
+        request: ConvertRequest,
+        convert: Callable[[ConvertRequest], Awaitable[ConvertResult]],
+    ) -> tuple[ConvertResult, bool]:
+        """
+        Retorna o resultado em cache ou executa a conversão e o armazena.
+
+        Resultados em arquivo (grandes) vão só para a camada em disco. Se a
+        mesma chave já está sendo convertida (neste worker ou, com diretório de
+        coalescência, em outro), espera essa conversão em vez de repeti-la;
+        o resultado compartilhado conta como vindo do cache.
+
+        Returns:
+            (resultado, True se veio do cache)
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return rename_result(cached, request.source_filename), True
+
+        async def convert_and_store() -> ConvertResult:
+            result = await convert(request)
+            if result.path is None:
+                self.put(key, result)
+            else:
+                await asyncio.to_thread(self.put, key, result)
+            return result
+
+        result, shared = await self.single_flight.run(key, convert_and_store)
+        if shared:
+            return rename_result(result, request.source_filename), True
+        return result, False
+
+    def clear(self) -> None:
+        """Esvazia a camada em memória."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        """Retorna contadores e ocupação do cache."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "disk": str(self.disk_dir) if self.disk_dir else None,
+                "single_flight": self.single_flight.stats(),
+            }
+
+    def _store(self, key: str, result: ConvertResult, stored_at: float) -> None:
+        size = len(result.content)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (stored_at, result)
+        self._size += size
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, result = self._entries.pop(key)
+        self._size -= len(result.content)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.pickle"
+
+    def _disk_get(self, key: str) -> ConvertResult | None:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_seconds:
+                _unlink_entry(path)
+                return None
+            with path.open("rb") as file:
+                result = pickle.load(file)
+            if result.path is not None:
+                result = dataclasses.replace(result, path=self._serve(path))
+            return result
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError) as exc:
+            logger.warning("Entrada de cache corrompida descartada (%s): %s", key, exc)
+            _unlink_entry(path)
+            return None
+
+    def _serve(self, path: Path) -> str:
+        """Hardlink próprio do arquivo da entrada, para quem consome o hit."""
+        serve_dir = self.disk_dir / _SERVE_DIR
+        serve_dir.mkdir(exist_ok=True)
+        target = serve_dir / f"{uuid.uuid4().hex}.data"
+        _link_or_copy(path.with_suffix(".data"), target)
+        return str(target)
+
+    def _disk_put(self, key: str, result: ConvertResult) -> None:
+        if not self.disk_dir or result.size > self.disk_max_bytes:
+            return
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if result.path is not None:
+                _link_or_copy(Path(result.path), path.with_suffix(".data"))
+                # Só os metadados no pickle; path marca a entrada em arquivo
+                result = dataclasses.replace(result, path=path.name)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning("Falha ao gravar cache em disco: %s", exc)
+            return
+        self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """
+        Remove as entradas mais antigas até respeitar disk_max_bytes, e os
+        hardlinks de hits que ficaram para trás (consumidor interrompido).
+        """
+        expired = time.time() - self.ttl_seconds
+        for entry in (self.disk_dir / _SERVE_DIR).glob("*.data"):
+            try:
+                # ctime: o hardlink compartilha o mtime do arquivo da entrada
+                if entry.stat().st_ctime < expired:
+                    entry.unlink(missing_ok=True)
+            except FileNotFoundError:
+                continue
+        files = []
+        for entry in self.disk_dir.glob("*/*.pickle"):
+            try:
+                stat = entry.stat()
+                size = stat.st_size
+                data = entry.with_suffix(".data")
+                if data.exists():
+                    size += data.stat().st_size
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, size, entry))
+        total = sum(size for _, size, _ in files)
+        for _, size, entry in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            _unlink_entry(entry)
+            total -= size
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    """Hardlink atômico de source em target; copia entre sistemas de arquivos."""
+    tmp_path = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def _unlink_entry(path: Path) -> None:
+    """Remove a entrada em disco (metadados e, se houver, o arquivo)."""
+    path.unlink(missing_ok=True)
+    path.with_suffix(".data").unlink(missing_ok=True)
@@ -0,0 +1,330 @@
+"""
+Coalescência de conversões idênticas em andamento (single-flight).
+
+Quando várias requisições com a mesma chave de cache chegam juntas (um link
+compartilhado, por exemplo), só a primeira converte; as demais esperam pela
+mesma conversão e recebem o seu resultado, inclusive os erros.
+
+Dentro de um worker, a espera é por uma tarefa asyncio compartilhada. Entre
+workers do mesmo host, com um diretório configurado, a primeira conversão
+trava `<chave>.lock` (flock) e, ao terminar, grava o resultado (ou o erro) em
+`<chave>.result`; os outros workers esperam a trava ser liberada e leem o
+resultado. Sem um resultado recente (o líder caiu, ou recusou por limite do
+próprio cliente), quem esperava converte por conta própria.
+"""
+
+import asyncio
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+from config import (
+    CONVERSION_TIMEOUT_SECONDS,
+    SINGLE_FLIGHT_DIR,
+    SINGLE_FLIGHT_POLL_MS,
+    SINGLE_FLIGHT_RESULT_TTL_SECONDS,
+)
+from domain.models import ConvertResult
+from services.convert_service import ConversionError
+from services.metrics import COALESCED_REQUESTS
+
+try:
+    import fcntl
+except ImportError:  # Windows: só a coalescência dentro do worker
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Escopos da coalescência: mesmo worker ou outro worker do host
+LOCAL = "local"
+REMOTE = "remote"
+
+_OK = "ok"
+_ERROR = "error"
+
+
+def _shareable(exc: BaseException) -> bool:
+    """
+    Erros que valem para qualquer requisição com a mesma entrada.
+
+    Recusas com Retry-After (limite do cliente, fila cheia) dizem respeito a
+    quem converteu, não ao documento: quem esperava tenta por conta própria.
+    """
+    return getattr(exc, "retry_after", None) is None
+
+
+def _copy_result_file(path: str, directory: str | None = None) -> str:
+    """Cópia própria do arquivo de resultado (hard link quando possível)."""
+    fd, copy = tempfile.mkstemp(
+        prefix="result-", suffix=Path(path).suffix, dir=directory
+    )
+    os.close(fd)
+    os.unlink(copy)
+    try:
+        os.link(path, copy)
+    except OSError:
+        shutil.copyfile(path, copy)
+    return copy
+
+
+@dataclass
+class _Flight:
+    """Conversão em andamento e quem a espera."""
+
+    task: asyncio.Task | None = None
+    followers: int = 0
+    # Cópias do arquivo de resultado, uma por seguidor
+    copies: list[str] = field(default_factory=list)
+
+
+class SingleFlight:
+    """
+    Executa no máximo uma conversão por chave de cada vez.
+
+    Args:
+        directory: Diretório de travas e resultados compartilhado entre os
+            workers do host (None: só dentro do processo)
+        poll_interval: Intervalo entre tentativas de obter a trava de outro
+            worker, em segundos
+        result_ttl: Validade dos resultados gravados no diretório, em segundos
+        wait_timeout: Espera máxima por outro worker antes de converter por
+            conta própria, em segundos
+    """
+
+    def __init__(
+        self,
+        directory: str | Path | None = SINGLE_FLIGHT_DIR,
+        poll_interval: float = SINGLE_FLIGHT_POLL_MS / 1000,
+        result_ttl: float = SINGLE_FLIGHT_RESULT_TTL_SECONDS,
+        wait_timeout: float = 2 * CONVERSION_TIMEOUT_SECONDS,
+    ):
+        if directory and fcntl is None:
+            logger.warning(
+                "Coalescência entre workers indisponível nesta plataforma (sem flock)"
+            )
+            directory = None
+        self.directory = Path(directory) if directory else None
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+        self.wait_timeout = wait_timeout
+        self.leaders = 0
+        self.coalesced = 0
+        self.coalesced_remote = 0
+        self.retries = 0
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    async def run(
+        self, key: str, convert: Callable[[], Awaitable[ConvertResult]]
+    ) -> tuple[ConvertResult, bool]:
+        """
+        Executa `convert` ou espera a conversão idêntica em andamento.
+
+        Cada chamador recebe o próprio resultado: resultados em arquivo são
+        copiados para cada seguidor.
+
+        Returns:
+            (resultado, True se veio da conversão de outra requisição)
+        """
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                return await self._lead(key, convert)
+            flight.followers += 1
+            try:
+                result, _ = await asyncio.shield(flight.task)
+            except asyncio.CancelledError:
+                if not flight.task.cancelled() or asyncio.current_task().cancelling():
+                    self._abandon(flight)
+                    raise
+                # O líder foi cancelado (cliente desconectou): tenta de novo
+                self.retries += 1
+                continue
+            except Exception as exc:
+                if _shareable(exc):
+                    COALESCED_REQUESTS.labels(LOCAL).inc()
+                    self.coalesced += 1
+                    raise
+                self.retries += 1
+                continue
+            COALESCED_REQUESTS.labels(LOCAL).inc()
+            self.coalesced += 1
+            if result.path:
+                result = replace(result, path=flight.copies.pop())
+            return result, True
+
+    @staticmethod
+    def _abandon(flight: _Flight) -> None:
+        """Seguidor cancelado: descarta a cópia do resultado reservada a ele."""
+        if not flight.task.done():
+            flight.followers -= 1
+        elif flight.copies:
+            Path(flight.copies.pop()).unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        """Contadores da coalescência."""
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_remote": self.coalesced_remote,
+            "retries": self.retries,
+            "directory": str(self.directory) if self.directory else None,
+        }
+
+    async def _lead(
+        self, key: str, convert: Callable[[], Awaitable[ConvertResult]]
+    ) -> tuple[ConvertResult, bool]:
+        flight = _Flight()
+        self._flights[key] = flight
+        flight.task = asyncio.ensure_future(self._convert(key, flight, convert))
+        return await flight.task
+
+    async def _convert(
+        self,
+        key: str,
+        flight: _Flight,
+        convert: Callable[[], Awaitable[ConvertResult]],
+    ) -> tuple[ConvertResult, bool]:
+        try:
+            if self.directory is None:
+                self.leaders += 1
+                result, remote = await convert(), False
+            else:
+                result, remote = await self._convert_shared(key, convert)
+        finally:
+            # Daqui em diante ninguém mais entra nesta conversão
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if result.path and flight.followers:
+            flight.copies = await asyncio.to_thread(
+                lambda: [
+                    _copy_result_file(result.path) for _ in range(flight.followers)
+                ]
+            )
+        return result, remote
+
+    async def _convert_shared(
+        self, key: str, convert: Callable[[], Awaitable[ConvertResult]]
+    ) -> tuple[ConvertResult, bool]:
+        """Conversão coordenada com os outros workers pelo diretório."""
+        started = time.time()
+        deadline = time.monotonic() + self.wait_timeout
+        fd = await asyncio.to_thread(self._try_lock, key)
+        waited = fd is None
+        while fd is None:
+            if time.monotonic() > deadline:
+                logger.warning(
+                    "Conversão idêntica em outro worker demorou demais; "
+                    "convertendo por conta própria"
+                )
+                self.leaders += 1
+                return await convert(), False
+            await asyncio.sleep(self.poll_interval)
+            fd = self._try_lock(key)
+        try:
+            if waited:
+                record = await asyncio.to_thread(self._read_record, key, started)
+                if record is not None:
+                    COALESCED_REQUESTS.labels(REMOTE).inc()
+                    self.coalesced_remote += 1
+                    if record[0] == _ERROR:
+                        raise ConversionError(record[1], status_code=record[2])
+                    return record[1], True
+            self.leaders += 1
+            try:
+                result = await convert()
+            except ConversionError as exc:
+                if _shareable(exc):
+                    await asyncio.to_thread(
+                        self._write_record, key, (_ERROR, str(exc), exc.status_code)
+                    )
+                raise
+            await asyncio.to_thread(self._write_result, key, result)
+            return result, False
+        finally:
+            os.close(fd)
+
+    def _try_lock(self, key: str) -> int | None:
+        """Obtém a trava da chave sem esperar; None se outro worker a tem."""
+        path = self.directory / f"{key}.lock"
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        # Marca o uso (a limpeza remove travas antigas)
+        os.utime(fd)
+        return fd
+
+    def _read_record(self, key: str, since: float) -> tuple | None:
+        """Resultado gravado por outro worker depois de `since`, se houver."""
+        path = self.directory / f"{key}.result"
+        try:
+            if path.stat().st_mtime < since:
+                return None
+            with path.open("rb") as file:
+                record = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError) as exc:
+            logger.warning("Resultado compartilhado ilegível (%s): %s", key, exc)
+            return None
+        if record[0] == _OK and record[1].path:
+            # Cópia própria: o arquivo compartilhado expira com o registro
+            try:
+                shared = record[1].path
+                record = (_OK, replace(record[1], path=_copy_result_file(shared)))
+            except OSError:
+                return None
+        return record
+
+    def _write_result(self, key: str, result: ConvertResult) -> None:
+        if result.path:
+            data = self.directory / f"{key}.data{Path(result.path).suffix}"
+            try:
+                tmp = _copy_result_file(result.path, str(self.directory))
+                os.replace(tmp, data)
+            except OSError as exc:
+                logger.warning("Falha ao compartilhar resultado: %s", exc)
+                return
+            result = replace(result, path=str(data))
+        # Os tempos de etapa são de quem converteu
+        self._write_record(key, (_OK, replace(result, timings=())))
+
+    def _write_record(self, key: str, record: tuple) -> None:
+        path = self.directory / f"{key}.result"
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump(record, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning("Falha ao gravar resultado compartilhado: %s", exc)
+            return
+        self._prune()
+
+    def _prune(self) -> None:
+        """Remove resultados e travas expirados (no máximo uma vez por TTL)."""
+        now = time.time()
+        with self._lock:
+            if now - self._last_prune < self.result_ttl:
+                return
+            self._last_prune = now
+        for entry in self.directory.iterdir():
+            try:
+                if now - entry.stat().st_mtime > self.result_ttl:
+                    entry.unlink(missing_ok=True)
+            except OSError:
+                continue
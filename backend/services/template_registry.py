@@ -0,0 +1,310 @@
+"""Registro de templates DOCX pré-processados, reutilizados entre conversões."""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from config import (
+    DEFAULT_PLACEHOLDER,
+    TEMPLATE_CACHE_SIZE,
+    TEMPLATE_REFERENCE_MAX_BYTES,
+    TEMPLATES_PATH,
+)
+from converter.docx_template import DocxTemplate, TemplateError
+from converter.reference_doc import REFERENCE_FORMATS, reference_format
+
+logger = logging.getLogger(__name__)
+
+_TEMPLATE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# (id do template, placeholders preparados)
+_Key = tuple[str, tuple[str, ...]]
+
+
+class TemplateNotFoundError(LookupError):
+    """Template não registrado."""
+
+    def __init__(self, template_id: str):
+        super().__init__(f"Template não encontrado: {template_id}")
+
+
+@dataclass(frozen=True)
+class TemplateInfo:
+    """
+    Metadados de um template registrado.
+
+    Sem placeholder (ou em ODT), o template só fornece os estilos: é usado
+    como documento de referência do Pandoc.
+    """
+
+    template_id: str
+    filename: str
+    size: int
+    placeholder: str
+    placeholder_count: int
+    created_at: float
+    format: str = "docx"
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def template_id_for(content: bytes) -> str:
+    """Id do template: derivado do conteúdo, para uploads repetidos."""
+    return hashlib.sha256(content).hexdigest()[:32]
+
+
+class TemplateRegistry:
+    """
+    Templates DOCX armazenados em disco e mantidos pré-processados em memória.
+
+    O parse do template (descompactação, localização do placeholder, índices
+    de estilos/numeração) é feito uma vez e reaproveitado por todas as
+    conversões que o usam, via cache LRU chaveado por (conteúdo, placeholders).
+    Templates enviados a cada requisição também passam por esse cache.
+
+    Templates usados só pelos estilos são gravados em disco uma única vez,
+    pelo hash do conteúdo, para o --reference-doc do Pandoc; os avulsos
+    ficam limitados a reference_max_bytes, removendo os de uso mais antigo.
+    """
+
+    def __init__(
+        self,
+        store_dir: str | Path = TEMPLATES_PATH,
+        max_entries: int = TEMPLATE_CACHE_SIZE,
+        reference_max_bytes: int = TEMPLATE_REFERENCE_MAX_BYTES,
+    ):
+        self.store_dir = Path(store_dir)
+        self.max_entries = max(1, max_entries)
+        self.reference_max_bytes = reference_max_bytes
+        self._prepared: OrderedDict[_Key, DocxTemplate] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def register(
+        self,
+        content: bytes,
+        filename: str,
+        placeholder: str = DEFAULT_PLACEHOLDER,
+    ) -> TemplateInfo:
+        """
+        Valida e armazena o template (DOCX, ou ODT só de estilos).
+
+        Raises:
+            TemplateError: Template inválido.
+        """
+        template_format = reference_format(content)
+        if template_format is None:
+            raise TemplateError("Template não é um DOCX ou ODT válido")
+        placeholder_count = 0
+        if template_format == "docx":
+            placeholder_count = self.prepare(content, placeholder).placeholder_count
+        info = TemplateInfo(
+            template_id=template_id_for(content),
+            filename=filename,
+            size=len(content),
+            placeholder=placeholder,
+            placeholder_count=placeholder_count,
+            created_at=time.time(),
+            format=template_format,
+        )
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self._template_path(info.template_id, info.format), content)
+        _write_atomic(
+            self._info_path(info.template_id),
+            json.dumps(info.to_dict(), ensure_ascii=False).encode("utf-8"),
+        )
+        logger.info("Template registrado: %s (%s)", info.template_id, filename)
+        return info
+
+    def get_info(self, template_id: str) -> TemplateInfo:
+        """Retorna os metadados do template."""
+        path = self._info_path(self._check_id(template_id))
+        try:
+            return TemplateInfo(**json.loads(path.read_text(encoding="utf-8")))
+        except FileNotFoundError as exc:
+            raise TemplateNotFoundError(template_id) from exc
+
+    def list(self) -> list[TemplateInfo]:
+        """Lista os templates registrados, do mais recente ao mais antigo."""
+        if not self.store_dir.exists():
+            return []
+        infos = []
+        for path in self.store_dir.glob("*.json"):
+            try:
+                infos.append(self.get_info(path.stem))
+            except (LookupError, ValueError, TypeError):
+                continue
+        return sorted(infos, key=lambda info: info.created_at, reverse=True)
+
+    def delete(self, template_id: str) -> None:
+        """Remove o template do disco e do cache."""
+        self._check_id(template_id)
+        if not self._info_path(template_id).exists():
+            raise TemplateNotFoundError(template_id)
+        for template_format in REFERENCE_FORMATS:
+            self._template_path(template_id, template_format).unlink(missing_ok=True)
+        self._info_path(template_id).unlink(missing_ok=True)
+        with self._lock:
+            for key in [key for key in self._prepared if key[0] == template_id]:
+                del self._prepared[key]
+
+    def get(
+        self, template_id: str, placeholder: str | Sequence[str] | None = None
+    ) -> DocxTemplate:
+        """
+        Retorna o template registrado, pré-processado.
+
+        Sem placeholder explícito, usa o informado no registro. Vários
+        placeholders preparam o template para o merge de várias origens.
+        """
+        info = self.get_info(template_id)
+        if info.format != "docx":
+            raise TemplateError("Template ODT só pode ser usado pelos estilos")
+        key = (template_id, _placeholders(placeholder or info.placeholder))
+        template = self._cached(key)
+        if template is not None:
+            return template
+        try:
+            content = self._template_path(template_id, "docx").read_bytes()
+        except FileNotFoundError as exc:
+            raise TemplateNotFoundError(template_id) from exc
+        return self._store(key, content)
+
+    def prepare(
+        self, content: bytes, placeholder: str | Sequence[str] = DEFAULT_PLACEHOLDER
+    ) -> DocxTemplate:
+        """
+        Pré-processa um template avulso, reaproveitando o cache.
+
+        Raises:
+            TemplateError: Template inválido.
+        """
+        key = (template_id_for(content), _placeholders(placeholder))
+        template = self._cached(key)
+        if template is not None:
+            return template
+        return self._store(key, content)
+
+    def reference_path(self, template_id: str) -> Path:
+        """Arquivo do template registrado, para uso como documento de referência."""
+        info = self.get_info(template_id)
+        path = self._template_path(template_id, info.format)
+        if not path.exists():
+            raise TemplateNotFoundError(template_id)
+        return path
+
+    def reference_doc(self, content: bytes, template_format: str) -> Path:
+        """
+        Documento de referência em disco para um template avulso: gravado
+        uma única vez por conteúdo (o nome é o hash) e reaproveitado, também
+        entre workers. O mtime marca o último uso, para a poda.
+        """
+        template_id = template_id_for(content)
+        registered = self._template_path(template_id, template_format)
+        if registered.exists():
+            return registered
+        path = self.store_dir / "reference" / (
+            template_id + REFERENCE_FORMATS[template_format]
+        )
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(path, content)
+            self._prune_references(path)
+        return path
+
+    def stats(self) -> dict:
+        """Retorna contadores e ocupação do cache de templates."""
+        with self._lock:
+            return {
+                "entries": len(self._prepared),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _prune_references(self, keep: Path) -> None:
+        """Remove os documentos de referência menos usados acima do limite."""
+        files = []
+        for entry in keep.parent.iterdir():
+            if entry.suffix not in REFERENCE_FORMATS.values() or entry == keep:
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry))
+        total = keep.stat().st_size + sum(size for _, size, _ in files)
+        for _, size, entry in sorted(files):
+            if total <= self.reference_max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+    def _cached(self, key: _Key) -> DocxTemplate | None:
+        with self._lock:
+            template = self._prepared.get(key)
+            if template is None:
+                self.misses += 1
+                return None
+            self._prepared.move_to_end(key)
+            self.hits += 1
+            return template
+
+    def _store(self, key: _Key, content: bytes) -> DocxTemplate:
+        template = DocxTemplate(content, key[1])
+        with self._lock:
+            self._prepared[key] = template
+            self._prepared.move_to_end(key)
+            while len(self._prepared) > self.max_entries:
+                self._prepared.popitem(last=False)
+        return template
+
+    def _check_id(self, template_id: str) -> str:
+        if not _TEMPLATE_ID.match(template_id or ""):
+            raise TemplateNotFoundError(template_id)
+        return template_id
+
+    def _template_path(self, template_id: str, template_format: str) -> Path:
+        return self.store_dir / (template_id + REFERENCE_FORMATS[template_format])
+
+    def _info_path(self, template_id: str) -> Path:
+        return self.store_dir / f"{template_id}.json"
+
+
+def _placeholders(placeholder: str | Sequence[str]) -> tuple[str, ...]:
+    if isinstance(placeholder, str):
+        return (placeholder,)
+    return tuple(dict.fromkeys(placeholder))
+
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+
+_registry: TemplateRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Registro compartilhado do processo (inclusive nos workers do pool)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TemplateRegistry()
+        return _registry
@@ -0,0 +1,83 @@
+"""
+Benchmark: latência por conversão, subprocesso por chamada vs pandoc server.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_pandoc_server.py --iterations 50 --to html
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import pypandoc  # noqa: E402
+
+from converter.pandoc_engine import ensure_pandoc, run_pandoc  # noqa: E402
+from converter.pandoc_server import PandocServerError, PandocServerPool  # noqa: E402
+
+SAMPLE = "\n\n".join(
+    f"## Seção {i}\n\nParágrafo com *ênfase* e `código` número {i}.\n\n- item\n- item"
+    for i in range(20)
+)
+
+
+def _summary(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    return (
+        f"média={statistics.mean(ordered) * 1000:.1f}ms "
+        f"p50={statistics.median(ordered) * 1000:.1f}ms "
+        f"p95={p95 * 1000:.1f}ms"
+    )
+
+
+def bench_subprocess(source: Path, output_format: str, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        run_pandoc([str(source), "-f", "markdown", "-t", output_format])
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_server(text: bytes, output_format: str, iterations: int) -> list[float]:
+    pool = PandocServerPool([pypandoc.get_pandoc_path(), "server"], 1, 60)
+    if not pool.start():
+        raise PandocServerError("pandoc server indisponível neste ambiente")
+    try:
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            pool.convert(text, "markdown", output_format)
+            samples.append(time.perf_counter() - start)
+        return samples
+    finally:
+        pool.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--to", default="html", help="Formato de saída Pandoc")
+    args = parser.parse_args()
+
+    ensure_pandoc()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = Path(tmpdir) / "bench.md"
+        source.write_text(SAMPLE, encoding="utf-8")
+        print(f"subprocesso: {_summary(bench_subprocess(source, args.to, args.iterations))}")
+    try:
+        samples = bench_server(SAMPLE.encode("utf-8"), args.to, args.iterations)
+    except PandocServerError as exc:
+        print(f"server: não executado ({exc})")
+        return 1
+    print(f"server:      {_summary(samples)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
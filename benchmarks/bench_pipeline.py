@@ -0,0 +1,565 @@
+"""
+Benchmark do pipeline de conversão: latência, throughput e memória.
+
+Gera corpora sintéticos (Markdown pequeno/médio/enorme com tabelas, código e
+imagens; HTML, RST e LaTeX derivados; templates DOCX de tamanhos variados) e
+mede:
+
+- pandoc:   PandocEngine.convert (cada formato de entrada -> HTML e DOCX)
+- pdf:      pdf_engine.convert_to_pdf_bytes, inteiro e em blocos
+            (pdf_chunked, com o número de workers de PDF_CHUNK_WORKERS)
+- pdf_engines: motor markdown-pdf vs caminho direto HTML -> PyMuPDF, para
+            entradas Markdown e HTML, com latência e fidelidade (páginas,
+            sumário e proporção das palavras da origem presentes no PDF)
+- ast_cache: reconversão de Markdown com uma seção editada a cada rodada,
+            via cache de AST por trecho (compare com pandoc/*/markdown)
+- fast_path: Markdown simples -> HTML/texto pelo conversor em processo
+            (markdown-it) vs Pandoc, com um texto novo a cada rodada
+- images:   Markdown com capturas de tela (data URIs) -> PDF/DOCX, com as
+            imagens originais, reduzidas (cache vazio) e reduzidas a partir
+            do cache de imagens, com o tamanho da saída
+- startup:  importação de main e inicialização (lifespan) em processo novo
+- merge:    docx_merge.merge_with_template_to_buffer e, como no serviço,
+            DocxTemplate.merge com o template já preparado (merge_prepared),
+            com templates de tamanhos variados e com uma fonte embutida de
+            8MB (sufixo +fonte); merge_sections monta um relatório de 10
+            seções num único merge (sections-10) e encadeando 10 merges, um
+            por placeholder (chained-10)
+- api:      POST /api/convert completo, via cliente ASGI em processo,
+            com N clientes concorrentes (cache de resultados desativado)
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_pipeline.py --sizes small,medium --output atual.json
+    python benchmarks/bench_pipeline.py --baseline base.json --threshold 0.2
+
+Com --baseline, termina com código 1 se o p50 ou o p95 de algum cenário
+piorar mais do que --threshold (fração) em relação à execução de referência.
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import itertools
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_PATH = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_PATH))
+
+import httpx  # noqa: E402
+import pymupdf  # noqa: E402
+
+from api.dependencies import (  # noqa: E402
+    get_admission_controller,
+    get_result_cache,
+    shutdown_conversion_executor,
+)
+from converter import images  # noqa: E402
+from converter.ast_cache import AstCache  # noqa: E402
+from converter.converter_registry import get_converter_registry  # noqa: E402
+from converter.docx_merge import merge_with_template_to_buffer  # noqa: E402
+from converter.docx_template import DocxTemplate  # noqa: E402
+from converter.pandoc_engine import PandocEngine, ensure_pandoc  # noqa: E402
+from config import API_KEY_HEADER, PDF_CHUNK_BYTES, PDF_CHUNK_WORKERS  # noqa: E402
+from converter.pdf_chunked import render_markdown_to_pdf_chunked  # noqa: E402
+from converter.pdf_engine import (  # noqa: E402
+    convert_bytes_to_pdf,
+    convert_bytes_to_pdf_direct,
+    convert_to_pdf_bytes,
+)
+from corpus import SIZES, build_corpus, template_document  # noqa: E402
+from domain.models import ConvertRequest  # noqa: E402
+from main import app  # noqa: E402
+from services.admission import AdmissionController  # noqa: E402
+from services.convert_service import ConvertService  # noqa: E402
+from services.cost_estimator import get_cost_estimator  # noqa: E402
+from services.result_cache import ResultCache, engine_version  # noqa: E402
+
+SCENARIOS = (
+    "pandoc",
+    "pdf",
+    "pdf_engines",
+    "ast_cache",
+    "fast_path",
+    "images",
+    "startup",
+    "merge",
+    "api",
+)
+COMPARED_METRICS = ("p50_ms", "p95_ms")
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """Percentil por interpolação linear entre as amostras ordenadas."""
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples: list[float], wall_seconds: float) -> dict:
+    """Estatísticas de latência (ms) e throughput (operações/s)."""
+    return {
+        "n": len(samples),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+        "throughput_per_s": round(len(samples) / wall_seconds, 2),
+    }
+
+
+def peak_rss_mb() -> dict:
+    """Pico de memória residente do processo e dos filhos (Pandoc, workers)."""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {
+        "self_mb": round(own / scale, 1),
+        "children_mb": round(children / scale, 1),
+    }
+
+
+def time_sync(operation: Callable[[], object], iterations: int) -> dict:
+    """Executa a operação em série, com uma rodada de aquecimento."""
+    operation()
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        begin = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - begin)
+    return summarize(samples, time.perf_counter() - start)
+
+
+def bench_pandoc(corpus: dict, iterations: int, workdir: Path) -> dict:
+    results = {}
+    for size, files in corpus.items():
+        for input_format in ("markdown", "html", "rst", "latex"):
+            for output_format in ("html", "docx"):
+                output = workdir / f"out-{size}-{input_format}.{output_format}"
+                results[f"pandoc/{size}/{input_format}->{output_format}"] = time_sync(
+                    lambda: PandocEngine.convert(
+                        files[input_format],
+                        output_format,
+                        output_path=output,
+                        input_format=input_format,
+                    ),
+                    iterations,
+                )
+    return results
+
+
+def bench_pdf(corpus: dict, iterations: int) -> dict:
+    results = {}
+    for size, files in corpus.items():
+        results[f"pdf/{size}/markdown"] = time_sync(
+            lambda: convert_to_pdf_bytes(files["markdown"], "markdown"), iterations
+        )
+        markdown = files["markdown"].read_text(encoding="utf-8")
+        results[f"pdf_chunked/{size}/markdown"] = time_sync(
+            lambda: render_markdown_to_pdf_chunked(
+                markdown, io.BytesIO(), PDF_CHUNK_BYTES, PDF_CHUNK_WORKERS
+            ),
+            iterations,
+        )
+    return results
+
+
+def _word_recall(reference: str, pdf: bytes) -> float:
+    """Fração das palavras do texto de referência presentes no PDF."""
+    expected = Counter(reference.split())
+    document = pymupdf.open(stream=pdf)
+    found = Counter("".join(page.get_text() for page in document).split())
+    return sum((expected & found).values()) / max(1, sum(expected.values()))
+
+
+def bench_pdf_engines(corpus: dict, iterations: int) -> dict:
+    engines = {"markdown": convert_bytes_to_pdf, "html": convert_bytes_to_pdf_direct}
+    results = {}
+    for size, files in corpus.items():
+        reference = PandocEngine.convert_bytes(
+            files["markdown"].read_bytes(), "plain", input_format="markdown"
+        ).decode("utf-8")
+        for input_format in ("markdown", "html"):
+            source = files[input_format].read_bytes()
+            for engine, convert in engines.items():
+                stats = time_sync(lambda: convert(source, input_format), iterations)
+                pdf = convert(source, input_format)
+                document = pymupdf.open(stream=pdf)
+                stats.update(
+                    pages=document.page_count,
+                    toc_entries=len(document.get_toc()),
+                    bytes=len(pdf),
+                    word_recall=round(_word_recall(reference, pdf), 3),
+                )
+                results[f"pdf_engines/{size}/{input_format}/{engine}"] = stats
+    return results
+
+
+def bench_ast_cache(corpus: dict, iterations: int) -> dict:
+    results = {}
+    for size, files in corpus.items():
+        markdown = files["markdown"].read_text(encoding="utf-8")
+        for output_format in ("html", "docx"):
+            cache = AstCache(min_bytes=0)
+            rounds = itertools.count()
+
+            def convert_edited() -> bytes:
+                # Cada rodada altera a mesma seção com um texto novo
+                source = markdown.replace(
+                    "## Seção 1\n", f"## Seção 1 (edição {next(rounds)})\n", 1
+                ).encode("utf-8")
+                return cache.convert(
+                    source, output_format
+                ) or PandocEngine.convert_bytes(source, output_format)
+
+            results[f"ast_cache/{size}/markdown->{output_format}"] = time_sync(
+                convert_edited, iterations
+            )
+    return results
+
+
+def _simple_markdown(sections: int) -> str:
+    """Markdown só com recursos que o conversor em processo atende."""
+    return "".join(
+        f"## Seção {i}\n\nTexto *simples* da seção {i}, com **ênfase**, "
+        f"`código` e [link](https://example.com/{i}). " * 3
+        + f"\n\n- item {i}\n- outro item\n\n> Citação da seção {i}.\n\n"
+        for i in range(sections)
+    )
+
+
+def bench_fast_path(iterations: int) -> dict:
+    results = {}
+    registry = get_converter_registry()
+    for size, sections in (("small", 10), ("medium", 200)):
+        markdown = _simple_markdown(sections)
+        for output_format in ("html", "txt"):
+            rounds = itertools.count()
+
+            def edited() -> bytes:
+                # Texto novo a cada rodada: sem reaproveitar a análise anterior
+                return f"{markdown}Rodada {next(rounds)}.\n".encode("utf-8")
+
+            def fast() -> bytes:
+                source = edited()
+                converter = registry.select("markdown", output_format, source)
+                return converter.convert(source)
+
+            name = f"fast_path/{size}/markdown->{output_format}"
+            results[name] = time_sync(fast, iterations)
+            results[f"{name}/pandoc"] = time_sync(
+                lambda: PandocEngine.convert_bytes(edited(), output_format),
+                iterations,
+            )
+    return results
+
+
+def _screenshots_markdown(count: int) -> bytes:
+    """Markdown com capturas de tela largas embutidas (PNG e JPEG)."""
+    parts = []
+    for i in range(count):
+        # Página de texto renderizada em alta resolução: texto com
+        # antialiasing, como numa captura de tela real
+        with pymupdf.open() as document:
+            page = document.new_page(width=640, height=360)
+            text = " ".join(f"campo{j}={j * (i + 7)}" for j in range(400))
+            page.insert_textbox(page.rect + (20, 20, -20, -20), text, fontsize=9)
+            pixmap = page.get_pixmap(dpi=288)
+        output, mime = ("png", "png") if i % 2 else ("jpg", "jpeg")
+        encoded = base64.b64encode(pixmap.tobytes(output)).decode()
+        parts.append(
+            f"# Tela {i}\n\n![tela {i}](data:image/{mime};base64,{encoded})\n\n"
+        )
+    return "".join(parts).encode("utf-8")
+
+
+def bench_images(iterations: int) -> dict:
+    results = {}
+    service = ConvertService()
+    source = _screenshots_markdown(6)
+    dpi = images.IMAGE_DPI
+    for output_format in ("pdf", "docx"):
+        request = ConvertRequest(
+            source_content=source,
+            source_filename="telas.md",
+            output_format=output_format,
+        )
+
+        def convert(fresh_cache: bool) -> bytes:
+            if fresh_cache:
+                images._cache = images.ImageCache()
+            return service.execute(request).read_content()
+
+        variants = {
+            "original": (0, False),
+            "reduzida": (dpi, True),
+            "reduzida-cache": (dpi, False),
+        }
+        for label, (variant_dpi, fresh_cache) in variants.items():
+            images.IMAGE_DPI = variant_dpi
+            try:
+                stats = time_sync(lambda: convert(fresh_cache), iterations)
+                stats["output_bytes"] = len(convert(False))
+            finally:
+                images.IMAGE_DPI = dpi
+            results[f"images/markdown->{output_format}/{label}"] = stats
+    return results
+
+
+_STARTUP_CODE = {
+    "import": "import main",
+    "lifespan": (
+        "import asyncio, main\n"
+        "async def start():\n"
+        "    async with main.lifespan(main.app):\n"
+        "        pass\n"
+        "asyncio.run(start())"
+    ),
+}
+
+
+def bench_startup(iterations: int) -> dict:
+    results = {}
+    for name, code in _STARTUP_CODE.items():
+        results[f"startup/{name}"] = time_sync(
+            lambda: subprocess.run(
+                [sys.executable, "-c", code],
+                cwd=BACKEND_PATH,
+                capture_output=True,
+                check=True,
+            ),
+            iterations,
+        )
+    return results
+
+
+def bench_merge(corpus: dict, iterations: int, workdir: Path) -> dict:
+    results = {}
+    for size, files in corpus.items():
+        content = workdir / f"content-{size}.docx"
+        PandocEngine.convert(files["markdown"], "docx", output_path=content)
+        content_bytes = content.read_bytes()
+        for template_size, template_files in corpus.items():
+            for kind, suffix in (("template", ""), ("template_font", "+fonte")):
+                path = template_files[kind]
+                name = f"{size}/template-{template_size}{suffix}"
+                results[f"merge/{name}"] = time_sync(
+                    lambda: merge_with_template_to_buffer(path, content),
+                    iterations,
+                )
+                prepared = DocxTemplate(path.read_bytes())
+                results[f"merge_prepared/{name}"] = time_sync(
+                    lambda: prepared.merge(content_bytes), iterations
+                )
+        results.update(_bench_sections(size, content_bytes, iterations))
+    return results
+
+
+def _bench_sections(size: str, content: bytes, iterations: int) -> dict:
+    """Relatório de 10 seções: um merge com tudo vs 10 merges encadeados."""
+    names = [f"{{{{SECAO{i}}}}}" for i in range(10)]
+    report = template_document(2, "\n\n".join(names))
+
+    def chained() -> bytes:
+        document = report
+        for name in names:
+            document = DocxTemplate(document, name).merge(content)
+        return document
+
+    prepared = DocxTemplate(report, names)
+    return {
+        f"merge_sections/{size}/sections-10": time_sync(
+            lambda: prepared.merge(dict.fromkeys(names, content)), iterations
+        ),
+        f"merge_sections/{size}/chained-10": time_sync(chained, iterations),
+    }
+
+
+async def _api_round(
+    client: httpx.AsyncClient, payload: dict, clients: int, iterations: int
+) -> dict:
+    samples: list[float] = []
+
+    async def worker(index: int, count: int) -> None:
+        # Cada worker é um cliente distinto para o controle de admissão
+        headers = {API_KEY_HEADER: f"bench-{index}"}
+        for _ in range(count):
+            begin = time.perf_counter()
+            response = await client.post("/api/convert", headers=headers, **payload)
+            samples.append(time.perf_counter() - begin)
+            if response.status_code != 200:
+                raise RuntimeError(
+                    f"/api/convert retornou {response.status_code}: {response.text}"
+                )
+
+    per_client = max(1, iterations // clients)
+    await client.post("/api/convert", **payload)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i, per_client) for i in range(clients)))
+    return summarize(samples, time.perf_counter() - start)
+
+
+async def _bench_api(corpus: dict, iterations: int, concurrency: list[int]) -> dict:
+    # Cache desativado: toda requisição passa pelo pipeline inteiro
+    app.dependency_overrides[get_result_cache] = lambda: ResultCache(max_bytes=0)
+    # Sem token bucket (rate=0) e com fila para todos os clientes: mede o
+    # pipeline, não o limite de taxa nem a fila justa
+    admission = AdmissionController(
+        rate=0, max_queued=max(concurrency), estimator=get_cost_estimator()
+    )
+    app.dependency_overrides[get_admission_controller] = lambda: admission
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=600
+        ) as client:
+            for size, files in corpus.items():
+                source = files["markdown"].read_bytes()
+                template = files["template"].read_bytes()
+                cases = {
+                    "md->html": {"data": {"output_format": "html"}},
+                    "md->pdf": {"data": {"output_format": "pdf"}},
+                    "md->docx+template": {
+                        "data": {"output_format": "docx"},
+                        "template": template,
+                    },
+                }
+                for name, case in cases.items():
+                    files_field = {"source_file": (f"{size}.md", source, "text/markdown")}
+                    if "template" in case:
+                        files_field["template_file"] = ("base.docx", case["template"])
+                    payload = {"data": case["data"], "files": files_field}
+                    for clients in concurrency:
+                        key = f"api/{size}/{name}/c{clients}"
+                        results[key] = await _api_round(
+                            client, payload, clients, iterations
+                        )
+    finally:
+        app.dependency_overrides.pop(get_result_cache, None)
+        app.dependency_overrides.pop(get_admission_controller, None)
+        shutdown_conversion_executor()
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Lista as regressões acima do limiar entre duas execuções."""
+    regressions = []
+    for name, stats in current["results"].items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = reference[metric], stats[metric]
+            if before > 0 and (after - before) / before > threshold:
+                regressions.append(
+                    f"{name}: {metric} {before:.1f}ms -> {after:.1f}ms "
+                    f"(+{(after - before) / before:.0%})"
+                )
+    return regressions
+
+
+def _csv(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", default="small,medium", help=f"Entre {list(SIZES)}")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument(
+        "--concurrency", default="1,4", help="Clientes simultâneos no cenário api"
+    )
+    parser.add_argument("--output", type=Path, help="Arquivo JSON de resultados")
+    parser.add_argument("--baseline", type=Path, help="JSON de referência")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    sizes = _csv(args.sizes)
+    scenarios = _csv(args.scenarios)
+    unknown = [s for s in sizes if s not in SIZES] + [
+        s for s in scenarios if s not in SCENARIOS
+    ]
+    if unknown:
+        parser.error(f"valores desconhecidos: {', '.join(unknown)}")
+
+    ensure_pandoc()
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workdir = Path(tmpdir)
+        corpus = build_corpus(workdir, sizes)
+        if "pandoc" in scenarios:
+            results.update(bench_pandoc(corpus, args.iterations, workdir))
+        if "pdf" in scenarios:
+            results.update(bench_pdf(corpus, args.iterations))
+        if "pdf_engines" in scenarios:
+            results.update(bench_pdf_engines(corpus, args.iterations))
+        if "ast_cache" in scenarios:
+            results.update(bench_ast_cache(corpus, args.iterations))
+        if "fast_path" in scenarios:
+            results.update(bench_fast_path(args.iterations))
+        if "images" in scenarios:
+            results.update(bench_images(args.iterations))
+        if "startup" in scenarios:
+            results.update(bench_startup(args.iterations))
+        if "merge" in scenarios:
+            results.update(bench_merge(corpus, args.iterations, workdir))
+        if "api" in scenarios:
+            concurrency = [int(c) for c in _csv(args.concurrency)]
+            results.update(
+                asyncio.run(_bench_api(corpus, args.iterations, concurrency))
+            )
+
+    report = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "engines": engine_version(),
+            "iterations": args.iterations,
+            "sizes": sizes,
+            "peak_rss": peak_rss_mb(),
+        },
+        "results": results,
+    }
+    for name, stats in results.items():
+        print(
+            f"{name:48} p50={stats['p50_ms']:>9.1f}ms p95={stats['p95_ms']:>9.1f}ms "
+            f"p99={stats['p99_ms']:>9.1f}ms {stats['throughput_per_s']:>8.1f}/s"
+        )
+    print(f"pico de RSS: {report['meta']['peak_rss']}")
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSÃO {line}")
+        if regressions:
+            return 1
+        print(f"sem regressões acima de {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
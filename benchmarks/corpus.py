@@ -0,0 +1,118 @@
+"""Corpora sintéticos para os benchmarks do pipeline de conversão."""
+
+import base64
+import io
+import os
+import zipfile
+import zlib
+from pathlib import Path
+
+from converter.pandoc_engine import PandocEngine
+
+# Número de seções por tamanho de documento
+SIZES = {"small": 5, "medium": 60, "huge": 600}
+# Parágrafos de enchimento por tamanho de template DOCX
+TEMPLATE_SIZES = {"small": 2, "medium": 200, "huge": 2000}
+# Fonte embutida (bytes aleatórios, incompressíveis) do template "pesado"
+TEMPLATE_MEDIA_BYTES = 8 * 1024 * 1024
+# Formatos de entrada derivados do Markdown (formato Pandoc, extensão)
+DERIVED_FORMATS = {"html": ".html", "rst": ".rst", "latex": ".tex"}
+
+
+def _png(width: int = 16, height: int = 16) -> bytes:
+    """PNG RGB mínimo (gradiente), sem dependências externas."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return (
+            len(data).to_bytes(4, "big")
+            + body
+            + zlib.crc32(body).to_bytes(4, "big")
+        )
+
+    rows = b"".join(
+        b"\x00"
+        + b"".join(bytes((x * 16 % 256, y * 16 % 256, 128)) for x in range(width))
+        for y in range(height)
+    )
+    header = (
+        width.to_bytes(4, "big") + height.to_bytes(4, "big") + b"\x08\x02\x00\x00\x00"
+    )
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+IMAGE_DATA_URI = "data:image/png;base64," + base64.b64encode(_png()).decode()
+
+
+def markdown_document(sections: int) -> str:
+    """Markdown com títulos, listas, tabelas, blocos de código e imagens."""
+    parts = ["# Documento de benchmark\n"]
+    for i in range(sections):
+        parts.append(
+            f"## Seção {i}\n\n"
+            f"Parágrafo com *ênfase*, **negrito**, `código` e um "
+            f"[link](https://example.com/{i}). " * 3
+            + "\n\n"
+            "- item um\n- item dois\n  - subitem\n\n"
+            "| Coluna A | Coluna B | Coluna C |\n"
+            "|----------|---------:|:--------:|\n"
+            + "".join(f"| a{i}.{row} | {row * i} | c |\n" for row in range(4))
+            + "\n```python\n"
+            f"def funcao_{i}(x):\n    return x * {i}\n"
+            "```\n\n"
+            f"![Figura {i}]({IMAGE_DATA_URI})\n"
+        )
+    return "\n".join(parts)
+
+
+def template_document(paragraphs: int, placeholder: str = "{{CONTEUDO}}") -> bytes:
+    """Template DOCX com capa, enchimento e o placeholder no meio."""
+    filler = "\n\n".join(
+        f"Parágrafo de template {i} com texto fixo de cabeçalho."
+        for i in range(paragraphs)
+    )
+    markdown = f"# Capa\n\n{filler}\n\n{placeholder}\n\nFim do template."
+    return PandocEngine.convert_bytes(markdown.encode("utf-8"), "docx")
+
+
+def with_embedded_font(docx: bytes, size: int = TEMPLATE_MEDIA_BYTES) -> bytes:
+    """Cópia do DOCX com uma fonte embutida de `size` bytes."""
+    output = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(docx)) as src, zipfile.ZipFile(
+        output, "w", zipfile.ZIP_DEFLATED
+    ) as dst:
+        for info in src.infolist():
+            dst.writestr(info, src.read(info))
+        dst.writestr("word/fonts/font1.odttf", os.urandom(size))
+    return output.getvalue()
+
+
+def build_corpus(directory: Path, sizes: list[str]) -> dict[str, dict[str, Path]]:
+    """
+    Gera os arquivos do corpus em `directory`.
+
+    Returns:
+        {tamanho: {"markdown": path, "html": path, ..., "template": path,
+                   "template_font": path}}
+    """
+    corpus: dict[str, dict[str, Path]] = {}
+    for size in sizes:
+        markdown = markdown_document(SIZES[size]).encode("utf-8")
+        files = {"markdown": directory / f"{size}.md"}
+        files["markdown"].write_bytes(markdown)
+        for pandoc_format, ext in DERIVED_FORMATS.items():
+            path = directory / f"{size}{ext}"
+            path.write_bytes(PandocEngine.convert_bytes(markdown, pandoc_format))
+            files[pandoc_format] = path
+        files["template"] = directory / f"template-{size}.docx"
+        template = template_document(TEMPLATE_SIZES[size])
+        files["template"].write_bytes(template)
+        files["template_font"] = directory / f"template-{size}-fonte.docx"
+        files["template_font"].write_bytes(with_embedded_font(template))
+        corpus[size] = files
+    return corpus
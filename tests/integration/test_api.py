@@ -1,9 +1,19 @@
 """Testes de integração da API."""
 
+import io
+import json
+import time
+import zipfile
+
 import pytest
 from fastapi.testclient import TestClient
 
+from api.dependencies import get_admission_controller, get_result_cache
+from converter.pandoc_engine import PandocEngine
 from main import app
+from services.admission import AdmissionController
+from services.result_cache import ResultCache
+from services.template_registry import TemplateRegistry
 
 client = TestClient(app)
 
@@ -23,6 +33,12 @@ class TestHealthCheck:
         assert "status" in response.json()
         assert "service" in response.json()
 
+    def test_health_informa_os_motores(self):
+        engines = client.get("/health").json()["engines"]
+        assert engines["pandoc"]["available"] is True
+        assert engines["pandoc"]["version"]
+        assert set(engines) >= {"markdown-pdf", "pymupdf", "docx-merge"}
+
 
 class TestFormatsEndpoint:
     """Testes do endpoint de formatos."""
@@ -40,6 +56,14 @@ class TestFormatsEndpoint:
         assert "from_md" in data
         assert "to_md" in data
 
+    def test_lista_formatos_inclui_capacidades_do_pandoc(self):
+        data = client.get("/api/formats").json()
+        pandoc = data["engines"]["pandoc"]
+        assert "markdown" in pandoc["input_formats"]
+        assert "docx" in pandoc["output_formats"]
+        assert "pdf" in data["output_formats"]
+        assert data["converters"]["markdown->html"] == ["markdown-it", "pandoc"]
+
 
 class TestConvertEndpoint:
     """Testes do endpoint de conversão."""
@@ -59,3 +83,383 @@ class TestConvertEndpoint:
         )
         assert response.status_code == 400
         assert "Formato inválido" in response.json()["detail"]
+
+    def test_convert_markdown_para_html(self):
+        response = client.post(
+            "/api/convert",
+            data={"output_format": "html"},
+            files={"source_file": ("test.md", b"# Hello", "text/markdown")},
+        )
+        assert response.status_code == 200
+        assert b"Hello" in response.content
+        assert "test.html" in response.headers["content-disposition"]
+
+    def test_convert_repetido_usa_cache_e_etag(self):
+        files = {"source_file": ("cache.md", b"# Cache hit", "text/markdown")}
+        first = client.post("/api/convert", data={"output_format": "rst"}, files=files)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+
+        second = client.post("/api/convert", data={"output_format": "rst"}, files=files)
+        assert second.headers["x-cache"] == "HIT"
+        assert second.content == first.content
+
+        not_modified = client.post(
+            "/api/convert",
+            data={"output_format": "rst"},
+            files=files,
+            headers={"If-None-Match": etag},
+        )
+        assert not_modified.status_code == 304
+
+    def test_convert_rejeita_origem_acima_do_limite(self):
+        response = client.post(
+            "/api/convert",
+            data={"output_format": "html"},
+            files={"source_file": ("big.md", b"x" * (11 * 1024 * 1024), "text/markdown")},
+        )
+        assert response.status_code == 413
+        assert "muito grande" in response.json()["detail"]
+
+
+class TestStreamingResponse:
+    """Resultados grandes são enviados em streaming a partir de arquivo."""
+
+    @pytest.fixture(autouse=True)
+    def small_spool_threshold(self, monkeypatch):
+        monkeypatch.setattr("services.convert_service.RESULT_SPOOL_THRESHOLD_BYTES", 16)
+
+    def test_resposta_em_arquivo_e_removido(self):
+        response = client.post(
+            "/api/convert",
+            data={"output_format": "html"},
+            files={"source_file": ("stream.md", b"# Streaming\n\ncorpo", "text/markdown")},
+        )
+        assert response.status_code == 200
+        assert b"Streaming" in response.content
+        assert response.headers["accept-ranges"] == "bytes"
+
+    def test_suporta_range(self):
+        response = client.post(
+            "/api/convert",
+            data={"output_format": "html"},
+            files={"source_file": ("range.md", b"# Range\n\ncorpo", "text/markdown")},
+            headers={"Range": "bytes=0-3"},
+        )
+        assert response.status_code == 206
+        assert response.content == b"<h1 "
+
+    def test_retomada_de_resultado_em_arquivo_vem_do_cache(self, tmp_path):
+        cache = ResultCache(disk_dir=tmp_path)
+        app.dependency_overrides[get_result_cache] = lambda: cache
+        try:
+            responses = [
+                client.post(
+                    "/api/convert",
+                    data={"output_format": "html"},
+                    files={
+                        "source_file": ("retoma.md", b"# Retoma\n\nx", "text/markdown")
+                    },
+                    headers={"Range": f"bytes={start}-"},
+                )
+                for start in (0, 4)
+            ]
+        finally:
+            app.dependency_overrides.pop(get_result_cache)
+        assert [r.headers["x-cache"] for r in responses] == ["MISS", "HIT"]
+        assert responses[1].status_code == 206
+        assert responses[0].content[4:] == responses[1].content
+
+
+class TestTemplatesEndpoint:
+    """Templates registrados e conversão por template_id."""
+
+    @pytest.fixture(autouse=True)
+    def registry(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(
+            "services.template_registry._registry", TemplateRegistry(tmp_path)
+        )
+
+    @pytest.fixture
+    def template(self) -> bytes:
+        return PandocEngine.convert_bytes(b"Capa\n\n{{CONTEUDO}}", "docx")
+
+    def test_registra_e_converte_por_id(self, template):
+        created = client.post(
+            "/api/templates",
+            files={"template_file": ("base.docx", template, "application/octet-stream")},
+        )
+        assert created.status_code == 201
+        template_id = created.json()["template_id"]
+        assert client.get(f"/api/templates/{template_id}").status_code == 200
+
+        response = client.post(
+            "/api/convert",
+            data={"output_format": "docx", "template_id": template_id},
+            files={"source_file": ("doc.md", b"# Corpo", "text/markdown")},
+        )
+        assert response.status_code == 200
+        assert response.content.startswith(b"PK")
+
+        assert client.delete(f"/api/templates/{template_id}").status_code == 204
+        assert client.get(f"/api/templates/{template_id}").status_code == 404
+
+    def test_varias_origens_no_mesmo_template(self):
+        template = PandocEngine.convert_bytes(
+            b"Capa\n\n{{INTRO}}\n\n{{RESULTADOS}}\n\nFim", "docx"
+        )
+        response = client.post(
+            "/api/convert",
+            data={
+                "output_format": "docx",
+                "placeholder": "{{INTRO}}",
+                "section_placeholders": "{{RESULTADOS}}",
+            },
+            files=[
+                ("source_file", ("intro.md", b"alfa", "text/markdown")),
+                ("template_file", ("base.docx", template, "application/octet-stream")),
+                ("section_files", ("resultados.rst", b"beta", "text/x-rst")),
+            ],
+        )
+        assert response.status_code == 200
+        text = PandocEngine.convert_bytes(
+            response.content, "plain", input_format="docx"
+        ).decode()
+        assert text.split() == ["Capa", "alfa", "beta", "Fim"]
+
+        response = client.post(
+            "/api/convert",
+            data={"output_format": "html", "section_placeholders": "{{RESULTADOS}}"},
+            files=[
+                ("source_file", ("intro.md", b"alfa", "text/markdown")),
+                ("section_files", ("resultados.md", b"beta", "text/markdown")),
+            ],
+        )
+        assert response.status_code == 400
+
+    def test_secoes_demais_retornam_413(self, monkeypatch):
+        monkeypatch.setattr("api.routes.MAX_SECTIONS", 1)
+        response = client.post(
+            "/api/convert",
+            data={"output_format": "docx", "section_placeholders": "{{A}},{{B}}"},
+            files=[
+                ("source_file", ("intro.md", b"alfa", "text/markdown")),
+                ("section_files", ("a.md", b"beta", "text/markdown")),
+                ("section_files", ("b.md", b"gama", "text/markdown")),
+            ],
+        )
+        assert response.status_code == 413
+
+    def test_template_id_inexistente_retorna_404(self):
+        response = client.post(
+            "/api/convert",
+            data={"output_format": "docx", "template_id": "0" * 32},
+            files={"source_file": ("doc.md", b"# Corpo", "text/markdown")},
+        )
+        assert response.status_code == 404
+
+    def test_template_invalido_retorna_400(self):
+        response = client.post(
+            "/api/templates",
+            files={"template_file": ("base.docx", b"nada", "application/octet-stream")},
+        )
+        assert response.status_code == 400
+
+
+class TestBatchEndpoint:
+    """Conversão em lote com resposta em zip."""
+
+    def test_converte_arquivos_e_zip(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("docs/a.md", "# A")
+        response = client.post(
+            "/api/convert/batch",
+            data={"output_format": "html"},
+            files=[
+                ("source_files", ("b.md", b"# B", "text/markdown")),
+                ("source_files", ("docs.zip", buffer.getvalue(), "application/zip")),
+            ],
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        assert sorted(archive.namelist()) == ["b.html", "docs/a.html", "manifest.json"]
+        assert json.loads(archive.read("manifest.json"))["succeeded"] == 2
+
+    def test_formato_invalido_retorna_400(self):
+        response = client.post(
+            "/api/convert/batch",
+            data={"output_format": "invalid"},
+            files=[("source_files", ("b.md", b"# B", "text/markdown"))],
+        )
+        assert response.status_code == 400
+
+
+class TestExportEndpoint:
+    """Exportação para vários formatos em uma requisição."""
+
+    def test_exporta_formatos_em_zip(self):
+        response = client.post(
+            "/api/convert/export",
+            data={"output_formats": "docx, html,pdf,html"},
+            files={"source_file": ("livro.md", b"# Livro\n\nTexto", "text/markdown")},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+        assert "livro.zip" in response.headers["content-disposition"]
+        assert response.headers["x-cache"].startswith("docx=")
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        assert archive.namelist() == ["livro.docx", "livro.html", "livro.pdf"]
+        assert b"Texto" in archive.read("livro.html")
+        assert archive.read("livro.pdf").startswith(b"%PDF")
+
+    def test_multipart_quando_pedido_no_accept(self):
+        response = client.post(
+            "/api/convert/export",
+            data={"output_formats": "html,txt"},
+            files={"source_file": ("nota.md", b"# Nota", "text/markdown")},
+            headers={"Accept": "multipart/mixed"},
+        )
+        assert response.status_code == 200
+        content_type = response.headers["content-type"]
+        assert content_type.startswith("multipart/mixed; boundary=")
+        boundary = content_type.split("boundary=")[1].encode()
+        parts = response.content.split(b"--" + boundary)
+        assert len(parts) == 4 and parts[-1] == b"--\r\n"
+        assert b'filename="nota.html"' in parts[1]
+        assert parts[2].endswith(b"Nota\n\r\n")
+
+    def test_formato_invalido_retorna_400(self):
+        response = client.post(
+            "/api/convert/export",
+            data={"output_formats": "html,invalid"},
+            files={"source_file": ("nota.md", b"# Nota", "text/markdown")},
+        )
+        assert response.status_code == 400
+
+
+class TestJobsEndpoint:
+    """Jobs assíncronos: submissão, consulta e resultado."""
+
+    def test_cria_job_e_baixa_resultado(self):
+        with TestClient(app) as jobs_client:
+            created = jobs_client.post(
+                "/api/jobs",
+                data={"output_format": "html"},
+                files={"source_file": ("job.md", b"# Job", "text/markdown")},
+            )
+            assert created.status_code == 202
+            job_id = created.json()["job_id"]
+            assert created.headers["location"] == f"/api/jobs/{job_id}"
+
+            for _ in range(200):
+                status = jobs_client.get(f"/api/jobs/{job_id}").json()
+                if status["status"] in ("done", "failed"):
+                    break
+                time.sleep(0.01)
+            assert status["status"] == "done"
+
+            result = jobs_client.get(f"/api/jobs/{job_id}/result")
+            assert result.status_code == 200
+            assert b"Job" in result.content
+            assert "job.html" in result.headers["content-disposition"]
+
+    def test_job_inexistente_retorna_404(self):
+        assert client.get("/api/jobs/nao-existe").status_code == 404
+
+
+class TestMetricsEndpoint:
+    """Métricas Prometheus e Server-Timing."""
+
+    def test_conversao_expoe_server_timing_e_metricas(self):
+        response = client.post(
+            "/api/convert",
+            data={"output_format": "rst"},
+            files={"source_file": ("metricas.md", b"# Metricas", "text/markdown")},
+        )
+        assert "pandoc;dur=" in response.headers["server-timing"]
+
+        metrics = client.get("/metrics")
+        assert metrics.status_code == 200
+        assert 'stage="pandoc"' in metrics.text
+        assert "converter_queue_depth" in metrics.text
+        assert "converter_engine_conversions_total" in metrics.text
+
+    def test_formato_invalido_nao_vira_rotulo(self):
+        response = client.post(
+            "/api/convert",
+            data={"output_format": "zzjunk123"},
+            files={"source_file": ("lixo.md", b"# Lixo", "text/markdown")},
+        )
+        assert response.status_code == 400
+        assert "zzjunk123" not in client.get("/metrics").text
+
+    def test_header_informa_o_motor(self):
+        response = client.post(
+            "/api/convert",
+            data={"output_format": "html"},
+            files={"source_file": ("motor.md", b"# Motor\n\ntexto", "text/markdown")},
+        )
+        assert response.status_code == 200
+        assert response.headers["x-converter-engine"] == "markdown-it"
+        assert "fast_path;dur=" in response.headers["server-timing"]
+
+
+class TestAdmissionEndpoint:
+    """Limites por cliente e estado da fila."""
+
+    def test_estado_identifica_o_cliente(self):
+        stats = client.get("/api/admission").json()
+        assert stats["client"] == "ip:testclient"
+        assert {"rate_per_second", "slots", "queued", "clients"} <= set(stats)
+
+        keyed = client.get("/api/admission", headers={"X-API-Key": "segredo"})
+        assert keyed.json()["client"].startswith("key:")
+
+    def test_cliente_acima_do_limite_recebe_429(self):
+        limited = AdmissionController(rate=1, burst=1, slots=1)
+        app.dependency_overrides[get_admission_controller] = lambda: limited
+        try:
+            responses = [
+                client.post(
+                    "/api/convert",
+                    data={"output_format": "txt"},
+                    files={"source_file": ("limite.md", f"# Limite {i}", "text/markdown")},
+                )
+                for i in range(2)
+            ]
+        finally:
+            app.dependency_overrides.pop(get_admission_controller)
+        assert responses[0].status_code == 200
+        assert responses[1].status_code == 429
+        assert responses[1].headers["retry-after"] == "1"
+
+    def test_resultado_em_cache_nao_consome_limite(self):
+        limited = AdmissionController(rate=1, burst=1, slots=1)
+        app.dependency_overrides[get_admission_controller] = lambda: limited
+        try:
+            codes = [
+                client.post(
+                    "/api/convert",
+                    data={"output_format": "txt"},
+                    files={"source_file": ("cache.md", b"# Cache", "text/markdown")},
+                ).status_code
+                for _ in range(3)
+            ]
+        finally:
+            app.dependency_overrides.pop(get_admission_controller)
+        assert codes == [200, 200, 200]
+
+    def test_zip_bomb_e_recusado_antes_da_conversao(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("word/document.xml", b"\0" * (5 * 1024 * 1024))
+        response = client.post(
+            "/api/convert",
+            data={"output_format": "md"},
+            files={"source_file": ("bomba.docx", buffer.getvalue(), "application/zip")},
+        )
+        assert response.status_code == 413
+        assert "suspeito" in response.json()["detail"]
+        assert "estimator" in client.get("/api/admission").json()
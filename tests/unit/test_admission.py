@@ -0,0 +1,190 @@
+"""Testes do controle de admissão (limite por cliente e fila justa)."""
+
+import asyncio
+
+import pytest
+
+from domain.models import ConvertRequest, ConvertResult
+from services.admission import (
+    AdmissionController,
+    RateLimitedError,
+    client_id,
+    conversion_cost,
+)
+from services.cost_estimator import BudgetExceededError, CostEstimator
+
+
+def _request(output_format: str = "txt", size: int = 0, template: bytes | None = None):
+    return ConvertRequest(
+        source_content=b"x" * size,
+        source_filename="doc.md",
+        output_format=output_format,
+        template_content=template,
+    )
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _noop():
+    return "ok"
+
+
+class TestCusto:
+    def test_pdf_e_merge_custam_mais_que_txt(self):
+        assert conversion_cost(_request("txt")) == 1
+        assert conversion_cost(_request("pdf")) == 5
+        assert conversion_cost(_request("docx", template=b"PK")) == 5
+
+    def test_custo_cresce_com_o_tamanho(self):
+        assert conversion_cost(_request("txt", size=1024 * 1024)) == 2
+
+    def test_cliente_por_chave_ou_ip(self):
+        assert client_id(None, "10.0.0.1") == "ip:10.0.0.1"
+        key = client_id("segredo", "10.0.0.1")
+        assert key.startswith("key:") and "segredo" not in key
+        assert client_id(None, None) == "anonymous"
+
+
+class TestTokenBucket:
+    async def test_acima_do_limite_retorna_429_ate_repor(self):
+        clock = _Clock()
+        admission = AdmissionController(rate=1, burst=5, slots=2, clock=clock)
+        assert await admission.run("a", 5, _noop) == "ok"
+        with pytest.raises(RateLimitedError) as exc_info:
+            await admission.run("a", 2, _noop)
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.retry_after == 2
+        # Outro cliente tem bucket próprio
+        assert await admission.run("b", 5, _noop) == "ok"
+
+        clock.now += 2
+        assert await admission.run("a", 2, _noop) == "ok"
+        assert admission.stats()["clients"]["a"]["rejected"] == 1
+
+    async def test_lote_e_desacelerado_em_vez_de_recusado(self):
+        admission = AdmissionController(rate=100, burst=1, slots=2)
+        for _ in range(3):
+            await admission.run("lote", 2, _noop, wait=True)
+        stats = admission.stats()["clients"]["lote"]
+        assert stats["rejected"] == 0
+        assert stats["throttled_seconds"] > 0
+
+
+class TestFilaJusta:
+    async def test_cliente_leve_passa_na_frente_do_pesado(self):
+        admission = AdmissionController(rate=0, slots=1)
+        order: list[str] = []
+        gate = asyncio.Event()
+
+        async def job(name: str):
+            order.append(name)
+            if name == "pesado-0":
+                await gate.wait()
+
+        heavy = [
+            asyncio.create_task(
+                admission.run("pesado", 5, lambda i=i: job(f"pesado-{i}"), wait=True)
+            )
+            for i in range(5)
+        ]
+        await asyncio.sleep(0.01)
+        light = asyncio.create_task(admission.run("leve", 1, lambda: job("leve")))
+        await asyncio.sleep(0.01)
+        assert admission.stats()["queued"] == 5
+        gate.set()
+        await asyncio.gather(*heavy, light)
+        assert order[:2] == ["pesado-0", "leve"]
+        assert admission.stats()["active"] == 0
+
+    async def test_fila_do_cliente_limitada_para_conversoes_avulsas(self):
+        admission = AdmissionController(rate=0, slots=1, max_queued_per_client=1)
+        gate = asyncio.Event()
+        running = asyncio.create_task(admission.run("a", 1, gate.wait))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(admission.run("a", 1, _noop))
+        await asyncio.sleep(0)
+        with pytest.raises(RateLimitedError):
+            await admission.run("a", 1, _noop)
+        gate.set()
+        await asyncio.gather(running, queued)
+
+    async def test_desistencia_na_fila_nao_prende_vaga(self):
+        admission = AdmissionController(rate=0, slots=1)
+        gate = asyncio.Event()
+        running = asyncio.create_task(admission.run("a", 1, gate.wait))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(admission.run("b", 1, _noop))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        gate.set()
+        await running
+        assert await admission.run("c", 1, _noop) == "ok"
+        stats = admission.stats()
+        assert stats["active"] == 0 and stats["queued"] == 0
+
+    async def test_converter_registra_a_espera_nos_tempos(self):
+        admission = AdmissionController(rate=0, slots=1)
+
+        async def convert(request: ConvertRequest) -> ConvertResult:
+            return ConvertResult(content=b"ok", filename="a.txt", content_type="text/plain")
+
+        result = await admission.converter("a", convert)(_request())
+        assert result.timings[0][0] == "admission"
+
+
+class TestBaixaPrioridade:
+    async def test_normal_passa_na_frente_e_baixa_prioridade_tem_vagas_proprias(self):
+        admission = AdmissionController(rate=0, slots=2, low_priority_slots=1)
+        order: list[str] = []
+        gates = {name: asyncio.Event() for name in ("normal-0", "caro-0")}
+
+        async def job(name: str):
+            order.append(name)
+            if name in gates:
+                await gates[name].wait()
+
+        def submit(name: str, low_priority: bool):
+            return asyncio.create_task(
+                admission.run(
+                    name.split("-")[0],
+                    1,
+                    lambda: job(name),
+                    wait=True,
+                    low_priority=low_priority,
+                )
+            )
+
+        tasks = [submit("caro-0", True), submit("caro-1", True)]
+        await asyncio.sleep(0.01)
+        # Com a vaga de baixa prioridade ocupada, a segunda cara espera
+        assert order == ["caro-0"]
+        tasks += [submit("normal-0", False), submit("normal-1", False)]
+        await asyncio.sleep(0.01)
+        assert order == ["caro-0", "normal-0"]
+        gates["caro-0"].set()
+        await asyncio.sleep(0.01)
+        assert order[2] == "normal-1"
+        gates["normal-0"].set()
+        await asyncio.gather(*tasks)
+        assert order[3] == "caro-1"
+        stats = admission.stats()
+        assert stats["low_priority_active"] == stats["low_priority_queued"] == 0
+        assert stats["clients"]["caro"]["low_priority"] == 2
+
+    async def test_acima_do_orcamento_nao_entra_na_fila(self):
+        admission = AdmissionController(
+            rate=0, slots=1, estimator=CostEstimator(budget_seconds=0)
+        )
+        with pytest.raises(BudgetExceededError):
+            await admission.converter("a", _unreachable)(_request())
+        assert admission.stats()["estimator"]["budget_seconds"] == 0
+
+
+async def _unreachable(request: ConvertRequest) -> ConvertResult:
+    raise AssertionError("conversão acima do orçamento não deveria rodar")
@@ -0,0 +1,100 @@
+"""Testes do cache de AST por trecho."""
+
+import pytest
+
+from converter.ast_cache import AstCache
+from converter.pandoc_engine import PandocEngine
+
+
+def _document(sections: int) -> str:
+    return "---\ntitle: Manual\n---\n\n# Manual\n\n" + "".join(
+        f"## Seção {i}\n\nTexto *da* seção {i} com [link](https://example.com/{i}).\n\n"
+        f"- item {i}\n- outro\n\n```python\nx = {i}\n```\n\n"
+        for i in range(sections)
+    )
+
+
+@pytest.fixture
+def cache():
+    return AstCache(max_bytes=16 * 1024 * 1024, min_bytes=0, segment_bytes=200)
+
+
+class TestAstCache:
+    @pytest.mark.parametrize("output_format", ["html", "md", "txt", "tex", "rst"])
+    def test_saida_igual_a_conversao_inteira(self, cache, output_format):
+        source = _document(12).encode("utf-8")
+        expected = PandocEngine.convert_bytes(source, output_format)
+        assert cache.convert(source, output_format) == expected
+        # Segunda vez, inteiramente do cache
+        assert cache.convert(source, output_format) == expected
+
+    def test_edicao_rele_so_o_trecho_alterado(self, cache):
+        document = _document(12)
+        cache.convert(document.encode("utf-8"), "html")
+        misses = cache.stats()["misses"]
+
+        edited = document.replace("seção 7 com", "seção sete com").encode("utf-8")
+        output = cache.convert(edited, "html")
+
+        assert output == PandocEngine.convert_bytes(edited, "html")
+        stats = cache.stats()
+        assert stats["misses"] == misses + 1
+        assert stats["fragment_misses"] > 0
+        assert "seção sete com" in output.decode("utf-8")
+
+    @pytest.mark.parametrize("output_format", ["html", "md"])
+    @pytest.mark.parametrize(
+        "construct",
+        [
+            "Texto com nota^[Nota da seção {i}.] inline.",
+            "(@) exemplo da seção {i}\n(@) outro exemplo",
+            "@. exemplo da seção {i}",
+        ],
+    )
+    def test_edicao_com_cache_quente_igual_a_conversao_inteira(
+        self, cache, output_format, construct
+    ):
+        document = "# Manual\n\n" + "".join(
+            f"## Seção {i}\n\n{construct.format(i=i)}\n\nMais texto {i}.\n\n"
+            for i in range(10)
+        )
+        cache.convert(document.encode("utf-8"), output_format)
+
+        edited = document.replace("Mais texto 6.", "Texto alterado.").encode("utf-8")
+        output = cache.convert(edited, output_format)
+        if output is None:
+            output = PandocEngine.convert_bytes(edited, output_format)
+        assert output == PandocEngine.convert_bytes(edited, output_format)
+
+    def test_ast_emendado_gera_o_mesmo_docx(self, cache):
+        source = _document(12).encode("utf-8")
+        cache.convert(source, "html")
+        ast = cache.ast(source)
+        assert ast is not None
+        assert PandocEngine.convert_bytes(
+            ast, "md", input_format="json", standalone=True
+        ) == PandocEngine.convert_bytes(source, "md", standalone=True)
+
+    @pytest.mark.parametrize(
+        "extra",
+        [
+            "Ver nota[^1].\n\n[^1]: Nota.\n",
+            "Ver [Seção 3].\n",
+            "## Seção 3\n\nTítulo repetido.\n",
+        ],
+    )
+    def test_documento_com_ligacoes_entre_trechos_fica_inteiro(self, cache, extra):
+        source = (_document(8) + extra).encode("utf-8")
+        assert cache.convert(source, "html") is None
+        assert cache.stats()["fallbacks"] == 1
+
+    def test_documento_pequeno_nao_usa_cache(self):
+        cache = AstCache(min_bytes=10_000, segment_bytes=200)
+        assert cache.convert(_document(3).encode("utf-8"), "html") is None
+        assert cache.stats()["segments"] == 0
+
+    def test_limite_de_bytes(self):
+        cache = AstCache(max_bytes=4096, min_bytes=0, segment_bytes=200)
+        source = _document(40).encode("utf-8")
+        assert cache.convert(source, "md") == PandocEngine.convert_bytes(source, "md")
+        assert 0 < cache.stats()["bytes"] <= 4096
@@ -0,0 +1,105 @@
+"""Testes da conversão em lote."""
+
+import io
+import json
+import zipfile
+
+import pytest
+
+from domain.models import ConvertRequest, ConvertResult
+from services.batch_service import (
+    BatchConverter,
+    BatchItem,
+    archive_items,
+    check_batch_limits,
+    safe_name,
+    stream_zip,
+)
+from services.convert_service import ConversionError
+from services.executor import ConversionExecutor
+from services.result_cache import ResultCache
+
+BASE = ConvertRequest(source_content=b"", source_filename="", output_format="html")
+
+
+def _job(request: ConvertRequest) -> ConvertResult:
+    if request.source_content == b"falha":
+        raise ConversionError("origem inválida")
+    return ConvertResult(
+        content=request.source_content.upper(),
+        filename="out.html",
+        content_type="text/html",
+    )
+
+
+async def _collect(chunks) -> zipfile.ZipFile:
+    data = b"".join([chunk async for chunk in chunks])
+    return zipfile.ZipFile(io.BytesIO(data))
+
+
+class TestArchiveItems:
+    def test_nomes_seguros(self):
+        assert safe_name("../../etc/passwd") == "etc/passwd"
+        assert safe_name("/abs/doc.md") == "abs/doc.md"
+        assert safe_name("dir\\doc.md") == "dir/doc.md"
+
+    def test_ignora_diretorios_e_ocultos(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("docs/", "")
+            archive.writestr("docs/a.md", "# A")
+            archive.writestr("__MACOSX/docs/._a.md", "x")
+            archive.writestr("docs/.DS_Store", "x")
+        with zipfile.ZipFile(buffer) as archive:
+            items = archive_items(archive)
+            assert [item.name for item in items] == ["docs/a.md"]
+            assert items[0].loader() == b"# A"
+
+    def test_rejeita_membro_acima_do_limite(self, monkeypatch):
+        monkeypatch.setattr("services.batch_service.MAX_FILE_SIZE_BYTES", 4)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("grande.md", "x" * 1000)
+        with zipfile.ZipFile(buffer) as archive:
+            with pytest.raises(ConversionError) as exc_info:
+                archive_items(archive)
+        assert exc_info.value.status_code == 413
+
+    def test_lote_vazio(self):
+        with pytest.raises(ConversionError):
+            check_batch_limits([])
+
+
+class TestBatchConverter:
+    async def test_zip_com_resultados_e_manifesto(self):
+        executor = ConversionExecutor(max_concurrency=2, queue_depth=0, job=_job)
+        items = [
+            BatchItem(name="a.md", content=b"a"),
+            BatchItem(name="sub/a.md", content=b"b"),
+            BatchItem(name="ruim.md", content=b"falha"),
+        ]
+        try:
+            outcomes = BatchConverter(executor, ResultCache()).run(items, BASE)
+            archive = await _collect(stream_zip(outcomes, "html"))
+        finally:
+            executor.shutdown()
+
+        assert archive.read("a.html") == b"A"
+        assert archive.read("sub/a.html") == b"B"
+        manifest = json.loads(archive.read("manifest.json"))
+        assert (manifest["total"], manifest["succeeded"], manifest["failed"]) == (3, 2, 1)
+        failed = next(entry for entry in manifest["files"] if entry["status"] == "error")
+        assert failed["source"] == "ruim.md"
+        assert failed["status_code"] == 400
+
+    async def test_lote_maior_que_a_fila_nao_e_rejeitado(self):
+        executor = ConversionExecutor(max_concurrency=1, queue_depth=0, job=_job)
+        items = [BatchItem(name=f"{i}.md", content=b"x") for i in range(10)]
+        try:
+            outcomes = BatchConverter(executor, ResultCache(), concurrency=4).run(
+                items, BASE
+            )
+            archive = await _collect(stream_zip(outcomes, "html"))
+        finally:
+            executor.shutdown()
+        assert json.loads(archive.read("manifest.json"))["succeeded"] == 10
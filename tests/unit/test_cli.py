@@ -0,0 +1,91 @@
+"""Testes da conversão em lote pela linha de comando."""
+
+import json
+
+import pytest
+
+from cli import MANIFEST_NAME, BulkConverter, main, output_names
+
+
+@pytest.fixture
+def source(tmp_path):
+    docs = tmp_path / "docs"
+    (docs / "guia").mkdir(parents=True)
+    (docs / "guia" / "intro.md").write_text("# Intro\n\nTexto.\n", encoding="utf-8")
+    (docs / "guia" / "uso.rst").write_text("Uso\n===\n\nTexto.\n", encoding="utf-8")
+    (docs / "notas.json").write_text("{}", encoding="utf-8")
+    (docs / ".rascunhos").mkdir()
+    (docs / ".rascunhos" / "x.md").write_text("# x", encoding="utf-8")
+    return docs
+
+
+def _converted(converter: BulkConverter) -> list[tuple[str, tuple[str, ...]]]:
+    stats = converter.run_once()
+    assert stats.failed == 0
+    return sorted((o.task.rel, o.task.formats) for o in stats.outcomes)
+
+
+class TestConversaoEmLote:
+    def test_converte_formatos_suportados_mantendo_as_pastas(self, source, tmp_path):
+        output = tmp_path / "site"
+        with BulkConverter(source, output, ["html", "txt"], jobs=1) as converter:
+            assert _converted(converter) == [
+                ("guia/intro.md", ("html", "txt")),
+                ("guia/uso.rst", ("html", "txt")),
+            ]
+        assert b"<h1" in (output / "guia" / "intro.html").read_bytes()
+        assert (output / "guia" / "uso.txt").read_text(encoding="utf-8").strip()
+        manifest = json.loads((output / MANIFEST_NAME).read_text(encoding="utf-8"))
+        assert set(manifest["files"]) == {"guia/intro.md", "guia/uso.rst"}
+
+    def test_reexecucao_converte_so_o_que_mudou(self, source, tmp_path):
+        output = tmp_path / "site"
+        with BulkConverter(source, output, ["html"], jobs=1) as converter:
+            converter.run_once()
+        (source / "guia" / "intro.md").write_text("# Novo\n", encoding="utf-8")
+
+        with BulkConverter(source, output, ["html", "txt"], jobs=1) as converter:
+            assert _converted(converter) == [
+                ("guia/intro.md", ("html", "txt")),
+                ("guia/uso.rst", ("txt",)),
+            ]
+            stats = converter.run_once()
+            assert (stats.converted, stats.skipped) == (0, 2)
+        assert b"Novo" in (output / "guia" / "intro.html").read_bytes()
+
+    def test_saida_apagada_e_gerada_de_novo(self, source, tmp_path):
+        output = tmp_path / "site"
+        with BulkConverter(source, output, ["html"], jobs=1) as converter:
+            converter.run_once()
+            (output / "guia" / "uso.html").unlink()
+            assert _converted(converter) == [("guia/uso.rst", ("html",))]
+
+    def test_erro_nao_entra_no_manifesto(self, source, tmp_path):
+        (source / "quebrado.docx").write_bytes(b"nao e um zip")
+        output = tmp_path / "site"
+        with BulkConverter(source, output, ["html"], jobs=1) as converter:
+            stats = converter.run_once()
+            assert stats.failed == 1
+            assert converter.run_once().failed == 1
+        manifest = json.loads((output / MANIFEST_NAME).read_text(encoding="utf-8"))
+        assert "quebrado.docx" not in manifest["files"]
+
+    def test_mesmo_nome_em_formatos_diferentes(self):
+        assert output_names(["a.md", "a.rst", "b/a.md"], "html") == {
+            "a.md": "a.md.html",
+            "a.rst": "a.rst.html",
+            "b/a.md": "b/a.html",
+        }
+
+    def test_linha_de_comando_com_pool_de_processos(self, source, tmp_path, capsys):
+        output = tmp_path / "site"
+        args = [str(source), "-o", str(output), "-f", "html,md", "-j", "2"]
+        assert main(args) == 0
+        out = capsys.readouterr().out
+        assert "2 convertidos, 0 sem alteração, 0 com erro" in out
+        assert "Throughput:" in out
+        assert "guia/intro.md -> html,md" in out
+        assert (output / "guia" / "uso.md").exists()
+
+        assert main(args) == 0
+        assert "0 convertidos, 2 sem alteração" in capsys.readouterr().out
@@ -1,9 +1,17 @@
 """Testes do serviço de conversão."""
 
+import base64
+import io
+import zipfile
+
+import pymupdf
 import pytest
 
+from converter.ast_cache import AstCache
+from converter.pandoc_engine import PandocEngine
 from domain.models import ConvertRequest
 from services.convert_service import ConversionError, ConvertService
+from services.template_registry import TemplateRegistry
 
 
 class TestConvertServiceValidation:
@@ -33,3 +41,317 @@ class TestConvertServiceValidation:
             service.execute(request)
         assert "muito grande" in str(exc_info.value)
         assert exc_info.value.status_code == 413
+
+
+class TestConvertServiceEmMemoria:
+    """Conversões ponta a ponta sem arquivos temporários."""
+
+    def test_converte_markdown_para_html(self):
+        result = ConvertService().execute(
+            ConvertRequest(
+                source_content=b"# Titulo\n\ntexto",
+                source_filename="doc.md",
+                output_format="html",
+            )
+        )
+        assert b"<h1" in result.content
+        assert result.filename == "doc.html"
+
+    def test_merge_com_template(self):
+        template = PandocEngine.convert_bytes(b"Capa\n\n{{CONTEUDO}}\n\nFim", "docx")
+        result = ConvertService().execute(
+            ConvertRequest(
+                source_content=b"# Titulo\n\ntexto",
+                source_filename="doc.md",
+                output_format="docx",
+                template_content=template,
+            )
+        )
+        text = PandocEngine.convert_bytes(
+            result.content, "md", input_format="docx"
+        ).decode("utf-8")
+        assert text.split() == ["Capa", "#", "Titulo", "texto", "Fim"]
+        assert result.filename == "doc.docx"
+
+    def test_resultado_grande_vai_para_arquivo(self):
+        result = ConvertService(spool_threshold=10).execute(
+            ConvertRequest(
+                source_content=b"# Titulo\n\ntexto longo o bastante",
+                source_filename="doc.md",
+                output_format="html",
+            )
+        )
+        try:
+            assert result.content == b""
+            assert result.path.endswith(".html")
+            assert b"<h1" in result.read_content()
+        finally:
+            result.cleanup()
+
+    def test_merge_grande_e_gravado_direto_em_arquivo(self):
+        template = PandocEngine.convert_bytes(b"Capa\n\n{{CONTEUDO}}\n\nFim", "docx")
+        result = ConvertService(spool_threshold=10).execute(
+            ConvertRequest(
+                source_content=b"texto",
+                source_filename="doc.md",
+                output_format="docx",
+                template_content=template,
+            )
+        )
+        try:
+            assert result.content == b"" and result.path.endswith(".docx")
+            text = PandocEngine.convert_bytes(
+                result.read_content(), "plain", input_format="docx"
+            )
+            assert text.decode().split() == ["Capa", "texto", "Fim"]
+        finally:
+            result.cleanup()
+
+    @pytest.mark.parametrize(
+        "source, output_format, engine",
+        [
+            (b"# Titulo\n\ntexto", "html", "markdown-it"),
+            (b"# Titulo\n\ntexto", "txt", "markdown-it"),
+            (b"# Titulo\n\ntexto", "md", "identity"),
+            (b"# Titulo\n\n$x^2$", "html", "pandoc"),
+            (b"# Titulo\n\ntexto", "rst", "pandoc"),
+        ],
+    )
+    def test_motor_da_conversao(self, source, output_format, engine):
+        result = ConvertService().execute(
+            ConvertRequest(
+                source_content=source,
+                source_filename="doc.md",
+                output_format=output_format,
+            )
+        )
+        assert result.engine == engine
+        if engine == "identity":
+            assert result.content == source
+        else:
+            assert b"Titulo" in result.content
+
+    def test_markdown_editado_reusa_o_cache_de_ast(self, monkeypatch):
+        cache = AstCache(max_bytes=1024 * 1024, min_bytes=0, segment_bytes=10)
+        monkeypatch.setattr("services.convert_service.get_ast_cache", lambda: cache)
+        sections = [f"## Seção {i}\n\nTexto da seção {i}.\n\n" for i in range(8)]
+        service = ConvertService()
+
+        for source in ("".join(sections), "".join(sections).replace("seção 5", "5ª")):
+            result = service.execute(
+                ConvertRequest(
+                    source_content=source.encode("utf-8"),
+                    source_filename="doc.md",
+                    output_format="tex",
+                )
+            )
+            assert result.content == PandocEngine.convert_bytes(
+                source.encode("utf-8"), "tex"
+            )
+        assert cache.stats()["misses"] == len(sections) + 1
+
+
+def _renamed_styles(package: bytes, old: bytes, new: bytes) -> bytes:
+    """Cópia do DOCX com um nome de estilo trocado (a marca do template)."""
+    output = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(package)) as src, zipfile.ZipFile(
+        output, "w", zipfile.ZIP_DEFLATED
+    ) as dst:
+        for info in src.infolist():
+            data = src.read(info)
+            if info.filename == "word/styles.xml":
+                data = data.replace(old, new)
+            dst.writestr(info, data)
+    return output.getvalue()
+
+
+class TestConvertServiceReferencia:
+    """Template sem placeholder: só os estilos, via --reference-doc."""
+
+    @pytest.fixture(autouse=True)
+    def registry(self, monkeypatch, tmp_path):
+        registry = TemplateRegistry(tmp_path)
+        monkeypatch.setattr("services.template_registry._registry", registry)
+        return registry
+
+    def test_template_sem_placeholder_aplica_os_estilos(self, registry):
+        template = _renamed_styles(
+            PandocEngine.convert_bytes(b"Capa", "docx"),
+            b'"heading 1"',
+            b'"Titulo Corp"',
+        )
+        request = ConvertRequest(
+            source_content=b"# Titulo\n\ntexto",
+            source_filename="doc.md",
+            output_format="docx",
+            template_content=template,
+        )
+        result = ConvertService().execute(request)
+        with zipfile.ZipFile(io.BytesIO(result.content)) as package:
+            assert b"Titulo Corp" in package.read("word/styles.xml")
+        text = PandocEngine.convert_bytes(result.content, "plain", input_format="docx")
+        assert text.decode().split() == ["Titulo", "texto"]
+        assert "docx_merge" not in dict(result.timings)
+        # Gravado em disco uma vez, pelo hash, e reaproveitado
+        assert len(list((registry.store_dir / "reference").iterdir())) == 1
+        ConvertService().execute(request)
+        assert len(list((registry.store_dir / "reference").iterdir())) == 1
+
+    def test_template_odt_na_saida_odt(self, registry):
+        template = PandocEngine.convert_bytes(b"Capa", "odt")
+        info = registry.register(template, "base.odt")
+        result = ConvertService().execute(
+            ConvertRequest(
+                source_content=b"texto",
+                source_filename="doc.md",
+                output_format="odt",
+                template_id=info.template_id,
+            )
+        )
+        assert result.filename == "doc.odt"
+        text = PandocEngine.convert_bytes(result.content, "plain", input_format="odt")
+        assert text.decode().split() == ["texto"]
+        with pytest.raises(ConversionError):
+            ConvertService().execute(
+                ConvertRequest(
+                    source_content=b"texto",
+                    source_filename="doc.md",
+                    output_format="docx",
+                    template_id=info.template_id,
+                )
+            )
+
+
+class TestConvertServicePdf:
+    """Motores de PDF selecionáveis por requisição."""
+
+    def _pdf(self, source: bytes, filename: str, engine: str) -> bytes:
+        return ConvertService().execute(
+            ConvertRequest(
+                source_content=source,
+                source_filename=filename,
+                output_format="pdf",
+                pdf_engine=engine,
+            )
+        ).content
+
+    def test_motor_html_direto_gera_pdf_com_sumario(self):
+        content = self._pdf(
+            b"<h2>Intro</h2><p>texto</p><h1>Capitulo</h1>", "doc.html", "html"
+        )
+        document = pymupdf.open(stream=content)
+        assert "texto" in document[0].get_text()
+        assert [entry[1] for entry in document.get_toc()] == ["Intro", "Capitulo"]
+
+    def test_motores_produzem_o_mesmo_texto(self):
+        source = b"# Titulo\n\nParagrafo de teste."
+        for engine in ("markdown", "html", "auto"):
+            text = pymupdf.open(stream=self._pdf(source, "doc.md", engine))[0].get_text()
+            assert text.split() == ["Titulo", "Paragrafo", "de", "teste."]
+
+    def test_rejeita_motor_invalido(self):
+        with pytest.raises(ConversionError) as exc_info:
+            self._pdf(b"# x", "doc.md", "latex")
+        assert exc_info.value.status_code == 400
+
+    def test_markdown_grande_e_renderizado_em_blocos(self, monkeypatch):
+        monkeypatch.setattr("services.convert_service.PDF_CHUNK_THRESHOLD_BYTES", 50)
+        monkeypatch.setattr("services.convert_service.PDF_CHUNK_BYTES", 20)
+        monkeypatch.setattr("services.convert_service.PDF_CHUNK_WORKERS", 1)
+        source = "".join(f"# Parte {i}\n\nTexto {i}.\n\n" for i in range(5))
+        result = ConvertService().execute(
+            ConvertRequest(
+                source_content=source.encode(),
+                source_filename="doc.md",
+                output_format="pdf",
+            )
+        )
+        try:
+            assert result.path is not None
+            document = pymupdf.open(result.path)
+            assert [entry[1] for entry in document.get_toc()] == [
+                f"Parte {i}" for i in range(5)
+            ]
+            assert "Texto 4." in "".join(page.get_text() for page in document)
+        finally:
+            result.cleanup()
+
+    def test_imagem_larga_e_reduzida_antes_da_conversao(self, monkeypatch):
+        monkeypatch.setattr("converter.images._cache", None)
+        pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 3000, 800), False)
+        pixmap.clear_with(230)
+        encoded = base64.b64encode(pixmap.tobytes("png")).decode()
+        source = f"# Tela\n\n![tela](data:image/png;base64,{encoded})\n".encode()
+
+        result = ConvertService().execute(
+            ConvertRequest(
+                source_content=source, source_filename="doc.md", output_format="pdf"
+            )
+        )
+        assert "images" in dict(result.timings)
+        (image,) = pymupdf.open(stream=result.content)[0].get_images()
+        assert image[2] == round(7.26 * 150)  # largura em pixels no PDF
+
+
+class TestConvertServiceExport:
+    """Exportação multi-formato a partir de um único parse."""
+
+    def test_le_a_origem_uma_vez_e_reusa_o_markdown_no_pdf(self, monkeypatch):
+        calls = []
+        original = PandocEngine.convert_bytes
+
+        def counting(content, output_format, input_format="markdown", **kwargs):
+            calls.append((input_format, output_format))
+            return original(
+                content, output_format, input_format=input_format, **kwargs
+            )
+
+        monkeypatch.setattr(PandocEngine, "convert_bytes", counting)
+        request = ConvertRequest(
+            source_content=b"<h1>Titulo</h1><p>Texto</p>",
+            source_filename="doc.html",
+            output_format="md",
+        )
+        export = ConvertService().export(request, ["md", "docx", "pdf"])
+
+        assert [result.filename for result in export.results] == [
+            "doc.md",
+            "doc.docx",
+            "doc.pdf",
+        ]
+        assert [call for call in calls if call[0] != "json"] == [("html", "json")]
+        assert sorted(call[1] for call in calls if call[0] == "json") == ["docx", "md"]
+        pdf_text = pymupdf.open(stream=export.results[2].content)[0].get_text()
+        assert pdf_text.split() == ["Titulo", "Texto"]
+
+    def test_resultados_iguais_aos_da_conversao_avulsa(self):
+        source = b"Titulo\n======\n\nTexto *curto*.\n"
+        request = ConvertRequest(
+            source_content=source, source_filename="doc.rst", output_format="html"
+        )
+        export = ConvertService().export(request, ["html", "txt", "docx"])
+        for result in export.results:
+            output_format = result.filename.rsplit(".", 1)[1]
+            single = ConvertService().execute(
+                ConvertRequest(
+                    source_content=source,
+                    source_filename="doc.rst",
+                    output_format=output_format,
+                )
+            )
+            if output_format == "docx":
+                assert _docx_body(result.content) == _docx_body(single.content)
+            else:
+                assert result.content == single.content
+
+    def test_rejeita_lista_vazia(self):
+        request = ConvertRequest(
+            source_content=b"# x", source_filename="doc.md", output_format="md"
+        )
+        with pytest.raises(ConversionError):
+            ConvertService().export(request, [])
+
+
+def _docx_body(content: bytes) -> bytes:
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        return archive.read("word/document.xml")
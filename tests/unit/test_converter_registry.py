@@ -0,0 +1,121 @@
+"""Testes do registro de conversores e da conversão de Markdown em processo."""
+
+import re
+
+import pytest
+
+from converter.converter_registry import Converter, ConverterRegistry
+from converter.markdown_fast import is_simple, markdown_to_html, markdown_to_plain
+from converter.pandoc_engine import PandocEngine
+
+SIMPLES = """# Título Principal
+
+Parágrafo com *ênfase*, **negrito**, `código  inline` e [link](https://example.com).
+Aspas "duplas", 'simples' e d'água -- traço --- travessão... fim.
+
+## Seção
+
+- item um
+- item dois com texto longo o bastante para quebrar a linha no texto puro do Pandoc
+- item três
+
+1. primeiro
+2. segundo
+
+> citação com texto
+>
+> segundo parágrafo
+
+    código indentado
+
+```
+cerca sem linguagem
+```
+
+---
+
+Autolink <https://example.com/a> e <foo@bar.com>, quebra
+forçada, entidades &amp; &lt;tag&gt; e ![img](x.png) no meio.
+
+## Seção
+
+- solto um
+
+- solto dois
+"""
+
+
+def _html(text: str) -> str:
+    # O Pandoc quebra o HTML em 72 colunas; o conteúdo é o mesmo
+    return re.sub(r"\s+", " ", re.sub(r">\s+<", "><", text)).strip()
+
+
+class TestMarkdownFast:
+    def test_html_igual_ao_do_pandoc(self):
+        source = SIMPLES.encode("utf-8")
+        assert is_simple(source)
+        expected = PandocEngine.convert_bytes(source, "html").decode("utf-8")
+        assert _html(markdown_to_html(source).decode("utf-8")) == _html(expected)
+
+    def test_texto_puro_igual_ao_do_pandoc(self):
+        source = SIMPLES.encode("utf-8")
+        assert markdown_to_plain(source) == PandocEngine.convert_bytes(source, "txt")
+
+    @pytest.mark.parametrize(
+        "source",
+        [
+            "Massa $E = mc^2$.\n",
+            "Nota[^1].\n\n[^1]: Texto.\n",
+            "| a | b |\n|---|---|\n| 1 | 2 |\n",
+            "Termo\n: definição\n",
+            "a. letra\nb. outra\n",
+            "```python\nx = 1\n```\n",
+            "![figura](img.png)\n",
+            "<div>html</div>\n",
+            "# Título {#id}\n",
+            "Texto\n- lista sem linha em branco\n",
+            "- item\n  - aninhado\n",
+            "---\ntitle: x\n---\n\nTexto\n",
+            "Ver [Seção].\n\n# Seção\n",
+            "Citação [@autor].\n",
+            "Largura dupla: 中文\n",
+        ],
+    )
+    def test_recursos_do_pandoc_nao_sao_simples(self, source):
+        assert not is_simple(source.encode("utf-8"))
+
+    def test_origem_que_nao_e_utf8_nao_e_simples(self):
+        assert not is_simple(b"\xff\xfe texto")
+
+
+class TestConverterRegistry:
+    def test_escolhe_maior_prioridade_que_aceita(self):
+        registry = ConverterRegistry(max_bytes=1024)
+        registry.register("markdown", "html", Converter("lento", bytes, 1))
+        registry.register(
+            "markdown",
+            "html",
+            Converter("rapido", bytes, 10, lambda content: b"$" not in content),
+        )
+        assert registry.select("markdown", "html", b"# a").name == "rapido"
+        assert registry.select("markdown", "html", b"$x$").name == "lento"
+        assert registry.select("markdown", "rst", b"# a") is None
+
+    def test_documento_grande_vai_para_o_pandoc(self):
+        registry = ConverterRegistry(max_bytes=4)
+        registry.register("markdown", "md", Converter("identity", bytes))
+        assert registry.select("markdown", "md", b"1234").name == "identity"
+        assert registry.select("markdown", "md", b"12345") is None
+
+    def test_erro_no_criterio_vai_para_o_pandoc(self):
+        registry = ConverterRegistry(max_bytes=1024)
+        registry.register(
+            "markdown", "html", Converter("quebrado", bytes, accepts=lambda c: 1 / 0)
+        )
+        assert registry.select("markdown", "html", b"# a") is None
+
+    def test_to_dict_lista_o_pandoc_por_ultimo(self):
+        registry = ConverterRegistry(max_bytes=1024)
+        registry.register("markdown", "html", Converter("b", bytes, 1))
+        registry.register("markdown", "html", Converter("a", bytes, 2))
+        assert registry.to_dict() == {"markdown->html": ["a", "b", "pandoc"]}
@@ -0,0 +1,145 @@
+"""Testes da estimativa de custo (pré-leitura, orçamentos e calibração)."""
+
+import io
+import zipfile
+
+import pytest
+
+from domain.models import ConvertRequest
+from services.cost_estimator import (
+    BudgetExceededError,
+    CostEstimator,
+    DocumentProfile,
+    _count_tokens,
+    scan,
+)
+
+MARKDOWN = b"""# Titulo
+
+Texto com ![figura](a.png) e <img src="b.png">.
+
+| a | b |
+|---|---|
+| 1 | 2 |
+
+## Lista
+
+- um
+    - dois
+        - tres
+
+> > citacao
+"""
+
+
+def _request(content: bytes, filename: str = "doc.md", output_format: str = "html"):
+    return ConvertRequest(
+        source_content=content, source_filename=filename, output_format=output_format
+    )
+
+
+def _zip(members: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+class TestPreLeitura:
+    def test_conta_estrutura_do_markdown(self):
+        profile = scan(_request(MARKDOWN))
+        assert profile.headings == 2
+        assert profile.tables == 1
+        assert profile.images == 2
+        assert profile.depth == 5
+        assert profile.lines == MARKDOWN.count(b"\n") + 1
+
+    def test_docx_le_so_o_xml_principal(self):
+        document = b"<w:body>" + b"<w:tbl></w:tbl>" * 2 + b"</w:body>"
+        content = _zip(
+            {"word/document.xml": document, "word/media/image1.png": b"\x89PNG"}
+        )
+        profile = scan(_request(content, "doc.docx"))
+        assert profile.tables == 2
+        assert profile.images == 1
+        assert profile.unpacked == len(document) + 4
+
+    def test_zip_bomb_e_recusado_sem_descompactar(self):
+        content = _zip({"word/document.xml": b"\0" * (5 * 1024 * 1024)})
+        with pytest.raises(BudgetExceededError) as exc_info:
+            scan(_request(content, "bomba.docx"))
+        assert exc_info.value.status_code == 413
+        assert exc_info.value.reason == "zip"
+
+    def test_marcador_dividido_entre_blocos(self):
+        chunks = [b"<w:t", b"bl><w:tbl", b">", b"<w:tbl>"]
+        assert _count_tokens(chunks, (b"<w:tbl>", b"<w:")) == [3, 3]
+
+
+class TestOrcamento:
+    def test_pdf_custa_mais_que_texto(self):
+        estimator = CostEstimator()
+        profile = DocumentProfile(size=1024 * 1024, lines=20_000, tables=50)
+        pdf = estimator.estimate(profile, "markdown", "pdf")
+        txt = estimator.estimate(profile, "markdown", "txt")
+        assert pdf.seconds > txt.seconds
+        assert pdf.memory_bytes > txt.memory_bytes
+
+    def test_acima_do_orcamento_do_formato_e_recusado(self):
+        estimator = CostEstimator(budget_seconds=60, format_budgets={"pdf": 0.01})
+        request = _request(MARKDOWN, output_format="pdf")
+        with pytest.raises(BudgetExceededError) as exc_info:
+            estimator.assess(request, ["pdf"])
+        assert exc_info.value.reason == "budget"
+        assert estimator.assess(request, ["txt"]).estimates[0].output_format == "txt"
+
+    def test_memoria_acima_do_orcamento_e_recusada(self):
+        estimator = CostEstimator(memory_budget=1024)
+        with pytest.raises(BudgetExceededError) as exc_info:
+            estimator.assess(_request(MARKDOWN), ["html"])
+        assert exc_info.value.reason == "memory"
+
+    def test_caro_vai_para_baixa_prioridade(self):
+        estimator = CostEstimator(low_priority_seconds=0.01)
+        assert estimator.assess(_request(MARKDOWN), ["html"]).low_priority
+        cheap = CostEstimator(low_priority_seconds=60)
+        assert not cheap.assess(_request(MARKDOWN), ["html"]).low_priority
+
+
+class TestCalibracao:
+    def test_tempos_medidos_ajustam_a_escala_do_par(self):
+        estimator = CostEstimator()
+        profile = DocumentProfile(size=1024)
+        estimate = estimator.estimate(profile, "markdown", "html")
+        estimator.record(estimate, [("pandoc", estimate.raw_seconds * 4)])
+        calibrated = estimator.estimate(profile, "markdown", "html")
+        assert calibrated.seconds == pytest.approx(estimate.seconds * 4)
+        # Outros pares não mudam
+        other = estimator.estimate(profile, "markdown", "rst")
+        assert other.seconds == pytest.approx(other.raw_seconds)
+
+        estimator.record(calibrated, [("admission", 5.0), ("pandoc", 0.0)])
+        stats = estimator.stats()["calibration"]["markdown->html"]
+        assert stats == {"scale": 4.0, "samples": 1}
+
+    def test_escala_inflada_por_contencao_nao_recusa(self):
+        request = _request(MARKDOWN, output_format="pdf")
+        raw = CostEstimator().estimate(scan(request), "markdown", "pdf").raw_seconds
+        estimator = CostEstimator(
+            format_budgets={"pdf": raw * 3}, low_priority_seconds=raw * 10
+        )
+        estimate = estimator.assess(request, ["pdf"]).estimates[0]
+        # Tempos medidos sob CPU disputada: 50× a previsão
+        estimator.record(estimate, [("pdf_render", raw * 50)])
+
+        assessment = estimator.assess(request, ["pdf"])
+        assert assessment.estimates[0].seconds == pytest.approx(raw * 50)
+        assert assessment.low_priority
+
+    def test_caminho_rapido_e_cache_de_ast_nao_calibram(self):
+        estimator = CostEstimator()
+        estimate = estimator.estimate(DocumentProfile(size=1024), "markdown", "html")
+        estimator.record(estimate, [("fast_path", 1e-6)])
+        estimator.record(estimate, [("ast_cache", 1e-6)])
+        assert estimator.stats()["calibration"] == {}
@@ -0,0 +1,70 @@
+"""Testes do registro de motores."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from converter import engine_registry
+from converter.engine_registry import EngineRegistry
+
+BACKEND = Path(__file__).resolve().parents[2] / "backend"
+
+
+class TestEngineRegistry:
+    def test_sonda_pandoc_com_leitores_e_escritores(self):
+        pandoc = EngineRegistry().get("pandoc")
+        assert pandoc.available
+        assert pandoc.version
+        assert {"markdown", "html", "rst", "latex", "docx", "odt", "json"} <= (
+            pandoc.input_formats
+        )
+        assert {"docx", "html", "markdown", "plain"} <= pandoc.output_formats
+
+    def test_sonda_uma_unica_vez(self, monkeypatch):
+        calls = []
+        original = engine_registry._probe_pandoc
+
+        def counting():
+            calls.append(1)
+            return original()
+
+        monkeypatch.setattr(engine_registry, "_probe_pandoc", counting)
+        registry = EngineRegistry()
+        registry.probe()
+        registry.output_formats()
+        registry.to_dict()
+        assert len(calls) == 1
+        assert registry.probe_seconds is not None
+
+    def test_pdf_indisponivel_sem_pymupdf(self, monkeypatch):
+        original = engine_registry._probe_python
+
+        def without_pymupdf(name, module, distribution):
+            if module == "pymupdf":
+                module = "modulo_que_nao_existe"
+            return original(name, module, distribution)
+
+        monkeypatch.setattr(engine_registry, "_probe_python", without_pymupdf)
+        registry = EngineRegistry()
+        assert "pdf" not in registry.output_formats()
+        assert "docx" in registry.output_formats()
+        assert registry.to_dict()["pymupdf"]["available"] is False
+
+
+class TestStartupImports:
+    def test_app_nao_importa_bibliotecas_de_pdf_e_merge(self):
+        # Workers que só convertem texto não pagam essas importações
+        code = (
+            "import sys, main; "
+            "print(' '.join(m for m in "
+            "('pymupdf', 'markdown_pdf', 'markdown_it', 'docx_merge') "
+            "if m in sys.modules))"
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=BACKEND,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert completed.stdout.strip() == ""
@@ -0,0 +1,152 @@
+"""Testes do pool de execução de conversões."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from domain.models import ConvertRequest, ConvertResult
+from services.executor import (
+    ConversionExecutor,
+    ConversionTimeoutError,
+    ExecutorBusyError,
+    WorkerLostError,
+    is_cpu_bound,
+)
+
+
+def _request(output_format: str = "html", template: bytes | None = None):
+    return ConvertRequest(
+        source_content=b"# Teste",
+        source_filename="teste.md",
+        output_format=output_format,
+        template_content=template,
+    )
+
+
+def _fake_result(request: ConvertRequest) -> ConvertResult:
+    return ConvertResult(content=b"ok", filename="out.html", content_type="text/html")
+
+
+def _stuck_or_fake(request: ConvertRequest) -> ConvertResult:
+    if request.source_content == b"preso":
+        time.sleep(60)
+    if request.source_content == b"morre":
+        os._exit(1)
+    return _fake_result(request)
+
+
+class TestIsCpuBound:
+    """Testes da classificação de jobs."""
+
+    def test_pdf_e_cpu_bound(self):
+        assert is_cpu_bound(_request("pdf"))
+
+    def test_docx_com_template_e_cpu_bound(self):
+        assert is_cpu_bound(_request("docx", template=b"PK"))
+
+    def test_pdf_em_blocos_fica_em_thread(self, monkeypatch):
+        # Os blocos vão para o pool de blocos compartilhado do processo
+        monkeypatch.setattr("services.executor.PDF_CHUNK_THRESHOLD_BYTES", 4)
+        assert not is_cpu_bound(_request("pdf"))
+
+    def test_html_nao_e_cpu_bound(self):
+        assert not is_cpu_bound(_request("html"))
+
+
+class TestConversionExecutor:
+    """Testes do ConversionExecutor."""
+
+    def test_backend_invalido(self):
+        with pytest.raises(ValueError):
+            ConversionExecutor(backend="gpu")
+
+    async def test_executa_job_fora_do_event_loop(self):
+        executor = ConversionExecutor(job=_fake_result, backend="thread")
+        try:
+            result = await executor.run(_request())
+            assert result.content == b"ok"
+            assert executor.stats()["running"] == 0
+        finally:
+            executor.shutdown()
+
+    async def test_fila_cheia_retorna_503(self):
+        gate = threading.Event()
+
+        def blocking_job(request):
+            gate.wait(5)
+            return _fake_result(request)
+
+        executor = ConversionExecutor(
+            max_concurrency=1, queue_depth=1, job=blocking_job, backend="thread"
+        )
+        try:
+            executor.submit(_request())
+            executor.submit(_request())
+            with pytest.raises(ExecutorBusyError) as exc_info:
+                executor.submit(_request())
+            assert exc_info.value.status_code == 503
+            assert exc_info.value.retry_after > 0
+        finally:
+            gate.set()
+            executor.shutdown()
+
+    async def test_timeout_retorna_504(self):
+        def slow_job(request):
+            time.sleep(0.5)
+            return _fake_result(request)
+
+        executor = ConversionExecutor(timeout=0.05, job=slow_job, backend="thread")
+        try:
+            with pytest.raises(ConversionTimeoutError) as exc_info:
+                await executor.run(_request())
+            assert exc_info.value.status_code == 504
+        finally:
+            executor.shutdown()
+
+    async def test_timeout_em_processo_encerra_o_worker(self):
+        executor = ConversionExecutor(
+            max_concurrency=1, timeout=5, job=_stuck_or_fake, backend="process"
+        )
+        try:
+            # Aquece o pool (spawn) antes de medir o tempo limite
+            assert (await executor.run(_request())).content == b"ok"
+            pool = executor._processes
+            stuck = list(pool._processes.values())
+            executor.timeout = 0.2
+
+            request = ConvertRequest(
+                source_content=b"preso",
+                source_filename="preso.md",
+                output_format="html",
+            )
+            with pytest.raises(ConversionTimeoutError):
+                await executor.run(request)
+            for process in stuck:
+                process.join(5)
+                assert not process.is_alive()
+
+            executor.timeout = 5
+            assert (await executor.run(_request())).content == b"ok"
+            assert executor._processes is not pool
+        finally:
+            executor.shutdown()
+
+    async def test_worker_morto_retorna_503_e_pool_e_recriado(self):
+        executor = ConversionExecutor(
+            max_concurrency=1, timeout=10, job=_stuck_or_fake, backend="process"
+        )
+        try:
+            request = ConvertRequest(
+                source_content=b"morre",
+                source_filename="morre.md",
+                output_format="html",
+            )
+            with pytest.raises(WorkerLostError) as exc_info:
+                await executor.run(request)
+            assert exc_info.value.status_code == 503
+            assert exc_info.value.retry_after > 0
+            assert (await executor.run(_request())).content == b"ok"
+        finally:
+            executor.shutdown()
@@ -0,0 +1,108 @@
+"""Testes da redução e do cache de imagens embutidas."""
+
+import base64
+import io
+import zipfile
+
+import pymupdf
+import pytest
+
+from converter import images
+from converter.images import (
+    ImageCache,
+    image_size,
+    optimize_images,
+    target_width,
+)
+from converter.pandoc_engine import PandocEngine
+
+
+def _image(width: int, height: int, output: str = "png") -> bytes:
+    pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, width, height), False)
+    pixmap.clear_with(220)
+    for x in range(0, width, 5):
+        pixmap.set_pixel(x, height // 2, (x % 256, 40, 90))
+    return pixmap.tobytes(output)
+
+
+def _markdown(data: bytes, copies: int = 1, mime: str = "png") -> bytes:
+    uri = f"data:image/{mime};base64,{base64.b64encode(data).decode()}"
+    return "".join(f"Figura {i}\n\n![captura]({uri})\n\n" for i in range(copies)).encode()
+
+
+def _embedded(content: bytes) -> list[bytes]:
+    return [base64.b64decode(data) for _, data in images._DATA_URI.findall(content)]
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    cache = ImageCache()
+    monkeypatch.setattr(images, "_cache", cache)
+    return cache
+
+
+class TestImagens:
+    def test_dimensoes_pelo_cabecalho(self):
+        assert image_size(_image(300, 20)) == (300, 20)
+        assert image_size(_image(300, 20, "jpg")) == (300, 20)
+        assert image_size(b"GIF89a...") is None
+
+    def test_largura_alvo_por_formato(self):
+        assert target_width(["txt", "md"]) == 0
+        assert target_width(["docx"]) == round(6.5 * 150)
+        assert target_width(["docx", "pdf"]) == round(7.26 * 150)
+
+    def test_imagem_larga_e_reduzida_no_mesmo_formato(self, cache):
+        for output, mime in (("png", "png"), ("jpg", "jpeg")):
+            source = _markdown(_image(2400, 300, output), mime=mime)
+            result = optimize_images(source, "markdown", ["pdf"])
+            (data,) = _embedded(result)
+            assert image_size(data) == (1089, 136)
+            assert data[:2] == _image(1, 1, output)[:2]
+            # Tamanho físico mantido: menos pixels por polegada
+            assert pymupdf.Pixmap(data).xres < 96
+
+    def test_imagem_estreita_fica_intacta(self):
+        source = _markdown(_image(400, 300))
+        assert optimize_images(source, "markdown", ["pdf"]) is source
+        assert optimize_images(source, "markdown", ["txt"]) is source
+
+    def test_repetidas_sao_processadas_uma_vez(self, cache):
+        source = _markdown(_image(2400, 100), copies=5)
+        result = optimize_images(source, "markdown", ["pdf"])
+        assert len(set(_embedded(result))) == 1
+        assert cache.stats()["misses"] == 1
+
+        # Outra requisição com a mesma imagem usa o cache
+        optimize_images(source, "markdown", ["pdf"])
+        assert cache.stats() | {"bytes": 0} == {
+            "entries": 1,
+            "bytes": 0,
+            "hits": 1,
+            "misses": 1,
+        }
+
+    def test_png_que_cresceria_so_e_reduzido_para_pdf(self, cache):
+        # Pontos esparsos: o PNG interpolado fica maior que o original, mas
+        # no PDF a imagem é guardada decodificada (o que conta são os pixels)
+        pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 2400, 800), False)
+        pixmap.clear_with(200)
+        for x in range(0, 2400, 7):
+            for y in range(0, 800, 50):
+                pixmap.set_pixel(x, y, (x % 256, y % 256, 30))
+        original = pixmap.tobytes("png")
+        assert cache.optimize(original, 975) is original
+        assert image_size(cache.optimize(original, 975, keep_larger=True))[0] == 975
+
+    def test_midia_do_docx_e_reduzida(self):
+        photo = _image(2400, 400, "jpg")
+        docx = PandocEngine.convert_bytes(_markdown(photo, mime="jpeg"), "docx")
+        result = optimize_images(docx, "docx", ["docx"])
+        with zipfile.ZipFile(io.BytesIO(docx)) as before, zipfile.ZipFile(
+            io.BytesIO(result)
+        ) as after:
+            assert before.namelist() == after.namelist()
+            (media,) = [n for n in after.namelist() if n.startswith("word/media/")]
+            assert image_size(after.read(media))[0] == 975
+            assert after.read("word/document.xml") == before.read("word/document.xml")
+        assert len(result) < len(docx)
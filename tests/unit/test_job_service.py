@@ -0,0 +1,235 @@
+"""Testes dos jobs de conversão assíncronos."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from domain.models import ConvertRequest, ConvertResult
+from services.convert_service import ConversionError
+from services.executor import ConversionExecutor, ExecutorBusyError
+from services.job_service import (
+    DONE,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    JobManager,
+    JobNotFoundError,
+    JobRecord,
+    MemoryJobStore,
+    SqliteJobStore,
+)
+from services.result_cache import ResultCache
+
+
+def _request(content: bytes = b"# Job", output_format: str = "html") -> ConvertRequest:
+    return ConvertRequest(
+        source_content=content, source_filename="job.md", output_format=output_format
+    )
+
+
+def _job(request: ConvertRequest) -> ConvertResult:
+    if request.source_content == b"falha":
+        raise ConversionError("origem inválida")
+    return ConvertResult(content=b"<h1>Job</h1>", filename="job.html", content_type="text/html")
+
+
+async def _wait(manager: JobManager, job_id: str):
+    for _ in range(200):
+        record = manager.get(job_id)
+        if record.status in (DONE, FAILED):
+            return record
+        await asyncio.sleep(0.01)
+    raise AssertionError("job não terminou")
+
+
+@pytest.fixture
+def executor():
+    executor = ConversionExecutor(max_concurrency=1, queue_depth=0, job=_job)
+    yield executor
+    executor.shutdown()
+
+
+class TestJobManager:
+    async def test_conclui_e_guarda_resultado(self, executor, tmp_path):
+        manager = JobManager(executor, ResultCache(), MemoryJobStore(tmp_path))
+        cleaned = []
+        record = manager.submit(_request(), cleanup=lambda: cleaned.append(True))
+        assert record.status == "queued"
+
+        done = await _wait(manager, record.job_id)
+        assert done.status == DONE
+        assert done.filename == "job.html"
+        assert manager.result_path(done).read_bytes() == b"<h1>Job</h1>"
+        assert done.to_dict()["run_seconds"] is not None
+        assert cleaned == [True]
+
+    async def test_falha_registra_erro(self, executor, tmp_path):
+        manager = JobManager(executor, ResultCache(), MemoryJobStore(tmp_path))
+        record = await _wait(manager, manager.submit(_request(b"falha")).job_id)
+        assert record.status == FAILED
+        assert record.status_code == 400
+        assert "origem inválida" in record.error
+
+    async def test_formato_invalido_rejeitado_na_submissao(self, executor, tmp_path):
+        manager = JobManager(executor, ResultCache(), MemoryJobStore(tmp_path))
+        with pytest.raises(ConversionError):
+            manager.submit(_request(output_format="xyz"))
+
+    async def test_limite_de_jobs_pendentes(self, tmp_path):
+        release = threading.Event()
+
+        def slow_job(request):
+            release.wait(5)
+            return _job(request)
+
+        executor = ConversionExecutor(max_concurrency=1, queue_depth=0, job=slow_job)
+        manager = JobManager(
+            executor, ResultCache(), MemoryJobStore(tmp_path), max_pending=1
+        )
+        try:
+            record = manager.submit(_request())
+            with pytest.raises(ExecutorBusyError):
+                manager.submit(_request(b"# outro"))
+            release.set()
+            assert (await _wait(manager, record.job_id)).status == DONE
+        finally:
+            release.set()
+            executor.shutdown()
+
+    async def test_job_aguardando_pool_cheio_fica_na_fila(self, tmp_path):
+        release = threading.Event()
+
+        def slow_job(request):
+            release.wait(5)
+            return _job(request)
+
+        executor = ConversionExecutor(max_concurrency=1, queue_depth=0, job=slow_job)
+        manager = JobManager(executor, ResultCache(), MemoryJobStore(tmp_path))
+        try:
+            busy = asyncio.create_task(executor.run(_request(b"# ocupa")))
+            await asyncio.sleep(0.05)
+            record = manager.submit(_request())
+            await asyncio.sleep(0.2)
+            waiting = manager.get(record.job_id)
+            assert waiting.status == QUEUED
+            assert waiting.started_at is None
+
+            release.set()
+            await busy
+            done = await _wait(manager, record.job_id)
+            assert done.status == DONE
+            assert done.started_at is not None
+            assert done.to_dict()["queue_seconds"] >= 0.2
+        finally:
+            release.set()
+            executor.shutdown()
+
+    async def test_resultado_expira(self, executor, tmp_path):
+        manager = JobManager(
+            executor, ResultCache(), MemoryJobStore(tmp_path), ttl_seconds=0
+        )
+        record = manager.submit(_request())
+        await asyncio.sleep(0.2)
+        with pytest.raises(JobNotFoundError):
+            manager.get(record.job_id)
+
+
+class TestSqliteJobStore:
+    async def test_sobrevive_a_reinicio(self, executor, tmp_path):
+        manager = JobManager(executor, ResultCache(), SqliteJobStore(tmp_path))
+        record = await _wait(manager, manager.submit(_request()).job_id)
+        manager.store.close()
+
+        restarted = JobManager(executor, ResultCache(), SqliteJobStore(tmp_path))
+        again = restarted.get(record.job_id)
+        assert again.status == DONE
+        assert restarted.result_path(again).read_bytes() == b"<h1>Job</h1>"
+        restarted.store.close()
+
+    async def test_job_de_outro_worker_com_heartbeat_nao_falha(self, tmp_path):
+        release = threading.Event()
+
+        def slow_job(request):
+            release.wait(5)
+            return _job(request)
+
+        owner_executor = ConversionExecutor(
+            max_concurrency=1, queue_depth=0, job=slow_job
+        )
+        other_executor = ConversionExecutor(max_concurrency=1, timeout=0.01)
+        owner = JobManager(
+            owner_executor,
+            ResultCache(),
+            SqliteJobStore(tmp_path),
+            heartbeat_seconds=0.05,
+        )
+        other = JobManager(
+            other_executor,
+            ResultCache(),
+            SqliteJobStore(tmp_path),
+            heartbeat_seconds=0.05,
+        )
+        try:
+            record = owner.submit(_request())
+            await asyncio.sleep(0.4)
+            assert other.get(record.job_id).status not in (DONE, FAILED)
+
+            release.set()
+            assert (await _wait(other, record.job_id)).status == DONE
+        finally:
+            release.set()
+            await owner.shutdown()
+            await other.shutdown()
+            owner_executor.shutdown()
+            other_executor.shutdown()
+
+    async def test_job_removido_por_outro_worker_nao_volta(self, tmp_path):
+        release = threading.Event()
+
+        def slow_job(request):
+            release.wait(5)
+            return _job(request)
+
+        executor = ConversionExecutor(max_concurrency=1, queue_depth=0, job=slow_job)
+        owner = JobManager(executor, ResultCache(), SqliteJobStore(tmp_path))
+        other = JobManager(executor, ResultCache(), SqliteJobStore(tmp_path))
+        try:
+            record = owner.submit(_request())
+            for _ in range(200):
+                if owner.get(record.job_id).status == RUNNING:
+                    break
+                await asyncio.sleep(0.01)
+            other.delete(record.job_id)
+
+            release.set()
+            await asyncio.gather(*owner._tasks.values())
+            assert owner.store.get(record.job_id) is None
+            assert not owner.store.result_path(record.job_id).exists()
+        finally:
+            release.set()
+            await owner.shutdown()
+            await other.shutdown()
+            executor.shutdown()
+
+    async def test_job_sem_heartbeat_consta_como_falho(self, executor, tmp_path):
+        manager = JobManager(
+            executor, ResultCache(), SqliteJobStore(tmp_path), heartbeat_seconds=1
+        )
+        created = time.time() - 10
+        manager.store.save(
+            JobRecord(
+                job_id="abandonado",
+                status=RUNNING,
+                source_filename="job.md",
+                output_format="html",
+                created_at=created,
+                started_at=created,
+                heartbeat_at=created,
+            )
+        )
+        record = manager.get("abandonado")
+        assert record.status == FAILED
+        assert record.status_code == 503
+        manager.store.close()
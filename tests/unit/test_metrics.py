@@ -0,0 +1,27 @@
+"""Testes das métricas e dos tempos por etapa."""
+
+from prometheus_client import REGISTRY
+
+from services.metrics import StageTimer, observe_stages
+
+
+class TestStageTimer:
+    def test_acumula_etapas_repetidas(self):
+        timer = StageTimer([("pandoc", 0.5)])
+        timer.add("pandoc", 0.25)
+        with timer.stage("docx_merge"):
+            pass
+        assert timer.stages["pandoc"] == 0.75
+        assert [name for name, _ in timer.as_tuple()] == ["pandoc", "docx_merge"]
+
+    def test_server_timing_em_milissegundos(self):
+        timer = StageTimer([("pandoc", 0.0125), ("pdf_render", 1)])
+        assert timer.server_timing() == "pandoc;dur=12.5, pdf_render;dur=1000.0"
+
+
+def test_observe_stages_rotula_por_formato():
+    labels = {"stage": "pandoc", "input_format": "rst", "output_format": "tex"}
+    before = REGISTRY.get_sample_value("converter_stage_seconds_sum", labels) or 0
+    observe_stages([("pandoc", 0.5)], "rst", "tex")
+    after = REGISTRY.get_sample_value("converter_stage_seconds_sum", labels)
+    assert after == before + 0.5
@@ -50,3 +50,42 @@ class TestGetOutputExtension:
 
     def test_extensao_case_insensitive(self):
         assert PandocEngine.get_output_extension("DOCX") == ".docx"
+
+
+class TestConvertBytes:
+    """Testes da conversão em memória (stdin/stdout)."""
+
+    def test_texto_para_texto(self):
+        output = PandocEngine.convert_bytes(b"# Oi", "html")
+        assert output.startswith(b"<h1")
+
+    def test_saida_binaria_docx(self):
+        output = PandocEngine.convert_bytes(b"# Oi", "docx")
+        assert output[:2] == b"PK"
+
+    def test_entrada_binaria_docx(self):
+        docx = PandocEngine.convert_bytes(b"# Oi", "docx")
+        assert PandocEngine.convert_bytes(docx, "md", input_format="docx") == b"# Oi\n"
+
+    def test_rejeita_formato_de_saida_invalido(self):
+        with pytest.raises(ValueError):
+            PandocEngine.convert_bytes(b"# Oi", "xyz")
+
+
+class TestPandocPath:
+    def test_falha_na_descoberta_nao_e_repetida(self, monkeypatch):
+        from converter import pandoc_engine
+
+        calls = []
+
+        def failing():
+            calls.append(1)
+            raise OSError("sem rede")
+
+        monkeypatch.setattr(pandoc_engine, "_pandoc_path", None)
+        monkeypatch.setattr(pandoc_engine, "_pandoc_error", None)
+        monkeypatch.setattr(pandoc_engine, "ensure_pandoc", failing)
+        for _ in range(2):
+            with pytest.raises(RuntimeError, match="Pandoc indisponível"):
+                pandoc_engine.pandoc_path()
+        assert len(calls) == 1
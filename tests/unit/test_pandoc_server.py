@@ -0,0 +1,77 @@
+"""Testes do pool de `pandoc server`."""
+
+import sys
+import textwrap
+
+import pytest
+
+from converter.pandoc_server import PandocServerError, PandocServerPool
+
+# Servidor falso que imita a API JSON do pandoc server
+FAKE_SERVER = textwrap.dedent(
+    """
+    import json
+    import sys
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body):
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._reply(200, b"3.9")
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if payload["text"] == "crash":
+                sys.exit(1)
+            output = f"{payload['from']}>{payload['to']}:{payload['text']}"
+            self._reply(200, json.dumps({"output": output, "base64": False}).encode())
+
+    port = int(sys.argv[sys.argv.index("--port") + 1])
+    HTTPServer(("127.0.0.1", port), Handler).serve_forever()
+    """
+)
+
+
+@pytest.fixture
+def fake_command(tmp_path):
+    script = tmp_path / "fake_pandoc_server.py"
+    script.write_text(FAKE_SERVER, encoding="utf-8")
+    return [sys.executable, str(script)]
+
+
+class TestPandocServerPool:
+    """Testes do PandocServerPool."""
+
+    def test_converte_via_servidor(self, fake_command):
+        pool = PandocServerPool(fake_command, size=1, timeout=5)
+        try:
+            assert pool.start()
+            output = pool.convert(b"# Oi", "markdown", "html")
+            assert output == b"markdown>html:# Oi"
+        finally:
+            pool.close()
+
+    def test_indisponivel_quando_comando_falha(self):
+        pool = PandocServerPool([sys.executable, "-c", "raise SystemExit(1)"], 1, 5)
+        assert not pool.start()
+        with pytest.raises(PandocServerError):
+            pool.convert(b"x", "markdown", "html")
+
+    def test_reinicia_servidor_apos_queda(self, fake_command):
+        pool = PandocServerPool(fake_command, size=1, timeout=5)
+        try:
+            pool.start()
+            with pytest.raises(PandocServerError):
+                pool.convert(b"crash", "markdown", "html")
+            assert pool.convert(b"ok", "markdown", "rst") == b"markdown>rst:ok"
+            assert pool.stats()["restarts"] >= 1
+        finally:
+            pool.close()
@@ -0,0 +1,80 @@
+"""Testes da renderização de PDF em blocos."""
+
+import io
+
+import pymupdf
+import pytest
+
+from converter import pdf_chunked
+from converter.pdf_chunked import (
+    render_markdown_to_pdf_chunked,
+    shutdown_chunk_pool,
+    split_markdown,
+)
+
+
+def _document(sections: int) -> str:
+    return "# Manual\n\n" + "".join(
+        f"## Seção {i}\n\nTexto da seção {i}.\n\n### Detalhe {i}\n\nMais texto.\n\n"
+        for i in range(sections)
+    )
+
+
+class TestSplitMarkdown:
+    def test_divide_so_antes_de_titulos_de_secao(self):
+        chunks = split_markdown(_document(6), target_chars=60)
+        assert len(chunks) > 1
+        assert "".join(chunks) == _document(6)
+        for chunk in chunks[1:]:
+            assert chunk.startswith("## Seção")
+
+    def test_nao_divide_dentro_de_bloco_de_codigo(self):
+        markdown = "# A\n\n" + "x" * 50 + "\n\n```\n## nao e titulo\n```\n\n## B\n"
+        chunks = split_markdown(markdown, target_chars=10)
+        assert chunks == [markdown[: markdown.index("## B")], "## B\n"]
+
+    def test_documento_pequeno_fica_inteiro(self):
+        assert split_markdown(_document(2), target_chars=10_000) == [_document(2)]
+
+    def test_repete_definicoes_de_link(self):
+        markdown = "# A\n\nVer [docs][d].\n\n## B\n\nOutro.\n\n[d]: https://example.com\n"
+        chunks = split_markdown(markdown, target_chars=5)
+        assert len(chunks) == 2
+        assert all("[d]: https://example.com" in chunk for chunk in chunks)
+
+
+@pytest.fixture(autouse=True)
+def _chunk_pool():
+    yield
+    shutdown_chunk_pool()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_costura_paginas_e_sumario_dos_blocos(workers):
+    buffer = io.BytesIO()
+    pages = render_markdown_to_pdf_chunked(
+        _document(8), buffer, target_chars=100, workers=workers
+    )
+    document = pymupdf.open(stream=buffer.getvalue())
+    assert document.page_count == pages
+    toc = document.get_toc()
+    assert [entry[1] for entry in toc] == ["Manual"] + [
+        f"Seção {i}" for i in range(8)
+    ]
+    assert toc[0][0] == 1 and {entry[0] for entry in toc[1:]} == {2}
+    assert [entry[2] for entry in toc] == sorted(entry[2] for entry in toc)
+    text = "".join(page.get_text() for page in document)
+    assert "Texto da seção 7." in text
+
+
+def test_pool_de_blocos_e_compartilhado_entre_renderizacoes():
+    render_markdown_to_pdf_chunked(
+        _document(8), io.BytesIO(), target_chars=100, workers=2
+    )
+    pool = pdf_chunked._pool
+    assert pool is not None and pool._max_workers == 2
+
+    render_markdown_to_pdf_chunked(
+        _document(4), io.BytesIO(), target_chars=100, workers=2
+    )
+    assert pdf_chunked._pool is pool
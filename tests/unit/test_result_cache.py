@@ -0,0 +1,102 @@
+"""Testes do cache de resultados."""
+
+from pathlib import Path
+
+from domain.models import ConvertRequest, ConvertResult
+from services.result_cache import ResultCache, cache_key, rename_result
+
+
+def _request(content: bytes = b"# Teste", **kwargs) -> ConvertRequest:
+    params = {
+        "source_content": content,
+        "source_filename": "teste.md",
+        "output_format": "html",
+    }
+    params.update(kwargs)
+    return ConvertRequest(**params)
+
+
+def _result(size: int = 10) -> ConvertResult:
+    return ConvertResult(content=b"x" * size, filename="a.html", content_type="text/html")
+
+
+class TestCacheKey:
+    """Testes da chave de cache."""
+
+    def test_mesma_entrada_mesma_chave(self):
+        assert cache_key(_request(), "v1") == cache_key(_request(), "v1")
+
+    def test_nome_do_arquivo_nao_altera_chave(self):
+        other = _request(source_filename="outro.md")
+        assert cache_key(_request(), "v1") == cache_key(other, "v1")
+
+    def test_extensao_formato_template_e_versao_alteram_chave(self):
+        base = cache_key(_request(), "v1")
+        assert cache_key(_request(source_filename="teste.txt"), "v1") != base
+        assert cache_key(_request(output_format="rst"), "v1") != base
+        assert cache_key(_request(template_content=b"PK"), "v1") != base
+        assert cache_key(_request(), "v2") != base
+
+    def test_motor_de_pdf_so_altera_chave_de_pdf(self):
+        pdf = cache_key(_request(output_format="pdf"), "v1")
+        assert cache_key(_request(output_format="pdf", pdf_engine="html"), "v1") != pdf
+        html = cache_key(_request(), "v1")
+        assert cache_key(_request(pdf_engine="html"), "v1") == html
+
+
+class TestResultCache:
+    """Testes do ResultCache."""
+
+    def test_miss_e_hit(self):
+        cache = ResultCache(disk_dir=None)
+        assert cache.get("k") is None
+        cache.put("k", _result())
+        assert cache.get("k") is not None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_eviction_por_tamanho(self):
+        cache = ResultCache(max_bytes=25, disk_dir=None)
+        cache.put("a", _result())
+        cache.put("b", _result())
+        cache.get("a")
+        cache.put("c", _result())
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expirado(self):
+        cache = ResultCache(ttl_seconds=-1, disk_dir=None)
+        cache.put("k", _result())
+        assert cache.get("k") is None
+
+    def test_camada_em_disco(self, tmp_path):
+        ResultCache(disk_dir=tmp_path).put("abcd", _result())
+        fresh = ResultCache(disk_dir=tmp_path)
+        assert fresh.get("abcd").content == b"x" * 10
+        assert fresh.stats()["disk_hits"] == 1
+
+    def test_resultado_em_arquivo_fica_na_camada_em_disco(self, tmp_path):
+        spooled = tmp_path / "resultado.pdf"
+        spooled.write_bytes(b"%PDF grande")
+        result = ConvertResult(
+            content=b"",
+            filename="a.pdf",
+            content_type="application/pdf",
+            path=str(spooled),
+        )
+        cache = ResultCache(disk_dir=tmp_path / "cache")
+        cache.put("abcd", result)
+        result.cleanup()
+        assert cache.stats()["entries"] == 0
+
+        for _ in range(2):
+            hit = ResultCache(disk_dir=tmp_path / "cache").get("abcd")
+            assert hit.path != str(spooled)
+            assert hit.read_content() == b"%PDF grande"
+            # Cada hit recebe o próprio arquivo, removido por quem consome
+            hit.cleanup()
+            assert not Path(hit.path).exists()
+
+    def test_renomeia_resultado(self):
+        assert rename_result(_result(), "relatorio.md").filename == "relatorio.html"
@@ -0,0 +1,150 @@
+"""Testes da coalescência de conversões idênticas (single-flight)."""
+
+import asyncio
+import os
+
+import pytest
+
+from domain.models import ConvertRequest, ConvertResult
+from services.convert_service import ConversionError
+from services.executor import ExecutorBusyError
+from services.result_cache import ResultCache
+from services.single_flight import SingleFlight
+
+
+def _request(filename: str = "teste.md") -> ConvertRequest:
+    return ConvertRequest(
+        source_content=b"# Teste", source_filename=filename, output_format="html"
+    )
+
+
+class _Conversor:
+    """Conversão lenta que conta as execuções."""
+
+    def __init__(self, result=None, error: Exception | None = None, delay=0.05):
+        self.calls = 0
+        self.result = result or ConvertResult(
+            content=b"<h1>Teste</h1>", filename="teste.html", content_type="text/html"
+        )
+        self.error = error
+        self.delay = delay
+
+    async def __call__(self, request: ConvertRequest | None = None) -> ConvertResult:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class TestMesmoWorker:
+    async def test_conversoes_identicas_sao_feitas_uma_vez(self):
+        cache = ResultCache(single_flight=SingleFlight(directory=None))
+        convert = _Conversor()
+        outcomes = await asyncio.gather(
+            *(
+                cache.get_or_convert("k", _request(f"doc{i}.md"), convert)
+                for i in range(5)
+            )
+        )
+        assert convert.calls == 1
+        assert [hit for _, hit in outcomes] == [False, True, True, True, True]
+        # Quem esperou recebe o resultado com o nome da própria origem
+        assert [result.filename for result, _ in outcomes][1:] == [
+            f"doc{i}.html" for i in range(1, 5)
+        ]
+        stats = cache.stats()["single_flight"]
+        assert stats["leaders"] == 1
+        assert stats["coalesced"] == 4
+        assert stats["in_flight"] == 0
+
+    async def test_erro_chega_a_todos(self):
+        flight = SingleFlight(directory=None)
+        convert = _Conversor(error=ConversionError("Documento inválido", 422))
+        outcomes = await asyncio.gather(
+            *(flight.run("k", convert) for _ in range(3)), return_exceptions=True
+        )
+        assert convert.calls == 1
+        assert all(isinstance(exc, ConversionError) for exc in outcomes)
+        assert {exc.status_code for exc in outcomes} == {422}
+
+    async def test_recusa_do_lider_nao_vale_para_os_outros(self):
+        flight = SingleFlight(directory=None)
+        busy = _Conversor(error=ExecutorBusyError())
+        convert = _Conversor()
+        leader = asyncio.ensure_future(flight.run("k", busy))
+        await asyncio.sleep(0)
+        result, shared = await flight.run("k", convert)
+        with pytest.raises(ExecutorBusyError):
+            await leader
+        assert (convert.calls, shared) == (1, False)
+        assert flight.stats()["retries"] == 1
+
+    async def test_lider_cancelado_nao_derruba_quem_espera(self):
+        flight = SingleFlight(directory=None)
+        convert = _Conversor()
+        leader = asyncio.ensure_future(flight.run("k", _Conversor(delay=10)))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.run("k", convert))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result, shared = await follower
+        assert result.content == b"<h1>Teste</h1>"
+        assert convert.calls == 1
+
+    async def test_resultado_em_arquivo_e_copiado_para_cada_um(self, tmp_path):
+        path = tmp_path / "resultado.pdf"
+        path.write_bytes(b"%PDF grande")
+        convert = _Conversor(
+            ConvertResult(
+                content=b"",
+                filename="a.pdf",
+                content_type="application/pdf",
+                path=str(path),
+            )
+        )
+        flight = SingleFlight(directory=None)
+        outcomes = await asyncio.gather(*(flight.run("k", convert) for _ in range(3)))
+        paths = {result.path for result, _ in outcomes}
+        assert len(paths) == 3
+        for result, _ in outcomes:
+            assert result.read_content() == b"%PDF grande"
+            result.cleanup()
+        assert not any(os.path.exists(p) for p in paths)
+
+
+class TestEntreWorkers:
+    """Dois SingleFlight no mesmo diretório fazem o papel de dois workers."""
+
+    async def test_outro_worker_espera_e_le_o_resultado(self, tmp_path):
+        workers = [SingleFlight(tmp_path, poll_interval=0.01) for _ in range(2)]
+        first, second = _Conversor(delay=0.2), _Conversor()
+        leader = asyncio.ensure_future(workers[0].run("k", first))
+        await asyncio.sleep(0.05)
+        result, shared = await workers[1].run("k", second)
+        assert (await leader)[1] is False
+        assert (first.calls, second.calls) == (1, 0)
+        assert shared and result.content == b"<h1>Teste</h1>"
+        assert workers[1].stats()["coalesced_remote"] == 1
+
+    async def test_erro_do_outro_worker_e_propagado(self, tmp_path):
+        workers = [SingleFlight(tmp_path, poll_interval=0.01) for _ in range(2)]
+        first = _Conversor(error=ConversionError("Documento inválido", 422), delay=0.2)
+        second = _Conversor()
+        leader = asyncio.ensure_future(workers[0].run("k", first))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ConversionError) as exc_info:
+            await workers[1].run("k", second)
+        with pytest.raises(ConversionError):
+            await leader
+        assert exc_info.value.status_code == 422
+        assert second.calls == 0
+
+    async def test_sem_conversao_em_andamento_nao_reusa_resultado_antigo(
+        self, tmp_path
+    ):
+        workers = [SingleFlight(tmp_path, poll_interval=0.01) for _ in range(2)]
+        await workers[0].run("k", _Conversor(delay=0))
+        convert = _Conversor(delay=0)
+        _, shared = await workers[1].run("k", convert)
+        assert (convert.calls, shared) == (1, False)
@@ -0,0 +1,188 @@
+"""Testes do template DOCX pré-processado e do registro de templates."""
+
+import io
+import os
+import zipfile
+
+import pytest
+
+from converter.docx_template import DocxTemplate, TemplateError
+from converter.pandoc_engine import PandocEngine
+from services.template_registry import TemplateNotFoundError, TemplateRegistry
+
+
+@pytest.fixture(scope="module")
+def template() -> bytes:
+    return PandocEngine.convert_bytes(b"Capa\n\n{{CONTEUDO}}\n\nFim", "docx")
+
+
+@pytest.fixture(scope="module")
+def report() -> bytes:
+    return PandocEngine.convert_bytes(
+        b"Capa\n\n{{INTRO}}\n\nMeio\n\n{{RESULTADOS}}\n\n{{ANEXOS}}\n\nFim",
+        "docx",
+    )
+
+
+def _text(docx: bytes) -> list[str]:
+    return PandocEngine.convert_bytes(docx, "plain", input_format="docx").decode().split()
+
+
+class TestDocxTemplate:
+    def test_merge_preserva_template_e_conteudo(self, template):
+        content = PandocEngine.convert_bytes(
+            b"# Titulo\n\n- um\n- dois\n\nNota[^1].\n\n[^1]: rodape", "docx"
+        )
+        merged = DocxTemplate(template).merge(content)
+        words = _text(merged)
+        assert words[0] == "Capa" and words[-2:] == ["[1]", "rodape"]
+        assert "Fim" in words and {"Titulo", "um", "dois"} <= set(words)
+
+    def test_template_reutilizado_em_varios_merges(self, template):
+        prepared = DocxTemplate(template)
+        for word in ("alfa", "beta"):
+            content = PandocEngine.convert_bytes(word.encode(), "docx")
+            assert _text(prepared.merge(content)) == ["Capa", word, "Fim"]
+
+    def test_placeholder_ausente(self, template):
+        prepared = DocxTemplate(template, placeholder="{{OUTRO}}")
+        assert prepared.placeholder_count == 0
+        with pytest.raises(TemplateError):
+            prepared.merge(template)
+
+    def test_rejeita_arquivo_que_nao_e_docx(self):
+        with pytest.raises(TemplateError):
+            DocxTemplate(b"texto puro")
+
+    def test_partes_sem_mudanca_sao_copiadas_comprimidas(self, template):
+        heavy = io.BytesIO()
+        with zipfile.ZipFile(io.BytesIO(template)) as src, zipfile.ZipFile(
+            heavy, "w", zipfile.ZIP_DEFLATED
+        ) as dst:
+            for info in src.infolist():
+                dst.writestr(info, src.read(info))
+            dst.writestr("word/fonts/font1.odttf", os.urandom(64 * 1024))
+        content = PandocEngine.convert_bytes(b"texto", "docx")
+        output = io.BytesIO()
+        DocxTemplate(heavy.getvalue()).merge_to(content, output)
+
+        with zipfile.ZipFile(heavy) as src, zipfile.ZipFile(output) as merged:
+            assert merged.testzip() is None
+            font = src.getinfo("word/fonts/font1.odttf")
+            copied = merged.getinfo("word/fonts/font1.odttf")
+            assert (copied.CRC, copied.compress_size) == (
+                font.CRC,
+                font.compress_size,
+            )
+            assert merged.read(copied) == src.read(font)
+        assert _text(output.getvalue()) == ["Capa", "texto", "Fim"]
+
+
+class TestVariosPlaceholders:
+    def test_insere_cada_conteudo_no_seu_placeholder(self, report):
+        prepared = DocxTemplate(report, ("{{INTRO}}", "{{RESULTADOS}}", "{{ANEXOS}}"))
+        assert prepared.placeholder_counts == {
+            "{{INTRO}}": 1,
+            "{{RESULTADOS}}": 1,
+            "{{ANEXOS}}": 1,
+        }
+        contents = {
+            "{{RESULTADOS}}": PandocEngine.convert_bytes(b"- beta\n- gama", "docx"),
+            "{{INTRO}}": PandocEngine.convert_bytes(b"alfa[^1]\n\n[^1]: nota", "docx"),
+        }
+        words = _text(prepared.merge(contents))
+        # Placeholder sem conteúdo fica vazio
+        assert words == [
+            "Capa", "alfa[1]", "Meio", "-", "beta", "-", "gama", "Fim", "[1]", "nota"
+        ]
+
+    def test_ids_de_relacionamento_unicos_entre_os_conteudos(self, report):
+        prepared = DocxTemplate(report, ["{{INTRO}}", "{{RESULTADOS}}"])
+        link = PandocEngine.convert_bytes(b"[a](https://a.example)", "docx")
+        merged = prepared.merge({"{{INTRO}}": link, "{{RESULTADOS}}": link})
+        with zipfile.ZipFile(io.BytesIO(merged)) as package:
+            rels = package.read("word/_rels/document.xml.rels").decode()
+        assert rels.count("https://a.example") == 2
+        ids = [part.split('"')[0] for part in rels.split('Id="')[1:]]
+        assert len(ids) == len(set(ids))
+
+    def test_placeholder_nao_preparado(self, report):
+        prepared = DocxTemplate(report, "{{INTRO}}")
+        with pytest.raises(TemplateError):
+            prepared.merge({"{{RESULTADOS}}": report})
+
+
+class TestTemplateRegistry:
+    def test_registra_e_reutiliza(self, tmp_path, template):
+        registry = TemplateRegistry(tmp_path)
+        info = registry.register(template, "base.docx")
+        assert info.placeholder_count == 1
+        assert registry.register(template, "base.docx").template_id == info.template_id
+        assert [item.template_id for item in registry.list()] == [info.template_id]
+
+        first = registry.get(info.template_id)
+        assert registry.get(info.template_id) is first
+        assert registry.stats()["hits"] >= 1
+
+    def test_carrega_do_disco_em_nova_instancia(self, tmp_path, template):
+        info = TemplateRegistry(tmp_path).register(template, "base.docx")
+        prepared = TemplateRegistry(tmp_path).get(info.template_id)
+        assert prepared.placeholder_count == 1
+
+    def test_remove_template(self, tmp_path, template):
+        registry = TemplateRegistry(tmp_path)
+        info = registry.register(template, "base.docx")
+        registry.delete(info.template_id)
+        with pytest.raises(TemplateNotFoundError):
+            registry.get(info.template_id)
+
+    def test_rejeita_id_invalido(self, tmp_path):
+        with pytest.raises(TemplateNotFoundError):
+            TemplateRegistry(tmp_path).get_info("../../etc/passwd")
+
+    def test_template_sem_placeholder_e_registrado_so_com_estilos(
+        self, tmp_path, template
+    ):
+        registry = TemplateRegistry(tmp_path)
+        info = registry.register(template, "base.docx", "{{OUTRO}}")
+        assert (info.placeholder_count, info.format) == (0, "docx")
+        assert registry.reference_path(info.template_id).read_bytes() == template
+
+        odt = PandocEngine.convert_bytes(b"Estilos", "odt")
+        info = registry.register(odt, "base.odt")
+        assert (info.placeholder_count, info.format) == (0, "odt")
+        assert registry.reference_path(info.template_id).suffix == ".odt"
+        with pytest.raises(TemplateError):
+            registry.get(info.template_id)
+        with pytest.raises(TemplateError):
+            registry.register(b"texto puro", "base.docx")
+
+    def test_documento_de_referencia_gravado_uma_vez(self, tmp_path, template):
+        registry = TemplateRegistry(tmp_path)
+        path = registry.reference_doc(template, "docx")
+        assert path.read_bytes() == template
+        inode = path.stat().st_ino
+        assert registry.reference_doc(template, "docx") == path
+        assert path.stat().st_ino == inode
+        # Template registrado: o próprio arquivo do registro serve
+        info = registry.register(template, "base.docx")
+        assert registry.reference_doc(template, "docx") == registry.reference_path(
+            info.template_id
+        )
+
+    def test_documentos_de_referencia_limitados_em_bytes(self, tmp_path):
+        registry = TemplateRegistry(tmp_path, reference_max_bytes=250)
+        first = registry.reference_doc(b"a" * 100, "docx")
+        second = registry.reference_doc(b"b" * 100, "docx")
+        os.utime(second, (1, 1))
+        # first foi usado mais recentemente que second
+        registry.reference_doc(b"a" * 100, "docx")
+        third = registry.reference_doc(b"c" * 100, "docx")
+        assert first.exists() and third.exists()
+        assert not second.exists()
+
+    def test_cache_lru_limitado(self, tmp_path, template):
+        registry = TemplateRegistry(tmp_path, max_entries=1)
+        registry.prepare(template, "{{CONTEUDO}}")
+        registry.prepare(template, "Capa")
+        assert registry.stats()["entries"] == 1
@@ -0,0 +1,91 @@
+"""Testes da leitura de uploads e do limite de corpo."""
+
+import io
+import os
+
+import pytest
+from fastapi import FastAPI, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from api.middleware import BodySizeLimitMiddleware
+from api.uploads import read_upload
+from services.convert_service import ConversionError
+
+
+def _upload(content: bytes, filename: str = "doc.md") -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=filename)
+
+
+class TestReadUpload:
+    """Testes do read_upload."""
+
+    async def test_pequeno_fica_em_memoria(self):
+        upload = await read_upload(_upload(b"# Oi"), limit=100, label="Arquivo")
+        assert upload.content == b"# Oi"
+        assert upload.path is None
+
+    async def test_grande_vai_para_disco(self):
+        content = b"x" * 5000
+        upload = await read_upload(
+            _upload(content), limit=10_000, label="Arquivo", spool_threshold=1000
+        )
+        try:
+            assert upload.content == b""
+            assert upload.path.endswith(".md")
+            with open(upload.path, "rb") as file:
+                assert file.read() == content
+        finally:
+            upload.cleanup()
+        assert upload.path is None
+
+    async def test_rejeita_acima_do_limite(self):
+        with pytest.raises(ConversionError) as exc_info:
+            await read_upload(_upload(b"x" * 101), limit=100, label="Template")
+        assert exc_info.value.status_code == 413
+        assert "Template muito grande" in str(exc_info.value)
+
+    async def test_remove_spool_ao_rejeitar(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+        with pytest.raises(ConversionError):
+            await read_upload(
+                _upload(b"x" * 3 * 1024 * 1024),
+                limit=2 * 1024 * 1024,
+                label="Arquivo",
+                spool_threshold=10,
+            )
+        assert os.listdir(tmp_path) == []
+
+
+class TestBodySizeLimitMiddleware:
+    """Testes do BodySizeLimitMiddleware."""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.add_middleware(BodySizeLimitMiddleware, limits={"/upload": 10})
+
+        @app.post("/upload")
+        async def upload(request: Request):
+            return {"size": len(await request.body())}
+
+        @app.post("/livre")
+        async def livre(request: Request):
+            return {"size": len(await request.body())}
+
+        return TestClient(app)
+
+    def test_aceita_dentro_do_limite(self, client):
+        assert client.post("/upload", content=b"12345").json() == {"size": 5}
+
+    def test_rejeita_content_length_acima_do_limite(self, client):
+        assert client.post("/upload", content=b"x" * 11).status_code == 413
+
+    def test_rejeita_corpo_chunked_acima_do_limite(self, client):
+        def chunks():
+            yield b"x" * 6
+            yield b"x" * 6
+
+        assert client.post("/upload", content=chunks()).status_code == 413
+
+    def test_rotas_sem_limite_nao_sao_afetadas(self, client):
+        assert client.post("/livre", content=b"x" * 100).status_code == 200